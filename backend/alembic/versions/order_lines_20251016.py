@@ -0,0 +1,52 @@
+"""Add order_lines projection of orders.items
+
+Revision ID: order_lines_20251016
+Revises: sync_tombstones_20251016
+Create Date: 2025-10-16
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = 'order_lines_20251016'
+down_revision = 'sync_tombstones_20251016'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'order_lines',
+        sa.Column('order_id', postgresql.UUID(as_uuid=True),
+                  sa.ForeignKey('orders.id', ondelete='CASCADE'), primary_key=True),
+        sa.Column('line_number', sa.Integer(), primary_key=True),
+        sa.Column('restaurant_id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('product_id', postgresql.UUID(as_uuid=True), nullable=True),
+        sa.Column('category_id', postgresql.UUID(as_uuid=True), nullable=True),
+        sa.Column('quantity', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('unit_price', sa.DECIMAL(10, 2), nullable=False, server_default='0'),
+        sa.Column('modifiers_total', sa.DECIMAL(10, 2), nullable=False,
+                  server_default='0'),
+        sa.Column('line_total', sa.DECIMAL(12, 2), nullable=False, server_default='0'),
+        sa.Column('ordered_at', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('completed_at', sa.DateTime(timezone=True), nullable=True),
+    )
+
+    # Only completed lines are reported on; the INCLUDE columns let top-N and
+    # per-category GROUP BYs run as index-only scans
+    op.create_index('idx_order_lines_product_mix', 'order_lines',
+                    ['restaurant_id', 'ordered_at'],
+                    postgresql_include=['product_id', 'quantity', 'line_total'],
+                    postgresql_where=sa.text('completed_at IS NOT NULL'))
+    op.create_index('idx_order_lines_category_mix', 'order_lines',
+                    ['restaurant_id', 'category_id', 'ordered_at'],
+                    postgresql_include=['quantity', 'line_total'],
+                    postgresql_where=sa.text('completed_at IS NOT NULL'))
+
+
+def downgrade():
+    op.drop_index('idx_order_lines_category_mix', table_name='order_lines')
+    op.drop_index('idx_order_lines_product_mix', table_name='order_lines')
+    op.drop_table('order_lines')
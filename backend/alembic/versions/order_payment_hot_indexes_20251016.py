@@ -0,0 +1,83 @@
+"""Add composite and partial indexes for order and payment hot paths
+
+Revision ID: order_payment_hot_indexes_20251016
+Revises: order_lines_20251016
+Create Date: 2025-10-16
+
+Indexes are built CONCURRENTLY so orders and payments stay writable while
+the migration runs. Three single-purpose indexes become redundant prefixes
+of the new ones and are dropped to keep order writes cheap.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'order_payment_hot_indexes_20251016'
+down_revision = 'order_lines_20251016'
+branch_labels = None
+depends_on = None
+
+ACTIVE_STATUSES = "status IN ('pending', 'confirmed', 'preparing', 'ready')"
+
+# name -> (table, columns, options)
+INDEXES = {
+    # Order lists (newest first), analytics windows, last order per restaurant
+    'idx_orders_restaurant_created': (
+        'orders', ['restaurant_id', 'created_at'], {},
+    ),
+    # Kitchen and live order boards
+    'idx_orders_restaurant_active': (
+        'orders', ['restaurant_id', 'created_at'],
+        {'postgresql_where': sa.text(ACTIVE_STATUSES)},
+    ),
+    # Offline sync keyset paging: ORDER BY coalesce(updated_at, created_at), id
+    'idx_orders_restaurant_changed': (
+        'orders',
+        ['restaurant_id', sa.text('coalesce(updated_at, created_at)'), 'id'],
+        {},
+    ),
+    # Payments of an order by status (rollups, refunds, payment breakdowns)
+    'idx_payments_order_status': (
+        'payments', ['order_id', 'status'], {},
+    ),
+    # Revenue and fee reports over completed payments
+    'idx_payments_completed_created': (
+        'payments', ['created_at'],
+        {'postgresql_where': sa.text("status = 'completed'")},
+    ),
+    'idx_payments_completed_processed': (
+        'payments', ['processed_at'],
+        {'postgresql_where': sa.text("status = 'completed'")},
+    ),
+    # Offline sync keyset paging for payments
+    'idx_payments_changed': (
+        'payments', [sa.text('coalesce(processed_at, created_at)'), 'id'], {},
+    ),
+}
+
+# Covered by the leading columns of an index above
+REDUNDANT_INDEXES = {
+    'idx_orders_restaurant_id': ('orders', ['restaurant_id']),
+    'idx_orders_restaurant_status': ('orders', ['restaurant_id', 'status']),
+    'idx_payments_order_id': ('payments', ['order_id']),
+}
+
+
+def upgrade():
+    with op.get_context().autocommit_block():
+        for name, (table, columns, options) in INDEXES.items():
+            op.create_index(name, table, columns, postgresql_concurrently=True,
+                            if_not_exists=True, **options)
+        for name, (table, _) in REDUNDANT_INDEXES.items():
+            op.drop_index(name, table_name=table, postgresql_concurrently=True,
+                          if_exists=True)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name, (table, columns) in REDUNDANT_INDEXES.items():
+            op.create_index(name, table, columns, postgresql_concurrently=True,
+                            if_not_exists=True)
+        for name, (table, _, _) in INDEXES.items():
+            op.drop_index(name, table_name=table, postgresql_concurrently=True,
+                          if_exists=True)
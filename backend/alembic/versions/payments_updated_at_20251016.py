@@ -0,0 +1,41 @@
+"""Add payments.updated_at for the offline sync cursor
+
+Revision ID: payments_updated_at_20251016
+Revises: search_indexes_20251016
+Create Date: 2025-10-16
+
+Offline sync paged payments by coalesce(processed_at, created_at), which does
+not move when a payment is refunded or changes status. updated_at is set on
+every update instead; existing rows start from their previous sync position.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'payments_updated_at_20251016'
+down_revision = 'search_indexes_20251016'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('payments', sa.Column('updated_at', sa.DateTime(timezone=True)))
+    op.execute(
+        "UPDATE payments SET updated_at = processed_at WHERE processed_at IS NOT NULL"
+    )
+    with op.get_context().autocommit_block():
+        op.drop_index('idx_payments_changed', table_name='payments',
+                      postgresql_concurrently=True, if_exists=True)
+        op.create_index('idx_payments_changed', 'payments',
+                        [sa.text('coalesce(updated_at, created_at)'), 'id'],
+                        postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.drop_index('idx_payments_changed', table_name='payments',
+                      postgresql_concurrently=True, if_exists=True)
+        op.create_index('idx_payments_changed', 'payments',
+                        [sa.text('coalesce(processed_at, created_at)'), 'id'],
+                        postgresql_concurrently=True, if_not_exists=True)
+    op.drop_column('payments', 'updated_at')
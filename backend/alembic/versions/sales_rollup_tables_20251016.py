@@ -0,0 +1,76 @@
+"""Add hourly and daily sales rollup tables
+
+Revision ID: sales_rollup_tables_20251016
+Revises: add_restaurant_id_to_recipe
+Create Date: 2025-10-16
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = 'sales_rollup_tables_20251016'
+down_revision = 'add_restaurant_id_to_recipe'
+branch_labels = None
+depends_on = None
+
+ROLLUP_TABLES = {
+    'hourly_sales_rollups': 'uq_hourly_sales_rollup',
+    'daily_sales_rollups': 'uq_daily_sales_rollup',
+}
+
+COUNT_COLUMNS = [
+    'order_count',
+    'dine_in_orders',
+    'takeaway_orders',
+    'delivery_orders',
+    'refunded_orders',
+]
+
+AMOUNT_COLUMNS = [
+    'revenue',
+    'subtotal',
+    'total_tax',
+    'total_service_charge',
+    'total_discounts',
+    'cash_sales',
+    'card_sales',
+    'qr_sales',
+    'other_sales',
+    'refunded_amount',
+]
+
+
+def upgrade():
+    for table_name, constraint_name in ROLLUP_TABLES.items():
+        op.create_table(
+            table_name,
+            sa.Column('id', postgresql.UUID(as_uuid=True), primary_key=True,
+                      server_default=sa.text('gen_random_uuid()')),
+            sa.Column('restaurant_id', postgresql.UUID(as_uuid=True),
+                      sa.ForeignKey('restaurants.id'), nullable=False),
+            sa.Column('bucket_start', sa.DateTime(), nullable=False),
+            *[
+                sa.Column(name, sa.Integer(), nullable=False, server_default='0')
+                for name in COUNT_COLUMNS
+            ],
+            *[
+                sa.Column(name, sa.DECIMAL(12, 2), nullable=False, server_default='0')
+                for name in AMOUNT_COLUMNS
+            ],
+            sa.Column('updated_at', sa.DateTime(timezone=True),
+                      server_default=sa.func.now()),
+            # Also serves restaurant + time range lookups from dashboards
+            sa.UniqueConstraint('restaurant_id', 'bucket_start', name=constraint_name),
+        )
+
+    # Platform-wide trends filter on the bucket alone
+    op.create_index('idx_daily_sales_rollups_bucket', 'daily_sales_rollups',
+                    ['bucket_start'])
+
+
+def downgrade():
+    op.drop_index('idx_daily_sales_rollups_bucket', table_name='daily_sales_rollups')
+    for table_name in ROLLUP_TABLES:
+        op.drop_table(table_name)
@@ -0,0 +1,57 @@
+"""Add trigram and full-text indexes for customer and product search
+
+Revision ID: search_indexes_20251016
+Revises: order_payment_hot_indexes_20251016
+Create Date: 2025-10-16
+
+Customer lookup at the till and product search filter with ILIKE
+'%term%' and pg_trgm word similarity, which GIN trigram indexes answer without
+scanning the table. Email and phone prefix lookups use text_pattern_ops
+b-trees scoped by restaurant. The index expressions must match the ones
+in app.core.database exactly for the planner to use them.
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = 'search_indexes_20251016'
+down_revision = 'order_payment_hot_indexes_20251016'
+branch_labels = None
+depends_on = None
+
+CUSTOMER_NAME = "(coalesce(first_name, '') || ' ' || coalesce(last_name, ''))"
+CUSTOMER_EMAIL = "lower(email)"
+CUSTOMER_PHONE = "regexp_replace(phone, '[^0-9]', '', 'g')"
+
+# name -> (table, USING ... definition)
+INDEXES = {
+    'idx_customers_name_trgm': ('customers', f"gin ({CUSTOMER_NAME} gin_trgm_ops)"),
+    'idx_customers_email_trgm': ('customers', f"gin ({CUSTOMER_EMAIL} gin_trgm_ops)"),
+    'idx_customers_phone_trgm': ('customers', f"gin ({CUSTOMER_PHONE} gin_trgm_ops)"),
+    'idx_customers_email_prefix': (
+        'customers', f"btree (restaurant_id, {CUSTOMER_EMAIL} text_pattern_ops)",
+    ),
+    'idx_customers_phone_prefix': (
+        'customers', f"btree (restaurant_id, {CUSTOMER_PHONE} text_pattern_ops)",
+    ),
+    'idx_products_name_trgm': ('products', "gin (name gin_trgm_ops)"),
+    'idx_products_description_fts': (
+        'products', "gin (to_tsvector('simple', coalesce(description, '')))",
+    ),
+}
+
+
+def upgrade():
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    with op.get_context().autocommit_block():
+        for name, (table, definition) in INDEXES.items():
+            op.execute(
+                f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} "
+                f"ON {table} USING {definition}"
+            )
+
+
+def downgrade():
+    # pg_trgm is left installed; other database objects may depend on it
+    with op.get_context().autocommit_block():
+        for name in INDEXES:
+            op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
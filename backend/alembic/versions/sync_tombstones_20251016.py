@@ -0,0 +1,36 @@
+"""Add sync tombstones for offline sync deletes
+
+Revision ID: sync_tombstones_20251016
+Revises: sales_rollup_tables_20251016
+Create Date: 2025-10-16
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = 'sync_tombstones_20251016'
+down_revision = 'sales_rollup_tables_20251016'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'sync_tombstones',
+        sa.Column('id', postgresql.UUID(as_uuid=True), primary_key=True,
+                  server_default=sa.text('gen_random_uuid()')),
+        sa.Column('restaurant_id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('entity_type', sa.String(20), nullable=False),
+        sa.Column('entity_id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('deleted_at', sa.DateTime(timezone=True),
+                  server_default=sa.func.now()),
+    )
+    op.create_index('ix_sync_tombstones_cursor', 'sync_tombstones',
+                    ['restaurant_id', 'deleted_at', 'id'])
+
+
+def downgrade():
+    op.drop_index('ix_sync_tombstones_cursor', table_name='sync_tombstones')
+    op.drop_table('sync_tombstones')
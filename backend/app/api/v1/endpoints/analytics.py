@@ -6,8 +6,8 @@ Real-time dashboard metrics optimized for mobile consumption
 from typing import List, Optional
 from fastapi import APIRouter, Depends, Query
 from sqlalchemy.orm import Session
-from sqlalchemy import func, and_
-from datetime import datetime, timedelta
+from sqlalchemy import and_
+from datetime import datetime, timedelta, timezone
 from pydantic import BaseModel
 
 from app.core.database import get_db, Order, Customer, User, Restaurant
@@ -15,6 +15,8 @@ from app.core.auth import get_current_user
 from app.core.responses import APIResponseHelper
 from app.core.exceptions import FynloException, ErrorCodes
 from app.core.analytics_engine import get_analytics_engine, AnalyticsTimeframe
+from app.services.order_line_service import get_order_line_service
+from app.services.sales_rollup_service import bucket_start, get_sales_rollup_service
 
 router = APIRouter()
 
@@ -182,27 +184,25 @@ async def get_mobile_reports_dashboard(
         else:
             target_restaurant_id = str(current_user.restaurant_id)
 
-        # Get today's date range
-        today_start = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        # Today's date range, in UTC like the rollup buckets
+        today_start = datetime.now(timezone.utc).replace(
+            hour=0, minute=0, second=0, microsecond=0
+        )
         today_end = today_start + timedelta(days=1)
-        week_start = today_start - timedelta(days=7)
+        trend_start = today_start - timedelta(days=6)
 
-        # Today's Summary
-        today_orders = (
-            db.query(Order)
-            .filter(
-                and_(
-                    Order.restaurant_id == target_restaurant_id,
-                    Order.status == "completed",
-                    Order.created_at >= today_start,
-                    Order.created_at < today_end,
-                )
+        # Daily sales buckets for the trend window, today included
+        daily_buckets = {
+            bucket.bucket_start: bucket
+            for bucket in get_sales_rollup_service(db).buckets(
+                [target_restaurant_id], trend_start, today_end
             )
-            .all()
-        )
+        }
 
-        total_sales = sum(order.total_amount for order in today_orders)
-        total_transactions = len(today_orders)
+        # Today's Summary
+        today_bucket = daily_buckets.get(bucket_start(today_start, "day"))
+        total_sales = today_bucket.revenue if today_bucket else 0
+        total_transactions = today_bucket.order_count if today_bucket else 0
         avg_order = total_sales / total_transactions if total_transactions > 0 else 0
 
         # Weekly Labor - Feature not yet implemented
@@ -213,23 +213,17 @@ async def get_mobile_reports_dashboard(
             "message": "Labor tracking feature coming soon",
         }
 
-        # Top Items Today (from order items)
-        item_sales = {}
-        for order in today_orders:
-            for item in order.items:
-                if item.product_name in item_sales:
-                    item_sales[item.product_name]["quantity"] += item.quantity
-                    item_sales[item.product_name]["revenue"] += item.subtotal
-                else:
-                    item_sales[item.product_name] = {
-                        "name": item.product_name,
-                        "quantity": item.quantity,
-                        "revenue": item.subtotal,
-                    }
-
-        top_items = sorted(
-            item_sales.values(), key=lambda x: x["revenue"], reverse=True
-        )[:5]
+        # Top Items Today, grouped over the order_lines projection
+        top_items = [
+            {
+                "name": row.name,
+                "quantity": int(row.quantity),
+                "revenue": float(row.revenue),
+            }
+            for row in get_order_line_service(db).top_products(
+                target_restaurant_id, today_start, today_end, limit=5
+            )
+        ]
 
         # Top Performers - Feature not yet implemented
         top_performers = []  # Will be populated when employee tracking is implemented
@@ -238,23 +232,12 @@ async def get_mobile_reports_dashboard(
         sales_trend = []
         for i in range(7):
             day_start = today_start - timedelta(days=i)
-            day_end = day_start + timedelta(days=1)
-            day_orders = (
-                db.query(func.sum(Order.total_amount))
-                .filter(
-                    and_(
-                        Order.restaurant_id == target_restaurant_id,
-                        Order.status == "completed",
-                        Order.created_at >= day_start,
-                        Order.created_at < day_end,
-                    )
-                )
-                .scalar()
-                or 0
-            )
-
+            bucket = daily_buckets.get(bucket_start(day_start, "day"))
             sales_trend.append(
-                {"period": day_start.strftime("%a"), "sales": float(day_orders)}
+                {
+                    "period": day_start.strftime("%a"),
+                    "sales": float(bucket.revenue) if bucket else 0.0,
+                }
             )
 
         # Structure response to match frontend expectations
@@ -313,64 +296,28 @@ async def get_legacy_analytics_dashboard(
         # Restaurant users see only their own data
         restaurants = [str(current_user.restaurant_id)]
 
-    # Date ranges
-    today_start = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    # Date ranges, in UTC like the rollup buckets
+    today_start = datetime.now(timezone.utc).replace(
+        hour=0, minute=0, second=0, microsecond=0
+    )
     week_start = today_start - timedelta(days=7)
     month_start = today_start - timedelta(days=30)
     period_start = today_start - timedelta(days=days)
 
-    # Revenue Metrics
-    total_revenue = (
-        db.query(func.sum(Order.total_amount))
-        .filter(
-            and_(
-                Order.restaurant_id.in_(restaurants),
-                Order.status == "completed",
-                Order.created_at >= period_start,
-            )
-        )
-        .scalar()
-        or 0
+    # Revenue Metrics, summed from daily sales rollups
+    rollup_start = min(period_start, month_start)
+    daily_buckets = get_sales_rollup_service(db).buckets(
+        restaurants, rollup_start, today_start + timedelta(days=1)
     )
 
-    daily_revenue = (
-        db.query(func.sum(Order.total_amount))
-        .filter(
-            and_(
-                Order.restaurant_id.in_(restaurants),
-                Order.status == "completed",
-                Order.created_at >= today_start,
-            )
-        )
-        .scalar()
-        or 0
-    )
+    def revenue_since(since: datetime):
+        since = bucket_start(since, "day")
+        return sum(b.revenue for b in daily_buckets if b.bucket_start >= since)
 
-    weekly_revenue = (
-        db.query(func.sum(Order.total_amount))
-        .filter(
-            and_(
-                Order.restaurant_id.in_(restaurants),
-                Order.status == "completed",
-                Order.created_at >= week_start,
-            )
-        )
-        .scalar()
-        or 0
-    )
-
-    monthly_revenue = (
-        db.query(func.sum(Order.total_amount))
-        .filter(
-            and_(
-                Order.restaurant_id.in_(restaurants),
-                Order.status == "completed",
-                Order.created_at >= month_start,
-            )
-        )
-        .scalar()
-        or 0
-    )
+    total_revenue = revenue_since(period_start)
+    daily_revenue = revenue_since(today_start)
+    weekly_revenue = revenue_since(week_start)
+    monthly_revenue = revenue_since(month_start)
 
     # Order Metrics
     total_orders = (
@@ -451,13 +398,14 @@ async def get_legacy_analytics_dashboard(
     customer_retention_rate = 0.0  # TODO: Implement customer tracking
     returning_customers = 0  # TODO: Implement customer tracking
 
-    # Payment method breakdown - TODO: Implement with actual payment data
+    # Payment method breakdown for the period (wallets are counted as other)
+    period_buckets = [b for b in daily_buckets if b.bucket_start >= period_start]
     payment_breakdown = PaymentMethodBreakdown(
-        qr_payments=0.0,
-        card_payments=0.0,
-        cash_payments=0.0,
+        qr_payments=float(sum(b.qr_sales for b in period_buckets)),
+        card_payments=float(sum(b.card_sales for b in period_buckets)),
+        cash_payments=float(sum(b.cash_sales for b in period_buckets)),
         apple_pay=0.0,
-        other_payments=0.0,
+        other_payments=float(sum(b.other_sales for b in period_buckets)),
     )
 
     # Peak hours - TODO: Calculate from actual order data
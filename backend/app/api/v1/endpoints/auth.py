@@ -20,6 +20,8 @@ from app.core.exceptions import (
     ValidationException,
 )
 from app.core.supabase import supabase_admin, get_admin_client
+from app.core.auth import get_current_user, revoke_token
+from app.core.responses import APIResponseHelper
 from app.core.config import settings
 from app.core.database import User, Restaurant
 from app.schemas.auth import AuthVerifyResponse, RegisterRestaurantRequest
@@ -551,6 +553,43 @@ async def verify_supabase_user(
         )
 
 
+@router.post("/logout")
+@limiter.limit(AUTH_RATE)
+async def logout(
+    request: Request,
+    authorization: Optional[str] = Header(None),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    """Revoke the caller's access token and end their Supabase session"""
+    token = authorization.replace("Bearer ", "")
+
+    # Locally verified tokens stay valid until expiry unless revoked here
+    await revoke_token(token)
+
+    client = supabase_admin or get_admin_client()
+    if client:
+        try:
+            # Also revokes the session's refresh tokens
+            client.auth.admin.sign_out(token)
+        except Exception as e:
+            logger.warning(f"Supabase sign out failed: {e}")
+
+    await AuditLoggerService(db).create_audit_log(
+        event_type=AuditEventType.USER_LOGOUT,
+        event_status=AuditEventStatus.SUCCESS,
+        action_performed="User logged out successfully.",
+        user_id=current_user.id,
+        username_or_email=current_user.email,
+        ip_address=request.client.host if request.client else "unknown",
+        user_agent=request.headers.get("user-agent", "unknown"),
+        details={"token_prefix": token[:10] + "..."},
+        commit=True,
+    )
+
+    return APIResponseHelper.success(message="Logged out")
+
+
 @router.post("/register-restaurant")
 @limiter.limit(AUTH_RATE)
 async def register_restaurant(
@@ -3,20 +3,55 @@ Customer Management API endpoints for Fynlo POS
 """
 
 from typing import List, Optional
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, Query, Response
 from sqlalchemy.orm import Session
 from sqlalchemy import and_, or_, desc, func
 from pydantic import BaseModel, EmailStr
-from datetime import datetime
+from datetime import datetime, timezone
 
 from app.core.database import get_db, Customer, Order, User
 from app.core.auth import get_current_user
 from app.core.redis_client import get_redis, RedisClient
 from app.core.exceptions import ValidationException, ResourceNotFoundException
+from app.core.pagination import Keyset
 from app.schemas.search_schemas import CustomerSearchRequest
+from app.services.search_service import get_search_service
 
 router = APIRouter()
 
+CURSOR_DESCRIPTION = "next_cursor from the previous page; replaces offset"
+# Cursor paged lists return the next page's cursor in this header
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+CUSTOMERS_BY_SPEND = Keyset(
+    "customers.total_spent", [(Customer.total_spent, 0), Customer.id], descending=True
+)
+CUSTOMER_ORDERS_NEWEST = Keyset(
+    "customer_orders.created_at", [Order.created_at, Order.id], descending=True
+)
+
+# Sorted in place of NULL when customer search pages by these fields
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+SEARCH_SORT_NULLS = {
+    "created_at": _EPOCH,
+    "updated_at": _EPOCH,
+    "total_spent": 0,
+    "first_name": "",
+    "last_name": "",
+    "email": "",
+}
+
+
+def customer_search_keyset(sort_by: Optional[str], sort_order: Optional[str]) -> Keyset:
+    if not sort_by:
+        return CUSTOMERS_BY_SPEND
+    column = getattr(Customer, sort_by)
+    return Keyset(
+        f"customers.{sort_by}.{sort_order}",
+        [(column, SEARCH_SORT_NULLS.get(sort_by)), Customer.id],
+        descending=sort_order == "desc",
+    )
+
 
 # Pydantic models
 class CustomerCreate(BaseModel):
@@ -73,10 +108,12 @@ class LoyaltyTransaction(BaseModel):
 
 @router.get("/", response_model=List[CustomerResponse])
 async def get_customers(
+    response: Response,
     restaurant_id: Optional[str] = Query(None),
     search: Optional[str] = Query(None),
     limit: int = Query(50, le=100),
     offset: int = Query(0),
+    cursor: Optional[str] = Query(None, description=CURSOR_DESCRIPTION),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
@@ -109,19 +146,11 @@ async def get_customers(
     query = db.query(Customer).filter(Customer.restaurant_id == restaurant_id)
 
     if search:
-        search_pattern = f"%{search}%"
-        query = query.filter(
-            or_(
-                Customer.first_name.ilike(search_pattern),
-                Customer.last_name.ilike(search_pattern),
-                Customer.email.ilike(search_pattern),
-                Customer.phone.ilike(search_pattern),
-            )
-        )
+        query = query.filter(get_search_service(db).customer_filter(search))
 
-    customers = (
-        query.order_by(desc(Customer.total_spent)).offset(offset).limit(limit).all()
-    )
+    customers, next_cursor = CUSTOMERS_BY_SPEND.paginate(query, cursor, limit, offset)
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
 
     # Get last visit dates
     customer_ids = [customer.id for customer in customers]
@@ -156,6 +185,54 @@ async def get_customers(
     ]
 
 
+@router.get("/lookup")
+async def lookup_customers(
+    q: str = Query(..., min_length=2, max_length=100),
+    restaurant_id: Optional[str] = Query(None),
+    limit: int = Query(10, ge=1, le=50),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """Ranked customer lookup by name, email or phone fragment for the till"""
+
+    user_restaurant_id = (
+        current_user.current_restaurant_id or current_user.restaurant_id
+    )
+    if not user_restaurant_id:
+        raise ValidationException(
+            message="User must be assigned to a restaurant", field="restaurant_id"
+        )
+    if not restaurant_id:
+        restaurant_id = str(user_restaurant_id)
+    else:
+        from app.core.tenant_security import TenantSecurity
+
+        await TenantSecurity.validate_restaurant_access(
+            user=current_user,
+            restaurant_id=restaurant_id,
+            operation="access",
+            resource_type="customers",
+            resource_id=None,
+            db=db,
+        )
+
+    hits = get_search_service(db).search_customers(restaurant_id, q, limit)
+
+    return [
+        {
+            "id": str(hit.entity.id),
+            "name": f"{hit.entity.first_name} {hit.entity.last_name}",
+            "email": hit.entity.email,
+            "phone": hit.entity.phone,
+            "loyalty_points": hit.entity.loyalty_points,
+            "total_spent": hit.entity.total_spent,
+            "visit_count": hit.entity.visit_count,
+            "score": round(hit.score, 3),
+        }
+        for hit in hits
+    ]
+
+
 @router.get("/stats", response_model=CustomerStats)
 async def get_customer_stats(
     restaurant_id: Optional[str] = Query(None),
@@ -519,8 +596,10 @@ async def update_loyalty_points(
 @router.get("/{customer_id}/orders")
 async def get_customer_orders(
     customer_id: str,
+    response: Response,
     limit: int = Query(20, le=50),
     offset: int = Query(0),
+    cursor: Optional[str] = Query(None, description=CURSOR_DESCRIPTION),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
@@ -541,14 +620,14 @@ async def get_customer_orders(
         db=db,
     )
 
-    orders = (
-        db.query(Order)
-        .filter(Order.customer_id == customer_id)
-        .order_by(desc(Order.created_at))
-        .offset(offset)
-        .limit(limit)
-        .all()
+    orders, next_cursor = CUSTOMER_ORDERS_NEWEST.paginate(
+        db.query(Order).filter(Order.customer_id == customer_id),
+        cursor,
+        limit,
+        offset,
     )
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
 
     return [
         {
@@ -566,6 +645,7 @@ async def get_customer_orders(
 @router.post("/search")
 async def search_customers(
     search_data: CustomerSearchRequest,
+    response: Response,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
@@ -620,17 +700,14 @@ async def search_customers(
     if search_data.min_spent is not None:
         query = query.filter(Customer.total_spent >= search_data.min_spent)
 
-    # Apply sorting - sort_by is already validated against whitelist
-    if search_data.sort_by:
-        order_func = desc if search_data.sort_order == "desc" else lambda x: x
-        sort_column = getattr(Customer, search_data.sort_by)
-        query = query.order_by(order_func(sort_column))
-    else:
-        query = query.order_by(desc(Customer.total_spent))
-
-    # Apply pagination
+    # Apply sorting and pagination - sort_by is already validated against whitelist
+    keyset = customer_search_keyset(search_data.sort_by, search_data.sort_order)
     offset = (search_data.page - 1) * search_data.limit
-    customers = query.offset(offset).limit(search_data.limit).all()
+    customers, next_cursor = keyset.paginate(
+        query, search_data.cursor, search_data.limit, offset
+    )
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
 
     return [
         {
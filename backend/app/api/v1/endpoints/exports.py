@@ -1,68 +1,166 @@
 """
 Export API endpoints for Fynlo POS - Portal export functionality
-TEMPORARILY DISABLED DUE TO MISSING DEPENDENCIES
+Streams menu and report exports and imports menus in bulk
 """
 
 from datetime import date
-from fastapi import APIRouter, Depends, Query, Request
+from typing import Any, Dict, List, Optional, Union
+
+from fastapi import APIRouter, Body, Depends, Query, Request
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 
 from app.core.database import get_db, User
 from app.core.auth import get_current_user
+from app.core.cache_service import cache_service
 from app.core.responses import APIResponseHelper
+from app.core.exceptions import FynloException, ErrorCodes
+from app.core.tenant_security import TenantSecurity
 from app.middleware.rate_limit_middleware import limiter, PORTAL_EXPORT_RATE
+from app.services.activity_logger import ActivityLogger
+from app.services.export_service import (
+    EXPORT_MEDIA_TYPES,
+    export_filename,
+    import_menu as import_menu_items,
+    stream_export,
+)
 
 router = APIRouter()
 
+EXPORT_FORMAT_PATTERN = "^(json|csv|xlsx|parquet)$"
+
+# Report types map onto export datasets; "sales" is the historical name
+REPORT_DATASETS = {
+    "sales": "orders",
+    "orders": "orders",
+    "payments": "payments",
+    "inventory": "inventory",
+    "customers": "customers",
+}
+
+
+def _streamed_export(
+    dataset: str,
+    format: str,
+    restaurant_id: str,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+) -> StreamingResponse:
+    # Raises for a missing optional format library before any bytes are sent
+    body = stream_export(dataset, format, restaurant_id, date_from, date_to)
+    filename = export_filename(dataset, restaurant_id, format)
+    return StreamingResponse(
+        body,
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f"attachment; filename={filename}"},
+    )
+
 
 @router.get("/menu/{restaurant_id}/export")
 @limiter.limit(PORTAL_EXPORT_RATE)
-async def export_menu_disabled(
+async def export_menu(
     request: Request,
     restaurant_id: str,
-    format: str = Query("json", regex="^(json|csv|pdf)$"),
+    format: str = Query("json", regex=EXPORT_FORMAT_PATTERN),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
-    """Temporarily disabled endpoint - maintains original signature"""
-    return APIResponseHelper.error(
-        message="Export functionality is temporarily unavailable. Please try again later.",
-        status_code=503,
+    """Stream the restaurant menu as JSON, CSV, XLSX or Parquet"""
+    await TenantSecurity.validate_restaurant_access(
+        user=current_user,
+        restaurant_id=restaurant_id,
+        operation="access",
+        resource_type="menu",
+        request=request,
+        db=db,
     )
+    response = _streamed_export("menu", format, restaurant_id)
+    ActivityLogger.log_export(
+        db=db,
+        user_id=str(current_user.id),
+        restaurant_id=restaurant_id,
+        export_type="menu",
+        format=format,
+    )
+    return response
 
 
 @router.get("/reports/{restaurant_id}/export")
 @limiter.limit(PORTAL_EXPORT_RATE)
-async def export_report_disabled(
+async def export_report(
     request: Request,
     restaurant_id: str,
     report_type: str = Query(
-        ..., regex="^(sales|inventory|staff|customers|financial)$"
+        ..., regex="^(sales|orders|payments|inventory|customers)$"
     ),
-    format: str = Query("json", regex="^(json|csv|pdf)$"),
-    date_from: date = Query(...),
-    date_to: date = Query(...),
+    format: str = Query("json", regex=EXPORT_FORMAT_PATTERN),
+    date_from: Optional[date] = Query(None),
+    date_to: Optional[date] = Query(None),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
-    """Temporarily disabled endpoint - maintains original signature"""
-    return APIResponseHelper.error(
-        message="Export functionality is temporarily unavailable. Please try again later.",
-        status_code=503,
+    """
+    Stream report rows for a restaurant
+
+    Orders and payments are filtered to the inclusive date range; the export
+    is read in batches, so a full year of orders is safe to request.
+    """
+    await TenantSecurity.validate_restaurant_access(
+        user=current_user,
+        restaurant_id=restaurant_id,
+        operation="access",
+        resource_type="report",
+        request=request,
+        db=db,
+    )
+    if date_from and date_to and date_from > date_to:
+        raise FynloException(
+            message="date_from must be on or before date_to",
+            error_code=ErrorCodes.VALIDATION_ERROR,
+            status_code=400,
+        )
+    response = _streamed_export(
+        REPORT_DATASETS[report_type], format, restaurant_id, date_from, date_to
     )
+    ActivityLogger.log_export(
+        db=db,
+        user_id=str(current_user.id),
+        restaurant_id=restaurant_id,
+        export_type=report_type,
+        format=format,
+    )
+    return response
 
 
 @router.post("/menu/{restaurant_id}/import")
 @limiter.limit(PORTAL_EXPORT_RATE)
-async def import_menu_disabled(
+async def import_menu(
     request: Request,
     restaurant_id: str,
-    file_content: dict,  # JSON content from request body
+    # The JSON menu export, or {"items": [...], "categories": [...]}
+    file_content: Union[List[Dict[str, Any]], Dict[str, Any]] = Body(...),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
-    """Temporarily disabled endpoint - maintains original signature"""
-    return APIResponseHelper.error(
-        message="Import functionality is temporarily unavailable. Please try again later.",
-        status_code=503,
+    """Validate and upsert a JSON menu, matching products by name"""
+    await TenantSecurity.validate_restaurant_access(
+        user=current_user,
+        restaurant_id=restaurant_id,
+        operation="modify",
+        resource_type="menu",
+        request=request,
+        db=db,
+    )
+    result = import_menu_items(db, restaurant_id, file_content)
+    await cache_service.invalidate_restaurant_cache(restaurant_id)
+    ActivityLogger.log_activity(
+        db=db,
+        user_id=str(current_user.id),
+        restaurant_id=restaurant_id,
+        action=ActivityLogger.IMPORT_MENU,
+        details={key: value for key, value in result.items() if key != "errors"},
+    )
+    return APIResponseHelper.success(
+        data=result,
+        message=f"Imported {result['imported']} menu items",
     )
@@ -14,11 +14,14 @@ from app.core.database import get_db, Product, Category, User
 from app.core.redis_client import get_redis, RedisClient
 from app.core.auth import get_current_user
 from app.core.responses import APIResponseHelper
-from app.core.exceptions import FynloException
+from app.core.exceptions import FynloException, ErrorCodes
+from app.core.pagination import Keyset
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
+MENU_ITEMS_BY_NAME = Keyset("menu_items.name", [Product.name, Product.id])
+
 
 class MenuItemResponse:
     """Response model for menu items"""
@@ -113,6 +116,9 @@ async def get_menu_items_optimized(
     category: Optional[str] = Query(None, description="Category ID filter"),
     page: int = Query(1, ge=1),
     limit: int = Query(50, ge=1, le=100),
+    cursor: Optional[str] = Query(
+        None, description="next_cursor from the previous page; replaces page"
+    ),
     include_inactive: bool = Query(False),
     db: Session = Depends(get_db),
     redis_client: RedisClient = Depends(get_redis),
@@ -153,7 +159,8 @@ async def get_menu_items_optimized(
                 db=db,
             )
         # Build cache key
-        cache_key = f"menu:v3:{restaurant_id}:{category or 'all'}:{page}:{limit}:{include_inactive}"
+        position = cursor or page
+        cache_key = f"menu:v4:{restaurant_id}:{category or 'all'}:{position}:{limit}:{include_inactive}"
 
         # Try cache first
         if redis_client:
@@ -161,9 +168,16 @@ async def get_menu_items_optimized(
                 cached_data = redis_client.get(cache_key)
                 if cached_data:
                     logger.info(f"Menu cache hit for restaurant {restaurant_id}")
+                    cached_page = json.loads(cached_data)
                     return APIResponseHelper.success(
-                        data=json.loads(cached_data),
+                        data=cached_page["items"],
                         message="Menu retrieved from cache",
+                        meta={
+                            "page": page,
+                            "limit": limit,
+                            "has_more": cached_page["next_cursor"] is not None,
+                            "next_cursor": cached_page["next_cursor"],
+                        },
                     )
             except Exception as e:
                 logger.warning(f"Redis cache error: {e}")
@@ -187,15 +201,10 @@ async def get_menu_items_optimized(
         if category:
             query = query.filter(Product.category_id == category)
 
-        # Add consistent ordering
-        query = query.order_by(Product.sort_order.asc(), Product.name.asc())
-
-        # Apply pagination
-        offset = (page - 1) * limit
-        query = query.offset(offset).limit(limit)
-
-        # Execute query
-        products = query.all()
+        # Consistent ordering and pagination
+        products, next_cursor = MENU_ITEMS_BY_NAME.paginate(
+            query, cursor, limit, (page - 1) * limit
+        )
 
         # Transform to response format
         response_data = [MenuItemResponse(product).dict() for product in products]
@@ -204,7 +213,9 @@ async def get_menu_items_optimized(
         if redis_client and response_data:
             try:
                 redis_client.setex(
-                    cache_key, 300, json.dumps(response_data)  # 5 minutes TTL
+                    cache_key,
+                    300,  # 5 minutes TTL
+                    json.dumps({"items": response_data, "next_cursor": next_cursor}),
                 )
             except Exception as e:
                 logger.warning(f"Failed to cache menu: {e}")
@@ -212,9 +223,16 @@ async def get_menu_items_optimized(
         return APIResponseHelper.success(
             data=response_data,
             message="Menu retrieved successfully",
-            meta={"page": page, "limit": limit, "has_more": len(products) == limit},
+            meta={
+                "page": page,
+                "limit": limit,
+                "has_more": next_cursor is not None,
+                "next_cursor": next_cursor,
+            },
         )
 
+    except FynloException:
+        raise
     except Exception as e:
         logger.error(f"Menu query error for restaurant {restaurant_id}: {str(e)}")
         raise FynloException(
@@ -23,6 +23,8 @@ from app.core.security import (
     MetricsQueryParams,
     RefreshReplicasRequest,
 )
+from app.core.config import settings
+from app.middleware.asgi import middleware_timer
 from app.middleware.rate_limit_middleware import limiter, DEFAULT_RATE
 
 logger = logging.getLogger(__name__)
@@ -162,6 +164,32 @@ async def get_monitoring_metrics(
     )
 
 
+@router.get("/middleware")
+@limiter.limit(DEFAULT_RATE)
+async def get_middleware_timings(
+    request: Request,
+    current_user: User = Depends(get_current_user),
+) -> Dict[str, Any]:
+    """
+    Get per-middleware latency for this worker.
+
+    Only populated when MIDDLEWARE_TIMING_ENABLED is set. Requires platform
+    owner role.
+    """
+    if current_user.role != "platform_owner":
+        raise AuthorizationException(
+            message="Only platform owners can access middleware timings"
+        )
+
+    return APIResponseHelper.success(
+        data={
+            "enabled": settings.MIDDLEWARE_TIMING_ENABLED,
+            "middleware": middleware_timer.snapshot(),
+        },
+        message="Middleware timings retrieved",
+    )
+
+
 @router.post("/replicas/refresh")
 @limiter.limit("10/minute")  # Stricter limit for refresh operations
 async def refresh_replica_count(
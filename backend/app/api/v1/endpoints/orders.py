@@ -26,6 +26,7 @@ from app.core.exceptions import (
     FynloException,
 )
 from app.core.onboarding_helper import OnboardingHelper
+from app.core.pagination import Keyset
 from app.core.websocket import (
     websocket_manager,
     notify_order_created,
@@ -51,6 +52,10 @@ from decimal import Decimal  # Ensure Decimal is imported if used for amounts
 router = APIRouter()
 email_service = EmailService()  # Instantiate EmailService globally or per request
 
+ORDERS_NEWEST = Keyset(
+    "orders.created_at", [Order.created_at, Order.id], descending=True
+)
+
 
 # Pydantic models
 class OrderItem(BaseModel):
@@ -161,6 +166,9 @@ async def get_orders(
     date_to: Optional[datetime] = Query(None),
     limit: int = Query(50, le=100),
     offset: int = Query(0),
+    cursor: Optional[str] = Query(
+        None, description="next_cursor from the previous page; replaces offset"
+    ),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
@@ -221,7 +229,7 @@ async def get_orders(
     if date_to:
         query = query.filter(Order.created_at <= date_to)
 
-    orders = query.order_by(desc(Order.created_at)).offset(offset).limit(limit).all()
+    orders, next_cursor = ORDERS_NEWEST.paginate(query, cursor, limit, offset)
 
     # Fetch customer information for the orders
     customer_ids = [order.customer_id for order in orders if order.customer_id]
@@ -273,7 +281,11 @@ async def get_orders(
                     f"{date_from} to {date_to}" if date_from or date_to else None
                 ),
             },
-            "pagination": {"limit": limit, "offset": offset},
+            "pagination": {
+                "limit": limit,
+                "offset": offset,
+                "next_cursor": next_cursor,
+            },
         },
     )
 
@@ -559,7 +571,7 @@ async def create_order(
                 "id": str(new_order.id),
                 "order_number": new_order.order_number,
                 "status": new_order.status,
-                "total_amount": new_order.total_amount,
+                "total_amount": float(new_order.total_amount),
                 "items": new_order.items,
             },
         )
@@ -580,7 +592,7 @@ async def create_order(
                     "order_number": new_order.order_number,
                     "status": new_order.status,
                     "items": new_order.items,
-                    "total_amount": new_order.total_amount,
+                    "total_amount": float(new_order.total_amount),
                     "table_number": new_order.table_number,
                 },
             )
@@ -740,7 +752,7 @@ async def update_order(
             "id": str(order.id),
             "order_number": order.order_number,
             "status": order.status,
-            "total_amount": order.total_amount,
+            "total_amount": float(order.total_amount),
             "items": order.items,
         },
     )
@@ -758,7 +770,7 @@ async def update_order(
             "status": order.status,
             "action": "updated",
             "items": order.items,
-            "total_amount": order.total_amount,
+            "total_amount": float(order.total_amount),
             "table_number": order.table_number,
         },
         target_restaurant=restaurant_id,
@@ -869,7 +881,7 @@ async def confirm_order(
             "id": str(order.id),
             "order_number": order.order_number,
             "status": order.status,
-            "total_amount": order.total_amount,
+            "total_amount": float(order.total_amount),
             "items": order.items,
         },
     )
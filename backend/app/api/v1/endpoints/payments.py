@@ -28,6 +28,7 @@ from app.core.exceptions import (
 from app.core.transaction_manager import transactional
 from app.core.tenant_security import TenantSecurity
 from app.services.payment_factory import payment_factory
+from app.services.smart_routing import record_routing_volume
 from app.services.audit_logger import AuditLoggerService
 from app.models.audit_log import AuditEventType, AuditEventStatus
 from app.middleware.rate_limit_middleware import limiter, PAYMENT_RATE
@@ -1074,6 +1075,9 @@ async def process_payment(
             db.refresh(payment_db_record)
             if result["status"] == "success":
                 db.refresh(order)
+                record_routing_volume(
+                    str(restaurant_id), Decimal(str(payment_data_req.amount))
+                )
 
             return APIResponseHelper.success(
                 message=f"Payment processed successfully with {result['provider']}",
@@ -14,10 +14,14 @@ from app.core.database import get_db, Platform, Restaurant, User, Order, Custome
 from app.core.auth import get_current_user
 from app.core.responses import APIResponseHelper
 from app.core.exceptions import FynloException, ErrorCodes
+from app.core.pagination import Keyset
+from app.services.sales_rollup_service import get_sales_rollup_service
 from app.api.v1.endpoints import platform_settings
 
 router = APIRouter()
 
+RESTAURANTS_BY_NAME = Keyset("restaurants.name", [Restaurant.name, Restaurant.id])
+
 # Include platform settings router
 router.include_router(
     platform_settings.router, prefix="/settings", tags=["platform-settings"]
@@ -129,46 +133,28 @@ async def get_platform_dashboard(
         end_date = datetime.now()
         start_date = end_date - timedelta(days=30)
 
-        # Get restaurant summaries with metrics
+        # Get restaurant summaries with metrics from daily sales rollups
         restaurant_summaries = []
         total_platform_revenue = 0
         total_platform_orders = 0
 
-        for restaurant in restaurants:
-            # Calculate restaurant metrics
-            restaurant_orders = (
-                db.query(Order)
-                .filter(
-                    and_(
-                        Order.restaurant_id == restaurant.id,
-                        Order.status == "completed",
-                    )
-                )
-                .all()
-            )
-
-            monthly_orders = (
-                db.query(Order)
-                .filter(
-                    and_(
-                        Order.restaurant_id == restaurant.id,
-                        Order.created_at >= start_date,
-                        Order.status == "completed",
-                    )
-                )
-                .all()
-            )
-
-            total_revenue = sum(order.total_amount for order in restaurant_orders)
-            monthly_revenue = sum(order.total_amount for order in monthly_orders)
+        rollups = get_sales_rollup_service(db)
+        all_time = rollups.totals_by_restaurant(restaurant_ids=restaurant_ids)
+        monthly = rollups.totals_by_restaurant(
+            start=start_date, restaurant_ids=restaurant_ids
+        )
+        last_order_at = dict(
+            db.query(Order.restaurant_id, func.max(Order.created_at))
+            .filter(Order.restaurant_id.in_(restaurant_ids))
+            .group_by(Order.restaurant_id)
+            .all()
+        )
 
-            # Get last order
-            last_order = (
-                db.query(Order)
-                .filter(Order.restaurant_id == restaurant.id)
-                .order_by(desc(Order.created_at))
-                .first()
-            )
+        for restaurant in restaurants:
+            totals = all_time.get(str(restaurant.id))
+            month = monthly.get(str(restaurant.id))
+            total_revenue = totals.revenue if totals else 0
+            total_orders = int(totals.order_count) if totals else 0
 
             restaurant_summaries.append(
                 RestaurantSummary(
@@ -177,16 +163,16 @@ async def get_platform_dashboard(
                     address=restaurant.address,
                     is_active=restaurant.is_active,
                     total_revenue=float(total_revenue),
-                    monthly_revenue=float(monthly_revenue),
-                    total_orders=len(restaurant_orders),
-                    monthly_orders=len(monthly_orders),
-                    last_order_at=last_order.created_at if last_order else None,
+                    monthly_revenue=float(month.revenue) if month else 0.0,
+                    total_orders=total_orders,
+                    monthly_orders=int(month.order_count) if month else 0,
+                    last_order_at=last_order_at.get(restaurant.id),
                     created_at=restaurant.created_at,
                 )
             )
 
             total_platform_revenue += total_revenue
-            total_platform_orders += len(restaurant_orders)
+            total_platform_orders += total_orders
 
         # Calculate aggregated metrics
         active_restaurants = sum(1 for r in restaurants if r.is_active)
@@ -346,6 +332,9 @@ async def get_platform_restaurants(
     status: Optional[str] = Query(None, description="Filter by restaurant status"),
     limit: int = Query(50, le=100),
     offset: int = Query(0),
+    cursor: Optional[str] = Query(
+        None, description="next_cursor from the previous page; replaces offset"
+    ),
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
@@ -376,7 +365,9 @@ async def get_platform_restaurants(
         total_count = query.count()
 
         # Apply pagination
-        restaurants = query.order_by(Restaurant.name).offset(offset).limit(limit).all()
+        restaurants, next_cursor = RESTAURANTS_BY_NAME.paginate(
+            query, cursor, limit, offset
+        )
 
         # Build restaurant summaries
         restaurant_data = []
@@ -425,6 +416,7 @@ async def get_platform_restaurants(
                 "total_count": total_count,
                 "limit": limit,
                 "offset": offset,
+                "next_cursor": next_cursor,
                 "platform_id": platform_id,
                 "status_filter": status,
             },
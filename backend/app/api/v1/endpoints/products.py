@@ -16,6 +16,7 @@ from app.core.responses import APIResponseHelper
 from app.core.exceptions import FynloException, ErrorCodes
 from app.core.tenant_security import TenantSecurity
 from app.core.cache_service import cache_service
+from app.services.search_service import get_search_service
 
 router = APIRouter()
 
@@ -147,7 +148,9 @@ async def get_categories(
     response_data = [cat.model_dump() for cat in result]
 
     # Cache for 5 minutes
-    await redis.set(f"categories:{restaurant_id}", response_data, expire=300)
+    await redis.cache_menu_data(
+        f"categories:{restaurant_id}", restaurant_id, response_data, expire=300
+    )
 
     return APIResponseHelper.success(
         data=response_data, message=f"Retrieved {len(response_data)} categories"
@@ -369,7 +372,7 @@ async def get_products(
     response_data = [prod.model_dump() for prod in result]
 
     # Cache for 5 minutes
-    await redis.set(cache_key, response_data, expire=300)
+    await redis.cache_menu_data(cache_key, restaurant_id, response_data, expire=300)
 
     return APIResponseHelper.success(
         data=response_data,
@@ -732,7 +735,7 @@ async def get_products_mobile(
     ]
 
     # Cache for 5 minutes
-    await redis.set(cache_key, result, expire=300)
+    await redis.cache_menu_data(cache_key, restaurant_id, result, expire=300)
 
     return APIResponseHelper.success(
         data=result, message=f"Retrieved {len(result)} mobile products"
@@ -804,7 +807,7 @@ async def get_products_by_category(
     ]
 
     # Cache for 5 minutes
-    await redis.set(cache_key, result, expire=300)
+    await redis.cache_menu_data(cache_key, restaurant_id, result, expire=300)
 
     return APIResponseHelper.success(
         data=result,
@@ -812,6 +815,53 @@ async def get_products_by_category(
     )
 
 
+@router.get("/search")
+async def search_products(
+    q: str = Query(..., min_length=2, max_length=100),
+    restaurant_id: Optional[str] = Query(None),
+    category_id: Optional[str] = Query(None),
+    limit: int = Query(20, ge=1, le=100),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """Ranked search of active products by name and description"""
+
+    # Use user's restaurant if not specified
+    if not restaurant_id:
+        restaurant_id = str(current_user.restaurant_id)
+    else:
+        await TenantSecurity.validate_restaurant_access(
+            user=current_user,
+            restaurant_id=restaurant_id,
+            operation="access",
+            resource_type="product",
+            resource_id=None,
+            db=db,
+        )
+
+    hits = get_search_service(db).search_products(
+        restaurant_id, q, limit, category_id=category_id
+    )
+
+    result = [
+        {
+            "id": str(hit.entity.id),
+            "category_id": str(hit.entity.category_id),
+            "name": hit.entity.name,
+            "description": hit.entity.description,
+            "price": str(hit.entity.price),  # Keep as string to preserve precision
+            "image": hit.entity.image_url,
+            "barcode": hit.entity.barcode,
+            "score": round(hit.score, 3),
+        }
+        for hit in hits
+    ]
+
+    return APIResponseHelper.success(
+        data=result, message=f"Found {len(result)} products matching '{q}'"
+    )
+
+
 @router.get("/{product_id}", response_model=ProductResponse)
 async def get_product(
     product_id: str,
@@ -4,7 +4,8 @@ Handles batch upload, conflict resolution, and offline synchronization
 """
 
 from typing import List, Optional, Dict, Any
-from fastapi import APIRouter, Depends, Query, Body, Path
+from fastapi import APIRouter, Depends, Query, Body, Path, Request
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from pydantic import BaseModel, Field
 from datetime import datetime
@@ -53,8 +54,11 @@ class DownloadChangesRequest(BaseModel):
         None, description="Last sync timestamp in ISO format"
     )
     entity_types: Optional[List[str]] = Field(None, description="Entity types to sync")
-    limit: int = Field(
-        default=1000, le=5000, description="Maximum number of changes to return"
+    cursor: Optional[str] = Field(
+        None, description="next_cursor from the previous page or sync"
+    )
+    limit: Optional[int] = Field(
+        None, ge=1, description="Page size, capped at the server maximum"
     )
 
 
@@ -140,17 +144,31 @@ async def upload_batch_actions(
 
 @router.get("/download-changes")
 async def download_server_changes(
-    last_sync_timestamp: Optional[str] = Query(None, description="Last sync timestamp"),
+    request: Request,
+    cursor: Optional[str] = Query(
+        None, description="next_cursor from the previous page or sync"
+    ),
+    last_sync_timestamp: Optional[str] = Query(
+        None, description="Last sync timestamp, used only when no cursor is given"
+    ),
     entity_types: Optional[str] = Query(
         None, description="Comma-separated entity types"
     ),
-    limit: int = Query(1000, le=5000, description="Maximum changes to return"),
+    limit: Optional[int] = Query(
+        None, ge=1, description="Page size, capped at the server maximum"
+    ),
+    stream: bool = Query(False, description="Stream the page as NDJSON"),
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
     """
-    Download server changes since last sync timestamp
-    Returns incremental changes for offline synchronization
+    Download one page of server changes after a sync cursor
+
+    Follow next_cursor while has_more is true; the last cursor is the
+    starting point for the next incremental sync. Deletes arrive as records
+    with action "delete". Send ``stream=true`` or ``Accept:
+    application/x-ndjson`` to receive one change per line followed by a
+    checkpoint line instead of the JSON envelope.
     """
     try:
         # Validate restaurant access
@@ -164,7 +182,7 @@ async def download_server_changes(
 
         # Parse parameters
         last_sync_dt = None
-        if last_sync_timestamp:
+        if last_sync_timestamp and not cursor:
             try:
                 last_sync_dt = datetime.fromisoformat(
                     last_sync_timestamp.replace("Z", "+00:00")
@@ -180,35 +198,23 @@ async def download_server_changes(
         if entity_types:
             entity_type_list = [t.strip() for t in entity_types.split(",")]
 
-        # Get sync manager and download changes
+        # Get sync manager and read one page
         sync_manager = get_sync_manager(db)
-        changes = sync_manager.download_changes(
+        page = sync_manager.download_page(
             restaurant_id=restaurant_id,
-            last_sync_timestamp=last_sync_dt,
+            cursor=cursor,
+            since=last_sync_dt,
             entity_types=entity_type_list,
+            page_size=limit,
         )
 
-        # Apply limit to total changes
-        if changes["total_changes"] > limit:
-            # Truncate changes to respect limit
-            truncated_changes = {}
-            remaining_limit = limit
-
-            for entity_type, entity_changes in changes["changes"].items():
-                if remaining_limit <= 0:
-                    truncated_changes[entity_type] = []
-                elif len(entity_changes) <= remaining_limit:
-                    truncated_changes[entity_type] = entity_changes
-                    remaining_limit -= len(entity_changes)
-                else:
-                    truncated_changes[entity_type] = entity_changes[:remaining_limit]
-                    remaining_limit = 0
-
-            changes["changes"] = truncated_changes
-            changes["truncated"] = True
-            changes["truncated_total"] = changes["total_changes"]
-            changes["total_changes"] = limit
+        if stream or "application/x-ndjson" in request.headers.get("accept", ""):
+            return StreamingResponse(
+                page.ndjson_lines(), media_type="application/x-ndjson"
+            )
 
+        changes = page.to_dict()
+        changes["last_sync_timestamp"] = last_sync_timestamp
         return APIResponseHelper.success(
             data=changes,
             message=f"Downloaded {changes['total_changes']} changes since last sync",
@@ -219,8 +225,9 @@ async def download_server_changes(
                     "to": changes["sync_timestamp"],
                 },
                 "entity_types_requested": entity_type_list,
-                "limit_applied": limit,
-                "has_more": changes.get("truncated", False),
+                "limit_applied": page.page_size,
+                "has_more": page.has_more,
+                "next_cursor": changes["next_cursor"],
             },
         )
 
@@ -460,6 +460,7 @@ async def websocket_endpoint_general(
             user_id=str(verified_user.id) if verified_user else user_id,
             connection_type=conn_type,
             roles=roles,
+            resume_from=websocket.query_params.get("resume_from"),
         )
 
         # Register connection with rate limiter
@@ -630,6 +631,7 @@ async def websocket_kitchen_endpoint(
             user_id=str(verified_user.id) if verified_user else user_id,
             connection_type=ConnectionType.KITCHEN,
             roles=roles,
+            resume_from=websocket.query_params.get("resume_from"),
         )
 
         # Track user connection
@@ -782,6 +784,7 @@ async def websocket_pos_endpoint(
             user_id=str(verified_user.id) if verified_user else user_id,
             connection_type=ConnectionType.POS,
             roles=roles,
+            resume_from=websocket.query_params.get("resume_from"),
         )
 
         # Track user connection
@@ -939,6 +942,7 @@ async def websocket_management_endpoint(
             user_id=str(verified_user.id) if verified_user else user_id,
             connection_type=ConnectionType.MANAGEMENT,
             roles=[verified_user.role] if verified_user else [],
+            resume_from=websocket.query_params.get("resume_from"),
         )
 
         # Track user connection
@@ -1259,6 +1263,10 @@ async def get_websocket_stats(
                 status_code=403,
             )
 
+        try:
+            await websocket_manager.replay_log.refresh_stats()
+        except Exception as e:
+            logger.warning(f"Could not refresh replay log stats: {e}")
         stats = websocket_manager.get_connection_stats()
 
         return APIResponseHelper.success(
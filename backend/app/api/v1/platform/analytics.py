@@ -7,10 +7,11 @@ from fastapi import APIRouter, Depends, Query
 from sqlalchemy.orm import Session
 from sqlalchemy import func, desc
 
-from app.core.database import get_db, Restaurant, Order, User
+from app.core.database import get_db, Restaurant, User
 from app.core.auth import get_current_platform_owner
 from app.core.cache import get_cached_data_async, cache_data
 from app.core.responses import APIResponseHelper
+from app.models.reports import DailySalesRollup
 
 router = APIRouter(prefix="/analytics", tags=["platform-analytics"])
 
@@ -40,13 +41,18 @@ async def get_platform_overview(
             .count()
         )
 
-        # Revenue metrics
-        total_revenue = (
-            db.query(func.sum(Order.total_amount))
-            .filter(Order.created_at >= thirty_days_ago)
-            .scalar()
-            or 0
+        # Revenue and order metrics from daily sales rollups
+        totals = (
+            db.query(
+                func.coalesce(func.sum(DailySalesRollup.revenue), 0).label("revenue"),
+                func.coalesce(func.sum(DailySalesRollup.order_count), 0).label(
+                    "orders"
+                ),
+            )
+            .filter(DailySalesRollup.bucket_start >= thirty_days_ago)
+            .one()
         )
+        total_revenue = totals.revenue
 
         # Transaction fees (1% of all transactions)
         transaction_fees = float(total_revenue) * 0.01
@@ -72,9 +78,7 @@ async def get_platform_overview(
         active_users = db.query(User).filter(User.last_login >= thirty_days_ago).count()
 
         # Order metrics
-        total_orders = (
-            db.query(Order).filter(Order.created_at >= thirty_days_ago).count()
-        )
+        total_orders = totals.orders
 
         overview = {
             "restaurants": {
@@ -128,14 +132,16 @@ async def get_revenue_trends(
         start_date = end_date - timedelta(days=days)
 
         # Query daily revenue
+        day = func.date(DailySalesRollup.bucket_start)
         daily_revenue = (
             db.query(
-                func.date(Order.created_at).label("date"),
-                func.sum(Order.total_amount).label("revenue"),
-                func.count(Order.id).label("order_count"),
+                day.label("date"),
+                func.sum(DailySalesRollup.revenue).label("revenue"),
+                func.sum(DailySalesRollup.order_count).label("order_count"),
             )
-            .filter(Order.created_at >= start_date)
-            .group_by(func.date(Order.created_at))
+            .filter(DailySalesRollup.bucket_start >= start_date)
+            .group_by(day)
+            .order_by(day)
             .all()
         )
 
@@ -146,7 +152,7 @@ async def get_revenue_trends(
                     "date": row.date.isoformat(),
                     "revenue": float(row.revenue or 0),
                     "transaction_fees": float(row.revenue or 0) * 0.01,
-                    "order_count": row.order_count,
+                    "order_count": int(row.order_count),
                 }
             )
 
@@ -176,13 +182,18 @@ async def get_top_restaurants(
             return APIResponseHelper.success(data=cached_data)
 
         query = db.query(Restaurant)
+        # Rollup buckets are naive UTC
+        since = datetime.utcnow() - timedelta(days=30)
 
         if metric == "revenue":
-            # Join with orders and sum revenue
+            # Join with daily rollups and sum revenue
             results = (
-                db.query(Restaurant, func.sum(Order.total_amount).label("metric_value"))
-                .join(Order, Order.restaurant_id == Restaurant.id)
-                .filter(Order.created_at >= datetime.now() - timedelta(days=30))
+                db.query(
+                    Restaurant,
+                    func.sum(DailySalesRollup.revenue).label("metric_value"),
+                )
+                .join(DailySalesRollup, DailySalesRollup.restaurant_id == Restaurant.id)
+                .filter(DailySalesRollup.bucket_start >= since)
                 .group_by(Restaurant.id)
                 .order_by(desc("metric_value"))
                 .limit(limit)
@@ -190,11 +201,14 @@ async def get_top_restaurants(
             )
 
         elif metric == "orders":
-            # Count orders
+            # Count completed orders from daily rollups
             results = (
-                db.query(Restaurant, func.count(Order.id).label("metric_value"))
-                .join(Order, Order.restaurant_id == Restaurant.id)
-                .filter(Order.created_at >= datetime.now() - timedelta(days=30))
+                db.query(
+                    Restaurant,
+                    func.sum(DailySalesRollup.order_count).label("metric_value"),
+                )
+                .join(DailySalesRollup, DailySalesRollup.restaurant_id == Restaurant.id)
+                .filter(DailySalesRollup.bucket_start >= since)
                 .group_by(Restaurant.id)
                 .order_by(desc("metric_value"))
                 .limit(limit)
@@ -10,16 +10,23 @@ from sqlalchemy import or_
 
 from app.core.database import get_db, Restaurant, User
 from app.core.auth import get_current_platform_owner
+from app.core.exceptions import FynloException
+from app.core.pagination import Keyset
 from app.core.responses import APIResponseHelper
 from app.core.security_utils import sanitize_sql_like_pattern
 
 router = APIRouter(prefix="/restaurants", tags=["platform-restaurants"])
 
+RESTAURANTS_BY_NAME = Keyset("restaurants.name", [Restaurant.name, Restaurant.id])
+
 
 @router.get("/")
 async def list_all_restaurants(
     skip: int = Query(0, ge=0),
     limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(
+        None, description="next_cursor from the previous page; replaces skip"
+    ),
     search: Optional[str] = None,
     subscription_plan: Optional[str] = None,
     subscription_status: Optional[str] = None,
@@ -51,7 +58,9 @@ async def list_all_restaurants(
         total = query.count()
 
         # Get paginated results
-        restaurants = query.offset(skip).limit(limit).all()
+        restaurants, next_cursor = RESTAURANTS_BY_NAME.paginate(
+            query, cursor, limit, skip
+        )
 
         # Format response
         data = []
@@ -76,9 +85,17 @@ async def list_all_restaurants(
             )
 
         return APIResponseHelper.success(
-            data={"restaurants": data, "total": total, "skip": skip, "limit": limit}
+            data={
+                "restaurants": data,
+                "total": total,
+                "skip": skip,
+                "limit": limit,
+                "next_cursor": next_cursor,
+            }
         )
 
+    except FynloException:
+        raise
     except Exception as e:
         return APIResponseHelper.error(
             message=f"Failed to fetch restaurants: {str(e)}", status_code=500
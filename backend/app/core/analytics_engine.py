@@ -1,17 +1,21 @@
 """
 Advanced Analytics Engine for Fynlo POS
 Real-time dashboard metrics optimized for mobile consumption
+
+Every widget is computed with grouped SQL aggregates in a single round-trip;
+only summary rows are returned to Python, never the underlying orders.
 """
 
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Tuple
 from datetime import datetime, timedelta, date
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, desc
+from sqlalchemy import and_, case, desc, func, select
 from enum import Enum
 from dataclasses import dataclass
 
-from app.core.database import Order, Product, Customer, Payment, User
+from app.core.database import Category, Order, Product, Customer, Payment, User
 from app.core.exceptions import FynloException, ErrorCodes
+from app.models.reports import OrderLine
 
 
 class AnalyticsTimeframe(str, Enum):
@@ -72,12 +76,76 @@ class AnalyticsFilter:
     customer_segments: Optional[List[str]] = None
 
 
+# Trend bucket per dashboard timeframe, passed to date_trunc
+TREND_BUCKETS = {
+    AnalyticsTimeframe.HOUR: "minute",
+    AnalyticsTimeframe.DAY: "hour",
+    AnalyticsTimeframe.WEEK: "day",
+    AnalyticsTimeframe.MONTH: "day",
+    AnalyticsTimeframe.QUARTER: "week",
+    AnalyticsTimeframe.YEAR: "month",
+    AnalyticsTimeframe.CUSTOM: "day",
+}
+
+PENDING_STATUSES = ("pending", "preparing")
+
+
+def _sum_if(condition, value):
+    """SUM(CASE WHEN condition THEN value ELSE 0 END)"""
+    return func.coalesce(func.sum(case((condition, value), else_=0)), 0)
+
+
+def _count_if(condition):
+    return _sum_if(condition, 1)
+
+
+def _ratio(part, whole, scale: float = 1.0) -> float:
+    return float(part) / float(whole) * scale if whole else 0.0
+
+
 class AnalyticsEngine:
     """Advanced analytics engine for real-time dashboard metrics"""
 
     def __init__(self, db: Session):
         self.db = db
 
+    @staticmethod
+    def _order_window(
+        restaurant_id: str, start_date: datetime, end_date: datetime
+    ) -> List[Any]:
+        """Filter clauses for a restaurant's orders created in a date range"""
+        return [
+            Order.restaurant_id == restaurant_id,
+            Order.created_at >= start_date,
+            Order.created_at <= end_date,
+        ]
+
+    def _product_sales_subquery(self, filter_criteria: AnalyticsFilter):
+        """
+        Units and revenue per product for completed orders in the window,
+        grouped over the order_lines projection of orders.items
+        """
+        return (
+            select(
+                OrderLine.product_id,
+                func.sum(OrderLine.quantity).label("units_sold"),
+                func.sum(OrderLine.line_total).label("revenue"),
+            )
+            .where(*self._completed_lines_window(filter_criteria))
+            .group_by(OrderLine.product_id)
+            .subquery("product_sales")
+        )
+
+    @staticmethod
+    def _completed_lines_window(filter_criteria: AnalyticsFilter) -> List[Any]:
+        """Filter clauses for lines of completed orders created in the window"""
+        return [
+            OrderLine.restaurant_id == filter_criteria.restaurant_id,
+            OrderLine.ordered_at >= filter_criteria.start_date,
+            OrderLine.ordered_at <= filter_criteria.end_date,
+            OrderLine.completed_at.isnot(None),
+        ]
+
     def get_dashboard_overview(
         self,
         restaurant_id: str,
@@ -108,8 +176,7 @@ class AnalyticsEngine:
             performance_metrics = self._get_performance_metrics(filter_criteria)
 
             # Get time series data for charts
-            revenue_trend = self._get_revenue_trend(filter_criteria, timeframe)
-            order_trend = self._get_order_trend(filter_criteria, timeframe)
+            revenue_trend, order_trend = self._get_trends(filter_criteria, timeframe)
 
             # Get top performing items
             top_products = self._get_top_products(filter_criteria, limit=5)
@@ -214,63 +281,57 @@ class AnalyticsEngine:
             if not start_date:
                 start_date = self._get_timeframe_start(end_date, timeframe)
 
-            # Get employee performance data
-            employees = (
-                self.db.query(User)
+            # Per-employee order counts and revenue, grouped in one query
+            completed = Order.status == "completed"
+            total_revenue = _sum_if(completed, Order.total_amount)
+            rows = (
+                self.db.query(
+                    User.id,
+                    User.username,
+                    User.role,
+                    func.count(Order.id).label("total_orders"),
+                    _count_if(completed).label("completed_orders"),
+                    total_revenue.label("total_revenue"),
+                )
+                .outerjoin(
+                    Order,
+                    and_(
+                        Order.created_by == User.id,
+                        *self._order_window(restaurant_id, start_date, end_date),
+                    ),
+                )
                 .filter(
                     User.restaurant_id == restaurant_id,
                     User.role.in_(["employee", "manager"]),
                 )
+                .group_by(User.id, User.username, User.role)
+                .order_by(desc(total_revenue))
                 .all()
             )
 
             employee_metrics = []
 
-            for employee in employees:
-                # Get orders handled by employee
-                orders = (
-                    self.db.query(Order)
-                    .filter(
-                        and_(
-                            Order.restaurant_id == restaurant_id,
-                            Order.created_by == employee.id,
-                            Order.created_at >= start_date,
-                            Order.created_at <= end_date,
-                        )
-                    )
-                    .all()
-                )
-
-                completed_orders = [o for o in orders if o.status == "completed"]
-                total_revenue = sum(o.total_amount for o in completed_orders)
-
-                # Calculate performance metrics
-                avg_order_value = (
-                    total_revenue / len(completed_orders) if completed_orders else 0
-                )
-                completion_rate = (
-                    len(completed_orders) / len(orders) * 100 if orders else 0
-                )
-
+            for row in rows:
                 employee_metrics.append(
                     {
-                        "employee_id": str(employee.id),
-                        "employee_name": employee.username,
-                        "role": employee.role,
-                        "total_orders": len(orders),
-                        "completed_orders": len(completed_orders),
-                        "total_revenue": float(total_revenue),
-                        "avg_order_value": float(avg_order_value),
-                        "completion_rate": round(completion_rate, 2),
+                        "employee_id": str(row.id),
+                        "employee_name": row.username,
+                        "role": row.role,
+                        "total_orders": row.total_orders,
+                        "completed_orders": int(row.completed_orders),
+                        "total_revenue": float(row.total_revenue),
+                        "avg_order_value": _ratio(
+                            row.total_revenue, row.completed_orders
+                        ),
+                        "completion_rate": round(
+                            _ratio(row.completed_orders, row.total_orders, 100), 2
+                        ),
                         "orders_per_hour": round(
-                            len(orders) / 8, 2
+                            row.total_orders / 8, 2
                         ),  # Assuming 8-hour shifts
                     }
                 )
 
-            # Sort by performance (total revenue)
-            employee_metrics.sort(key=lambda x: x["total_revenue"], reverse=True)
-
             # Calculate team averages
             team_totals = {
                 "total_orders": sum(e["total_orders"] for e in employee_metrics),
@@ -316,98 +377,91 @@ class AnalyticsEngine:
             if not start_date:
                 start_date = self._get_timeframe_start(end_date, timeframe)
 
-            # Customer overview
-            total_customers = (
-                self.db.query(Customer)
+            # Customer overview: total and new customers in one pass
+            customer_counts = (
+                self.db.query(
+                    func.count(Customer.id).label("total_customers"),
+                    _count_if(
+                        and_(
+                            Customer.created_at >= start_date,
+                            Customer.created_at <= end_date,
+                        )
+                    ).label("new_customers"),
+                )
                 .filter(Customer.restaurant_id == restaurant_id)
-                .count()
+                .one()
             )
-
-            # New customers in period
-            new_customers = (
-                self.db.query(Customer)
-                .filter(
-                    and_(
-                        Customer.restaurant_id == restaurant_id,
-                        Customer.created_at >= start_date,
-                        Customer.created_at <= end_date,
-                    )
+            total_customers = customer_counts.total_customers
+            new_customers = int(customer_counts.new_customers)
+
+            # Per-customer totals in the period, grouped in SQL
+            per_customer = (
+                select(
+                    Order.customer_id.label("customer_id"),
+                    func.count(Order.id).label("total_orders"),
+                    func.sum(Order.total_amount).label("total_spent"),
+                    func.min(Order.created_at).label("first_order"),
+                    func.max(Order.created_at).label("last_order"),
                 )
-                .count()
+                .where(
+                    *self._order_window(restaurant_id, start_date, end_date),
+                    Order.customer_id.isnot(None),
+                )
+                .group_by(Order.customer_id)
+                .subquery("per_customer")
             )
 
-            # Customer orders in period
-            customer_orders = (
-                self.db.query(Order, Customer)
-                .join(Customer, Order.customer_id == Customer.id)
-                .filter(
-                    and_(
-                        Order.restaurant_id == restaurant_id,
-                        Order.created_at >= start_date,
-                        Order.created_at <= end_date,
-                    )
+            # Frequency summary and top ten, both from the grouped rows
+            rank = func.row_number().over(order_by=desc(per_customer.c.total_spent))
+            ranked = select(
+                per_customer,
+                rank.label("spend_rank"),
+                func.count().over().label("active_customers"),
+                func.sum(case((per_customer.c.total_orders > 1, 1), else_=0))
+                .over()
+                .label("repeat_customers"),
+                func.sum(per_customer.c.total_orders).over().label("all_orders"),
+                func.sum(per_customer.c.total_spent).over().label("all_spent"),
+            ).subquery("ranked")
+            rows = (
+                self.db.query(
+                    ranked,
+                    func.concat_ws(" ", Customer.first_name, Customer.last_name).label(
+                        "customer_name"
+                    ),
                 )
+                .outerjoin(Customer, Customer.id == ranked.c.customer_id)
+                .filter(ranked.c.spend_rank <= 10)
+                .order_by(ranked.c.spend_rank)
                 .all()
             )
 
-            # Customer lifetime value analysis
-            customer_ltv = {}
-            for order, customer in customer_orders:
-                if customer.id not in customer_ltv:
-                    customer_ltv[customer.id] = {
-                        "customer_name": customer.name,
-                        "total_orders": 0,
-                        "total_spent": 0,
-                        "first_order": None,
-                        "last_order": None,
-                    }
-
-                customer_ltv[customer.id]["total_orders"] += 1
-                customer_ltv[customer.id]["total_spent"] += float(order.total_amount)
-
-                if (
-                    not customer_ltv[customer.id]["first_order"]
-                    or order.created_at < customer_ltv[customer.id]["first_order"]
-                ):
-                    customer_ltv[customer.id]["first_order"] = order.created_at
-
-                if (
-                    not customer_ltv[customer.id]["last_order"]
-                    or order.created_at > customer_ltv[customer.id]["last_order"]
-                ):
-                    customer_ltv[customer.id]["last_order"] = order.created_at
-
-            # Top customers by value
-            top_customers = sorted(
-                customer_ltv.values(), key=lambda x: x["total_spent"], reverse=True
-            )[:10]
-
-            # Customer frequency analysis
-            repeat_customers = len(
-                [c for c in customer_ltv.values() if c["total_orders"] > 1]
-            )
-            repeat_rate = (
-                (repeat_customers / len(customer_ltv) * 100) if customer_ltv else 0
-            )
+            top_customers = [
+                {
+                    "customer_name": row.customer_name,
+                    "total_orders": row.total_orders,
+                    "total_spent": float(row.total_spent),
+                    "first_order": row.first_order,
+                    "last_order": row.last_order,
+                }
+                for row in rows
+            ]
 
-            # Average order frequency
+            active_customers = rows[0].active_customers if rows else 0
+            repeat_customers = int(rows[0].repeat_customers) if rows else 0
+            repeat_rate = _ratio(repeat_customers, active_customers, 100)
             avg_orders_per_customer = (
-                sum(c["total_orders"] for c in customer_ltv.values())
-                / len(customer_ltv)
-                if customer_ltv
-                else 0
+                _ratio(rows[0].all_orders, active_customers) if rows else 0
             )
             avg_spend_per_customer = (
-                sum(c["total_spent"] for c in customer_ltv.values()) / len(customer_ltv)
-                if customer_ltv
-                else 0
+                _ratio(rows[0].all_spent, active_customers) if rows else 0
             )
 
             return {
                 "customer_overview": {
                     "total_customers": total_customers,
                     "new_customers": new_customers,
-                    "active_customers": len(customer_ltv),
+                    "active_customers": active_customers,
                     "repeat_customers": repeat_customers,
                     "repeat_rate": round(repeat_rate, 2),
                 },
@@ -446,52 +500,51 @@ class AnalyticsEngine:
             if not start_date:
                 start_date = self._get_timeframe_start(end_date, timeframe)
 
-            # Get all products
-            products = (
-                self.db.query(Product)
+            filter_criteria = AnalyticsFilter(
+                restaurant_id=restaurant_id,
+                start_date=start_date,
+                end_date=end_date,
+            )
+
+            # Products with their sales joined from one grouped subquery
+            sales = self._product_sales_subquery(filter_criteria)
+            revenue = func.coalesce(sales.c.revenue, 0)
+            rows = (
+                self.db.query(
+                    Product.id,
+                    Product.name,
+                    Product.price,
+                    Product.stock_quantity,
+                    func.coalesce(Category.name, "General").label("category"),
+                    func.coalesce(sales.c.units_sold, 0).label("units_sold"),
+                    revenue.label("revenue"),
+                )
+                .outerjoin(Category, Category.id == Product.category_id)
+                .outerjoin(sales, sales.c.product_id == Product.id)
                 .filter(Product.restaurant_id == restaurant_id)
+                .order_by(desc(revenue), Product.name)
                 .all()
             )
 
             product_analytics = []
+            min_stock = 10  # Would be from product settings
 
-            for product in products:
-                # Get orders containing this product
-                # Note: This would need order_items table in real implementation
-                product_orders = []  # Placeholder for order items query
-
-                # Calculate product metrics
-                total_sold = len(product_orders)  # Would be sum of quantities
-                total_revenue = sum(float(product.price) for _ in product_orders)
-
-                # Stock analysis
-                stock_level = (
-                    product.stock_quantity if hasattr(product, "stock_quantity") else 0
-                )
-                min_stock = 10  # Would be from product settings
-                stock_status = "low" if stock_level < min_stock else "normal"
-
+            for rank, row in enumerate(rows, start=1):
+                stock_level = row.stock_quantity or 0
                 product_analytics.append(
                     {
-                        "product_id": str(product.id),
-                        "product_name": product.name,
-                        "category": getattr(product, "category", "General"),
-                        "price": float(product.price),
+                        "product_id": str(row.id),
+                        "product_name": row.name,
+                        "category": row.category,
+                        "price": float(row.price),
                         "stock_level": stock_level,
-                        "stock_status": stock_status,
-                        "units_sold": total_sold,
-                        "revenue_generated": total_revenue,
-                        "popularity_rank": 0,  # Would be calculated based on sales
+                        "stock_status": "low" if stock_level < min_stock else "normal",
+                        "units_sold": int(row.units_sold),
+                        "revenue_generated": float(row.revenue),
+                        "popularity_rank": rank,
                     }
                 )
 
-            # Sort by revenue
-            product_analytics.sort(key=lambda x: x["revenue_generated"], reverse=True)
-
-            # Add popularity ranks
-            for i, product in enumerate(product_analytics):
-                product["popularity_rank"] = i + 1
-
             # Category analysis
             categories = {}
             for product in product_analytics:
@@ -544,61 +597,52 @@ class AnalyticsEngine:
             now = datetime.now()
             today_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
 
-            # Today's metrics
-            today_orders = (
-                self.db.query(Order)
+            current_hour_start = now.replace(minute=0, second=0, microsecond=0)
+
+            # Today's and current hour's metrics in a single aggregate row
+            completed = Order.status == "completed"
+            this_hour = Order.created_at >= current_hour_start
+            today = (
+                self.db.query(
+                    func.count(Order.id).label("total_orders"),
+                    _count_if(completed).label("completed_orders"),
+                    _count_if(Order.status.in_(PENDING_STATUSES)).label(
+                        "pending_orders"
+                    ),
+                    _sum_if(completed, Order.total_amount).label("total_revenue"),
+                    _count_if(this_hour).label("hour_orders"),
+                    _sum_if(and_(this_hour, completed), Order.total_amount).label(
+                        "hour_revenue"
+                    ),
+                )
                 .filter(
-                    and_(
-                        Order.restaurant_id == restaurant_id,
-                        Order.created_at >= today_start,
-                    )
+                    Order.restaurant_id == restaurant_id,
+                    Order.created_at >= today_start,
                 )
-                .all()
-            )
-
-            completed_orders = [o for o in today_orders if o.status == "completed"]
-            pending_orders = [
-                o for o in today_orders if o.status in ["pending", "preparing"]
-            ]
-
-            # Real-time calculations
-            total_revenue_today = sum(o.total_amount for o in completed_orders)
-            avg_order_value = (
-                total_revenue_today / len(completed_orders) if completed_orders else 0
+                .one()
             )
 
-            # Current hour metrics
-            current_hour_start = now.replace(minute=0, second=0, microsecond=0)
-            current_hour_orders = [
-                o for o in today_orders if o.created_at >= current_hour_start
-            ]
-
-            # Performance indicators
-            orders_per_hour = len(current_hour_orders)
-            revenue_per_hour = sum(
-                o.total_amount for o in current_hour_orders if o.status == "completed"
-            )
+            completed_orders = int(today.completed_orders)
+            hour_orders = int(today.hour_orders)
 
             return {
                 "current_time": now.isoformat(),
                 "today_metrics": {
-                    "total_orders": len(today_orders),
-                    "completed_orders": len(completed_orders),
-                    "pending_orders": len(pending_orders),
-                    "total_revenue": float(total_revenue_today),
-                    "avg_order_value": float(avg_order_value),
+                    "total_orders": today.total_orders,
+                    "completed_orders": completed_orders,
+                    "pending_orders": int(today.pending_orders),
+                    "total_revenue": float(today.total_revenue),
+                    "avg_order_value": _ratio(today.total_revenue, completed_orders),
                 },
                 "current_hour": {
-                    "orders_count": len(current_hour_orders),
-                    "revenue": float(revenue_per_hour),
-                    "orders_per_hour_rate": orders_per_hour,
+                    "orders_count": hour_orders,
+                    "revenue": float(today.hour_revenue),
+                    "orders_per_hour_rate": hour_orders,
                 },
                 "operational_status": {
-                    "active_orders": len(pending_orders),
-                    "completion_rate": (
-                        len(completed_orders) / len(today_orders) * 100
-                        if today_orders
-                        else 0
+                    "active_orders": int(today.pending_orders),
+                    "completion_rate": _ratio(
+                        completed_orders, today.total_orders, 100
                     ),
                     "avg_order_time": "15 minutes",  # Would calculate from actual data
                 },
@@ -632,41 +676,27 @@ class AnalyticsEngine:
 
     def _get_revenue_metrics(self, filter_criteria: AnalyticsFilter) -> Dict[str, Any]:
         """Calculate revenue metrics"""
-        # Current period revenue
-        current_orders = (
-            self.db.query(Order)
-            .filter(
-                and_(
-                    Order.restaurant_id == filter_criteria.restaurant_id,
-                    Order.created_at >= filter_criteria.start_date,
-                    Order.created_at <= filter_criteria.end_date,
-                    Order.status == "completed",
-                )
-            )
-            .all()
-        )
-
-        current_revenue = sum(o.total_amount for o in current_orders)
-
-        # Previous period for comparison
+        # Current and previous period revenue in one scan of both windows
         period_length = filter_criteria.end_date - filter_criteria.start_date
         prev_start = filter_criteria.start_date - period_length
-        prev_end = filter_criteria.start_date
+        in_current = Order.created_at >= filter_criteria.start_date
 
-        prev_orders = (
-            self.db.query(Order)
+        totals = (
+            self.db.query(
+                _sum_if(in_current, Order.total_amount).label("current"),
+                _sum_if(~in_current, Order.total_amount).label("previous"),
+            )
             .filter(
-                and_(
-                    Order.restaurant_id == filter_criteria.restaurant_id,
-                    Order.created_at >= prev_start,
-                    Order.created_at <= prev_end,
-                    Order.status == "completed",
-                )
+                *self._order_window(
+                    filter_criteria.restaurant_id, prev_start, filter_criteria.end_date
+                ),
+                Order.status == "completed",
             )
-            .all()
+            .one()
         )
 
-        prev_revenue = sum(o.total_amount for o in prev_orders)
+        current_revenue = float(totals.current)
+        prev_revenue = float(totals.previous)
 
         # Calculate change
         change_percent = 0
@@ -734,25 +764,25 @@ class AnalyticsEngine:
         self, filter_criteria: AnalyticsFilter
     ) -> Dict[str, Any]:
         """Calculate performance metrics"""
-        orders = (
-            self.db.query(Order)
+        completed = Order.status == "completed"
+        totals = (
+            self.db.query(
+                func.count(Order.id).label("total_orders"),
+                _count_if(completed).label("completed_orders"),
+                _sum_if(completed, Order.total_amount).label("total_revenue"),
+            )
             .filter(
-                and_(
-                    Order.restaurant_id == filter_criteria.restaurant_id,
-                    Order.created_at >= filter_criteria.start_date,
-                    Order.created_at <= filter_criteria.end_date,
+                *self._order_window(
+                    filter_criteria.restaurant_id,
+                    filter_criteria.start_date,
+                    filter_criteria.end_date,
                 )
             )
-            .all()
+            .one()
         )
 
-        completed_orders = [o for o in orders if o.status == "completed"]
-        completion_rate = len(completed_orders) / len(orders) * 100 if orders else 0
-
-        total_revenue = sum(o.total_amount for o in completed_orders)
-        avg_order_value = (
-            total_revenue / len(completed_orders) if completed_orders else 0
-        )
+        completion_rate = _ratio(totals.completed_orders, totals.total_orders, 100)
+        avg_order_value = _ratio(totals.total_revenue, totals.completed_orders)
 
         return {
             "completion_rate": round(completion_rate, 2),
@@ -760,46 +790,71 @@ class AnalyticsEngine:
             "formatted_aov": f"${avg_order_value:.2f}",
         }
 
-    def _get_revenue_trend(
+    def _get_trends(
         self, filter_criteria: AnalyticsFilter, timeframe: AnalyticsTimeframe
-    ) -> List[Dict[str, Any]]:
-        """Get revenue trend data"""
-        # This would generate time series data based on timeframe
-        # For now, returning sample data
-        return [
-            {"timestamp": filter_criteria.start_date.isoformat(), "value": 1000.0},
-            {"timestamp": filter_criteria.end_date.isoformat(), "value": 1200.0},
-        ]
+    ) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """Revenue and order count per date_trunc bucket, in one grouped query"""
+        bucket = func.date_trunc(
+            TREND_BUCKETS.get(timeframe, "day"), Order.created_at
+        ).label("bucket")
+        rows = (
+            self.db.query(
+                bucket,
+                func.count(Order.id).label("orders"),
+                _sum_if(Order.status == "completed", Order.total_amount).label(
+                    "revenue"
+                ),
+            )
+            .filter(
+                *self._order_window(
+                    filter_criteria.restaurant_id,
+                    filter_criteria.start_date,
+                    filter_criteria.end_date,
+                )
+            )
+            .group_by(bucket)
+            .order_by(bucket)
+            .all()
+        )
 
-    def _get_order_trend(
-        self, filter_criteria: AnalyticsFilter, timeframe: AnalyticsTimeframe
-    ) -> List[Dict[str, Any]]:
-        """Get order trend data"""
-        return [
-            {"timestamp": filter_criteria.start_date.isoformat(), "value": 25},
-            {"timestamp": filter_criteria.end_date.isoformat(), "value": 30},
+        revenue_trend = [
+            {"timestamp": row.bucket.isoformat(), "value": float(row.revenue)}
+            for row in rows
         ]
+        order_trend = [
+            {"timestamp": row.bucket.isoformat(), "value": row.orders} for row in rows
+        ]
+        return revenue_trend, order_trend
 
     def _get_top_products(
         self, filter_criteria: AnalyticsFilter, limit: int = 5
     ) -> List[Dict[str, Any]]:
         """Get top performing products"""
-        products = (
-            self.db.query(Product)
+        sales = self._product_sales_subquery(filter_criteria)
+        rows = (
+            self.db.query(
+                Product.id,
+                Product.name,
+                Product.price,
+                sales.c.units_sold,
+                sales.c.revenue,
+            )
+            .join(sales, sales.c.product_id == Product.id)
             .filter(Product.restaurant_id == filter_criteria.restaurant_id)
+            .order_by(desc(sales.c.revenue))
             .limit(limit)
             .all()
         )
 
         return [
             {
-                "product_id": str(product.id),
-                "product_name": product.name,
-                "price": float(product.price),
-                "units_sold": 10,  # Would calculate from order items
-                "revenue": float(product.price) * 10,
+                "product_id": str(row.id),
+                "product_name": row.name,
+                "price": float(row.price),
+                "units_sold": int(row.units_sold),
+                "revenue": float(row.revenue),
             }
-            for product in products
+            for row in rows
         ]
 
     def _get_recent_orders(
@@ -833,42 +888,64 @@ class AnalyticsEngine:
 
     def _get_sales_overview(self, filter_criteria: AnalyticsFilter) -> Dict[str, Any]:
         """Get sales overview data"""
-        orders = (
-            self.db.query(Order)
+        totals = (
+            self.db.query(
+                func.coalesce(func.sum(Order.total_amount), 0).label("total_revenue"),
+                func.count(Order.id).label("total_orders"),
+            )
             .filter(
-                and_(
-                    Order.restaurant_id == filter_criteria.restaurant_id,
-                    Order.created_at >= filter_criteria.start_date,
-                    Order.created_at <= filter_criteria.end_date,
-                    Order.status == "completed",
-                )
+                *self._order_window(
+                    filter_criteria.restaurant_id,
+                    filter_criteria.start_date,
+                    filter_criteria.end_date,
+                ),
+                Order.status == "completed",
             )
-            .all()
+            .one()
         )
 
-        total_revenue = sum(o.total_amount for o in orders)
-        total_orders = len(orders)
-        avg_order_value = total_revenue / total_orders if total_orders else 0
+        period_days = max(
+            (filter_criteria.end_date - filter_criteria.start_date).total_seconds()
+            / 86400,
+            1,
+        )
 
         return {
-            "total_revenue": float(total_revenue),
-            "total_orders": total_orders,
-            "avg_order_value": float(avg_order_value),
-            "revenue_per_day": float(
-                total_revenue / 1
-            ),  # Would calculate based on actual days
+            "total_revenue": float(totals.total_revenue),
+            "total_orders": totals.total_orders,
+            "avg_order_value": _ratio(totals.total_revenue, totals.total_orders),
+            "revenue_per_day": float(totals.total_revenue) / period_days,
         }
 
     def _get_sales_by_category(
         self, filter_criteria: AnalyticsFilter
     ) -> Dict[str, Any]:
         """Get sales breakdown by category"""
-        # Would join with order_items and products to get category data
-        return {
-            "Food": {"revenue": 5000.0, "orders": 100},
-            "Beverages": {"revenue": 2000.0, "orders": 80},
-            "Desserts": {"revenue": 800.0, "orders": 40},
-        }
+        revenue = func.sum(OrderLine.line_total)
+        rows = (
+            self.db.query(
+                func.coalesce(Category.name, "General").label("category"),
+                func.sum(OrderLine.quantity).label("units_sold"),
+                revenue.label("revenue"),
+                func.count(func.distinct(OrderLine.order_id)).label("orders"),
+            )
+            .outerjoin(Category, Category.id == OrderLine.category_id)
+            .filter(*self._completed_lines_window(filter_criteria))
+            .group_by(OrderLine.category_id, Category.name)
+            .order_by(desc(revenue))
+            .all()
+        )
+
+        breakdown: Dict[str, Any] = {}
+        for row in rows:
+            # Categories sharing a name (or uncategorised lines) are merged
+            entry = breakdown.setdefault(
+                row.category, {"revenue": 0.0, "orders": 0, "units_sold": 0}
+            )
+            entry["revenue"] += float(row.revenue)
+            entry["orders"] += row.orders
+            entry["units_sold"] += int(row.units_sold)
+        return breakdown
 
     def _get_sales_pattern(
         self, filter_criteria: AnalyticsFilter, timeframe: AnalyticsTimeframe
@@ -885,58 +962,53 @@ class AnalyticsEngine:
         self, filter_criteria: AnalyticsFilter
     ) -> Dict[str, Any]:
         """Get payment method breakdown"""
-        payments = (
-            self.db.query(Payment)
+        # Payments carry no restaurant_id; scope them through their order
+        rows = (
+            self.db.query(
+                Payment.payment_method,
+                func.count(Payment.id).label("count"),
+                func.sum(Payment.amount).label("amount"),
+            )
+            .join(Order, Order.id == Payment.order_id)
             .filter(
-                and_(
-                    Payment.restaurant_id == filter_criteria.restaurant_id,
-                    Payment.created_at >= filter_criteria.start_date,
-                    Payment.created_at <= filter_criteria.end_date,
-                    Payment.status == "completed",
-                )
+                Order.restaurant_id == filter_criteria.restaurant_id,
+                Payment.created_at >= filter_criteria.start_date,
+                Payment.created_at <= filter_criteria.end_date,
+                Payment.status == "completed",
             )
+            .group_by(Payment.payment_method)
             .all()
         )
 
-        method_breakdown = {}
-        for payment in payments:
-            method = payment.payment_method
-            if method not in method_breakdown:
-                method_breakdown[method] = {"count": 0, "amount": 0.0}
-
-            method_breakdown[method]["count"] += 1
-            method_breakdown[method]["amount"] += float(payment.amount)
-
-        return method_breakdown
+        return {
+            row.payment_method: {"count": row.count, "amount": float(row.amount)}
+            for row in rows
+        }
 
     def _get_order_analysis(self, filter_criteria: AnalyticsFilter) -> Dict[str, Any]:
         """Get detailed order analysis"""
-        orders = (
-            self.db.query(Order)
+        totals = (
+            self.db.query(
+                func.avg(Order.total_amount).label("avg_value"),
+                func.max(Order.total_amount).label("max_value"),
+                func.min(Order.total_amount).label("min_value"),
+                func.count(Order.id).label("total_orders"),
+            )
             .filter(
-                and_(
-                    Order.restaurant_id == filter_criteria.restaurant_id,
-                    Order.created_at >= filter_criteria.start_date,
-                    Order.created_at <= filter_criteria.end_date,
+                *self._order_window(
+                    filter_criteria.restaurant_id,
+                    filter_criteria.start_date,
+                    filter_criteria.end_date,
                 )
             )
-            .all()
+            .one()
         )
 
-        order_values = [float(o.total_amount) for o in orders]
-
-        if order_values:
-            avg_value = sum(order_values) / len(order_values)
-            max_value = max(order_values)
-            min_value = min(order_values)
-        else:
-            avg_value = max_value = min_value = 0
-
         return {
-            "avg_order_value": avg_value,
-            "max_order_value": max_value,
-            "min_order_value": min_value,
-            "total_orders": len(orders),
+            "avg_order_value": float(totals.avg_value or 0),
+            "max_order_value": float(totals.max_value or 0),
+            "min_order_value": float(totals.min_value or 0),
+            "total_orders": totals.total_orders,
         }
 
     def get_financial_analytics(
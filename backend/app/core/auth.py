@@ -10,6 +10,8 @@ from datetime import datetime, timedelta
 from jose import jwt
 
 from app.core.supabase import supabase_admin
+from app.core.auth_cache import auth_user_cache
+from app.core.token_verifier import TokenIdentity, get_token_verifier
 from app.core.database import get_db
 from app.core.database import User
 from app.services.audit_logger import AuditLoggerService
@@ -24,6 +26,56 @@ from app.core.exceptions import (
 logger = logging.getLogger(__name__)
 
 
+def local_verification_enabled() -> bool:
+    return settings.AUTH_VERIFICATION_MODE == "local"
+
+
+async def verify_supabase_token(token: str) -> Optional[TokenIdentity]:
+    """
+    Resolve a Supabase access token to its identity.
+
+    In "local" mode the signature is checked against the cached JWKS; otherwise
+    the token is sent to the Supabase API. Returns None when Supabase does not
+    recognise the token; local verification failures raise AuthenticationException.
+    """
+    if local_verification_enabled():
+        return await get_token_verifier().verify(token)
+
+    user_response = supabase_admin.auth.get_user(token)
+    supabase_user = user_response.user
+    if not supabase_user:
+        return None
+    return TokenIdentity(
+        supabase_id=str(supabase_user.id),
+        token_id="",
+        email=supabase_user.email,
+    )
+
+
+async def resolve_token_user(identity: TokenIdentity, db: Session) -> Optional[User]:
+    """Load the local user for a verified identity, using the cache in local mode"""
+    use_cache = local_verification_enabled()
+    if use_cache:
+        cached_user = await auth_user_cache.get(
+            identity.supabase_id, identity.token_id, db
+        )
+        if cached_user is not None:
+            return cached_user
+
+    db_user = db.query(User).filter(User.supabase_id == identity.supabase_id).first()
+    if use_cache and db_user is not None and db_user.is_active:
+        await auth_user_cache.set(identity.supabase_id, identity.token_id, db_user)
+    return db_user
+
+
+async def revoke_token(token: str) -> None:
+    """Revocation hook for logout: reject a locally verified token until expiry"""
+    if not local_verification_enabled():
+        return
+    identity = await get_token_verifier().verify(token)
+    await auth_user_cache.revoke_token(identity.token_id, identity.expires_at)
+
+
 async def get_current_user(
     request: Request,
     authorization: Optional[str] = Header(None),
@@ -55,11 +107,25 @@ async def get_current_user(
     token = authorization.replace("Bearer ", "")
 
     try:
-        # Verify with Supabase
-        user_response = supabase_admin.auth.get_user(token)
-        supabase_user = user_response.user
+        # Verify with Supabase (remotely, or locally against the cached JWKS)
+        try:
+            identity = await verify_supabase_token(token)
+        except AuthenticationException as e:
+            await audit_service.create_audit_log(
+                event_type=AuditEventType.ACCESS_DENIED,
+                event_status=AuditEventStatus.FAILURE,
+                action_performed=f"{action_prefix} denied: Invalid token",
+                ip_address=ip_address,
+                user_agent=user_agent,
+                details={
+                    "reason": e.message,
+                    "token_prefix": token[:10] + "...",
+                },
+                commit=True,
+            )
+            raise
 
-        if not supabase_user:
+        if not identity:
             await audit_service.create_audit_log(
                 event_type=AuditEventType.ACCESS_DENIED,
                 event_status=AuditEventStatus.FAILURE,
@@ -77,21 +143,19 @@ async def get_current_user(
             )
 
         # Get user from our database
-        db_user = (
-            db.query(User).filter(User.supabase_id == str(supabase_user.id)).first()
-        )
+        db_user = await resolve_token_user(identity, db)
 
         if not db_user:
             await audit_service.create_audit_log(
                 event_type=AuditEventType.ACCESS_DENIED,
                 event_status=AuditEventStatus.FAILURE,
                 action_performed=f"{action_prefix} denied: User not found in database",
-                username_or_email=supabase_user.email,
+                username_or_email=identity.email,
                 ip_address=ip_address,
                 user_agent=user_agent,
                 details={
                     "reason": "User exists in Supabase but not in local database",
-                    "supabase_id": str(supabase_user.id),
+                    "supabase_id": identity.supabase_id,
                 },
                 commit=True,
             )
@@ -116,18 +180,21 @@ async def get_current_user(
                 message="Access denied", details={"error_code": "ACCESS_DENIED"}
             )
 
-        # Log successful access
+        # Log successful access. The commit would expire the user's loaded
+        # attributes and make the handler reload the row, so keep it out of it
+        db.expunge(db_user)
         await audit_service.create_audit_log(
             event_type=AuditEventType.ACCESS_GRANTED,
             event_status=AuditEventStatus.SUCCESS,
             action_performed=f"{action_prefix} granted",
             user_id=db_user.id,
             username_or_email=db_user.email,
-            restaurant_id=db_user.restaurant_id,
             ip_address=ip_address,
             user_agent=user_agent,
+            details={"restaurant_id": str(db_user.restaurant_id)},
             commit=True,
         )
+        db.add(db_user)
 
         return db_user
 
@@ -219,25 +286,22 @@ async def verify_websocket_token(
     """
     try:
         # Verify with Supabase
-        if not supabase_admin:
+        if not supabase_admin and not local_verification_enabled():
             logger.error("Supabase admin client not initialized")
             return None
 
-        user_response = supabase_admin.auth.get_user(token)
-        supabase_user = user_response.user
+        identity = await verify_supabase_token(token)
 
-        if not supabase_user:
+        if not identity:
             logger.warning("Invalid token - no user returned from Supabase")
             return None
 
         # Find user in our database by Supabase ID
-        db_user = (
-            db.query(User).filter(User.supabase_id == str(supabase_user.id)).first()
-        )
+        db_user = await resolve_token_user(identity, db)
 
         if not db_user:
             logger.warning(
-                f"User not found in database for Supabase ID: {supabase_user.id}"
+                f"User not found in database for Supabase ID: {identity.supabase_id}"
             )
             return None
 
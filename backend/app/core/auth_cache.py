@@ -0,0 +1,240 @@
+"""
+Short-lived cache of authenticated users for local token verification.
+
+Two tiers: an in-process TTL map keyed by (supabase_id, token id) and a shared
+Redis tier keyed by supabase_id. Cached rows are re-attached to the request's
+session with merge(load=False), so a hit costs no database round-trip. The
+cached instances themselves are never handed out, only their merged copies.
+"""
+
+import asyncio
+import logging
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session, make_transient_to_detached
+
+from app.core.config import settings
+from app.core.database import User
+from app.core.exceptions import AuthenticationException
+from app.core.redis_client import redis_client
+
+logger = logging.getLogger(__name__)
+
+# Never copy credentials into the cache; they lazy-load if a caller needs them
+EXCLUDED_COLUMNS = {"password_hash", "pin_code"}
+USER_KEY_PREFIX = "auth:user:"
+REVOKED_KEY_PREFIX = "auth:revoked:"
+
+
+def _snapshot_user(user: User) -> Dict[str, Any]:
+    return {
+        column.key: getattr(user, column.key)
+        for column in User.__table__.columns
+        if column.key not in EXCLUDED_COLUMNS
+    }
+
+
+def _encode_snapshot(snapshot: Dict[str, Any]) -> Dict[str, Any]:
+    encoded = {}
+    for key, value in snapshot.items():
+        if isinstance(value, uuid.UUID):
+            value = str(value)
+        elif isinstance(value, datetime):
+            value = value.isoformat()
+        encoded[key] = value
+    return encoded
+
+
+def _decode_snapshot(data: Dict[str, Any]) -> Dict[str, Any]:
+    decoded = {}
+    for column in User.__table__.columns:
+        if column.key not in data:
+            continue
+        value = data[column.key]
+        if value is not None and isinstance(value, str):
+            python_type = column.type.python_type
+            if python_type is uuid.UUID:
+                value = uuid.UUID(value)
+            elif python_type is datetime:
+                value = datetime.fromisoformat(value)
+        decoded[column.key] = value
+    return decoded
+
+
+def _detached_user(snapshot: Dict[str, Any]) -> User:
+    user = User(**snapshot)
+    make_transient_to_detached(user)
+    return user
+
+
+def _attach(detached: User, db: Session) -> User:
+    """Copy a cached detached User into the request's session without a SELECT"""
+    return db.merge(detached, load=False)
+
+
+class AuthUserCache:
+    """Resolved-user cache with token revocation"""
+
+    def __init__(
+        self,
+        ttl: Optional[int] = None,
+        redis_ttl: Optional[int] = None,
+        max_entries: Optional[int] = None,
+        redis=None,
+    ):
+        self.ttl = ttl if ttl is not None else settings.AUTH_USER_CACHE_TTL_SECONDS
+        self.redis_ttl = (
+            redis_ttl
+            if redis_ttl is not None
+            else settings.AUTH_USER_CACHE_REDIS_TTL_SECONDS
+        )
+        self.max_entries = (
+            max_entries
+            if max_entries is not None
+            else settings.AUTH_USER_CACHE_MAX_ENTRIES
+        )
+        self.redis = redis if redis is not None else redis_client
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[float, User]]" = (
+            OrderedDict()
+        )
+        self._revoked: Dict[str, float] = {}
+        self.hits = 0
+        self.redis_hits = 0
+        self.misses = 0
+
+    # --- Lookup ---
+    async def get(
+        self, supabase_id: str, token_id: str, db: Session
+    ) -> Optional[User]:
+        """
+        Return the cached user attached to db, or None on a miss.
+        Raises AuthenticationException if the token has been revoked.
+        """
+        key = (supabase_id, token_id)
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires_at, detached = entry
+            if expires_at > time.monotonic() and not self._is_locally_revoked(
+                token_id
+            ):
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return _attach(detached, db)
+            self._entries.pop(key, None)
+
+        # Shared tier: one Redis round-trip replaces the Supabase call and query
+        if await self.is_revoked(token_id):
+            raise AuthenticationException(
+                message="Token has been revoked",
+                details={"error_code": "TOKEN_REVOKED"},
+            )
+        data = await self._redis_call("get", f"{USER_KEY_PREFIX}{supabase_id}")
+        if isinstance(data, dict):
+            detached = _detached_user(_decode_snapshot(data))
+            self._store_local(key, detached)
+            self.redis_hits += 1
+            return _attach(detached, db)
+
+        self.misses += 1
+        return None
+
+    async def set(self, supabase_id: str, token_id: str, user: User) -> None:
+        """Cache an active user for this token"""
+        snapshot = _snapshot_user(user)
+        self._store_local((supabase_id, token_id), _detached_user(snapshot))
+        await self._redis_call(
+            "set",
+            f"{USER_KEY_PREFIX}{supabase_id}",
+            _encode_snapshot(snapshot),
+            expire=self.redis_ttl,
+        )
+
+    def _store_local(self, key: Tuple[str, str], detached: User) -> None:
+        self._entries[key] = (time.monotonic() + self.ttl, detached)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    # --- Revocation hooks ---
+    async def revoke_token(
+        self, token_id: str, expires_at: Optional[float] = None
+    ) -> None:
+        """
+        Reject a token until it expires (e.g. on logout). Other workers see the
+        revocation once their in-process entry lapses (AUTH_USER_CACHE_TTL_SECONDS).
+        """
+        ttl = int(expires_at - time.time()) if expires_at else self.redis_ttl
+        ttl = max(ttl, 1)
+        self._revoked[token_id] = time.monotonic() + ttl
+        for key in [k for k in self._entries if k[1] == token_id]:
+            self._entries.pop(key, None)
+        await self._redis_call("set", f"{REVOKED_KEY_PREFIX}{token_id}", "1", expire=ttl)
+
+    async def is_revoked(self, token_id: str) -> bool:
+        if self._is_locally_revoked(token_id):
+            return True
+        return bool(await self._redis_call("exists", f"{REVOKED_KEY_PREFIX}{token_id}"))
+
+    def _is_locally_revoked(self, token_id: str) -> bool:
+        until = self._revoked.get(token_id)
+        if until is None:
+            return False
+        if until <= time.monotonic():
+            self._revoked.pop(token_id, None)
+            return False
+        return True
+
+    def invalidate_user_local(self, supabase_id: str) -> int:
+        keys = [k for k in self._entries if k[0] == supabase_id]
+        for key in keys:
+            self._entries.pop(key, None)
+        return len(keys)
+
+    async def invalidate_user(self, supabase_id: str) -> None:
+        """Drop a user from both tiers (role change, deactivation, deletion)"""
+        self.invalidate_user_local(supabase_id)
+        await self._redis_call("delete", f"{USER_KEY_PREFIX}{supabase_id}")
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._revoked.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "entries": len(self._entries),
+            "revoked_tokens": len(self._revoked),
+            "hits": self.hits,
+            "redis_hits": self.redis_hits,
+            "misses": self.misses,
+        }
+
+    async def _redis_call(self, method: str, *args, **kwargs) -> Any:
+        # Cache failures must never fail authentication; fall through to the DB
+        try:
+            return await getattr(self.redis, method)(*args, **kwargs)
+        except Exception as e:
+            logger.warning(f"Auth cache Redis {method} failed: {e}")
+            return None
+
+
+auth_user_cache = AuthUserCache()
+
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _invalidate_cached_user(mapper, connection, target) -> None:
+    """Evict users whose row changes so is_active/role edits apply promptly"""
+    if not target.supabase_id:
+        return
+    supabase_id = str(target.supabase_id)
+    auth_user_cache.invalidate_user_local(supabase_id)
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        return
+    loop.create_task(auth_user_cache.invalidate_user(supabase_id))
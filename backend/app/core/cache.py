@@ -4,14 +4,19 @@ Uses Valkey (Redis) for high-performance caching.
 """
 
 import logging
-from typing import Any, Optional, Dict
+from typing import Any, Iterable, Optional, Dict
 
 from app.core.redis_client import redis_client
 
 logger = logging.getLogger(__name__)
 
+# Tag shared by the platform dashboard entries cleared by invalidate_platform_cache
+PLATFORM_CACHE_TAG = "platform"
 
-async def cache_data(key: str, data: Any, ttl: int = 300) -> bool:
+
+async def cache_data(
+    key: str, data: Any, ttl: int = 300, tags: Optional[Iterable[str]] = None
+) -> bool:
     """
     Cache data with a specific TTL (time-to-live) in seconds.
 
@@ -19,6 +24,7 @@ async def cache_data(key: str, data: Any, ttl: int = 300) -> bool:
         key: Cache key
         data: Data to cache (will be JSON serialized)
         ttl: Time-to-live in seconds (default: 5 minutes)
+        tags: Tags to invalidate the entry by
 
     Returns:
         bool: True if successful, False otherwise
@@ -27,7 +33,7 @@ async def cache_data(key: str, data: Any, ttl: int = 300) -> bool:
         logger.warning("Redis client not available for caching")
         return False
     try:
-        return await redis_client.set(key, data, expire=ttl)
+        return await redis_client.set(key, data, expire=ttl, tags=tags)
     except Exception as e:
         logger.error(f"Failed to cache data for key {key}: {e}")
         return False
@@ -131,7 +137,7 @@ async def cache_platform_analytics(
         bool: True if successful
     """
     key = f"platform:analytics:{metric}"
-    return await cache_data(key, data, ttl)
+    return await cache_data(key, data, ttl, tags=[PLATFORM_CACHE_TAG])
 
 
 async def get_platform_analytics(metric: str) -> Optional[Dict[str, Any]]:
@@ -166,7 +172,7 @@ async def cache_platform_report(
     # Create a deterministic key from params
     param_str = ":".join(f"{k}={v}" for k, v in sorted(params.items()))
     key = f"platform:report:{report_type}:{param_str}"
-    return await cache_data(key, data, ttl)
+    return await cache_data(key, data, ttl, tags=[PLATFORM_CACHE_TAG])
 
 
 async def get_platform_report(
@@ -194,11 +200,10 @@ async def invalidate_platform_cache() -> int:
     Returns:
         int: Number of keys deleted
     """
-    patterns = ["platform:analytics:*", "platform:report:*", "platform:dashboard:*"]
-    total_deleted = 0
-    for pattern in patterns:
-        deleted = await delete_cache_pattern(pattern)
-        total_deleted += deleted
+    if not redis_client:
+        logger.warning("Redis client not available for cache invalidation")
+        return 0
+    total_deleted = await redis_client.delete_tags(PLATFORM_CACHE_TAG)
 
     logger.info(f"Invalidated {total_deleted} platform cache entries")
     return total_deleted
@@ -278,7 +283,7 @@ async def cache_dashboard_widget(widget_name: str, data: Any, ttl: int = 300) ->
         bool: True if successful
     """
     key = f"platform:dashboard:widget:{widget_name}"
-    return await cache_data(key, data, ttl)
+    return await cache_data(key, data, ttl, tags=[PLATFORM_CACHE_TAG])
 
 
 async def get_dashboard_widget(widget_name: str) -> Optional[Any]:
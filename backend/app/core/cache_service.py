@@ -1,18 +1,61 @@
 """
 Enhanced cache service for Fynlo POS with comprehensive caching strategies.
 Implements decorator pattern for easy endpoint caching and cache invalidation.
+
+Reads go through two tiers: a bounded in-process LRU per worker (L1) in front
+of Redis (L2). L1 entries live at most CACHE_L1_TTL_SECONDS, and deletes are
+published on a Redis channel so every worker drops its copy straight away.
+Entries carry tags (restaurant, menu, user, decorator prefix) so invalidation
+deletes exactly the tagged keys rather than SCANning for patterns.
+Concurrent misses for one key share a single computation, and keys this worker
+computed are refreshed slightly ahead of expiry (XFetch) so hot keys do not all
+expire at once. L1 hands out the cached objects themselves: callers must not
+mutate values returned by the cache.
 """
 
+import asyncio
 import hashlib
+import json
 import logging
+import math
+import random
+import time
+import uuid
+from collections import OrderedDict
+from fnmatch import fnmatchcase
 from functools import wraps
-from typing import Any, Callable, Optional, Dict, List
+from typing import Any, Awaitable, Callable, Optional, Dict, Iterable, List, Set, Tuple
 import inspect
 
-from app.core.redis_client import redis_client
+from app.core.config import settings
+from app.core.redis_client import redis_client, restaurant_tag, user_tag
 
 logger = logging.getLogger(__name__)
 
+INVALIDATION_CHANNEL = "fynlo:cache:invalidate"
+
+
+class _L1Entry:
+    """In-process copy of a cached value"""
+
+    __slots__ = ("value", "expires_at", "deadline", "compute_time", "tags")
+
+    def __init__(
+        self,
+        value: Any,
+        expires_at: float,
+        deadline: Optional[float],
+        compute_time: float,
+        tags: Tuple[str, ...] = (),
+    ):
+        self.value = value
+        self.expires_at = expires_at
+        self.tags = tags
+        # When the value expires from Redis, if known, and how long it took
+        # to compute; together they drive the early refresh
+        self.deadline = deadline
+        self.compute_time = compute_time
+
 
 class CacheService:
     """Enhanced cache service with advanced features"""
@@ -20,6 +63,16 @@ class CacheService:
     def __init__(self):
         self.redis = redis_client
         self.metrics = CacheMetrics()
+        self.instance_id = uuid.uuid4().hex
+        self.l1_max_entries = settings.CACHE_L1_MAX_ENTRIES
+        self.l1_ttl = settings.CACHE_L1_TTL_SECONDS
+        self.early_refresh_beta = settings.CACHE_EARLY_REFRESH_BETA
+        self.reconnect_delay = 1.0
+        self._l1: "OrderedDict[str, _L1Entry]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._flight_tags: Dict[str, Tuple[str, ...]] = {}
+        self._stale_flights: Set[str] = set()
+        self._listener: Optional[asyncio.Task] = None
 
     def cache_key(self, prefix: str, **kwargs) -> str:
         """
@@ -47,7 +100,7 @@ class CacheService:
 
     async def get(self, key: str) -> Optional[Any]:
         """
-        Get value from cache.
+        Get value from cache, trying this worker's L1 before Redis.
 
         Args:
             key: Cache key
@@ -55,10 +108,15 @@ class CacheService:
         Returns:
             Cached value or None if not found/expired
         """
+        entry = self._l1_get(key)
+        if entry is not None:
+            self.metrics.record_hit("l1")
+            return entry.value
         try:
             value = await self.redis.get(key)
             if value is not None:
-                self.metrics.record_hit()
+                self.metrics.record_hit("l2")
+                self._store_l1_from_l2(key, value)
                 logger.debug(f"Cache hit for key: {key}")
             else:
                 self.metrics.record_miss()
@@ -69,7 +127,14 @@ class CacheService:
             logger.error(f"Cache get error for key {key}: {e}")
             return None
 
-    async def set(self, key: str, value: Any, ttl: int = 3600) -> bool:
+    async def set(
+        self,
+        key: str,
+        value: Any,
+        ttl: int = 3600,
+        compute_time: float = 0.0,
+        tags: Optional[Iterable[str]] = None,
+    ) -> bool:
         """
         Set value in cache with TTL.
 
@@ -77,13 +142,23 @@ class CacheService:
             key: Cache key
             value: Value to cache
             ttl: Time-to-live in seconds (default: 1 hour)
+            compute_time: Seconds it took to produce the value, used to
+                schedule its early refresh
+            tags: Tags to invalidate the entry by (see invalidate_tags)
 
         Returns:
             bool: True if successful, False otherwise
         """
+        tags = tuple(tags or ())
         try:
-            success = await self.redis.set(key, value, expire=ttl)
+            if tags:
+                success = await self.redis.set(key, value, expire=ttl, tags=tags)
+            else:
+                success = await self.redis.set(key, value, expire=ttl)
             if success:
+                self._store_l1(
+                    key, value, ttl, time.monotonic() + ttl, compute_time, tags
+                )
                 logger.debug(f"Cache set for key: {key} with TTL: {ttl}s")
             return success
         except Exception as e:
@@ -91,9 +166,56 @@ class CacheService:
             logger.error(f"Cache set error for key {key}: {e}")
             return False
 
+    async def get_or_compute(
+        self,
+        key: str,
+        compute: Callable[[], Awaitable[Any]],
+        ttl: int = 3600,
+        tags: Optional[Iterable[str]] = None,
+    ) -> Any:
+        """
+        Return the cached value for key, computing and caching it on a miss.
+
+        Concurrent misses in this worker share one call to compute. A hit on a
+        value this worker computed may instead recompute it shortly before it
+        expires, with a probability rising as expiry nears.
+
+        Args:
+            key: Cache key
+            compute: Coroutine function producing the value
+            ttl: Time-to-live in seconds for a computed value
+            tags: Tags for a computed value
+
+        Returns:
+            The cached or freshly computed value
+        """
+        tags = tuple(tags or ())
+        value = await self.get(key)
+        if value is not None:
+            entry = self._l1.get(key)
+            if (
+                key in self._inflight
+                or entry is None
+                or not self._should_refresh_early(entry)
+            ):
+                return value
+            self.metrics.record_early_refresh()
+            try:
+                return await asyncio.shield(self._start_flight(key, compute, ttl, tags))
+            except Exception as e:
+                logger.warning(f"Early refresh of {key} failed, serving cached value: {e}")
+                return value
+
+        flight = self._inflight.get(key)
+        if flight is not None:
+            self.metrics.record_coalesced()
+        else:
+            flight = self._start_flight(key, compute, ttl, tags)
+        return await asyncio.shield(flight)
+
     async def delete(self, key: str) -> bool:
         """
-        Delete a specific cache key.
+        Delete a specific cache key from every worker and Redis.
 
         Args:
             key: Cache key to delete
@@ -103,17 +225,21 @@ class CacheService:
         """
         try:
             success = await self.redis.delete(key)
-            if success:
-                logger.debug(f"Cache deleted for key: {key}")
-            return success
         except Exception as e:
+            self._evict_local(keys=[key])
             self.metrics.record_error()
             logger.error(f"Cache delete error for key {key}: {e}")
             return False
+        # Evict after Redis so a concurrent read cannot reload the old value
+        self._evict_local(keys=[key])
+        if success:
+            logger.debug(f"Cache deleted for key: {key}")
+        await self._publish_invalidation(keys=[key])
+        return success
 
     async def delete_pattern(self, pattern: str) -> int:
         """
-        Delete all keys matching a pattern.
+        Delete all keys matching a pattern from every worker and Redis.
 
         Args:
             pattern: Pattern to match (e.g., "menu:restaurant_id=*")
@@ -123,12 +249,36 @@ class CacheService:
         """
         try:
             count = await self.redis.delete_pattern(pattern)
-            logger.info(f"Deleted {count} cache keys matching pattern: {pattern}")
-            return count
         except Exception as e:
+            self._evict_local(patterns=[pattern])
             self.metrics.record_error()
             logger.error(f"Cache delete pattern error for {pattern}: {e}")
             return 0
+        self._evict_local(patterns=[pattern])
+        logger.info(f"Deleted {count} cache keys matching pattern: {pattern}")
+        await self._publish_invalidation(patterns=[pattern])
+        return count
+
+    async def invalidate_tags(self, *tags: str) -> int:
+        """
+        Delete every entry tagged with any of tags, on every worker.
+
+        Args:
+            *tags: Tags given when the entries were cached
+
+        Returns:
+            int: Number of Redis keys deleted
+        """
+        try:
+            count = await self.redis.delete_tags(*tags)
+        except Exception as e:
+            self._evict_local(tags=tags)
+            self.metrics.record_error()
+            logger.error(f"Cache delete error for tags {tags}: {e}")
+            return 0
+        self._evict_local(tags=tags)
+        await self._publish_invalidation(tags=tags)
+        return count
 
     async def invalidate_restaurant_cache(self, restaurant_id: str) -> int:
         """
@@ -140,24 +290,7 @@ class CacheService:
         Returns:
             int: Number of keys deleted
         """
-        # Patterns must handle alphabetically sorted parameters and new hash format
-        patterns = [
-            # Direct keys with restaurant_id in various positions (due to sorting)
-            f"menu_items:*restaurant_id={restaurant_id}*",
-            f"menu_categories:*restaurant_id={restaurant_id}*",
-            f"products:*restaurant_id={restaurant_id}*",
-            f"categories:*restaurant_id={restaurant_id}*",
-            f"settings:*restaurant_id={restaurant_id}*",
-            f"analytics:*restaurant_id={restaurant_id}*",
-            # Hash-based keys with restaurant_id preserved
-            f"*:restaurant_id={restaurant_id}:hash:*",
-        ]
-
-        total_deleted = 0
-        for pattern in patterns:
-            deleted = await self.delete_pattern(pattern)
-            total_deleted += deleted
-
+        total_deleted = await self.invalidate_tags(restaurant_tag(restaurant_id))
         logger.info(
             f"Invalidated {total_deleted} cache entries for restaurant {restaurant_id}"
         )
@@ -173,23 +306,214 @@ class CacheService:
         Returns:
             int: Number of keys deleted
         """
-        patterns = [
-            f"user:user_id={user_id}*",
-            f"session:*{user_id}*",
-            f"permissions:user_id={user_id}*",
-        ]
-
-        total_deleted = 0
-        for pattern in patterns:
-            deleted = await self.delete_pattern(pattern)
-            total_deleted += deleted
-
+        total_deleted = await self.invalidate_tags(user_tag(user_id))
         logger.info(f"Invalidated {total_deleted} cache entries for user {user_id}")
         return total_deleted
 
     def get_metrics(self) -> Dict[str, Any]:
         """Get cache performance metrics"""
-        return self.metrics.get_metrics()
+        metrics = self.metrics.get_metrics()
+        metrics["l1"]["entries"] = len(self._l1)
+        return metrics
+
+    def clear_local(self) -> None:
+        """Drop this worker's L1 tier"""
+        self._l1.clear()
+
+    # --- L1 tier ---
+    def _l1_get(self, key: str) -> Optional[_L1Entry]:
+        entry = self._l1.get(key)
+        # Expired entries stay until evicted so their refresh schedule
+        # survives being reloaded from Redis
+        if entry is None or entry.expires_at <= time.monotonic():
+            return None
+        self._l1.move_to_end(key)
+        return entry
+
+    def _store_l1(
+        self,
+        key: str,
+        value: Any,
+        ttl: int,
+        deadline: Optional[float],
+        compute_time: float,
+        tags: Tuple[str, ...] = (),
+    ) -> None:
+        if self.l1_max_entries <= 0 or self.l1_ttl <= 0:
+            return
+        expires_at = time.monotonic() + min(ttl, self.l1_ttl)
+        self._l1[key] = _L1Entry(value, expires_at, deadline, compute_time, tags)
+        self._l1.move_to_end(key)
+        while len(self._l1) > self.l1_max_entries:
+            self._l1.popitem(last=False)
+            self.metrics.record_eviction()
+
+    def _store_l1_from_l2(self, key: str, value: Any) -> None:
+        previous = self._l1.get(key)
+        deadline, compute_time, tags = None, 0.0, ()
+        if previous is not None and (previous.deadline or 0) > time.monotonic():
+            deadline, compute_time = previous.deadline, previous.compute_time
+            tags = previous.tags
+        ttl = self.l1_ttl
+        if deadline is not None:
+            ttl = min(ttl, math.ceil(deadline - time.monotonic()))
+        self._store_l1(key, value, ttl, deadline, compute_time, tags)
+
+    def _should_refresh_early(self, entry: _L1Entry) -> bool:
+        # XFetch: recompute when now - compute_time * beta * ln(rand) passes
+        # the deadline, which gets likelier the closer expiry is
+        if entry.deadline is None or not entry.compute_time:
+            return False
+        jitter = -entry.compute_time * self.early_refresh_beta * math.log(
+            1.0 - random.random()
+        )
+        return time.monotonic() + jitter >= entry.deadline
+
+    def _evict_local(
+        self,
+        keys: Iterable[str] = (),
+        patterns: Iterable[str] = (),
+        tags: Iterable[str] = (),
+    ) -> int:
+        keys, patterns, tags = set(keys), list(patterns), set(tags)
+
+        def matches(key: str, key_tags: Tuple[str, ...]) -> bool:
+            return (
+                key in keys
+                or not tags.isdisjoint(key_tags)
+                or any(fnmatchcase(key, p) for p in patterns)
+            )
+
+        doomed = [key for key, entry in self._l1.items() if matches(key, entry.tags)]
+        for key in doomed:
+            del self._l1[key]
+        # A computation already under way would cache the old data
+        self._stale_flights.update(
+            key for key in self._inflight if matches(key, self._flight_tags[key])
+        )
+        return len(doomed)
+
+    # --- Single flight ---
+    def _start_flight(
+        self,
+        key: str,
+        compute: Callable[[], Awaitable[Any]],
+        ttl: int,
+        tags: Tuple[str, ...],
+    ) -> asyncio.Future:
+        flight = asyncio.ensure_future(self._compute(key, compute, ttl, tags))
+        self._inflight[key] = flight
+        self._flight_tags[key] = tags
+        flight.add_done_callback(lambda done: self._finish_flight(key, done))
+        return flight
+
+    def _finish_flight(self, key: str, flight: asyncio.Future) -> None:
+        if self._inflight.get(key) is flight:
+            del self._inflight[key]
+            del self._flight_tags[key]
+            self._stale_flights.discard(key)
+        if not flight.cancelled():
+            flight.exception()  # retrieved here in case every waiter has gone
+
+    async def _compute(
+        self,
+        key: str,
+        compute: Callable[[], Awaitable[Any]],
+        ttl: int,
+        tags: Tuple[str, ...],
+    ) -> Any:
+        started = time.monotonic()
+        result = await compute()
+        compute_time = time.monotonic() - started
+        if result is None:
+            return result
+        if key in self._stale_flights:
+            logger.debug(f"Not caching {key}: invalidated while being computed")
+            return result
+        await self.set(key, result, ttl, compute_time=compute_time, tags=tags)
+        return result
+
+    # --- Cross-worker invalidation ---
+    async def _publish_invalidation(
+        self,
+        keys: Iterable[str] = (),
+        patterns: Iterable[str] = (),
+        tags: Iterable[str] = (),
+    ) -> None:
+        client = getattr(self.redis, "redis", None)
+        if client is None:
+            return
+        message = {
+            "origin": self.instance_id,
+            "keys": list(keys),
+            "patterns": list(patterns),
+            "tags": list(tags),
+        }
+        try:
+            await client.publish(INVALIDATION_CHANNEL, json.dumps(message))
+        except Exception as e:
+            self.metrics.record_error()
+            logger.warning(f"Cache invalidation publish failed: {e}")
+
+    async def start_invalidation_listener(self) -> None:
+        """Evict L1 entries deleted by other workers"""
+        client = getattr(self.redis, "redis", None)
+        if client is None:
+            logger.warning(
+                "Redis unavailable - cache invalidations will only reach this worker"
+            )
+            return
+        if self._listener is None:
+            self._listener = asyncio.create_task(self._listen(client))
+
+    async def stop_invalidation_listener(self) -> None:
+        if self._listener:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+
+    async def _listen(self, client) -> None:
+        while True:
+            pubsub = client.pubsub()
+            try:
+                await pubsub.subscribe(INVALIDATION_CHANNEL)
+                logger.info("Cache subscribed to invalidation channel")
+                async for message in pubsub.listen():
+                    if message.get("type") != "message":
+                        continue
+                    self._handle_invalidation(message["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Cache invalidation subscription lost: {e}")
+                # Invalidations may have been missed while disconnected
+                self.clear_local()
+                await asyncio.sleep(self.reconnect_delay)
+            finally:
+                try:
+                    await pubsub.close()
+                except Exception:
+                    pass
+
+    def _handle_invalidation(self, data) -> None:
+        if isinstance(data, bytes):
+            data = data.decode()
+        try:
+            message = json.loads(data)
+        except json.JSONDecodeError:
+            logger.warning("Dropping malformed cache invalidation message")
+            return
+        if message.get("origin") == self.instance_id:
+            return
+        self.metrics.record_remote_invalidation()
+        self._evict_local(
+            keys=message.get("keys", ()),
+            patterns=message.get("patterns", ()),
+            tags=message.get("tags", ()),
+        )
 
 
 class CacheMetrics:
@@ -199,16 +523,25 @@ class CacheMetrics:
         self.hits = 0
         self.misses = 0
         self.errors = 0
+        self.l1_hits = 0
+        self.l2_hits = 0
+        self.coalesced = 0
+        self.early_refreshes = 0
+        self.evictions = 0
+        self.remote_invalidations = 0
 
     @property
     def hit_rate(self) -> float:
         """Calculate cache hit rate percentage"""
-        total = self.hits + self.misses
-        return (self.hits / total * 100) if total > 0 else 0.0
+        return _rate(self.hits, self.misses)
 
-    def record_hit(self):
-        """Record a cache hit"""
+    def record_hit(self, tier: str = "l2"):
+        """Record a cache hit served by the given tier"""
         self.hits += 1
+        if tier == "l1":
+            self.l1_hits += 1
+        else:
+            self.l2_hits += 1
 
     def record_miss(self):
         """Record a cache miss"""
@@ -218,35 +551,83 @@ class CacheMetrics:
         """Record a cache error"""
         self.errors += 1
 
+    def record_coalesced(self):
+        """Record a miss that waited for another caller's computation"""
+        self.coalesced += 1
+
+    def record_early_refresh(self):
+        """Record a value recomputed ahead of its expiry"""
+        self.early_refreshes += 1
+
+    def record_eviction(self):
+        """Record an L1 entry evicted to stay within its size bound"""
+        self.evictions += 1
+
+    def record_remote_invalidation(self):
+        """Record an invalidation received from another worker"""
+        self.remote_invalidations += 1
+
     def get_metrics(self) -> Dict[str, Any]:
         """Get all metrics"""
+        l1_misses = self.l2_hits + self.misses
         return {
             "hits": self.hits,
             "misses": self.misses,
             "errors": self.errors,
             "hit_rate": f"{self.hit_rate:.2f}%",
             "total_requests": self.hits + self.misses,
+            "l1": {
+                "hits": self.l1_hits,
+                "misses": l1_misses,
+                "hit_rate": f"{_rate(self.l1_hits, l1_misses):.2f}%",
+                "evictions": self.evictions,
+                "remote_invalidations": self.remote_invalidations,
+            },
+            "l2": {
+                "hits": self.l2_hits,
+                "misses": self.misses,
+                "hit_rate": f"{_rate(self.l2_hits, self.misses):.2f}%",
+            },
+            "coalesced": self.coalesced,
+            "early_refreshes": self.early_refreshes,
         }
 
 
+def _rate(hits: int, misses: int) -> float:
+    total = hits + misses
+    return (hits / total * 100) if total > 0 else 0.0
+
+
 # Global cache service instance
 cache_service = CacheService()
 
 
+def prefix_tag(prefix: str) -> str:
+    """Tag for every entry cached by a @cached function"""
+    return f"prefix:{prefix}"
+
+
 def cached(
     ttl: int = 3600,
     prefix: Optional[str] = None,
     key_params: Optional[List[str]] = None,
     invalidate_on: Optional[List[str]] = None,
+    tags: Optional[List[str]] = None,
 ):
     """
     Decorator for caching function results.
 
+    Entries are tagged with their prefix and, when the function takes a
+    restaurant_id, with that restaurant, so invalidate_restaurant_cache
+    reaches them.
+
     Args:
         ttl: Time-to-live in seconds (default: 1 hour)
         prefix: Cache key prefix (default: function name)
         key_params: List of parameter names to include in cache key
         invalidate_on: List of parameter names that trigger cache invalidation
+        tags: Extra tag templates formatted with the call's arguments,
+            e.g. "user:{user_id}"
 
     Example:
         @cached(ttl=3600, prefix="menu", key_params=["restaurant_id"])
@@ -293,30 +674,28 @@ def cached(
             # Generate cache key
             cache_key = cache_service.cache_key(cache_prefix, **cache_params)
 
+            entry_tags = [prefix_tag(cache_prefix)]
+            if bound_args.arguments.get("restaurant_id"):
+                entry_tags.append(restaurant_tag(bound_args.arguments["restaurant_id"]))
+            for template in tags or ():
+                entry_tags.append(template.format(**bound_args.arguments))
+
             # Check if we need to invalidate cache
             if invalidate_on:
                 for param in invalidate_on:
                     if param in bound_args.arguments and bound_args.arguments[param]:
-                        await cache_service.delete_pattern(f"{cache_prefix}*")
+                        await cache_service.invalidate_tags(prefix_tag(cache_prefix))
                         logger.debug(f"Cache invalidated for prefix: {cache_prefix}")
                         break
 
-            # Try to get from cache
-            cached_value = await cache_service.get(cache_key)
-            if cached_value is not None:
-                return cached_value
-
-            # Execute function and cache result
-            result = await func(*args, **kwargs)
-
-            # Cache the result
-            await cache_service.set(cache_key, result, ttl)
-
-            return result
+            # Serve from cache; concurrent misses share one call to func
+            return await cache_service.get_or_compute(
+                cache_key, lambda: func(*args, **kwargs), ttl, tags=entry_tags
+            )
 
         # Add cache management methods to the wrapper
-        wrapper.invalidate_cache = lambda **params: cache_service.delete_pattern(
-            f"{prefix or f'{func.__module__}.{func.__name__}'}*"
+        wrapper.invalidate_cache = lambda **params: cache_service.invalidate_tags(
+            prefix_tag(prefix or f"{func.__module__}.{func.__name__}")
         )
 
         return wrapper
@@ -369,7 +748,12 @@ async def warm_menu_cache(db):
             ]
 
             # Cache it
-            if await cache_service.set(cache_key, menu_data, ttl=3600):
+            if await cache_service.set(
+                cache_key,
+                menu_data,
+                ttl=3600,
+                tags=[restaurant_tag(restaurant.id), prefix_tag("menu_items")],
+            ):
                 warmed_count += 1
 
         logger.info(f"Warmed cache for {warmed_count}/{len(restaurants)} restaurants")
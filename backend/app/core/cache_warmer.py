@@ -1,19 +1,33 @@
 """
 Cache warming strategies for Fynlo POS.
 Pre-populates cache with frequently accessed data to improve performance.
+
+Runs are incremental: each restaurant's menu version (product/category counts
+and latest edit times) is stored next to its warmed entries, with the same
+tags, so unchanged restaurants whose entries are still cached are skipped by
+every worker. The rest are warmed busiest first, a bounded number at a time.
 """
 
 import asyncio
 import logging
-from datetime import datetime
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
 from sqlalchemy.orm import Session
-from sqlalchemy import and_
+from sqlalchemy import and_, func
 
-from app.core.cache_service import cache_service
-from app.models import Restaurant, Product, Category
+from app.core.cache_service import cache_service, prefix_tag
+from app.core.config import settings
+from app.core.redis_client import restaurant_tag
+from app.models import Restaurant, Product, Category, Order
 
 logger = logging.getLogger(__name__)
 
+WARM_TTL = 3600  # TTL of warmed entries
+WARM_INTERVAL = 300  # Incremental runs are cheap, so run them often
+# Versions expire before the entries they describe, so a restaurant is
+# re-warmed before its cached menu can lapse between two runs
+VERSION_TTL = WARM_TTL - 2 * WARM_INTERVAL
+
 
 class CacheWarmer:
     """Manages cache warming operations"""
@@ -21,7 +35,7 @@ class CacheWarmer:
     def __init__(self):
         self.is_warming = False
         self.last_warm_time = None
-        self.warm_interval = 3600  # 1 hour
+        self.warm_interval = WARM_INTERVAL
 
     async def warm_all_caches(self, db: Session) -> dict:
         """
@@ -39,6 +53,7 @@ class CacheWarmer:
         stats = {
             "started_at": start_time,
             "restaurants_warmed": 0,
+            "restaurants_skipped": 0,
             "menus_warmed": 0,
             "categories_warmed": 0,
             "settings_warmed": 0,
@@ -50,39 +65,64 @@ class CacheWarmer:
             restaurants = (
                 db.query(Restaurant).filter(Restaurant.is_active == True).all()
             )
+            versions = await asyncio.to_thread(self._menu_versions, db, restaurants)
+            traffic = await asyncio.to_thread(self._recent_traffic, db)
+            restaurants.sort(key=lambda r: traffic.get(r.id, 0), reverse=True)
 
             logger.info(
                 f"Starting cache warming for {len(restaurants)} active restaurants"
             )
 
-            for restaurant in restaurants:
-                try:
-                    # Warm menu cache
-                    menu_warmed = await self._warm_menu_cache(db, restaurant)
+            semaphore = asyncio.Semaphore(settings.CACHE_WARM_CONCURRENCY)
+
+            async def bounded(coro):
+                async with semaphore:
+                    return await coro
+
+            batch_size = settings.CACHE_WARM_BATCH_SIZE
+            for start in range(0, len(restaurants), batch_size):
+                batch = restaurants[start : start + batch_size]
+                fresh = await asyncio.gather(
+                    *(bounded(self._is_fresh(r.id, versions[r.id])) for r in batch)
+                )
+                stale = [r for r, is_fresh in zip(batch, fresh) if not is_fresh]
+                stats["restaurants_skipped"] += len(batch) - len(stale)
+                if not stale:
+                    continue
+
+                menus = await asyncio.to_thread(
+                    self._load_menus, db, [r.id for r in stale]
+                )
+                results = await asyncio.gather(
+                    *(
+                        bounded(
+                            self._warm_restaurant(
+                                db, r, menus.get(r.id), versions[r.id]
+                            )
+                        )
+                        for r in stale
+                    ),
+                    return_exceptions=True,
+                )
+
+                for restaurant, result in zip(stale, results):
+                    if isinstance(result, Exception):
+                        error_msg = (
+                            f"Error warming cache for restaurant {restaurant.id}: "
+                            f"{str(result)}"
+                        )
+                        logger.error(error_msg)
+                        stats["errors"].append(error_msg)
+                        continue
+
+                    menu_warmed, categories_warmed = result
                     if menu_warmed:
                         stats["menus_warmed"] += 1
-
-                    # Warm categories cache
-                    categories_warmed = await self._warm_categories_cache(
-                        db, restaurant
-                    )
                     if categories_warmed:
                         stats["categories_warmed"] += 1
-
                     # Settings warming disabled - RestaurantSettings model not available
-                    # settings_warmed = await self._warm_settings_cache(db, restaurant)
-                    # if settings_warmed:
-                    #     stats["settings_warmed"] += 1
-
                     stats["restaurants_warmed"] += 1
 
-                except Exception as e:
-                    error_msg = (
-                        f"Error warming cache for restaurant {restaurant.id}: {str(e)}"
-                    )
-                    logger.error(error_msg)
-                    stats["errors"].append(error_msg)
-
             # Calculate duration
             end_time = datetime.utcnow()
             duration = (end_time - start_time).total_seconds()
@@ -97,28 +137,156 @@ class CacheWarmer:
         finally:
             self.is_warming = False
 
-    async def _warm_menu_cache(self, db: Session, restaurant: Restaurant) -> bool:
-        """Warm menu cache for a restaurant"""
+    async def _warm_restaurant(
+        self,
+        db: Session,
+        restaurant: Restaurant,
+        menu: Optional[Tuple[List[Product], List[Category]]],
+        version: str,
+    ) -> Tuple[bool, bool]:
+        """Warm one restaurant and record its version once fully warmed"""
+        products, categories = menu or ([], [])
+        menu_warmed = await self._warm_menu_cache(
+            db, restaurant, products=products, categories=categories
+        )
+        categories_warmed = await self._warm_categories_cache(
+            db, restaurant, categories=categories
+        )
+        if menu_warmed and categories_warmed:
+            await cache_service.set(
+                self._version_key(restaurant.id),
+                version,
+                ttl=VERSION_TTL,
+                tags=[
+                    restaurant_tag(restaurant.id),
+                    prefix_tag("menu_items"),
+                    prefix_tag("menu_categories"),
+                ],
+            )
+        return menu_warmed, categories_warmed
+
+    async def _is_fresh(self, restaurant_id: Any, version: str) -> bool:
+        """Whether the restaurant was warmed at this version and is still cached"""
+        return await cache_service.get(self._version_key(restaurant_id)) == version
+
+    @staticmethod
+    def _version_key(restaurant_id: Any) -> str:
+        return cache_service.cache_key(
+            "warm_version", restaurant_id=str(restaurant_id)
+        )
+
+    @staticmethod
+    def _menu_versions(db: Session, restaurants: List[Restaurant]) -> Dict[Any, str]:
+        """
+        Compute a menu version per restaurant from two aggregate queries.
+
+        Counts catch deletions; Category has no updated_at, so category edits
+        are caught by the restaurant cache invalidation clearing the version.
+        """
+        products = {
+            restaurant_id: (count, latest)
+            for restaurant_id, count, latest in db.query(
+                Product.restaurant_id,
+                func.count(Product.id),
+                func.max(func.coalesce(Product.updated_at, Product.created_at)),
+            )
+            .group_by(Product.restaurant_id)
+            .all()
+        }
+        categories = {
+            restaurant_id: (count, latest)
+            for restaurant_id, count, latest in db.query(
+                Category.restaurant_id,
+                func.count(Category.id),
+                func.max(Category.created_at),
+            )
+            .group_by(Category.restaurant_id)
+            .all()
+        }
+
+        def version(restaurant: Restaurant) -> str:
+            product_count, product_latest = products.get(restaurant.id, (0, None))
+            category_count, category_latest = categories.get(restaurant.id, (0, None))
+            return (
+                f"{restaurant.updated_at}|{product_count}|{product_latest}"
+                f"|{category_count}|{category_latest}"
+            )
+
+        return {restaurant.id: version(restaurant) for restaurant in restaurants}
+
+    @staticmethod
+    def _recent_traffic(db: Session) -> Dict[Any, int]:
+        """Order counts per restaurant over the traffic window"""
+        since = datetime.utcnow() - timedelta(
+            hours=settings.CACHE_WARM_TRAFFIC_WINDOW_HOURS
+        )
+        return {
+            restaurant_id: count
+            for restaurant_id, count in db.query(
+                Order.restaurant_id, func.count(Order.id)
+            )
+            .filter(Order.created_at >= since)
+            .group_by(Order.restaurant_id)
+            .all()
+        }
+
+    @staticmethod
+    def _load_menus(
+        db: Session, restaurant_ids: List[Any]
+    ) -> Dict[Any, Tuple[List[Product], List[Category]]]:
+        """Load active products and all categories for a batch of restaurants"""
+        menus = {restaurant_id: ([], []) for restaurant_id in restaurant_ids}
+        for product in (
+            db.query(Product)
+            .filter(
+                and_(
+                    Product.restaurant_id.in_(restaurant_ids),
+                    Product.is_active == True,
+                )
+            )
+            .all()
+        ):
+            menus.setdefault(product.restaurant_id, ([], []))[0].append(product)
+        for category in (
+            db.query(Category)
+            .filter(Category.restaurant_id.in_(restaurant_ids))
+            .order_by(Category.sort_order, Category.name)
+            .all()
+        ):
+            menus.setdefault(category.restaurant_id, ([], []))[1].append(category)
+        return menus
+
+    async def _warm_menu_cache(
+        self,
+        db: Session,
+        restaurant: Restaurant,
+        products: Optional[List[Product]] = None,
+        categories: Optional[List[Category]] = None,
+    ) -> bool:
+        """Warm menu cache for a restaurant, querying whatever wasn't preloaded"""
         try:
             # Get menu items
-            menu_items = (
-                db.query(Product)
-                .filter(
-                    and_(
-                        Product.restaurant_id == restaurant.id,
-                        Product.is_active == True,
+            menu_items = products
+            if menu_items is None:
+                menu_items = (
+                    db.query(Product)
+                    .filter(
+                        and_(
+                            Product.restaurant_id == restaurant.id,
+                            Product.is_active == True,
+                        )
                     )
+                    .all()
                 )
-                .all()
-            )
 
             # Get categories for menu items
-            categories_dict = {
-                cat.id: cat.name
-                for cat in db.query(Category)
-                .filter(Category.restaurant_id == restaurant.id)
-                .all()
-            }
+            if categories is None:
+                categories = (
+                    db.query(Category)
+                    .filter(Category.restaurant_id == restaurant.id)
+                    .all()
+                )
+            categories_dict = {cat.id: cat.name for cat in categories}
 
             # Transform to match endpoint format
             from app.api.v1.endpoints.menu import format_menu_item
@@ -146,7 +314,12 @@ class CacheWarmer:
             cache_key = cache_service.cache_key(
                 "menu_items", restaurant_id=str(restaurant.id), category=None
             )
-            success = await cache_service.set(cache_key, response_data, ttl=3600)
+            success = await cache_service.set(
+                cache_key,
+                response_data,
+                ttl=WARM_TTL,
+                tags=[restaurant_tag(restaurant.id), prefix_tag("menu_items")],
+            )
 
             if success:
                 logger.debug(
@@ -161,21 +334,29 @@ class CacheWarmer:
             )
             return False
 
-    async def _warm_categories_cache(self, db: Session, restaurant: Restaurant) -> bool:
-        """Warm categories cache for a restaurant"""
+    async def _warm_categories_cache(
+        self,
+        db: Session,
+        restaurant: Restaurant,
+        categories: Optional[List[Category]] = None,
+    ) -> bool:
+        """Warm categories cache for a restaurant, querying if not preloaded"""
         try:
             # Get categories
-            categories = (
-                db.query(Category)
-                .filter(
-                    and_(
-                        Category.restaurant_id == restaurant.id,
-                        Category.is_active == True,
+            if categories is None:
+                categories = (
+                    db.query(Category)
+                    .filter(
+                        and_(
+                            Category.restaurant_id == restaurant.id,
+                            Category.is_active == True,
+                        )
                     )
+                    .order_by(Category.sort_order, Category.name)
+                    .all()
                 )
-                .order_by(Category.sort_order, Category.name)
-                .all()
-            )
+            else:
+                categories = [cat for cat in categories if cat.is_active]
 
             # Transform to cache format
             menu_categories = []
@@ -211,7 +392,12 @@ class CacheWarmer:
             cache_key = cache_service.cache_key(
                 "menu_categories", restaurant_id=str(restaurant.id)
             )
-            success = await cache_service.set(cache_key, response_data, ttl=3600)
+            success = await cache_service.set(
+                cache_key,
+                response_data,
+                ttl=WARM_TTL,
+                tags=[restaurant_tag(restaurant.id), prefix_tag("menu_categories")],
+            )
 
             if success:
                 logger.debug(
@@ -31,6 +31,18 @@ class Settings(BaseSettings):
 
     # Redis - Must be set via environment variable in production
     REDIS_URL: Optional[str] = None
+    # Response cache: a bounded per-worker tier in front of Redis. In-process
+    # entries live at most CACHE_L1_TTL_SECONDS; deletes reach other workers
+    # over pub/sub. Beta > 1 refreshes hot keys earlier, 0 disables it.
+    CACHE_L1_MAX_ENTRIES: int = 5000
+    CACHE_L1_TTL_SECONDS: int = 30
+    CACHE_EARLY_REFRESH_BETA: float = 1.0
+    # Cache warming: restaurants are warmed busiest first (by orders in the
+    # traffic window), CACHE_WARM_CONCURRENCY at a time, and skipped while
+    # their menu is unchanged and still cached
+    CACHE_WARM_CONCURRENCY: int = 20
+    CACHE_WARM_BATCH_SIZE: int = 200
+    CACHE_WARM_TRAFFIC_WINDOW_HOURS: int = 24
 
     # Security
     SECRET_KEY: Optional[str] = None
@@ -42,6 +54,15 @@ class Settings(BaseSettings):
     SUPABASE_URL: Optional[str] = None
     SUPABASE_ANON_KEY: Optional[str] = None
     SUPABASE_SERVICE_ROLE_KEY: Optional[str] = None
+    SUPABASE_JWT_SECRET: Optional[str] = None  # Legacy HS256 projects only
+    SUPABASE_JWT_AUDIENCE: str = "authenticated"
+    # "remote" verifies every token with the Supabase API, "local" verifies
+    # signatures against the cached JWKS and caches the resolved user row
+    AUTH_VERIFICATION_MODE: str = "remote"
+    AUTH_JWKS_REFRESH_SECONDS: int = 600
+    AUTH_USER_CACHE_TTL_SECONDS: int = 30  # In-process tier
+    AUTH_USER_CACHE_REDIS_TTL_SECONDS: int = 300  # Shared Redis tier
+    AUTH_USER_CACHE_MAX_ENTRIES: int = 10000
     # Platform owner emails - comma-separated list from environment
     PLATFORM_OWNER_EMAILS: Optional[
         str
@@ -68,6 +89,36 @@ class Settings(BaseSettings):
     SUMUP_AFFILIATE_KEY: Optional[str] = None
     SUMUP_ENVIRONMENT: str = "sandbox"  # sandbox | production
 
+    # Payment provider I/O. HTTP calls share one keep-alive pool; blocking SDK
+    # calls run on a dedicated thread pool. Each provider is capped at
+    # PAYMENT_PROVIDER_CONCURRENCY in-flight calls so one slow provider cannot
+    # take every connection or thread
+    PAYMENT_HTTP_TIMEOUT_SECONDS: float = 15.0
+    PAYMENT_HTTP_CONNECT_TIMEOUT_SECONDS: float = 5.0
+    PAYMENT_HTTP_MAX_CONNECTIONS: int = 100
+    PAYMENT_HTTP_MAX_KEEPALIVE: int = 20
+    PAYMENT_PROVIDER_CONCURRENCY: int = 20
+    PAYMENT_SDK_THREADS: int = 32
+    PAYMENT_MAX_RETRIES: int = 2
+    PAYMENT_RETRY_BACKOFF_SECONDS: float = 0.2
+    # Per-provider circuit breaker, fed by call outcomes and latencies over a
+    # rolling window. It opens once MIN_CALLS have been seen and either rate is
+    # exceeded, and after OPEN_SECONDS lets HALF_OPEN_PROBES calls through to
+    # decide whether to close again
+    PAYMENT_BREAKER_WINDOW_SECONDS: int = 60
+    PAYMENT_BREAKER_MIN_CALLS: int = 10
+    PAYMENT_BREAKER_FAILURE_RATE: float = 0.5
+    PAYMENT_BREAKER_SLOW_CALL_SECONDS: float = 5.0
+    PAYMENT_BREAKER_SLOW_CALL_RATE: float = 0.8
+    PAYMENT_BREAKER_OPEN_SECONDS: float = 30.0
+    PAYMENT_BREAKER_HALF_OPEN_PROBES: int = 3
+    # Idempotent calls may be hedged to the next provider once the first has
+    # run longer than its p95 latency, but never sooner than this
+    PAYMENT_HEDGE_MIN_DELAY_SECONDS: float = 0.5
+    # Smart routing inputs per restaurant (volume projection, health scores)
+    # are served from memory and rebuilt in the background once this old
+    ROUTING_TABLE_TTL_SECONDS: int = 300
+
     # QR Payment Settings
     QR_PAYMENT_FEE_PERCENTAGE: float = 1.2  # Your competitive advantage
     DEFAULT_CARD_FEE_PERCENTAGE: float = 2.9
@@ -75,6 +126,38 @@ class Settings(BaseSettings):
     # WebSocket
     WEBSOCKET_HOST: str = "localhost"
     WEBSOCKET_PORT: int = 8001
+    # Cross-worker broadcast transport: "redis", "memory" (single worker) or "none"
+    WEBSOCKET_BROKER: str = "redis"
+    # Per-connection outbound buffer; a socket that falls this far behind or
+    # takes longer than the timeout to accept one frame is disconnected
+    WEBSOCKET_SEND_QUEUE_SIZE: int = 256
+    WEBSOCKET_SEND_TIMEOUT_SECONDS: float = 5.0
+    # Offline replay log for user-targeted messages (Redis streams when
+    # available); MAX_BYTES only bounds the in-memory fallback
+    WEBSOCKET_REPLAY_TTL_SECONDS: int = 3600
+    WEBSOCKET_REPLAY_MAX_ENTRIES: int = 100
+    WEBSOCKET_REPLAY_MAX_BYTES: int = 16 * 1024 * 1024
+
+    # Offline sync download paging. Rows changed within the settle window are
+    # held back so a transaction still in flight is not skipped by the cursor;
+    # cursors older than the tombstone retention must do a full resync
+    SYNC_PAGE_SIZE: int = 500
+    SYNC_MAX_PAGE_SIZE: int = 5000
+    SYNC_SETTLE_SECONDS: float = 5.0
+    SYNC_TOMBSTONE_RETENTION_DAYS: int = 30
+    # Offline upload actions written per savepoint
+    SYNC_UPLOAD_CHUNK_SIZE: int = 100
+
+    # SQL injection WAF: longer request bodies are rejected rather than
+    # scanned in part (each string within a body has its own, smaller limit)
+    WAF_MAX_BODY_BYTES: int = 10 * 1024 * 1024
+
+    # Rows per server-side cursor fetch for streamed exports and menu imports
+    EXPORT_BATCH_SIZE: int = 2000
+
+    # Monthly partitions of orders/payments created ahead of time, once those
+    # tables have been partitioned (scripts/partition_orders_payments.py)
+    PARTITION_MONTHS_AHEAD: int = 3
 
     # File Upload
     MAX_FILE_SIZE: int = 10 * 1024 * 1024  # 10MB
@@ -99,6 +182,8 @@ class Settings(BaseSettings):
     DO_API_TOKEN: Optional[str] = None  # DigitalOcean personal access token
     DO_APP_ID: Optional[str] = None  # DigitalOcean app ID
     DESIRED_REPLICAS: int = 2  # Desired number of backend replicas
+    # Record per-middleware latency, served at /api/v1/monitoring/middleware
+    MIDDLEWARE_TIMING_ENABLED: bool = False
 
     # Logging and Error Handling
     LOG_LEVEL: str = "DEBUG"
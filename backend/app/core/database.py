@@ -13,8 +13,12 @@ from sqlalchemy import (
     Text,
     ForeignKey,
     DECIMAL,
+    DDL,
+    Index,
     UniqueConstraint,
     event,
+    literal,
+    text,
 )
 from sqlalchemy.dialects.postgresql import UUID, JSONB
 from sqlalchemy.ext.declarative import declarative_base
@@ -85,6 +89,10 @@ from app.core.database_security import DatabaseSecurityConfig
 # Merge security settings with existing connect_args
 secure_engine_args = DatabaseSecurityConfig.get_secure_engine_args()
 secure_connect_args = secure_engine_args.pop("connect_args", {})
+if database_url.startswith("sqlite"):
+    # The libpq options above don't apply to SQLite (tests and the offline
+    # benchmarks), and get_db sessions are opened from FastAPI's threadpool
+    secure_connect_args = {"check_same_thread": False}
 # Merge with existing connect_args
 for key, value in connect_args.items():
     if key not in secure_connect_args:
@@ -107,6 +115,9 @@ engine = create_engine(
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# RLS session variables are PostgreSQL settings
+_uses_session_variables = engine.dialect.name == "postgresql"
+
 Base = declarative_base()
 
 # Database Models matching frontend expectations
@@ -315,6 +326,76 @@ class Product(Base):
     recipes = relationship("Recipe", back_populates="product_item")
 
 
+# Search expressions for customer lookup and product search. The indexes below
+# are built on exactly these expressions (see alembic search_indexes_20251016),
+# so queries in app.services.search_service must use them unchanged.
+CUSTOMER_SEARCH_NAME = (
+    func.coalesce(Customer.__table__.c.first_name, "")
+    + " "
+    + func.coalesce(Customer.__table__.c.last_name, "")
+)
+CUSTOMER_SEARCH_EMAIL = func.lower(Customer.__table__.c.email)
+CUSTOMER_SEARCH_PHONE = func.regexp_replace(
+    Customer.__table__.c.phone, "[^0-9]", "", "g"
+)
+PRODUCT_SEARCH_DESCRIPTION = func.to_tsvector(
+    literal("simple", String), func.coalesce(Product.__table__.c.description, "")
+)
+
+# pg_trgm GIN indexes answer ILIKE '%term%' and word similarity (%>); the
+# text_pattern_ops b-trees answer the prefix lookups used at the till
+for _index in (
+    Index(
+        "idx_customers_name_trgm",
+        CUSTOMER_SEARCH_NAME.label("name"),
+        postgresql_using="gin",
+        postgresql_ops={"name": "gin_trgm_ops"},
+    ),
+    Index(
+        "idx_customers_email_trgm",
+        CUSTOMER_SEARCH_EMAIL.label("email"),
+        postgresql_using="gin",
+        postgresql_ops={"email": "gin_trgm_ops"},
+    ),
+    Index(
+        "idx_customers_phone_trgm",
+        CUSTOMER_SEARCH_PHONE.label("phone"),
+        postgresql_using="gin",
+        postgresql_ops={"phone": "gin_trgm_ops"},
+    ),
+    Index(
+        "idx_customers_email_prefix",
+        Customer.__table__.c.restaurant_id,
+        CUSTOMER_SEARCH_EMAIL.label("email"),
+        postgresql_ops={"email": "text_pattern_ops"},
+    ),
+    Index(
+        "idx_customers_phone_prefix",
+        Customer.__table__.c.restaurant_id,
+        CUSTOMER_SEARCH_PHONE.label("phone"),
+        postgresql_ops={"phone": "text_pattern_ops"},
+    ),
+    Index(
+        "idx_products_name_trgm",
+        Product.__table__.c.name,
+        postgresql_using="gin",
+        postgresql_ops={"name": "gin_trgm_ops"},
+    ),
+    Index(
+        "idx_products_description_fts",
+        PRODUCT_SEARCH_DESCRIPTION,
+        postgresql_using="gin",
+    ),
+):
+    _index.ddl_if(dialect="postgresql")
+
+event.listen(
+    Base.metadata,
+    "before_create",
+    DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm").execute_if(dialect="postgresql"),
+)
+
+
 class Order(Base):
     """Customer orders"""
 
@@ -347,6 +428,32 @@ class Order(Base):
     # Relationship
     table = relationship("Table", back_populates="orders")
 
+    # Hot access paths; see alembic order_payment_hot_indexes_20251016
+    __table_args__ = (
+        Index("idx_orders_restaurant_created", "restaurant_id", "created_at"),
+        Index(
+            "idx_orders_restaurant_status_created",
+            "restaurant_id",
+            "status",
+            "created_at",
+        ),
+        Index(
+            "idx_orders_restaurant_active",
+            "restaurant_id",
+            "created_at",
+            postgresql_where=text(
+                "status IN ('pending', 'confirmed', 'preparing', 'ready')"
+            ),
+        ),
+        # Offline sync pages by (coalesce(updated_at, created_at), id)
+        Index(
+            "idx_orders_restaurant_changed",
+            "restaurant_id",
+            func.coalesce(updated_at, created_at),
+            "id",
+        ),
+    )
+
 
 class Payment(Base):
     """Payment transactions"""
@@ -368,6 +475,23 @@ class Payment(Base):
     payment_metadata = Column(JSONB, default={})
     processed_at = Column(DateTime(timezone=True))
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+    # Bumped by every update (status changes, refunds) for the sync cursor
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+
+    __table_args__ = (
+        Index("idx_payments_order_status", "order_id", "status"),
+        Index(
+            "idx_payments_completed_created",
+            "created_at",
+            postgresql_where=text("status = 'completed'"),
+        ),
+        Index(
+            "idx_payments_completed_processed",
+            "processed_at",
+            postgresql_where=text("status = 'completed'"),
+        ),
+        Index("idx_payments_changed", func.coalesce(updated_at, created_at), "id"),
+    )
 
 
 class QRPayment(Base):
@@ -600,6 +724,9 @@ def set_sqlite_pragma(dbapi_connection, connection_record):
 @event.listens_for(engine, "checkout")
 def receive_checkout(dbapi_connection, connection_record, connection_proxy):
     """Set session variables when connection is checked out from pool"""
+    if not _uses_session_variables:
+        return
+
     # Get RLS context if available
     context = RLSContext.get()
 
@@ -660,6 +787,9 @@ def receive_checkout(dbapi_connection, connection_record, connection_proxy):
 @event.listens_for(engine, "checkin")
 def receive_checkin(dbapi_connection, connection_record):
     """Reset session when connection is returned to pool"""
+    if not _uses_session_variables:
+        return
+
     cursor = dbapi_connection.cursor()
     try:
         # Reset only RLS session variables to ensure clean state
@@ -4,57 +4,83 @@ Handles port compatibility and mobile-specific request processing
 """
 
 from fastapi import Request, Response
+from starlette.datastructures import Headers, MutableHeaders
 from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 from typing import Callable
 import json
 import logging
+import time
+
+from app.middleware.asgi import report_timing, request_path
 
 logger = logging.getLogger(__name__)
 
 
-class MobileCompatibilityMiddleware(BaseHTTPMiddleware):
+class MobileCompatibilityMiddleware:
     """
     Middleware to handle mobile app compatibility requirements
     """
 
+    MOBILE_INDICATORS = ["ios", "iphone", "ipad", "fynlo", "react-native", "mobile"]
+
     def __init__(
-        self, app, enable_cors: bool = True, enable_port_redirect: bool = True
+        self,
+        app: ASGIApp,
+        enable_cors: bool = True,
+        enable_port_redirect: bool = True,
     ):
-        super().__init__(app)
+        self.app = app
         self.enable_cors = enable_cors
         self.enable_port_redirect = enable_port_redirect
 
-    async def dispatch(self, request: Request, call_next: Callable) -> Response:
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
         """
         Process mobile-specific request handling
         """
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        headers = Headers(scope=scope)
+        is_mobile = self.is_mobile_request(headers)
+
         # Add mobile-friendly headers
-        if self.is_mobile_request(request):
+        if is_mobile:
             # Log mobile requests for monitoring
-            logger.info(f"Mobile request: {request.method} {request.url.path}")
+            logger.info(f"Mobile request: {scope['method']} {request_path(scope)}")
+        spent = time.perf_counter() - started
 
-        # Process request
-        response = await call_next(request)
+        async def send_with_headers(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                header_started = time.perf_counter()
+                response_headers = MutableHeaders(scope=message)
 
-        # Add mobile-friendly response headers
-        if self.enable_cors:
-            self.add_cors_headers(response, request)
+                # Add mobile-friendly response headers
+                if self.enable_cors:
+                    self.add_cors_headers(response_headers, headers)
 
-        # Add mobile-specific headers
-        self.add_mobile_headers(response, request)
+                # Add mobile-specific headers
+                self.add_mobile_headers(response_headers, is_mobile)
 
-        return response
+                report_timing(
+                    "mobile_compatibility",
+                    spent + time.perf_counter() - header_started,
+                )
+            await send(message)
 
-    def is_mobile_request(self, request: Request) -> bool:
+        await self.app(scope, receive, send_with_headers)
+
+    def is_mobile_request(self, headers: Headers) -> bool:
         """
         Detect if request is from mobile app
         """
-        user_agent = request.headers.get("user-agent", "").lower()
-        mobile_indicators = ["ios", "iphone", "ipad", "fynlo", "react-native", "mobile"]
+        user_agent = headers.get("user-agent", "").lower()
 
-        return any(indicator in user_agent for indicator in mobile_indicators)
+        return any(indicator in user_agent for indicator in self.MOBILE_INDICATORS)
 
-    def add_cors_headers(self, response: Response, request: Request):
+    def add_cors_headers(self, response_headers: MutableHeaders, headers: Headers):
         """
         DEPRECATED: CORS headers are now handled securely by the main application.
         Mobile apps don't need CORS headers as they're not browsers.
@@ -64,20 +90,20 @@ class MobileCompatibilityMiddleware(BaseHTTPMiddleware):
         # Mobile apps make direct API calls without CORS restrictions
         pass
 
-    def add_mobile_headers(self, response: Response, request: Request):
+    def add_mobile_headers(self, response_headers: MutableHeaders, is_mobile: bool):
         """
         Add mobile-specific headers
         """
-        if self.is_mobile_request(request):
-            response.headers["X-Mobile-Optimized"] = "true"
-            response.headers["X-API-Version"] = "1.0"
-            response.headers[
+        if is_mobile:
+            response_headers["X-Mobile-Optimized"] = "true"
+            response_headers["X-API-Version"] = "1.0"
+            response_headers[
                 "X-Cache-Control"
             ] = "public, max-age=300"  # 5 minutes cache
 
         # Add JSON content type for consistency
-        if not response.headers.get("content-type"):
-            response.headers["Content-Type"] = "application/json"
+        if not response_headers.get("content-type"):
+            response_headers["Content-Type"] = "application/json"
 
 
 class JSONRPCCompatibilityMiddleware(BaseHTTPMiddleware):
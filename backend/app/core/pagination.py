@@ -0,0 +1,148 @@
+"""
+Keyset (cursor) pagination for list endpoints
+
+OFFSET pagination reads and throws away every skipped row, so deep pages get
+linearly slower, and rows inserted while a client pages shift everything
+after them onto the next page. A keyset page instead resumes strictly after
+the last row returned, compared on the sort columns plus a unique
+tiebreaker, which an index on those columns answers directly.
+
+List endpoints keep their offset/page parameters and return a
+``next_cursor`` with every page that is not the last; passing it back as
+``cursor`` continues by keyset instead of offset.
+"""
+
+import base64
+import json
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+from typing import Any, List, Optional, Sequence, Tuple, Union
+from uuid import UUID
+
+from sqlalchemy import func, tuple_
+
+from app.core.exceptions import FynloException, ErrorCodes
+
+CURSOR_VERSION = 1
+
+# Sort column, or (sort column, value sorted in place of NULL)
+KeyColumn = Union[Any, Tuple[Any, Any]]
+
+
+def _encode_value(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, (Decimal, UUID)):
+        return str(value)
+    return value
+
+
+def _decode_value(python_type, value):
+    if value is None:
+        return None
+    if python_type is datetime:
+        return datetime.fromisoformat(value)
+    return python_type(value)
+
+
+class Keyset:
+    """
+    A sort order that can be paged by keyset.
+
+    All columns sort in the same direction and the last one must be unique
+    (normally the primary key) so rows with equal sort values keep a total
+    order. Row comparisons treat NULL as unknown, so nullable columns are
+    given as (column, if_null) and sorted as coalesce(column, if_null).
+    ``name`` is stored in cursors so one ordering rejects another's cursors.
+    """
+
+    def __init__(
+        self, name: str, columns: Sequence[KeyColumn], descending: bool = False
+    ):
+        self.name = name
+        self.descending = descending
+        self.attributes = []
+        self.if_null = []
+        for column in columns:
+            if not isinstance(column, tuple):
+                column = (column, None)
+            attribute, if_null = column
+            self.attributes.append(attribute)
+            self.if_null.append(if_null)
+
+    @property
+    def expressions(self) -> List:
+        return [
+            func.coalesce(attribute, if_null) if if_null is not None else attribute
+            for attribute, if_null in zip(self.attributes, self.if_null)
+        ]
+
+    def order_by(self) -> List:
+        return [
+            expression.desc() if self.descending else expression.asc()
+            for expression in self.expressions
+        ]
+
+    def values(self, entity) -> List:
+        """The sort key of a loaded row, as it compares in SQL"""
+        values = []
+        for attribute, if_null in zip(self.attributes, self.if_null):
+            value = getattr(entity, attribute.key)
+            values.append(if_null if value is None else value)
+        return values
+
+    def encode(self, entity) -> str:
+        payload = {
+            "v": CURSOR_VERSION,
+            "k": self.name,
+            "p": [_encode_value(value) for value in self.values(entity)],
+        }
+        raw = json.dumps(payload, separators=(",", ":")).encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+    def decode(self, token: str) -> List:
+        try:
+            raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+            payload = json.loads(raw)
+            if payload["v"] != CURSOR_VERSION:
+                raise ValueError(f"unsupported cursor version {payload['v']}")
+            if payload["k"] != self.name:
+                raise ValueError("cursor belongs to a different sort order")
+            if len(payload["p"]) != len(self.attributes):
+                raise ValueError("wrong number of cursor values")
+            return [
+                _decode_value(attribute.type.python_type, value)
+                for attribute, value in zip(self.attributes, payload["p"])
+            ]
+        except (ValueError, KeyError, TypeError, InvalidOperation) as e:
+            raise FynloException(
+                message=f"Invalid pagination cursor: {str(e)}",
+                error_code=ErrorCodes.VALIDATION_ERROR,
+                status_code=400,
+            )
+
+    def after(self, values: Sequence):
+        """Filter for the rows that sort after the given key"""
+        row = tuple_(*self.expressions)
+        return row < tuple(values) if self.descending else row > tuple(values)
+
+    def paginate(
+        self, query, cursor: Optional[str], limit: int, offset: int = 0
+    ) -> Tuple[List, Optional[str]]:
+        """
+        One page of an ORM query sorted by this keyset.
+
+        The page starts after cursor when one is given, otherwise at offset,
+        so offset pages also hand out a cursor to continue from. Returns the
+        rows and the cursor of the following page, or None on the last page;
+        one extra row is read to tell whether more remain.
+        """
+        query = query.order_by(*self.order_by())
+        if cursor:
+            query = query.filter(self.after(self.decode(cursor)))
+        elif offset:
+            query = query.offset(offset)
+        rows = query.limit(limit + 1).all()
+        if len(rows) > limit:
+            return rows[:limit], self.encode(rows[limit - 1])
+        return rows, None
@@ -0,0 +1,289 @@
+"""
+Monthly range partitioning for orders and payments
+
+Both tables are read almost exclusively by restaurant and created_at range,
+so partitioning by month lets the planner prune old months and lets old
+months be detached or archived without a bulk DELETE.
+
+Converting a live table is a one-off maintenance step (see
+scripts/partition_orders_payments.py, which builds its statements with
+conversion_statements()). Once a table is partitioned,
+partition_maintenance_task() keeps PARTITION_MONTHS_AHEAD months of
+partitions created in advance; it does nothing for tables that are not
+partitioned, so it is safe to run everywhere.
+"""
+
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from datetime import date
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import text
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+PARTITIONED_TABLES = ("orders", "payments")
+PARTITION_KEY = "created_at"
+
+MonthRange = Tuple[str, date, date]
+
+
+def month_start(day: date) -> date:
+    return day.replace(day=1)
+
+
+def add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(table: str, month: date) -> str:
+    return f"{table}_p{month:%Y%m}"
+
+
+def monthly_ranges(table: str, first: date, last: date) -> List[MonthRange]:
+    """(name, from, to) for every month from first through last inclusive"""
+    ranges = []
+    month = month_start(first)
+    while month <= month_start(last):
+        following = add_months(month, 1)
+        ranges.append((partition_name(table, month), month, following))
+        month = following
+    return ranges
+
+
+def missing_partitions(
+    table: str, existing: Iterable[str], today: date, months_ahead: int
+) -> List[MonthRange]:
+    """Partitions for this month and the next months_ahead not yet created"""
+    existing = set(existing)
+    last = add_months(month_start(today), months_ahead)
+    return [
+        month_range
+        for month_range in monthly_ranges(table, today, last)
+        if month_range[0] not in existing
+    ]
+
+
+def create_partition_sql(table: str, month_range: MonthRange) -> str:
+    name, start, end = month_range
+    return (
+        f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {table} "
+        f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+    )
+
+
+def is_partitioned(connection, table: str) -> bool:
+    return (
+        connection.execute(
+            text(
+                "SELECT 1 FROM pg_partitioned_table p "
+                "JOIN pg_class c ON c.oid = p.partrelid "
+                "WHERE c.relname = :table "
+                "AND c.relnamespace = current_schema()::regnamespace"
+            ),
+            {"table": table},
+        ).first()
+        is not None
+    )
+
+
+def existing_partitions(connection, table: str) -> Set[str]:
+    rows = connection.execute(
+        text(
+            "SELECT child.relname FROM pg_inherits i "
+            "JOIN pg_class parent ON parent.oid = i.inhparent "
+            "JOIN pg_class child ON child.oid = i.inhrelid "
+            "WHERE parent.relname = :table"
+        ),
+        {"table": table},
+    )
+    return {name for (name,) in rows}
+
+
+def ensure_monthly_partitions(
+    connection, table: str, months_ahead: int, today: Optional[date] = None
+) -> List[str]:
+    """
+    Create any missing monthly partitions up to months_ahead months from now.
+
+    Returns the names created; an empty list for unpartitioned tables.
+    """
+    if connection.dialect.name != "postgresql" or not is_partitioned(
+        connection, table
+    ):
+        return []
+    created = []
+    for month_range in missing_partitions(
+        table,
+        existing_partitions(connection, table),
+        today or date.today(),
+        months_ahead,
+    ):
+        try:
+            # Fails if the default partition already holds rows for the
+            # month; those rows must be moved before the month can be split out
+            with connection.begin_nested():
+                connection.execute(text(create_partition_sql(table, month_range)))
+            created.append(month_range[0])
+        except Exception as e:
+            logger.warning(f"Could not create partition {month_range[0]}: {e}")
+    return created
+
+
+@dataclass
+class TableDefinition:
+    """What a conversion has to carry over from the unpartitioned table"""
+
+    table: str
+    first_month: date
+    last_month: date
+    index_definitions: List[str] = field(default_factory=list)
+    skipped_unique_indexes: List[str] = field(default_factory=list)
+    outbound_foreign_keys: Dict[str, str] = field(default_factory=dict)
+    inbound_foreign_keys: List[Tuple[str, str]] = field(default_factory=list)
+    policies: List[str] = field(default_factory=list)
+    row_level_security: bool = False
+
+
+def conversion_statements(definition: TableDefinition) -> List[str]:
+    """
+    SQL turning an ordinary table into a monthly partitioned one, in a single
+    transaction. Partitioned primary keys must include the partition key, so
+    the key becomes (id, created_at) and foreign keys referencing the table
+    (inbound_foreign_keys, as (table, constraint) pairs) are dropped.
+    """
+    table = definition.table
+    old = f"{table}_unpartitioned"
+    statements = [
+        f"LOCK TABLE {table} IN ACCESS EXCLUSIVE MODE",
+        *[
+            f"ALTER TABLE {referencing} DROP CONSTRAINT {constraint}"
+            for referencing, constraint in definition.inbound_foreign_keys
+        ],
+        f"UPDATE {table} SET {PARTITION_KEY} = now() WHERE {PARTITION_KEY} IS NULL",
+        f"ALTER TABLE {table} RENAME TO {old}",
+        f"CREATE TABLE {table} (LIKE {old} INCLUDING DEFAULTS INCLUDING CONSTRAINTS "
+        f"INCLUDING STORAGE INCLUDING COMMENTS) PARTITION BY RANGE ({PARTITION_KEY})",
+        f"ALTER TABLE {table} ALTER COLUMN {PARTITION_KEY} SET NOT NULL",
+        f"ALTER TABLE {table} ADD CONSTRAINT {table}_pkey_partitioned "
+        f"PRIMARY KEY (id, {PARTITION_KEY})",
+        *[
+            create_partition_sql(table, month_range)
+            for month_range in monthly_ranges(
+                table, definition.first_month, definition.last_month
+            )
+        ],
+        f"CREATE TABLE {table}_default PARTITION OF {table} DEFAULT",
+        f"INSERT INTO {table} SELECT * FROM {old}",
+        f"DROP TABLE {old}",
+        *definition.index_definitions,
+        *[
+            f"ALTER TABLE {table} ADD CONSTRAINT {name} {constraint}"
+            for name, constraint in definition.outbound_foreign_keys.items()
+        ],
+    ]
+    if definition.row_level_security:
+        statements += [
+            f"ALTER TABLE {table} ENABLE ROW LEVEL SECURITY",
+            f"ALTER TABLE {table} FORCE ROW LEVEL SECURITY",
+        ]
+    statements += definition.policies
+    statements.append(f"ANALYZE {table}")
+    return statements
+
+
+def read_table_definition(
+    connection, table: str, months_ahead: int
+) -> TableDefinition:
+    """Introspect an unpartitioned table for conversion_statements()"""
+    first = connection.execute(
+        text(f"SELECT min({PARTITION_KEY})::date FROM {table}")
+    ).scalar()
+    today = date.today()
+    definition = TableDefinition(
+        table=table,
+        first_month=month_start(first or today),
+        last_month=add_months(month_start(today), months_ahead),
+    )
+
+    # The primary key is replaced by (id, created_at); other unique indexes
+    # would need the partition key too, so they are reported, not recreated
+    for indexdef, unique in connection.execute(
+        text(
+            "SELECT pg_get_indexdef(i.indexrelid), i.indisunique FROM pg_index i "
+            "JOIN pg_class t ON t.oid = i.indrelid "
+            "WHERE t.relname = :table AND NOT i.indisprimary"
+        ),
+        {"table": table},
+    ):
+        indexdef = indexdef.replace(" ON public.", " ON ")
+        if unique:
+            definition.skipped_unique_indexes.append(indexdef)
+        else:
+            definition.index_definitions.append(indexdef)
+
+    for name, contype, constraintdef, relname in connection.execute(
+        text(
+            "SELECT c.conname, c.contype, pg_get_constraintdef(c.oid), t.relname "
+            "FROM pg_constraint c JOIN pg_class t ON t.oid = c.conrelid "
+            "WHERE c.contype = 'f' AND (c.conrelid = CAST(:table AS regclass) "
+            "OR c.confrelid = CAST(:table AS regclass))"
+        ),
+        {"table": table},
+    ):
+        if relname == table:
+            definition.outbound_foreign_keys[name] = constraintdef
+        else:
+            definition.inbound_foreign_keys.append((relname, name))
+
+    definition.row_level_security = bool(
+        connection.execute(
+            text("SELECT relrowsecurity FROM pg_class WHERE relname = :table"),
+            {"table": table},
+        ).scalar()
+    )
+    for name, permissive, roles, cmd, qual, with_check in connection.execute(
+        text(
+            "SELECT policyname, permissive, array_to_string(roles, ', '), cmd, "
+            "qual, with_check FROM pg_policies WHERE tablename = :table"
+        ),
+        {"table": table},
+    ):
+        policy = f"CREATE POLICY {name} ON {table} AS {permissive} FOR {cmd} TO {roles}"
+        if qual:
+            policy += f" USING ({qual})"
+        if with_check:
+            policy += f" WITH CHECK ({with_check})"
+        definition.policies.append(policy)
+    return definition
+
+
+def maintain_partitions() -> Dict[str, List[str]]:
+    """Create upcoming partitions for every partitioned table"""
+    from app.core.database import engine
+
+    created = {}
+    with engine.begin() as connection:
+        for table in PARTITIONED_TABLES:
+            names = ensure_monthly_partitions(
+                connection, table, settings.PARTITION_MONTHS_AHEAD
+            )
+            if names:
+                created[table] = names
+    return created
+
+
+async def partition_maintenance_task():
+    """Background task creating partitions ahead of time, once a day"""
+    while True:
+        try:
+            created = await asyncio.to_thread(maintain_partitions)
+            if created:
+                logger.info(f"Created partitions: {created}")
+        except Exception as e:
+            logger.error(f"Error in partition maintenance task: {e}")
+        await asyncio.sleep(24 * 3600)
@@ -0,0 +1,67 @@
+"""
+Projection Helpers
+Shared by the reporting tables that mapper listeners keep in step with orders
+(sales rollups, order lines)
+"""
+
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Any, Callable, Dict, Iterable, List, Tuple
+
+from sqlalchemy import inspect
+
+# (connection, order, before, after, inserted)
+OrderChangeHandler = Callable[[Any, Any, Dict[str, Any], Dict[str, Any], bool], None]
+
+_order_change_handlers: List[Tuple[Tuple[str, ...], OrderChangeHandler]] = []
+
+
+def flushed_states(
+    target, fields: Iterable[str], inserted: bool
+) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """(before, after) values of the given fields for a flushed instance"""
+    state = inspect(target)
+    before, after = {}, {}
+    for field in fields:
+        # Read loaded state only; created_at may be a pending server default
+        value = state.dict.get(field)
+        history = state.attrs[field].history
+        if inserted:
+            before[field] = None
+        else:
+            before[field] = history.deleted[0] if history.deleted else value
+        after[field] = value
+    return before, after
+
+
+def on_order_change(fields: Iterable[str]):
+    """Register a projection's handler for changes to the given order fields"""
+
+    def register(handler: OrderChangeHandler) -> OrderChangeHandler:
+        _order_change_handlers.append((tuple(fields), handler))
+        return handler
+
+    return register
+
+
+def order_changed_in_bulk(connection, order, previous: Dict[str, Any]) -> None:
+    """
+    Run the registered projections for an order written with a bulk UPDATE,
+    which the mapper listeners never see. The order holds the new values and
+    previous the old value of each field that changed.
+    """
+    state = inspect(order)
+    for fields, handler in _order_change_handlers:
+        after = {field: state.dict.get(field) for field in fields}
+        before = {
+            field: previous[field] if field in previous else value
+            for field, value in after.items()
+        }
+        if before != after:
+            handler(connection, order, before, after, False)
+
+
+def utc_bounds(start_date: date, end_date: date) -> Tuple[datetime, datetime]:
+    """Aware UTC bounds covering start_date through end_date inclusive"""
+    start = datetime.combine(start_date, time.min, tzinfo=timezone.utc)
+    end = datetime.combine(end_date + timedelta(days=1), time.min, tzinfo=timezone.utc)
+    return start, end
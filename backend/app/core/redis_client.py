@@ -7,7 +7,7 @@ Connects to DigitalOcean Valkey (Redis compatible).
 import json
 import logging
 import time
-from typing import Any, Optional
+from typing import Any, Dict, Iterable, Optional, Set
 import redis.asyncio as aioredis
 from redis.asyncio.connection import ConnectionPool
 
@@ -16,6 +16,41 @@ from app.core.exceptions import ServiceUnavailableError
 
 logger = logging.getLogger(__name__)
 
+# Tagged entries are also recorded in one Redis set per tag, so invalidating a
+# tag deletes exactly its keys instead of SCANning the whole keyspace
+TAG_KEY_PREFIX = "cache:tag:"
+# Tag sets outlive the entries they list; every tagged write extends them
+TAG_SET_TTL_SECONDS = 86400
+
+# Delete every key listed in the tag sets, then the sets, in one round-trip.
+# DEL is batched to stay under Lua's unpack() limit.
+DELETE_TAGS_SCRIPT = """
+local deleted = 0
+for _, tag_key in ipairs(KEYS) do
+    local members = redis.call('SMEMBERS', tag_key)
+    for i = 1, #members, 1000 do
+        deleted = deleted + redis.call('DEL', unpack(members, i, math.min(i + 999, #members)))
+    end
+    redis.call('DEL', tag_key)
+end
+return deleted
+"""
+
+
+def restaurant_tag(restaurant_id: Any) -> str:
+    """Tag for every cache entry derived from a restaurant's data"""
+    return f"restaurant:{restaurant_id}"
+
+
+def menu_tag(restaurant_id: Any) -> str:
+    """Tag for cache entries derived from a restaurant's products and categories"""
+    return f"menu:{restaurant_id}"
+
+
+def user_tag(user_id: Any) -> str:
+    """Tag for cache entries derived from a user's data"""
+    return f"user:{user_id}"
+
 
 class RedisClient:
     """Redis client wrapper with circuit breaker pattern"""
@@ -24,6 +59,8 @@ class RedisClient:
         self.pool: Optional[ConnectionPool] = None
         self.redis: Optional[aioredis.Redis] = None
         self._mock_storage = {}  # For fallback
+        self._mock_tags: Dict[str, Set[str]] = {}
+        self._delete_tags_script = None
         self._is_connected = False  # Track if we've attempted connection
         self._last_health_check = 0
         self._health_check_interval = 5  # seconds
@@ -91,12 +128,21 @@ class RedisClient:
         self.pool = None
         self._is_healthy = False
 
-    async def set(self, key: str, value: Any, expire: Optional[int] = None) -> bool:
-        """Set a value in Redis"""
+    async def set(
+        self,
+        key: str,
+        value: Any,
+        expire: Optional[int] = None,
+        tags: Optional[Iterable[str]] = None,
+    ) -> bool:
+        """Set a value in Redis, recording the key under each of tags"""
+        tags = list(tags or ())
         if not self.redis:  # Mock fallback
             if isinstance(value, (dict, list, tuple)):  # Handle tuples as well
                 value = json.dumps(value)
             self._mock_storage[key] = str(value)  # Store as string for consistency
+            for tag in tags:
+                self._mock_tags.setdefault(tag, set()).add(key)
             # Mock doesn't handle expire well, but log it
             if expire:
                 logger.debug(
@@ -110,7 +156,16 @@ class RedisClient:
             value_to_set = str(value)  # Ensure value is string if not complex type
 
         try:
-            await self.redis.set(key, value_to_set, ex=expire)
+            if tags:
+                async with self.redis.pipeline(transaction=True) as pipe:
+                    pipe.set(key, value_to_set, ex=expire)
+                    for tag in tags:
+                        tag_key = f"{TAG_KEY_PREFIX}{tag}"
+                        pipe.sadd(tag_key, key)
+                        pipe.expire(tag_key, max(expire or 0, TAG_SET_TTL_SECONDS))
+                    await pipe.execute()
+            else:
+                await self.redis.set(key, value_to_set, ex=expire)
             self._on_success()
             return True
         except Exception as e:
@@ -187,6 +242,36 @@ class RedisClient:
         logger.info(f"Deleted {keys_deleted_count} keys matching pattern: {pattern}")
         return keys_deleted_count
 
+    async def delete_tags(self, *tags: str) -> int:
+        """Delete every key recorded under any of tags"""
+        if not tags:
+            return 0
+        if not self.redis:  # Mock fallback
+            keys = set()
+            for tag in tags:
+                keys |= self._mock_tags.pop(tag, set())
+            deleted = 0
+            for key in keys:
+                if self._mock_storage.pop(key, None) is not None:
+                    deleted += 1
+            return deleted
+
+        try:
+            if self._delete_tags_script is None:
+                self._delete_tags_script = self.redis.register_script(
+                    DELETE_TAGS_SCRIPT
+                )
+            deleted = await self._delete_tags_script(
+                keys=[f"{TAG_KEY_PREFIX}{tag}" for tag in tags]
+            )
+            self._on_success()
+            logger.info(f"Deleted {deleted} keys tagged {', '.join(tags)}")
+            return int(deleted)
+        except Exception as e:
+            logger.error(f"Error deleting keys tagged {', '.join(tags)}: {e}")
+            self._on_failure()
+            return 0
+
     async def exists(self, key: str) -> bool:
         """Check if key exists"""
         if not self.redis:  # Mock fallback
@@ -231,7 +316,20 @@ class RedisClient:
             )
 
     async def cache_menu(self, restaurant_id: str, menu_data: dict, expire: int = 300):
-        await self.set(f"menu:{restaurant_id}", menu_data, expire)
+        await self.cache_menu_data(
+            f"menu:{restaurant_id}", restaurant_id, menu_data, expire
+        )
+
+    async def cache_menu_data(
+        self, key: str, restaurant_id: str, data: Any, expire: int = 300
+    ) -> bool:
+        """Cache product or category data, invalidated with the restaurant's menu"""
+        return await self.set(
+            key,
+            data,
+            expire,
+            tags=[restaurant_tag(restaurant_id), menu_tag(restaurant_id)],
+        )
 
     async def get_cached_menu(self, restaurant_id: str) -> Optional[dict]:
         return await self.get(f"menu:{restaurant_id}")
@@ -243,21 +341,14 @@ class RedisClient:
         return await self.get(f"order:{order_id}")
 
     async def invalidate_restaurant_cache(self, restaurant_id: str) -> int:
-        patterns = [
-            f"products:{restaurant_id}:*",
-            f"categories:{restaurant_id}:*",
-            f"menu:{restaurant_id}:*",
-            f"orders:{restaurant_id}:*",
-        ]
-        total_deleted = sum(await self.delete_pattern(p) for p in patterns)
+        total_deleted = await self.delete_tags(restaurant_tag(restaurant_id))
         logger.info(
             f"Invalidated {total_deleted} cache keys for restaurant {restaurant_id}"
         )
         return total_deleted
 
     async def invalidate_product_cache(self, restaurant_id: str) -> int:
-        patterns = [f"products:{restaurant_id}:*", f"menu:{restaurant_id}:*"]
-        total_deleted = sum(await self.delete_pattern(p) for p in patterns)
+        total_deleted = await self.delete_tags(menu_tag(restaurant_id))
         logger.info(
             f"Invalidated {total_deleted} product cache keys for restaurant {restaurant_id}"
         )
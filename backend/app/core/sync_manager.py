@@ -3,15 +3,36 @@ Offline Sync Manager for Fynlo POS
 Handles batch upload, conflict resolution, and offline synchronization
 """
 
-from typing import Dict, List, Any, Optional
-from datetime import datetime, timedelta
+from typing import Dict, Iterator, List, Any, Optional, Tuple
+from datetime import datetime, timedelta, timezone
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, desc
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy import delete, event, func, insert, select, tuple_, update
+import asyncio
+import base64
+import hashlib
+import json
+import logging
 import uuid
 from enum import Enum
 
-from app.core.database import Order, Product, Customer, Payment
+from app.core.config import settings
+from app.core.database import Order, Product, Customer, Payment, SessionLocal
 from app.core.exceptions import FynloException, ErrorCodes
+from app.core.projections import order_changed_in_bulk
+from app.core.websocket_sender import encode_message
+from app.models.sync import SyncTombstone
+
+logger = logging.getLogger(__name__)
+
+SYNC_ENTITY_TYPES = ("orders", "products", "customers", "payments")
+SYNC_MODELS = {"orders": Order, "products": Product, "customers": Customer}
+CURSOR_VERSION = 1
+
+_MIN_ID = uuid.UUID(int=0)
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+SyncPosition = Tuple[datetime, uuid.UUID]  # (changed_at, id) keyset position
 
 
 class SyncAction(str, Enum):
@@ -119,6 +140,239 @@ class SyncConflict:
         }
 
 
+CONFLICT_MODELS = {"orders": Order, "products": Product}
+
+
+def server_snapshot(entity_type: str, entity) -> Dict[str, Any]:
+    """Server-side fields compared against client changes"""
+    updated_at = entity.updated_at.isoformat() if entity.updated_at else None
+    if entity_type == "orders":
+        return {
+            "id": str(entity.id),
+            "status": entity.status,
+            "total_amount": float(entity.total_amount),
+            "updated_at": updated_at,
+        }
+    return {
+        "id": str(entity.id),
+        "name": entity.name,
+        "price": float(entity.price),
+        "stock_quantity": entity.stock_quantity,
+        "updated_at": updated_at,
+    }
+
+
+def snapshot_hash(snapshot: Dict[str, Any]) -> str:
+    """Version token for a snapshot; the timestamp is left out of the hash"""
+    fields = {k: v for k, v in snapshot.items() if k != "updated_at"}
+    raw = json.dumps(fields, sort_keys=True, default=str).encode()
+    return hashlib.sha1(raw).hexdigest()
+
+
+def tombstone_key(entity_type: str) -> str:
+    return f"{entity_type}.deleted"
+
+
+class SyncCursor:
+    """
+    Opaque resume point for sync downloads.
+
+    Holds a (changed_at, id) keyset position for each entity type and one for
+    its tombstones, so a page can stop part way through any of them. Clients
+    keep the token from the last page and send it back unchanged; a final page
+    (has_more false) is also the starting point of the next incremental sync.
+    """
+
+    def __init__(self, restaurant_id: str, positions: Dict[str, SyncPosition]):
+        self.restaurant_id = str(restaurant_id)
+        self.positions = positions
+
+    @classmethod
+    def start(
+        cls, restaurant_id: str, since: Optional[datetime], now: datetime
+    ) -> "SyncCursor":
+        if since is not None and since.tzinfo is None:
+            since = since.replace(tzinfo=timezone.utc)
+        positions = {}
+        for entity_type in SYNC_ENTITY_TYPES:
+            positions[entity_type] = (since or _EPOCH, _MIN_ID)
+            # A first sync reads current rows, so only later deletes matter
+            positions[tombstone_key(entity_type)] = (since or now, _MIN_ID)
+        return cls(restaurant_id, positions)
+
+    def encode(self) -> str:
+        payload = {
+            "v": CURSOR_VERSION,
+            "r": self.restaurant_id,
+            "p": {
+                name: [changed_at.isoformat(), str(entity_id)]
+                for name, (changed_at, entity_id) in self.positions.items()
+            },
+        }
+        raw = json.dumps(payload, separators=(",", ":")).encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+    @classmethod
+    def decode(cls, token: str) -> "SyncCursor":
+        try:
+            raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+            payload = json.loads(raw)
+            if payload["v"] != CURSOR_VERSION:
+                raise ValueError(f"unsupported cursor version {payload['v']}")
+            positions = {
+                name: (datetime.fromisoformat(changed_at), uuid.UUID(entity_id))
+                for name, (changed_at, entity_id) in payload["p"].items()
+            }
+            for entity_type in SYNC_ENTITY_TYPES:
+                for name in (entity_type, tombstone_key(entity_type)):
+                    if name not in positions:
+                        raise KeyError(name)
+            return cls(payload["r"], positions)
+        except (ValueError, KeyError, TypeError) as e:
+            raise FynloException(
+                message=f"Invalid sync cursor: {str(e)}",
+                error_code=ErrorCodes.VALIDATION_ERROR,
+                status_code=400,
+            )
+
+    def advance(
+        self, name: str, keys: List[SyncPosition], room: int, upper: datetime
+    ) -> bool:
+        """
+        Move one position past the rows just read; True if rows were left over.
+
+        ``keys`` holds up to room + 1 positions, the extra row only signalling
+        that more remain. Once a stream is exhausted the position jumps to the
+        settle bound so the next sync does not rescan quiet history.
+        """
+        if len(keys) > room:
+            if room:
+                self.positions[name] = keys[room - 1]
+            return True
+        if keys:
+            self.positions[name] = keys[-1]
+        if self.positions[name] < (upper, _MIN_ID):
+            self.positions[name] = (upper, _MIN_ID)
+        return False
+
+
+def change_record(
+    entity_type: str,
+    entity_id,
+    changed_at: datetime,
+    action: SyncAction,
+    data: Optional[Dict[str, Any]],
+) -> Dict[str, Any]:
+    record = {
+        "entity_type": entity_type,
+        "id": str(entity_id),
+        "action": action.value,
+        "changed_at": changed_at.isoformat(),
+    }
+    if data is not None:
+        # Unset fields are left out rather than sent as nulls
+        record["data"] = {k: v for k, v in data.items() if v is not None}
+    return record
+
+
+def _money(value) -> Optional[float]:
+    return float(value) if value is not None else None
+
+
+def _order_sync_data(order: Order) -> Tuple[SyncAction, Dict[str, Any]]:
+    return SyncAction.UPDATE, {
+        "order_number": order.order_number,
+        "status": order.status,
+        "payment_status": order.payment_status,
+        "total_amount": _money(order.total_amount),
+    }
+
+
+def _product_sync_data(
+    product: Product,
+) -> Tuple[SyncAction, Optional[Dict[str, Any]]]:
+    # Deactivated products are removed from the device menu
+    if product.is_active is False:
+        return SyncAction.DELETE, None
+    return SyncAction.UPDATE, {
+        "name": product.name,
+        "price": _money(product.price),
+        "stock_quantity": product.stock_quantity,
+    }
+
+
+def _customer_sync_data(customer: Customer) -> Tuple[SyncAction, Dict[str, Any]]:
+    name = " ".join(n for n in (customer.first_name, customer.last_name) if n)
+    return SyncAction.UPDATE, {
+        "name": name or None,
+        "email": customer.email,
+        "phone": customer.phone,
+    }
+
+
+def _payment_sync_data(payment: Payment) -> Tuple[SyncAction, Dict[str, Any]]:
+    return SyncAction.UPDATE, {
+        "order_id": str(payment.order_id),
+        "payment_method": payment.payment_method,
+        "amount": _money(payment.amount),
+        "status": payment.status,
+    }
+
+
+SYNC_SERIALIZERS = {
+    "orders": _order_sync_data,
+    "products": _product_sync_data,
+    "customers": _customer_sync_data,
+    "payments": _payment_sync_data,
+}
+
+
+class SyncPage:
+    """One page of a sync download and the cursor to resume after it"""
+
+    def __init__(
+        self,
+        records: List[Dict[str, Any]],
+        cursor: SyncCursor,
+        has_more: bool,
+        sync_timestamp: datetime,
+        page_size: int,
+    ):
+        self.records = records
+        self.cursor = cursor
+        self.has_more = has_more
+        self.sync_timestamp = sync_timestamp
+        self.page_size = page_size
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "sync_timestamp": self.sync_timestamp.isoformat(),
+            "next_cursor": self.cursor.encode(),
+            "has_more": self.has_more,
+            "total_changes": len(self.records),
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Legacy JSON shape: flat records grouped by entity type"""
+        changes: Dict[str, List[Dict[str, Any]]] = {}
+        for record in self.records:
+            changes.setdefault(record["entity_type"], []).append(
+                {
+                    "id": record["id"],
+                    **record.get("data", {}),
+                    "updated_at": record["changed_at"],
+                    "action": record["action"],
+                }
+            )
+        return {**self.summary(), "changes": changes}
+
+    def ndjson_lines(self) -> Iterator[str]:
+        """One change per line, then a checkpoint line carrying the cursor"""
+        for record in self.records:
+            yield encode_message(record) + "\n"
+        yield encode_message({"type": "checkpoint", **self.summary()}) + "\n"
+
+
 class OfflineSyncManager:
     """Manager for offline synchronization operations"""
 
@@ -126,6 +380,10 @@ class OfflineSyncManager:
         self.db = db
         self.sync_queue: List[SyncRecord] = []
         self.conflicts: List[SyncConflict] = []
+        # (entity_type, entity_id) -> loaded row, or None if it does not exist
+        self._entities: Dict[Tuple[str, str], Any] = {}
+        # (model, id) -> (row, values before the first staged change, new values)
+        self._staged: Dict[Tuple[type, Any], Tuple[Any, Dict, Dict]] = {}
 
     def batch_upload(
         self,
@@ -136,6 +394,10 @@ class OfflineSyncManager:
     ) -> Dict[str, Any]:
         """
         Process batch upload of offline actions
+
+        Every entity the batch touches is loaded up front, conflicts are
+        checked against those in-memory rows, and each chunk's writes go out
+        as one executemany UPDATE per table inside a savepoint.
         """
         try:
             results = {
@@ -160,10 +422,12 @@ class OfflineSyncManager:
                     results["errors"].append({"action": action_data, "error": str(_e)})
                     results["failed"] += 1
 
+            self._prefetch_entities(sync_records, restaurant_id)
+
             # Process sync records in order
-            for sync_record in sync_records:
-                try:
-                    result = self._process_sync_record(sync_record)
+            chunk_size = settings.SYNC_UPLOAD_CHUNK_SIZE
+            for i in range(0, len(sync_records), chunk_size):
+                for result in self._process_chunk(sync_records[i : i + chunk_size]):
                     results["processed_actions"].append(result)
 
                     if result["status"] == SyncStatus.COMPLETED.value:
@@ -173,12 +437,12 @@ class OfflineSyncManager:
                         results["conflicts_detected"].append(result["conflict_details"])
                     else:
                         results["failed"] += 1
-
-                except Exception as e:
-                    results["failed"] += 1
-                    results["errors"].append(
-                        {"sync_record_id": sync_record.id, "error": str(e)}
-                    )
+                        results["errors"].append(
+                            {
+                                "sync_record_id": result["sync_record_id"],
+                                "error": result["error"],
+                            }
+                        )
 
             # Commit successful changes
             if results["successful"] > 0:
@@ -194,49 +458,192 @@ class OfflineSyncManager:
                 status_code=500,
             )
 
+    def _prefetch_entities(
+        self, sync_records: List[SyncRecord], restaurant_id: str
+    ) -> None:
+        """Load every order/product the batch refers to, one query per type"""
+        wanted: Dict[str, set] = {}
+        for sync_record in sync_records:
+            if sync_record.entity_type in CONFLICT_MODELS:
+                key = (sync_record.entity_type, str(sync_record.entity_id))
+                # Unknown and malformed ids are cached as missing
+                self._entities.setdefault(key, None)
+                try:
+                    entity_id = uuid.UUID(key[1])
+                except ValueError:
+                    continue
+                wanted.setdefault(sync_record.entity_type, set()).add(entity_id)
+
+        for entity_type, ids in wanted.items():
+            model = CONFLICT_MODELS[entity_type]
+            entities = self.db.scalars(
+                select(model).where(
+                    model.id.in_(ids), model.restaurant_id == restaurant_id
+                )
+            ).all()
+            for entity in entities:
+                self._entities[(entity_type, str(entity.id))] = entity
+
+    def _load_entity(self, entity_type: str, entity_id, restaurant_id: str):
+        """Prefetched entity, or a single lookup for records outside a batch"""
+        key = (entity_type, str(entity_id))
+        if key not in self._entities:
+            model = CONFLICT_MODELS[entity_type]
+            self._entities[key] = (
+                self.db.query(model)
+                .filter(model.id == entity_id, model.restaurant_id == restaurant_id)
+                .first()
+            )
+        return self._entities[key]
+
+    def _stage_write(self, entity, **values: Any) -> None:
+        """
+        Queue column updates for the next bulk write. The loaded row takes the
+        new values as committed state, so later actions in the batch see them
+        without the ORM flushing the row itself.
+        """
+        key = (type(entity), entity.id)
+        if key not in self._staged:
+            self._staged[key] = (entity, {}, {"id": entity.id})
+        _, previous, row = self._staged[key]
+        for field, value in values.items():
+            previous.setdefault(field, getattr(entity, field))
+            set_committed_value(entity, field, value)
+        row.update(values)
+
+    def _write_staged(self) -> None:
+        """Write staged updates with one executemany UPDATE per table"""
+        if not self._staged:
+            return
+        rows: Dict[type, List[Dict[str, Any]]] = {}
+        for (model, _), (_, _, row) in self._staged.items():
+            rows.setdefault(model, []).append(row)
+        for model, model_rows in rows.items():
+            self.db.execute(update(model), model_rows)
+
+        # Bulk UPDATEs skip the mapper listeners that keep the order
+        # projections (sales rollups, order lines) in step
+        connection = self.db.connection()
+        for (model, _), (entity, previous, _) in self._staged.items():
+            if model is Order:
+                order_changed_in_bulk(connection, entity, previous)
+        self._staged.clear()
+
+    def _discard_staged(self) -> None:
+        """Put staged rows back to their loaded values after a rollback"""
+        for entity, previous, _ in self._staged.values():
+            for field, value in previous.items():
+                set_committed_value(entity, field, value)
+        self._staged.clear()
+
+    def _process_chunk(self, chunk: List[SyncRecord]) -> List[Dict[str, Any]]:
+        try:
+            with self.db.begin_nested():
+                results = [self._process_sync_record(r) for r in chunk]
+                self._write_staged()
+            return results
+        except Exception as e:
+            self._discard_staged()
+            logger.warning(f"Sync chunk failed, retrying actions one by one: {e}")
+
+        # The savepoint rolled the whole chunk back; replay each action in its
+        # own savepoint so only the offending one fails
+        self.conflicts = [c for c in self.conflicts if c.sync_record not in chunk]
+        results = []
+        for sync_record in chunk:
+            try:
+                with self.db.begin_nested():
+                    result = self._process_sync_record(sync_record)
+                    self._write_staged()
+            except Exception as e:
+                self._discard_staged()
+                sync_record.status = SyncStatus.FAILED
+                sync_record.error_message = str(e)
+                result = {
+                    "sync_record_id": sync_record.id,
+                    "status": SyncStatus.FAILED.value,
+                    "error": str(e),
+                }
+            results.append(result)
+        return results
+
     def download_changes(
         self,
         restaurant_id: str,
         last_sync_timestamp: Optional[datetime] = None,
         entity_types: Optional[List[str]] = None,
+        cursor: Optional[str] = None,
+        page_size: Optional[int] = None,
     ) -> Dict[str, Any]:
         """
-        Download server changes since last sync
+        Download one page of server changes, grouped by entity type
         """
-        try:
-            if not last_sync_timestamp:
-                last_sync_timestamp = datetime.now() - timedelta(
-                    days=7
-                )  # Default 7 days
-
-            changes = {
-                "sync_timestamp": datetime.now().isoformat(),
-                "last_sync_timestamp": last_sync_timestamp.isoformat(),
-                "changes": {},
-                "total_changes": 0,
-            }
+        page = self.download_page(
+            restaurant_id,
+            cursor=cursor,
+            since=last_sync_timestamp,
+            entity_types=entity_types,
+            page_size=page_size,
+        )
+        changes = page.to_dict()
+        changes["last_sync_timestamp"] = (
+            last_sync_timestamp.isoformat() if last_sync_timestamp else None
+        )
+        return changes
 
-            # Define entity handlers
-            entity_handlers = {
-                "orders": self._get_order_changes,
-                "products": self._get_product_changes,
-                "customers": self._get_customer_changes,
-                "payments": self._get_payment_changes,
-            }
+    def download_page(
+        self,
+        restaurant_id: str,
+        cursor: Optional[str] = None,
+        since: Optional[datetime] = None,
+        entity_types: Optional[List[str]] = None,
+        page_size: Optional[int] = None,
+    ) -> "SyncPage":
+        """
+        Read the next page of changes after a sync cursor.
 
-            # Get changes for requested entity types
-            requested_types = entity_types or list(entity_handlers.keys())
+        Without a cursor the page starts at ``since`` (or from the beginning
+        for a first sync). Each entity type is read in (changed_at, id) order
+        followed by its tombstones, and the page stops as soon as page_size
+        records have been collected.
+        """
+        try:
+            now = self.db.scalar(select(func.now()))
+            upper = now - timedelta(seconds=settings.SYNC_SETTLE_SECONDS)
+            if cursor:
+                position = SyncCursor.decode(cursor)
+            else:
+                position = SyncCursor.start(restaurant_id, since, upper)
+            if position.restaurant_id != str(restaurant_id):
+                raise FynloException(
+                    message="Sync cursor belongs to a different restaurant",
+                    error_code=ErrorCodes.VALIDATION_ERROR,
+                    status_code=400,
+                )
 
-            for entity_type in requested_types:
-                if entity_type in entity_handlers:
-                    entity_changes = entity_handlers[entity_type](
-                        restaurant_id, last_sync_timestamp
-                    )
-                    changes["changes"][entity_type] = entity_changes
-                    changes["total_changes"] += len(entity_changes)
+            requested = [
+                t for t in (entity_types or SYNC_ENTITY_TYPES) if t in SYNC_ENTITY_TYPES
+            ]
+            self._check_tombstone_retention(position, requested, now)
+
+            limit = min(
+                page_size or settings.SYNC_PAGE_SIZE, settings.SYNC_MAX_PAGE_SIZE
+            )
+            records: List[Dict[str, Any]] = []
+            has_more = False
+            for entity_type in requested:
+                has_more = self._read_changes(
+                    entity_type, restaurant_id, position, upper, limit, records
+                ) or self._read_tombstones(
+                    entity_type, restaurant_id, position, upper, limit, records
+                )
+                if has_more:
+                    break
 
-            return changes
+            return SyncPage(records, position, has_more, now, limit)
 
+        except FynloException:
+            raise
         except Exception as e:
             raise FynloException(
                 message=f"Failed to download changes: {str(e)}",
@@ -244,6 +651,16 @@ class OfflineSyncManager:
                 status_code=500,
             )
 
+    def purge_tombstones(self, older_than_days: Optional[int] = None) -> int:
+        """Delete tombstones past the retention window; returns rows removed"""
+        days = older_than_days or settings.SYNC_TOMBSTONE_RETENTION_DAYS
+        cutoff = datetime.now(timezone.utc) - timedelta(days=days)
+        result = self.db.execute(
+            delete(SyncTombstone).where(SyncTombstone.deleted_at < cutoff)
+        )
+        self.db.commit()
+        return result.rowcount
+
     def resolve_conflict(
         self,
         conflict_id: str,
@@ -298,6 +715,7 @@ class OfflineSyncManager:
                 self.conflicts = [
                     c for c in self.conflicts if c.sync_record.id != conflict_id
                 ]
+                self._write_staged()
                 self.db.commit()
 
             return {
@@ -309,6 +727,7 @@ class OfflineSyncManager:
 
         except Exception as e:
             self.db.rollback()
+            self._discard_staged()
             raise FynloException(
                 message=f"Failed to resolve conflict: {str(e)}",
                 error_code=ErrorCodes.INTERNAL_ERROR,
@@ -412,7 +831,7 @@ class OfflineSyncManager:
             result = self._apply_sync_action(sync_record)
             sync_record.status = SyncStatus.COMPLETED
 
-            return {
+            processed = {
                 "sync_record_id": sync_record.id,
                 "status": SyncStatus.COMPLETED.value,
                 "entity_type": sync_record.entity_type,
@@ -420,6 +839,15 @@ class OfflineSyncManager:
                 "action": sync_record.action.value,
                 "result": result,
             }
+            entity = self._entities.get(
+                (sync_record.entity_type, str(sync_record.entity_id))
+            )
+            if entity is not None:
+                # Sent back as base_hash with the device's next edit
+                processed["entity_hash"] = snapshot_hash(
+                    server_snapshot(sync_record.entity_type, entity)
+                )
+            return processed
 
         except Exception as e:
             sync_record.status = SyncStatus.FAILED
@@ -439,36 +867,36 @@ class OfflineSyncManager:
 
             # Get current server data
             server_data = None
-            if entity_type == "orders":
-                entity = self.db.query(Order).filter(Order.id == entity_id).first()
-                if entity:
-                    server_data = {
-                        "id": str(entity.id),
-                        "status": entity.status,
-                        "total_amount": float(entity.total_amount),
-                        "updated_at": (
-                            entity.updated_at.isoformat() if entity.updated_at else None
-                        ),
-                    }
-            elif entity_type == "products":
-                entity = self.db.query(Product).filter(Product.id == entity_id).first()
+            if entity_type in CONFLICT_MODELS:
+                entity = self._load_entity(
+                    entity_type, entity_id, sync_record.restaurant_id
+                )
                 if entity:
-                    server_data = {
-                        "id": str(entity.id),
-                        "name": entity.name,
-                        "price": float(entity.price),
-                        "stock_quantity": entity.stock_quantity,
-                        "updated_at": (
-                            entity.updated_at.isoformat() if entity.updated_at else None
-                        ),
-                    }
-            # Add other entity types as needed
+                    server_data = server_snapshot(entity_type, entity)
 
             # Check for conflicts based on action type
             if sync_record.action == SyncAction.UPDATE and server_data:
                 client_data = sync_record.data
                 conflict_fields = []
 
+                # A client that sends the hash of the row it last saw gets an
+                # exact check that does not depend on device clocks
+                base_hash = client_data.get("base_hash")
+                if base_hash and base_hash != snapshot_hash(server_data):
+                    conflict_fields = [
+                        field
+                        for field in client_data
+                        if field in server_data
+                        and field != "updated_at"
+                        and server_data[field] != client_data[field]
+                    ]
+                    return SyncConflict(
+                        sync_record=sync_record,
+                        server_data=server_data,
+                        conflict_fields=conflict_fields or ["base_hash"],
+                        conflict_type="version_conflict",
+                    )
+
                 # Compare timestamps first
                 if "updated_at" in server_data and "updated_at" in client_data:
                     server_updated = datetime.fromisoformat(
@@ -527,9 +955,11 @@ class OfflineSyncManager:
         data = sync_record.data
 
         if entity_type == "orders":
-            return self._apply_order_action(action, data)
+            return self._apply_order_action(action, data, sync_record.restaurant_id)
         elif entity_type == "products":
-            return self._apply_product_action(action, data)
+            return self._apply_product_action(
+                action, data, sync_record.restaurant_id
+            )
         elif entity_type == "customers":
             return self._apply_customer_action(action, data)
         elif entity_type == "payments":
@@ -538,7 +968,7 @@ class OfflineSyncManager:
             raise ValueError(f"Unsupported entity type: {entity_type}")
 
     def _apply_order_action(
-        self, action: SyncAction, data: Dict[str, Any]
+        self, action: SyncAction, data: Dict[str, Any], restaurant_id: str
     ) -> Dict[str, Any]:
         """Apply order sync action"""
         if action == SyncAction.CREATE:
@@ -546,33 +976,37 @@ class OfflineSyncManager:
             return {"message": "Order creation applied", "entity_id": data.get("id")}
         elif action == SyncAction.UPDATE:
             # Update existing order
-            order = self.db.query(Order).filter(Order.id == data["id"]).first()
+            order = self._load_entity("orders", data["id"], restaurant_id)
             if order:
-                order.status = data.get("status", order.status)
-                order.updated_at = datetime.now()
+                self._stage_write(
+                    order,
+                    status=data.get("status", order.status),
+                    updated_at=datetime.now(),
+                )
                 return {"message": "Order update applied", "entity_id": str(order.id)}
         elif action == SyncAction.DELETE:
             # Mark order as deleted
-            order = self.db.query(Order).filter(Order.id == data["id"]).first()
+            order = self._load_entity("orders", data["id"], restaurant_id)
             if order:
-                order.is_deleted = True
-                order.updated_at = datetime.now()
+                # Orders have no deleted flag; the bump re-sends the order
+                self._stage_write(order, updated_at=datetime.now())
                 return {"message": "Order deletion applied", "entity_id": str(order.id)}
 
         return {"message": "No action applied"}
 
     def _apply_product_action(
-        self, action: SyncAction, data: Dict[str, Any]
+        self, action: SyncAction, data: Dict[str, Any], restaurant_id: str
     ) -> Dict[str, Any]:
         """Apply product sync action"""
         if action == SyncAction.UPDATE:
-            product = self.db.query(Product).filter(Product.id == data["id"]).first()
+            product = self._load_entity("products", data["id"], restaurant_id)
             if product:
-                product.stock_quantity = data.get(
-                    "stock_quantity", product.stock_quantity
+                self._stage_write(
+                    product,
+                    stock_quantity=data.get("stock_quantity", product.stock_quantity),
+                    price=data.get("price", product.price),
+                    updated_at=datetime.now(),
                 )
-                product.price = data.get("price", product.price)
-                product.updated_at = datetime.now()
                 return {
                     "message": "Product update applied",
                     "entity_id": str(product.id),
@@ -606,111 +1040,168 @@ class OfflineSyncManager:
         sync_record.data = merged_data
         return self._apply_sync_action(sync_record)
 
-    def _get_order_changes(
-        self, restaurant_id: str, since: datetime
-    ) -> List[Dict[str, Any]]:
-        """Get order changes since timestamp"""
-        orders = (
-            self.db.query(Order)
-            .filter(
-                and_(Order.restaurant_id == restaurant_id, Order.updated_at >= since)
+    def _check_tombstone_retention(
+        self, cursor: "SyncCursor", entity_types: List[str], now: datetime
+    ) -> None:
+        # Deletes older than the retention window may already be purged, so a
+        # device that far behind cannot be brought up to date incrementally
+        cutoff = now - timedelta(days=settings.SYNC_TOMBSTONE_RETENTION_DAYS)
+        for entity_type in entity_types:
+            if cursor.positions[tombstone_key(entity_type)][0] < cutoff:
+                raise FynloException(
+                    message="Sync cursor has expired - a full resync is required",
+                    error_code=ErrorCodes.VALIDATION_ERROR,
+                    details={"resync_required": True},
+                    status_code=410,
+                )
+
+    def _changes_select(self, entity_type: str, restaurant_id: str):
+        """(model, changed_at expression, base select) for an entity type"""
+        if entity_type == "payments":
+            # Payments carry no restaurant of their own
+            changed_at = func.coalesce(Payment.updated_at, Payment.created_at)
+            stmt = (
+                select(Payment, changed_at)
+                .join(Order, Order.id == Payment.order_id)
+                .where(Order.restaurant_id == restaurant_id)
             )
-            .order_by(desc(Order.updated_at))
-            .all()
-        )
+            return Payment, changed_at, stmt
 
-        return [
-            {
-                "id": str(order.id),
-                "status": order.status,
-                "total_amount": float(order.total_amount),
-                "updated_at": order.updated_at.isoformat(),
-                "action": "update",
-            }
-            for order in orders
-        ]
+        model = SYNC_MODELS[entity_type]
+        changed_at = func.coalesce(model.updated_at, model.created_at)
+        stmt = select(model, changed_at).where(model.restaurant_id == restaurant_id)
+        return model, changed_at, stmt
 
-    def _get_product_changes(
-        self, restaurant_id: str, since: datetime
-    ) -> List[Dict[str, Any]]:
-        """Get product changes since timestamp"""
-        products = (
-            self.db.query(Product)
-            .filter(
-                and_(
-                    Product.restaurant_id == restaurant_id, Product.updated_at >= since
-                )
+    def _read_changes(
+        self,
+        entity_type: str,
+        restaurant_id: str,
+        cursor: "SyncCursor",
+        upper: datetime,
+        limit: int,
+        records: List[Dict[str, Any]],
+    ) -> bool:
+        """Append changed rows after the cursor; True if the page filled up"""
+        room = limit - len(records)
+        model, changed_at, stmt = self._changes_select(entity_type, restaurant_id)
+        after_ts, after_id = cursor.positions[entity_type]
+        rows = self.db.execute(
+            stmt.where(
+                tuple_(changed_at, model.id) > tuple_(after_ts, after_id),
+                changed_at <= upper,
             )
-            .order_by(desc(Product.updated_at))
-            .all()
-        )
-
-        return [
-            {
-                "id": str(product.id),
-                "name": product.name,
-                "price": float(product.price),
-                "stock_quantity": product.stock_quantity,
-                "updated_at": product.updated_at.isoformat(),
-                "action": "update",
-            }
-            for product in products
-        ]
+            .order_by(changed_at, model.id)
+            .limit(room + 1)
+        ).all()
+
+        serialize = SYNC_SERIALIZERS[entity_type]
+        for entity, entity_changed_at in rows[:room]:
+            op, data = serialize(entity)
+            records.append(
+                change_record(entity_type, entity.id, entity_changed_at, op, data)
+            )
+        keys = [(entity_changed_at, entity.id) for entity, entity_changed_at in rows]
+        return cursor.advance(entity_type, keys, room, upper)
 
-    def _get_customer_changes(
-        self, restaurant_id: str, since: datetime
-    ) -> List[Dict[str, Any]]:
-        """Get customer changes since timestamp"""
-        customers = (
-            self.db.query(Customer)
-            .filter(
-                and_(
-                    Customer.restaurant_id == restaurant_id,
-                    Customer.updated_at >= since,
+    def _read_tombstones(
+        self,
+        entity_type: str,
+        restaurant_id: str,
+        cursor: "SyncCursor",
+        upper: datetime,
+        limit: int,
+        records: List[Dict[str, Any]],
+    ) -> bool:
+        """Append deletes after the cursor; True if the page filled up"""
+        room = limit - len(records)
+        key = tombstone_key(entity_type)
+        after_ts, after_id = cursor.positions[key]
+        tombstones = self.db.scalars(
+            select(SyncTombstone)
+            .where(
+                SyncTombstone.restaurant_id == restaurant_id,
+                SyncTombstone.entity_type == entity_type,
+                tuple_(SyncTombstone.deleted_at, SyncTombstone.id)
+                > tuple_(after_ts, after_id),
+                SyncTombstone.deleted_at <= upper,
+            )
+            .order_by(SyncTombstone.deleted_at, SyncTombstone.id)
+            .limit(room + 1)
+        ).all()
+
+        for tombstone in tombstones[:room]:
+            records.append(
+                change_record(
+                    entity_type,
+                    tombstone.entity_id,
+                    tombstone.deleted_at,
+                    SyncAction.DELETE,
+                    None,
                 )
             )
-            .order_by(desc(Customer.updated_at))
-            .all()
-        )
-
-        return [
-            {
-                "id": str(customer.id),
-                "name": customer.name,
-                "email": customer.email,
-                "phone": customer.phone,
-                "updated_at": customer.updated_at.isoformat(),
-                "action": "update",
-            }
-            for customer in customers
-        ]
-
-    def _get_payment_changes(
-        self, restaurant_id: str, since: datetime
-    ) -> List[Dict[str, Any]]:
-        """Get payment changes since timestamp"""
-        payments = (
-            self.db.query(Payment)
-            .filter(
-                and_(
-                    Payment.restaurant_id == restaurant_id, Payment.updated_at >= since
+        keys = [(tombstone.deleted_at, tombstone.id) for tombstone in tombstones]
+        return cursor.advance(key, keys, room, upper)
+
+
+def _record_tombstone(connection, entity_type: str, restaurant_id, entity_id):
+    # Same savepoint approach as the sales rollups: a failed tombstone must not
+    # abort the delete itself. Bulk Query.delete() bypasses these listeners.
+    try:
+        with connection.begin_nested():
+            connection.execute(
+                insert(SyncTombstone).values(
+                    restaurant_id=restaurant_id,
+                    entity_type=entity_type,
+                    entity_id=entity_id,
                 )
             )
-            .order_by(desc(Payment.updated_at))
-            .all()
-        )
+    except Exception as e:
+        logger.warning(f"Sync tombstone failed for {entity_type} {entity_id}: {e}")
 
-        return [
-            {
-                "id": str(payment.id),
-                "order_id": str(payment.order_id),
-                "amount": float(payment.amount),
-                "status": payment.status,
-                "updated_at": payment.updated_at.isoformat(),
-                "action": "update",
-            }
-            for payment in payments
-        ]
+
+@event.listens_for(Order, "after_delete")
+def _order_deleted(mapper, connection, target):
+    _record_tombstone(connection, "orders", target.restaurant_id, target.id)
+
+
+@event.listens_for(Product, "after_delete")
+def _product_deleted(mapper, connection, target):
+    _record_tombstone(connection, "products", target.restaurant_id, target.id)
+
+
+@event.listens_for(Customer, "after_delete")
+def _customer_deleted(mapper, connection, target):
+    _record_tombstone(connection, "customers", target.restaurant_id, target.id)
+
+
+@event.listens_for(Payment, "after_delete")
+def _payment_deleted(mapper, connection, target):
+    restaurant_id = connection.scalar(
+        select(Order.restaurant_id).where(Order.id == target.order_id)
+    )
+    if restaurant_id is not None:
+        _record_tombstone(connection, "payments", restaurant_id, target.id)
+
+
+def purge_expired_tombstones() -> int:
+    """Delete tombstones past the retention window in a session of their own"""
+    db = SessionLocal()
+    try:
+        return OfflineSyncManager(db).purge_tombstones()
+    finally:
+        db.close()
+
+
+async def tombstone_purge_task():
+    """Background task purging expired sync tombstones, once a day"""
+    while True:
+        try:
+            purged = await asyncio.to_thread(purge_expired_tombstones)
+            if purged:
+                logger.info(f"Purged {purged} expired sync tombstones")
+        except Exception as e:
+            logger.error(f"Error in sync tombstone purge task: {e}")
+        await asyncio.sleep(24 * 3600)
 
 
 # Factory function
@@ -0,0 +1,236 @@
+"""
+Local Supabase JWT verification against a cached signing key set.
+
+Used by get_current_user when AUTH_VERIFICATION_MODE is "local" so that
+authenticated requests no longer need a Supabase API round-trip.
+"""
+
+import asyncio
+import hashlib
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional
+
+import httpx
+from jose import jwk, jwt
+from jose.exceptions import ExpiredSignatureError, JWTClaimsError, JWTError
+
+from app.core.config import settings
+from app.core.exceptions import AuthenticationException
+
+logger = logging.getLogger(__name__)
+
+ASYMMETRIC_ALGORITHMS = ["RS256", "ES256"]
+HMAC_ALGORITHM = "HS256"
+
+
+@dataclass
+class TokenIdentity:
+    """Identity extracted from a verified Supabase access token"""
+
+    supabase_id: str
+    token_id: str
+    email: Optional[str] = None
+    expires_at: Optional[float] = None
+    claims: Dict[str, Any] = field(default_factory=dict)
+
+
+def token_identifier(claims: Dict[str, Any], token: str) -> str:
+    """
+    Stable identifier for a token, used as the revocation/cache key.
+    Supabase tokens carry session_id rather than jti, so fall back to it and
+    finally to a digest of the raw token.
+    """
+    jti = claims.get("jti") or claims.get("session_id")
+    if jti:
+        return str(jti)
+    return hashlib.sha256(token.encode()).hexdigest()[:32]
+
+
+class JWKSCache:
+    """Signing keys fetched from Supabase, refreshed periodically"""
+
+    def __init__(
+        self,
+        jwks_url: Optional[str] = None,
+        refresh_interval: Optional[int] = None,
+        min_refetch_interval: int = 30,
+    ):
+        self.jwks_url = jwks_url
+        self.refresh_interval = (
+            refresh_interval
+            if refresh_interval is not None
+            else settings.AUTH_JWKS_REFRESH_SECONDS
+        )
+        self.min_refetch_interval = min_refetch_interval
+        self._keys: Dict[str, Any] = {}
+        self._fetched_at = 0.0
+        self._last_attempt = 0.0
+        self._lock = asyncio.Lock()
+
+    @property
+    def is_stale(self) -> bool:
+        return time.monotonic() - self._fetched_at > self.refresh_interval
+
+    def load(self, jwks: Dict[str, Any]) -> int:
+        """Replace the cached key set with the keys in a JWKS document"""
+        keys = {}
+        for key_data in jwks.get("keys", []):
+            alg = key_data.get("alg")
+            if alg not in ASYMMETRIC_ALGORITHMS:
+                continue
+            try:
+                keys[key_data.get("kid", "")] = jwk.construct(key_data, alg)
+            except JWTError as e:
+                logger.warning(f"Skipping unusable JWKS key {key_data.get('kid')}: {e}")
+        self._keys = keys
+        self._fetched_at = time.monotonic()
+        return len(keys)
+
+    async def refresh(self, force: bool = False) -> None:
+        """Fetch the key set, at most once per min_refetch_interval"""
+        if not self.jwks_url:
+            return
+        async with self._lock:
+            now = time.monotonic()
+            if not force and not self.is_stale:
+                return
+            if now - self._last_attempt < self.min_refetch_interval:
+                return
+            self._last_attempt = now
+            try:
+                async with httpx.AsyncClient(timeout=5.0) as client:
+                    response = await client.get(self.jwks_url)
+                    response.raise_for_status()
+                count = self.load(response.json())
+                logger.info(f"Loaded {count} signing keys from Supabase JWKS")
+            except Exception as e:
+                # Keep serving the previous key set; tokens signed with
+                # unknown keys will simply fail verification
+                logger.error(f"Failed to refresh Supabase JWKS: {e}")
+
+    async def get_key(self, kid: Optional[str]) -> Optional[Any]:
+        if self.is_stale:
+            await self.refresh()
+        key = self._keys.get(kid or "")
+        if key is None:
+            # Key rotation: an unknown kid triggers an early (rate-limited) fetch
+            await self.refresh(force=True)
+            key = self._keys.get(kid or "")
+        return key
+
+
+class SupabaseTokenVerifier:
+    """Verifies Supabase access tokens without calling the Supabase API"""
+
+    def __init__(
+        self,
+        jwks_cache: Optional[JWKSCache] = None,
+        hmac_secret: Optional[str] = None,
+        issuer: Optional[str] = None,
+        audience: Optional[str] = None,
+        leeway: int = 10,
+        max_verified_tokens: int = 10000,
+    ):
+        supabase_url = (settings.SUPABASE_URL or "").rstrip("/")
+        self.jwks_cache = jwks_cache or JWKSCache(
+            jwks_url=(
+                f"{supabase_url}/auth/v1/.well-known/jwks.json"
+                if supabase_url
+                else None
+            )
+        )
+        secret = hmac_secret if hmac_secret is not None else settings.SUPABASE_JWT_SECRET
+        self._hmac_key = jwk.construct(secret, HMAC_ALGORITHM) if secret else None
+        self.issuer = (
+            issuer
+            if issuer is not None
+            else (f"{supabase_url}/auth/v1" if supabase_url else None)
+        )
+        self.audience = audience or settings.SUPABASE_JWT_AUDIENCE
+        self.leeway = leeway
+        # Terminals repeat the same bearer token for its whole lifetime, so the
+        # signature check only needs to run once per token; expiry is rechecked
+        self.max_verified_tokens = max_verified_tokens
+        self._verified: "OrderedDict[str, TokenIdentity]" = OrderedDict()
+
+    async def verify(self, token: str) -> TokenIdentity:
+        """Verify signature and claims, returning the token identity"""
+        identity = self._verified.get(token)
+        if identity is not None:
+            if identity.expires_at + self.leeway > time.time():
+                self._verified.move_to_end(token)
+                return identity
+            self._verified.pop(token, None)
+
+        identity = await self._verify_signature_and_claims(token)
+        self._verified[token] = identity
+        while len(self._verified) > self.max_verified_tokens:
+            self._verified.popitem(last=False)
+        return identity
+
+    async def _verify_signature_and_claims(self, token: str) -> TokenIdentity:
+        try:
+            header = jwt.get_unverified_header(token)
+        except JWTError:
+            raise AuthenticationException(
+                message="Authentication failed", details={"error_code": "INVALID_TOKEN"}
+            )
+
+        alg = header.get("alg")
+        if alg == HMAC_ALGORITHM:
+            key = self._hmac_key
+        elif alg in ASYMMETRIC_ALGORITHMS:
+            key = await self.jwks_cache.get_key(header.get("kid"))
+        else:
+            key = None
+
+        if key is None:
+            raise AuthenticationException(
+                message="Authentication failed",
+                details={"error_code": "INVALID_TOKEN", "reason": "unknown signing key"},
+            )
+
+        try:
+            claims = jwt.decode(
+                token,
+                key,
+                algorithms=[alg],
+                audience=self.audience,
+                issuer=self.issuer,
+                options={"leeway": self.leeway, "require_exp": True},
+            )
+        except ExpiredSignatureError:
+            raise AuthenticationException(
+                message="Token has expired", details={"error_code": "TOKEN_EXPIRED"}
+            )
+        except (JWTClaimsError, JWTError):
+            raise AuthenticationException(
+                message="Authentication failed", details={"error_code": "INVALID_TOKEN"}
+            )
+
+        if not claims.get("sub"):
+            raise AuthenticationException(
+                message="Authentication failed", details={"error_code": "INVALID_TOKEN"}
+            )
+
+        return TokenIdentity(
+            supabase_id=str(claims["sub"]),
+            token_id=token_identifier(claims, token),
+            email=claims.get("email"),
+            expires_at=claims.get("exp"),
+            claims=claims,
+        )
+
+
+_verifier: Optional[SupabaseTokenVerifier] = None
+
+
+def get_token_verifier() -> SupabaseTokenVerifier:
+    """Get the process-wide verifier, created on first use"""
+    global _verifier
+    if _verifier is None:
+        _verifier = SupabaseTokenVerifier()
+    return _verifier
@@ -3,14 +3,24 @@ WebSocket Manager for Fynlo POS
 Real-time communication for orders, payments, kitchen updates, and notifications
 """
 
+import asyncio
 from typing import Dict, List, Optional, Any
-from fastapi import WebSocket, WebSocketDisconnect
-import json
+from fastapi import WebSocket
 from datetime import datetime
 import uuid
 from enum import Enum
 
+from app.core.config import settings
 from app.core.exceptions import FynloException, ErrorCodes
+from app.core.websocket_broker import BrokerBackend, create_broker
+from app.core.websocket_replay import (
+    InMemoryReplayLog,
+    ReplayLog,
+    create_replay_log,
+    parse_offset,
+    with_offset,
+)
+from app.core.websocket_sender import ConnectionSender, encode_message
 import logging
 
 logger = logging.getLogger(__name__)
@@ -25,6 +35,7 @@ class EventType(str, Enum):
     PAYMENT_FAILED = "payment_failed"
     INVENTORY_LOW = "inventory_low"
     INVENTORY_OUT = "inventory_out"
+    INVENTORY_UPDATED = "inventory.updated"
     USER_LOGIN = "user_login"
     USER_LOGOUT = "user_logout"
     KITCHEN_UPDATE = "kitchen_update"
@@ -63,7 +74,7 @@ class WebSocketMessage:
         self.timestamp = datetime.now().isoformat()
 
     def to_dict(self) -> Dict[str, Any]:
-        return {
+        message_dict = {
             "id": self.id,
             "event_type": self.event_type.value,
             "data": self.data,
@@ -71,6 +82,20 @@ class WebSocketMessage:
             "user_id": self.user_id,
             "timestamp": self.timestamp,
         }
+        return message_dict
+
+    @classmethod
+    def from_dict(cls, message_dict: Dict[str, Any]) -> "WebSocketMessage":
+        """Rebuild a message received from another worker, keeping its id"""
+        message = cls(
+            event_type=EventType(message_dict["event_type"]),
+            data=message_dict.get("data", {}),
+            restaurant_id=message_dict["restaurant_id"],
+            user_id=message_dict.get("user_id"),
+        )
+        message.id = message_dict.get("id", message.id)
+        message.timestamp = message_dict.get("timestamp", message.timestamp)
+        return message
 
 
 class WebSocketConnection:
@@ -94,6 +119,9 @@ class WebSocketConnection:
         self.connected_at = datetime.now()
         self.last_ping = datetime.now()
         self.is_active = True
+        self.sender: Optional[ConnectionSender] = None
+        # Last sequence number given to a broker broadcast sent on this socket
+        self.sequence = 0
 
 
 class WebSocketManager:
@@ -112,8 +140,12 @@ class WebSocketManager:
         # Store connections by type: {connection_type: List[connection_id]}
         self.type_connections: Dict[str, List[str]] = {}
 
-        # Message queue for offline connections
-        self.message_queue: Dict[str, List[WebSocketMessage]] = {}
+        # Replay log for user-targeted messages sent while the user was offline
+        self.replay_log: ReplayLog = InMemoryReplayLog(
+            ttl_seconds=settings.WEBSOCKET_REPLAY_TTL_SECONDS,
+            max_entries=settings.WEBSOCKET_REPLAY_MAX_ENTRIES,
+            max_bytes=settings.WEBSOCKET_REPLAY_MAX_BYTES,
+        )
 
         # Connection statistics
         self.stats = {
@@ -121,8 +153,32 @@ class WebSocketManager:
             "active_connections": 0,
             "messages_sent": 0,
             "messages_failed": 0,
+            "slow_consumers_dropped": 0,
         }
 
+        self.send_queue_size = settings.WEBSOCKET_SEND_QUEUE_SIZE
+        self.send_timeout = settings.WEBSOCKET_SEND_TIMEOUT_SECONDS
+
+        # Cross-worker fan-out; None means broadcasts stay on this worker
+        self.broker: Optional[BrokerBackend] = None
+
+        # Last broker channel sequence received per restaurant, used to notice
+        # broadcasts this worker never received
+        self.channel_sequences: Dict[str, int] = {}
+
+    async def attach_broker(self, broker: BrokerBackend):
+        """Route restaurant broadcasts through a broker shared by all workers"""
+        self.broker = broker
+        await broker.start(self._on_broker_message)
+
+    async def detach_broker(self):
+        if self.broker:
+            await self.broker.stop()
+            self.broker = None
+
+    def has_local_connections(self, restaurant_id: str) -> bool:
+        return bool(self.restaurant_connections.get(restaurant_id))
+
     async def connect(
         self,
         websocket: WebSocket,
@@ -130,8 +186,13 @@ class WebSocketManager:
         user_id: Optional[str] = None,
         connection_type: ConnectionType = ConnectionType.POS,
         roles: List[str] = None,
+        resume_from: Optional[str] = None,
     ) -> str:
-        """Accept new WebSocket connection"""
+        """
+        Accept new WebSocket connection. Messages logged for the user while
+        offline are replayed after resume_from (the last offset the client
+        saw), or after the last offset already handed to them.
+        """
         try:
             await websocket.accept()
 
@@ -144,6 +205,14 @@ class WebSocketManager:
                 connection_type=connection_type,
                 roles=roles or [],
             )
+            connection.sender = ConnectionSender(
+                connection_id,
+                websocket,
+                on_drop=self._on_consumer_dropped,
+                stats=self.stats,
+                max_queue=self.send_queue_size,
+                send_timeout=self.send_timeout,
+            )
 
             # Store connection
             self.active_connections[connection_id] = connection
@@ -153,12 +222,6 @@ class WebSocketManager:
                 self.restaurant_connections[restaurant_id] = []
             self.restaurant_connections[restaurant_id].append(connection_id)
 
-            # Index by user
-            if user_id:
-                if user_id not in self.user_connections:
-                    self.user_connections[user_id] = []
-                self.user_connections[user_id].append(connection_id)
-
             # Index by type
             type_key = connection_type.value
             if type_key not in self.type_connections:
@@ -184,8 +247,17 @@ class WebSocketManager:
                 ),
             )
 
-            # Send queued messages if any
-            await self._send_queued_messages(user_id, restaurant_id)
+            if user_id:
+                # Replay in offset order, then index the user for live messages
+                # and pick up anything logged while the replay was being read
+                after = await self._resume_offset(restaurant_id, user_id, resume_from)
+                after = await self._replay_missed_messages(connection, after)
+
+                if user_id not in self.user_connections:
+                    self.user_connections[user_id] = []
+                self.user_connections[user_id].append(connection_id)
+
+                await self._replay_missed_messages(connection, after)
 
             return connection_id
 
@@ -203,6 +275,9 @@ class WebSocketManager:
                 return
 
             connection = self.active_connections[connection_id]
+            connection.is_active = False
+            if connection.sender:
+                connection.sender.close()
 
             # Remove from restaurant index
             if connection.restaurant_id in self.restaurant_connections:
@@ -215,6 +290,7 @@ class WebSocketManager:
                     )
                     if not self.restaurant_connections[connection.restaurant_id]:
                         del self.restaurant_connections[connection.restaurant_id]
+                        self.channel_sequences.pop(connection.restaurant_id, None)
 
             # Remove from user index
             if connection.user_id and connection.user_id in self.user_connections:
@@ -242,53 +318,59 @@ class WebSocketManager:
             logger.error(f"Error disconnecting WebSocket {connection_id}: {str(e)}")
 
     async def send_to_connection(self, connection_id: str, message: WebSocketMessage):
-        """Send message to specific connection"""
-        try:
-            if connection_id not in self.active_connections:
-                return False
-
-            connection = self.active_connections[connection_id]
-
-            if not connection.is_active:
-                return False
-
-            message_data = message.to_dict()
-            await connection.websocket.send_text(json.dumps(message_data))
-
-            self.stats["messages_sent"] += 1
-            return True
-
-        except WebSocketDisconnect:
-            await self.disconnect(connection_id)
+        """Queue message for a specific connection"""
+        connection = self.active_connections.get(connection_id)
+        if not connection:
             return False
-        except Exception as e:
-            self.stats["messages_failed"] += 1
-            logger.error(
-                f"Failed to send message to connection {connection_id}: {str(e)}"
-            )
+        return self._send_frame(connection, encode_message(message.to_dict()))
+
+    def _send_frame(self, connection: WebSocketConnection, frame: str) -> bool:
+        """Hand an encoded frame to the connection's writer without waiting"""
+        if not connection.is_active or connection.sender is None:
             return False
+        return connection.sender.offer(frame)
+
+    def _send_to_connections(
+        self, connections: List[WebSocketConnection], message: WebSocketMessage
+    ) -> int:
+        """Encode once and queue the same frame for every connection"""
+        if not connections:
+            return 0
+        frame = encode_message(message.to_dict())
+        return sum(self._send_frame(connection, frame) for connection in connections)
+
+    async def _on_consumer_dropped(self, connection_id: str, reason: str):
+        """Disconnect a consumer whose writer gave up on it"""
+        self.stats["slow_consumers_dropped"] += 1
+        logger.warning(f"Dropping WebSocket connection {connection_id}: {reason}")
+        await self.disconnect(connection_id)
+
+    async def flush(self):
+        """Wait for every queued frame to be written or discarded"""
+        senders = [
+            connection.sender
+            for connection in list(self.active_connections.values())
+            if connection.sender
+        ]
+        await asyncio.gather(*(sender.join() for sender in senders))
 
     async def send_to_restaurant(self, restaurant_id: str, message: WebSocketMessage):
         """Send message to all connections in a restaurant"""
-        if restaurant_id not in self.restaurant_connections:
-            return
-
-        connection_ids = self.restaurant_connections[restaurant_id].copy()
-
-        for connection_id in connection_ids:
-            await self.send_to_connection(connection_id, message)
+        await self.broadcast_to_restaurant(restaurant_id, message)
 
     async def send_to_user(self, user_id: str, message: WebSocketMessage):
         """Send message to all user connections"""
         if user_id not in self.user_connections:
-            # Queue message for when user connects
-            self._queue_message(user_id, message)
+            # Log message for when user connects
+            await self._log_offline_message(user_id, message)
             return
 
-        connection_ids = self.user_connections[user_id].copy()
-
-        for connection_id in connection_ids:
-            await self.send_to_connection(connection_id, message)
+        connections = [
+            self.active_connections[connection_id]
+            for connection_id in self.user_connections[user_id]
+            if connection_id in self.active_connections
+        ]
+        self._send_to_connections(connections, message)
 
     async def send_to_connection_type(
         self, connection_type: ConnectionType, message: WebSocketMessage
@@ -299,12 +381,13 @@ class WebSocketManager:
         if type_key not in self.type_connections:
             return
 
-        connection_ids = self.type_connections[type_key].copy()
-
-        for connection_id in connection_ids:
+        connections = []
+        for connection_id in self.type_connections[type_key]:
             connection = self.active_connections.get(connection_id)
             if connection and connection.restaurant_id == message.restaurant_id:
-                await self.send_to_connection(connection_id, message)
+                connections.append(connection)
+
+        self._send_to_connections(connections, message)
 
     async def broadcast_to_restaurant(
         self,
@@ -314,12 +397,81 @@ class WebSocketManager:
         exclude_user_id: Optional[str] = None,
     ):
         """Broadcast message to restaurant with filtering"""
+        if self.broker:
+            envelope = {
+                "message": message.to_dict(),
+                "connection_types": (
+                    [t.value for t in connection_types] if connection_types else None
+                ),
+                "exclude_user_id": exclude_user_id,
+            }
+            try:
+                # Published once; every worker delivers to its own sockets
+                await self.broker.publish(restaurant_id, envelope)
+                return
+            except Exception as e:
+                logger.error(
+                    f"Broker publish failed for restaurant {restaurant_id}, "
+                    f"delivering locally only: {str(e)}"
+                )
+
+        await self._deliver_to_restaurant(
+            restaurant_id, message, connection_types, exclude_user_id
+        )
+
+    async def _on_broker_message(
+        self, restaurant_id: str, sequence: int, envelope: Dict[str, Any]
+    ):
+        """
+        Deliver a broadcast received from the broker to local connections.
+        Each connection numbers the broadcasts it is sent, so filtered ones
+        leave no gap. A jump in the channel sequence means this worker missed
+        broadcasts (e.g. while resubscribing), which every local connection
+        is shown as a skipped number.
+        """
         if restaurant_id not in self.restaurant_connections:
+            self.channel_sequences.pop(restaurant_id, None)
             return
 
-        connection_ids = self.restaurant_connections[restaurant_id].copy()
+        last = self.channel_sequences.get(restaurant_id)
+        self.channel_sequences[restaurant_id] = sequence
+        if last is not None and sequence > last + 1:
+            logger.warning(
+                f"Missed {sequence - last - 1} broadcasts for restaurant "
+                f"{restaurant_id}"
+            )
+            for connection_id in self.restaurant_connections[restaurant_id]:
+                connection = self.active_connections.get(connection_id)
+                if connection:
+                    connection.sequence += 1
+
+        message = WebSocketMessage.from_dict(envelope["message"])
+        connection_types = envelope.get("connection_types")
+        await self._deliver_to_restaurant(
+            restaurant_id,
+            message,
+            [ConnectionType(t) for t in connection_types] if connection_types else None,
+            envelope.get("exclude_user_id"),
+            sequenced=True,
+        )
 
-        for connection_id in connection_ids:
+    async def _deliver_to_restaurant(
+        self,
+        restaurant_id: str,
+        message: WebSocketMessage,
+        connection_types: List[ConnectionType] = None,
+        exclude_user_id: Optional[str] = None,
+        sequenced: bool = False,
+    ):
+        """
+        Send to this worker's connections for a restaurant, numbering each
+        frame with the connection's own sequence when sequenced
+        """
+        if restaurant_id not in self.restaurant_connections:
+            return
+
+        connections = []
+        for connection_id in self.restaurant_connections[restaurant_id]:
             connection = self.active_connections.get(connection_id)
             if not connection:
                 continue
@@ -332,55 +484,90 @@ class WebSocketManager:
             if exclude_user_id and connection.user_id == exclude_user_id:
                 continue
 
-            await self.send_to_connection(connection_id, message)
+            connections.append(connection)
 
-    def _queue_message(self, user_id: str, message: WebSocketMessage):
-        """Queue message for offline user"""
-        if user_id not in self.message_queue:
-            self.message_queue[user_id] = []
+        if not sequenced:
+            # Serialized once; slow sockets back up in their own queue only
+            self._send_to_connections(connections, message)
+            return
 
-        self.message_queue[user_id].append(message)
+        # Serialized once and the sequence spliced onto the end of the object
+        head = encode_message(message.to_dict())[:-1]
+        for connection in connections:
+            connection.sequence += 1
+            frame = f'{head},"sequence":{connection.sequence}}}'
+            self._send_frame(connection, frame)
 
-        # Limit queue size to prevent memory issues
-        if len(self.message_queue[user_id]) > 100:
-            self.message_queue[user_id] = self.message_queue[user_id][-100:]
+    async def _log_offline_message(self, user_id: str, message: WebSocketMessage):
+        """Append a message to the offline user's replay log"""
+        try:
+            await self.replay_log.append(
+                message.restaurant_id, user_id, encode_message(message.to_dict())
+            )
+        except Exception as e:
+            logger.error(f"Failed to log offline message for user {user_id}: {e}")
 
-    async def _send_queued_messages(self, user_id: Optional[str], restaurant_id: str):
-        """Send queued messages to newly connected user"""
-        if not user_id or user_id not in self.message_queue:
-            return
+    async def _resume_offset(
+        self, restaurant_id: str, user_id: str, resume_from: Optional[str]
+    ) -> Optional[str]:
+        """Offset to replay after: the client's own, else the stored cursor"""
+        if resume_from:
+            try:
+                parse_offset(resume_from)
+                return resume_from
+            except ValueError:
+                logger.warning(f"Ignoring malformed resume offset for user {user_id}")
+        try:
+            return await self.replay_log.get_cursor(restaurant_id, user_id)
+        except Exception as e:
+            logger.error(f"Failed to read replay cursor for user {user_id}: {e}")
+            return None
 
-        queued_messages = self.message_queue[user_id].copy()
-        del self.message_queue[user_id]
+    async def _replay_missed_messages(
+        self, connection: WebSocketConnection, after: Optional[str]
+    ) -> Optional[str]:
+        """Queue logged frames after the given offset; returns the last offset"""
+        try:
+            entries = await self.replay_log.read_since(
+                connection.restaurant_id, connection.user_id, after
+            )
+        except Exception as e:
+            logger.error(
+                f"Failed to read replay log for user {connection.user_id}: {e}"
+            )
+            return after
 
-        for message in queued_messages:
-            # Only send messages for the current restaurant
-            if message.restaurant_id == restaurant_id:
-                await self.send_to_user(user_id, message)
+        for offset, frame in entries:
+            self._send_frame(connection, with_offset(frame, offset))
+
+        if not entries:
+            return after
+        last_offset = entries[-1][0]
+        try:
+            await self.replay_log.set_cursor(
+                connection.restaurant_id, connection.user_id, last_offset
+            )
+        except Exception as e:
+            logger.error(
+                f"Failed to store replay cursor for user {connection.user_id}: {e}"
+            )
+        return last_offset
 
     async def ping_connections(self):
         """Send ping to all connections to check health"""
         current_time = datetime.now()
-        disconnected_connections = []
+        ping_frame = encode_message(
+            {"type": "ping", "timestamp": current_time.isoformat()}
+        )
 
-        for connection_id, connection in self.active_connections.items():
-            try:
-                # Send ping
-                ping_message = {"type": "ping", "timestamp": current_time.isoformat()}
-                await connection.websocket.send_text(json.dumps(ping_message))
+        # Dead or stalled sockets are disconnected by their writer
+        for connection in list(self.active_connections.values()):
+            if self._send_frame(connection, ping_frame):
                 connection.last_ping = current_time
 
-            except WebSocketDisconnect:
-                disconnected_connections.append(connection_id)
-            except Exception:
-                disconnected_connections.append(connection_id)
-
-        # Clean up disconnected connections
-        for connection_id in disconnected_connections:
-            await self.disconnect(connection_id)
-
     def get_connection_stats(self) -> Dict[str, Any]:
         """Get connection statistics"""
+        replay_stats = self.replay_log.get_stats()
         return {
             **self.stats,
             "connections_by_restaurant": {
@@ -391,8 +578,12 @@ class WebSocketManager:
                 conn_type: len(connections)
                 for conn_type, connections in self.type_connections.items()
             },
-            "queued_messages": sum(
-                len(messages) for messages in self.message_queue.values()
+            "queued_messages": replay_stats.get("entries", 0),
+            "replay": replay_stats,
+            "broker": (
+                {"backend": type(self.broker).__name__, **self.broker.stats}
+                if self.broker
+                else None
             ),
         }
 
@@ -656,3 +847,25 @@ websocket_manager = WebSocketManager()
 def get_websocket_manager() -> WebSocketManager:
     """Get the global WebSocket manager instance"""
     return websocket_manager
+
+
+async def init_websocket_broker(redis_client=None):
+    """Attach the configured cross-worker broker to the global manager"""
+    broker = create_broker(
+        redis_client, has_local_connections=websocket_manager.has_local_connections
+    )
+    if broker:
+        await websocket_manager.attach_broker(broker)
+        logger.info(f"WebSocket broker attached: {type(broker).__name__}")
+
+
+async def close_websocket_broker():
+    await websocket_manager.detach_broker()
+
+
+def init_websocket_replay_log(redis_client=None):
+    """Keep offline replay logs in Redis streams when Redis is connected"""
+    websocket_manager.replay_log = create_replay_log(redis_client)
+    logger.info(
+        f"WebSocket replay log: {type(websocket_manager.replay_log).__name__}"
+    )
@@ -0,0 +1,215 @@
+"""
+Cross-worker fan-out for WebSocketManager broadcasts.
+
+Each restaurant has one broker channel. A broadcast is published once; every
+worker (including the publisher) receives it and delivers to its own local
+sockets. Messages carry a per-channel sequence number so a worker can tell
+when it missed one; WebSocketManager numbers each socket's frames from it.
+"""
+
+import asyncio
+import json
+import logging
+from abc import ABC, abstractmethod
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+CHANNEL_PREFIX = "fynlo:ws:restaurant:"
+SEQUENCE_PREFIX = "fynlo:ws:seq:"
+
+BrokerHandler = Callable[[str, int, Dict[str, Any]], Awaitable[None]]
+
+# INCR and PUBLISH in one atomic round-trip so subscribers always observe
+# sequence numbers in order. The payload is prefixed as "<seq>|<json>".
+PUBLISH_SCRIPT = """
+local seq = redis.call('INCR', KEYS[1])
+redis.call('PUBLISH', KEYS[2], seq .. '|' .. ARGV[1])
+return seq
+"""
+
+
+def restaurant_channel(restaurant_id: str) -> str:
+    return f"{CHANNEL_PREFIX}{restaurant_id}"
+
+
+class BrokerBackend(ABC):
+    """Publish/subscribe transport used by WebSocketManager"""
+
+    def __init__(self):
+        self.handler: Optional[BrokerHandler] = None
+        self.stats = {"published": 0, "received": 0, "publish_errors": 0}
+
+    async def start(self, handler: BrokerHandler) -> None:
+        """Begin delivering messages for all restaurant channels to handler"""
+        self.handler = handler
+
+    async def stop(self) -> None:
+        self.handler = None
+
+    @abstractmethod
+    async def publish(self, restaurant_id: str, envelope: Dict[str, Any]) -> int:
+        """Publish an envelope to the restaurant channel, returning its sequence"""
+
+    async def _dispatch(self, restaurant_id: str, sequence: int, envelope) -> None:
+        if self.handler is None:
+            return
+        self.stats["received"] += 1
+        try:
+            await self.handler(restaurant_id, sequence, envelope)
+        except Exception as e:
+            logger.error(f"WebSocket broker handler failed for {restaurant_id}: {e}")
+
+
+class InMemoryBrokerHub:
+    """Stand-in for the Redis server; brokers sharing a hub act as workers"""
+
+    def __init__(self):
+        self.brokers: List["InMemoryBroker"] = []
+        self.sequences: Dict[str, int] = {}
+
+    async def publish(self, restaurant_id: str, envelope: Dict[str, Any]) -> int:
+        channel = restaurant_channel(restaurant_id)
+        sequence = self.sequences.get(channel, 0) + 1
+        self.sequences[channel] = sequence
+        for broker in list(self.brokers):
+            await broker._dispatch(restaurant_id, sequence, envelope)
+        return sequence
+
+
+class InMemoryBroker(BrokerBackend):
+    """Single-process broker, also used in tests to simulate several workers"""
+
+    def __init__(self, hub: Optional[InMemoryBrokerHub] = None):
+        super().__init__()
+        self.hub = hub or InMemoryBrokerHub()
+
+    async def start(self, handler: BrokerHandler) -> None:
+        await super().start(handler)
+        if self not in self.hub.brokers:
+            self.hub.brokers.append(self)
+
+    async def stop(self) -> None:
+        if self in self.hub.brokers:
+            self.hub.brokers.remove(self)
+        await super().stop()
+
+    async def publish(self, restaurant_id: str, envelope: Dict[str, Any]) -> int:
+        self.stats["published"] += 1
+        return await self.hub.publish(restaurant_id, envelope)
+
+
+class RedisPubSubBroker(BrokerBackend):
+    """
+    Redis pub/sub transport. Workers pattern-subscribe to every restaurant
+    channel and drop messages for restaurants they hold no sockets for before
+    decoding the payload.
+    """
+
+    def __init__(
+        self,
+        redis,
+        has_local_connections: Optional[Callable[[str], bool]] = None,
+        reconnect_delay: float = 1.0,
+    ):
+        super().__init__()
+        self.redis = redis
+        self.has_local_connections = has_local_connections
+        self.reconnect_delay = reconnect_delay
+        self._script = None
+        self._listener: Optional[asyncio.Task] = None
+        self._running = False
+
+    async def start(self, handler: BrokerHandler) -> None:
+        await super().start(handler)
+        self._script = self.redis.register_script(PUBLISH_SCRIPT)
+        self._running = True
+        self._listener = asyncio.create_task(self._listen())
+
+    async def stop(self) -> None:
+        self._running = False
+        if self._listener:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+        await super().stop()
+
+    async def publish(self, restaurant_id: str, envelope: Dict[str, Any]) -> int:
+        try:
+            sequence = await self._script(
+                keys=[
+                    f"{SEQUENCE_PREFIX}{restaurant_id}",
+                    restaurant_channel(restaurant_id),
+                ],
+                args=[json.dumps(envelope, default=str)],
+            )
+            self.stats["published"] += 1
+            return int(sequence)
+        except Exception:
+            self.stats["publish_errors"] += 1
+            raise
+
+    async def _listen(self) -> None:
+        while self._running:
+            pubsub = self.redis.pubsub()
+            try:
+                await pubsub.psubscribe(f"{CHANNEL_PREFIX}*")
+                logger.info("WebSocket broker subscribed to restaurant channels")
+                async for message in pubsub.listen():
+                    if message.get("type") != "pmessage":
+                        continue
+                    await self._handle_raw(message["channel"], message["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"WebSocket broker subscription lost: {e}")
+                await asyncio.sleep(self.reconnect_delay)
+            finally:
+                try:
+                    await pubsub.close()
+                except Exception:
+                    pass
+
+    async def _handle_raw(self, channel, data) -> None:
+        if isinstance(channel, bytes):
+            channel = channel.decode()
+        if isinstance(data, bytes):
+            data = data.decode()
+        restaurant_id = channel[len(CHANNEL_PREFIX) :]
+        if self.has_local_connections and not self.has_local_connections(
+            restaurant_id
+        ):
+            return
+        sequence, _, payload = data.partition("|")
+        try:
+            envelope = json.loads(payload)
+        except json.JSONDecodeError:
+            logger.warning(f"Dropping malformed broker message on {channel}")
+            return
+        await self._dispatch(restaurant_id, int(sequence), envelope)
+
+
+def create_broker(
+    redis_client, has_local_connections: Optional[Callable[[str], bool]] = None
+) -> Optional[BrokerBackend]:
+    """
+    Build the broker selected by WEBSOCKET_BROKER. Falls back to the in-memory
+    broker when Redis is not connected (development mock mode).
+    """
+    backend = settings.WEBSOCKET_BROKER
+    if backend == "none":
+        return None
+    if backend == "redis" and redis_client is not None and redis_client.redis:
+        return RedisPubSubBroker(
+            redis_client.redis, has_local_connections=has_local_connections
+        )
+    if backend == "redis":
+        logger.warning(
+            "Redis unavailable - WebSocket broadcasts will only reach this worker"
+        )
+    return InMemoryBroker()
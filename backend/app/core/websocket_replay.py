@@ -0,0 +1,285 @@
+"""
+Replay log for user-targeted WebSocket messages sent while the user is offline.
+
+Entries are stored as already-encoded frames per (restaurant, user) and are
+bounded both by count and by age. Each entry has an offset (a Redis stream
+ID, or the same "<ms>-<seq>" shape in memory); replayed frames carry it so a
+client can reconnect with ``resume_from`` and receive only what it missed.
+The log also keeps a server-side cursor of the last offset handed to the
+user, used when a client reconnects without one.
+"""
+
+import logging
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict, deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "fynlo:ws:replay:"
+# Sorted set of stream keys scored by when each stream expires, read for stats
+STREAMS_KEY = "fynlo:ws:replay-streams"
+
+ReplayEntry = Tuple[str, str]  # (offset, encoded frame)
+
+
+def replay_key(restaurant_id: str, user_id: str) -> str:
+    return f"{KEY_PREFIX}{restaurant_id}:{user_id}"
+
+
+def parse_offset(offset: str) -> Tuple[int, int]:
+    millis, _, seq = offset.partition("-")
+    return int(millis), int(seq or 0)
+
+
+def with_offset(frame: str, offset: str) -> str:
+    """Add an "offset" field to an encoded JSON object without re-encoding it"""
+    return f'{{"offset":"{offset}",{frame[1:]}' if frame != "{}" else frame
+
+
+class ReplayLog(ABC):
+    """Per-user offline message log with resume-from-offset reads"""
+
+    def __init__(self, ttl_seconds: int, max_entries: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.stats = {"appended": 0, "replayed": 0, "append_errors": 0}
+
+    @abstractmethod
+    async def append(self, restaurant_id: str, user_id: str, frame: str) -> str:
+        """Store an encoded frame and return its offset"""
+
+    @abstractmethod
+    async def read_since(
+        self, restaurant_id: str, user_id: str, after: Optional[str] = None
+    ) -> List[ReplayEntry]:
+        """Unexpired entries strictly after the given offset, oldest first"""
+
+    @abstractmethod
+    async def get_cursor(self, restaurant_id: str, user_id: str) -> Optional[str]:
+        """Last offset handed to the user, if any"""
+
+    @abstractmethod
+    async def set_cursor(self, restaurant_id: str, user_id: str, offset: str) -> None:
+        pass
+
+    async def refresh_stats(self) -> None:
+        """Update size stats that need a round-trip to the backing store"""
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {"backend": type(self).__name__, **self.stats}
+
+
+class InMemoryReplayLog(ReplayLog):
+    """Process-local fallback, bounded per key, by age and by total bytes"""
+
+    def __init__(self, ttl_seconds: int, max_entries: int, max_bytes: int):
+        super().__init__(ttl_seconds, max_entries)
+        self.max_bytes = max_bytes
+        # key -> deque of (offset, stored_at, frame); LRU order for byte eviction
+        self.logs: "OrderedDict[str, Deque[Tuple[str, float, str]]]" = OrderedDict()
+        self.cursors: Dict[str, Tuple[str, float]] = {}
+        self.bytes = 0
+        self.entries = 0
+        self.stats["evicted"] = 0
+        self._last_offset = (0, 0)
+
+    def _next_offset(self) -> str:
+        millis = int(time.time() * 1000)
+        last_millis, last_seq = self._last_offset
+        if millis <= last_millis:
+            millis, seq = last_millis, last_seq + 1
+        else:
+            seq = 0
+        self._last_offset = (millis, seq)
+        return f"{millis}-{seq}"
+
+    def _remove_oldest(self, key: str) -> None:
+        log = self.logs[key]
+        _, _, frame = log.popleft()
+        self.bytes -= len(frame)
+        self.entries -= 1
+        self.stats["evicted"] += 1
+        if not log:
+            del self.logs[key]
+
+    def _expire(self, key: str, now: float) -> None:
+        cutoff = now - self.ttl_seconds
+        while key in self.logs and self.logs[key][0][1] < cutoff:
+            self._remove_oldest(key)
+
+    async def append(self, restaurant_id: str, user_id: str, frame: str) -> str:
+        key = replay_key(restaurant_id, user_id)
+        now = time.time()
+        self._expire(key, now)
+        offset = self._next_offset()
+
+        log = self.logs.setdefault(key, deque())
+        self.logs.move_to_end(key)
+        log.append((offset, now, frame))
+        self.bytes += len(frame)
+        self.entries += 1
+        self.stats["appended"] += 1
+
+        if len(log) > self.max_entries:
+            self._remove_oldest(key)
+        # Shed the least recently written users first when over the byte budget
+        while self.bytes > self.max_bytes and self.logs:
+            self._remove_oldest(next(iter(self.logs)))
+        return offset
+
+    async def read_since(
+        self, restaurant_id: str, user_id: str, after: Optional[str] = None
+    ) -> List[ReplayEntry]:
+        key = replay_key(restaurant_id, user_id)
+        self._expire(key, time.time())
+        log = self.logs.get(key, ())
+        after_offset = parse_offset(after) if after else None
+        entries = [
+            (offset, frame)
+            for offset, _, frame in log
+            if after_offset is None or parse_offset(offset) > after_offset
+        ]
+        self.stats["replayed"] += len(entries)
+        return entries
+
+    async def get_cursor(self, restaurant_id: str, user_id: str) -> Optional[str]:
+        key = replay_key(restaurant_id, user_id)
+        cursor = self.cursors.get(key)
+        if cursor is None:
+            return None
+        offset, stored_at = cursor
+        if stored_at < time.time() - self.ttl_seconds:
+            del self.cursors[key]
+            return None
+        return offset
+
+    async def set_cursor(self, restaurant_id: str, user_id: str, offset: str) -> None:
+        self.cursors[replay_key(restaurant_id, user_id)] = (offset, time.time())
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **super().get_stats(),
+            "users": len(self.logs),
+            "entries": self.entries,
+            "bytes": self.bytes,
+            "max_bytes": self.max_bytes,
+        }
+
+
+class RedisStreamReplayLog(ReplayLog):
+    """
+    One Redis stream per (restaurant, user), capped with MAXLEN and expired
+    as a whole after the TTL. Reads also skip entries older than the TTL, since
+    a busy stream is never idle long enough to expire. Stream keys are also
+    registered in STREAMS_KEY with their expiry time, so stats can find the
+    live streams without scanning the keyspace.
+    """
+
+    def __init__(self, redis, ttl_seconds: int, max_entries: int):
+        super().__init__(ttl_seconds, max_entries)
+        self.redis = redis
+        # Totals across all workers, as of the last refresh_stats()
+        self.users = 0
+        self.entries = 0
+        self.bytes = 0
+
+    async def append(self, restaurant_id: str, user_id: str, frame: str) -> str:
+        key = replay_key(restaurant_id, user_id)
+        try:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                pipe.xadd(
+                    key, {"f": frame}, maxlen=self.max_entries, approximate=False
+                )
+                pipe.expire(key, self.ttl_seconds)
+                pipe.zadd(STREAMS_KEY, {key: time.time() + self.ttl_seconds})
+                pipe.expire(STREAMS_KEY, self.ttl_seconds)
+                offset = (await pipe.execute())[0]
+        except Exception:
+            self.stats["append_errors"] += 1
+            raise
+        if isinstance(offset, bytes):
+            offset = offset.decode()
+        self.stats["appended"] += 1
+        return offset
+
+    async def read_since(
+        self, restaurant_id: str, user_id: str, after: Optional[str] = None
+    ) -> List[ReplayEntry]:
+        oldest = f"{int((time.time() - self.ttl_seconds) * 1000)}-0"
+        start = oldest
+        if after and parse_offset(after) >= parse_offset(oldest):
+            start = f"({after}"
+        raw = await self.redis.xrange(
+            replay_key(restaurant_id, user_id),
+            min=start,
+            max="+",
+            count=self.max_entries,
+        )
+        entries = []
+        for offset, fields in raw:
+            if isinstance(offset, bytes):
+                offset = offset.decode()
+            frame = fields.get("f", fields.get(b"f"))
+            if isinstance(frame, bytes):
+                frame = frame.decode()
+            entries.append((offset, frame))
+        self.stats["replayed"] += len(entries)
+        return entries
+
+    async def get_cursor(self, restaurant_id: str, user_id: str) -> Optional[str]:
+        cursor = await self.redis.get(f"{replay_key(restaurant_id, user_id)}:cursor")
+        if isinstance(cursor, bytes):
+            cursor = cursor.decode()
+        return cursor
+
+    async def set_cursor(self, restaurant_id: str, user_id: str, offset: str) -> None:
+        await self.redis.set(
+            f"{replay_key(restaurant_id, user_id)}:cursor",
+            offset,
+            ex=self.ttl_seconds,
+        )
+
+    async def refresh_stats(self) -> None:
+        """
+        Count the registered streams' entries (XLEN) and memory (MEMORY USAGE),
+        dropping registrations whose stream has expired
+        """
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.zremrangebyscore(STREAMS_KEY, "-inf", time.time())
+            pipe.zrange(STREAMS_KEY, 0, -1)
+            _, keys = await pipe.execute()
+        users = entries = size = 0
+        if keys:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                for key in keys:
+                    pipe.xlen(key)
+                    pipe.memory_usage(key)
+                results = await pipe.execute()
+            # A stream can expire just before its registration does
+            for length, usage in zip(results[::2], results[1::2]):
+                if length:
+                    users += 1
+                    entries += length
+                    size += usage or 0
+        self.users, self.entries, self.bytes = users, entries, size
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **super().get_stats(),
+            "users": self.users,
+            "entries": self.entries,
+            "bytes": self.bytes,
+        }
+
+
+def create_replay_log(redis_client=None) -> ReplayLog:
+    """Redis streams when Redis is connected, otherwise the in-memory log"""
+    ttl = settings.WEBSOCKET_REPLAY_TTL_SECONDS
+    max_entries = settings.WEBSOCKET_REPLAY_MAX_ENTRIES
+    if redis_client is not None and redis_client.redis:
+        return RedisStreamReplayLog(redis_client.redis, ttl, max_entries)
+    return InMemoryReplayLog(ttl, max_entries, settings.WEBSOCKET_REPLAY_MAX_BYTES)
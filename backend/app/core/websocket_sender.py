@@ -0,0 +1,137 @@
+"""
+Outbound delivery for WebSocketManager connections.
+
+Each connection owns a bounded queue drained by its own writer task. A
+broadcast encodes the message once and hands the same frame to every queue
+without awaiting any socket, so one slow tablet cannot hold up the rest of
+the restaurant. A consumer whose queue overflows, or that takes longer than
+the send timeout to accept a frame, is dropped and disconnected.
+"""
+
+import asyncio
+import json
+import logging
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from fastapi import WebSocket
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+# Close code for consumers dropped for falling behind ("try again later")
+SLOW_CONSUMER_CLOSE_CODE = 1013
+
+DropHandler = Callable[[str, str], Awaitable[None]]
+
+
+def encode_message(payload: Dict[str, Any]) -> str:
+    """Serialize an outbound frame, using orjson when it is installed"""
+    if orjson is not None:
+        return orjson.dumps(
+            payload, default=str, option=orjson.OPT_NON_STR_KEYS
+        ).decode()
+    return json.dumps(payload, default=str)
+
+
+class ConnectionSender:
+    """Bounded send queue and writer task for a single WebSocket"""
+
+    def __init__(
+        self,
+        connection_id: str,
+        websocket: WebSocket,
+        on_drop: DropHandler,
+        stats: Dict[str, int],
+        max_queue: int = 256,
+        send_timeout: float = 5.0,
+    ):
+        self.connection_id = connection_id
+        self.websocket = websocket
+        self.on_drop = on_drop
+        self.stats = stats
+        self.send_timeout = send_timeout
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        self.closed = False
+        self._writer: Optional[asyncio.Task] = None
+        self._drop_task: Optional[asyncio.Task] = None
+        self._timed_out = False
+
+    def offer(self, frame: str) -> bool:
+        """Queue an encoded frame without waiting; False if it was not accepted"""
+        if self.closed:
+            return False
+        try:
+            self.queue.put_nowait(frame)
+        except asyncio.QueueFull:
+            self._drop("send queue full")
+            return False
+        if self._writer is None:
+            self._writer = asyncio.create_task(self._run())
+        return True
+
+    async def join(self):
+        """Wait until every queued frame has been written or discarded"""
+        await self.queue.join()
+
+    def close(self):
+        """Stop the writer and discard anything still queued"""
+        self.closed = True
+        self._discard_pending()
+        if self._writer and self._writer is not asyncio.current_task():
+            self._writer.cancel()
+
+    async def _run(self):
+        # Runs only while frames are pending, so idle sockets hold no task
+        loop = asyncio.get_running_loop()
+        writer = asyncio.current_task()
+        while not self.closed and not self.queue.empty():
+            frame = self.queue.get_nowait()
+            # A timer handle is much cheaper than wait_for's extra task per frame
+            self._timed_out = False
+            timer = loop.call_later(self.send_timeout, self._expire, writer)
+            try:
+                await self.websocket.send_text(frame)
+                self.stats["messages_sent"] += 1
+            except asyncio.CancelledError:
+                if not self._timed_out:
+                    raise
+                self.stats["messages_failed"] += 1
+                self._drop("send timed out")
+            except Exception as e:
+                self.stats["messages_failed"] += 1
+                self._drop(f"send failed: {str(e)}")
+            finally:
+                timer.cancel()
+                self.queue.task_done()
+        self._writer = None
+
+    def _expire(self, writer: asyncio.Task):
+        self._timed_out = True
+        writer.cancel()
+
+    def _drop(self, reason: str):
+        if self.closed:
+            return
+        self.closed = True
+        self._discard_pending()
+        self._drop_task = asyncio.create_task(self._notify_drop(reason))
+
+    async def _notify_drop(self, reason: str):
+        try:
+            await asyncio.wait_for(
+                self.websocket.close(code=SLOW_CONSUMER_CLOSE_CODE),
+                timeout=self.send_timeout,
+            )
+        except Exception:
+            pass
+        await self.on_drop(self.connection_id, reason)
+
+    def _discard_pending(self):
+        while not self.queue.empty():
+            self.queue.get_nowait()
+            self.queue.task_done()
+            self.stats["messages_failed"] += 1
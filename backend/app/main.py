@@ -20,7 +20,7 @@ from app.core.redis_client import close_redis
 from app.middleware.rate_limit_middleware import init_fastapi_limiter
 from slowapi import _rate_limit_exceeded_handler
 from slowapi.errors import RateLimitExceeded
-from slowapi.middleware import SlowAPIMiddleware
+from slowapi.middleware import SlowAPIASGIMiddleware
 from app.core.responses import APIResponseHelper
 
 from app.middleware.sql_injection_waf import SQLInjectionWAFMiddleware
@@ -30,7 +30,10 @@ from app.core.logging_filters import setup_logging_filters
 from app.middleware.version_middleware import APIVersionMiddleware
 from app.middleware.security_headers_middleware import SecurityHeadersMiddleware
 from app.middleware.rls_middleware import RLSMiddleware
+from app.middleware.asgi import middleware_timer, set_timing_hook
 from app.core.mobile_middleware import MobileCompatibilityMiddleware
+from app.services import sales_rollup_service  # noqa: F401 - rollup listeners
+from app.services import order_line_service  # noqa: F401 - order line listeners
 
 # Configure logging
 # Logging level will be set by Uvicorn based on settings.LOG_LEVEL
@@ -96,6 +99,19 @@ async def lifespan(app: FastAPI):
 
         await init_instance_tracker(redis_client)
 
+        logger.info("Attaching WebSocket broker...")
+        from app.core.websocket import (
+            init_websocket_broker,
+            init_websocket_replay_log,
+        )
+
+        await init_websocket_broker(redis_client)
+        init_websocket_replay_log(redis_client)
+
+        from app.core.cache_service import cache_service
+
+        await cache_service.start_invalidation_listener()
+
         # Initialize cache warming
         logger.info("Initializing cache warming...")
         from app.core.cache_warmer import warm_cache_on_startup, warm_cache_task
@@ -113,6 +129,14 @@ async def lifespan(app: FastAPI):
         asyncio.create_task(warm_cache_task())
         logger.info("✅ Cache warming initialized")
 
+        from app.core.partitioning import partition_maintenance_task
+
+        asyncio.create_task(partition_maintenance_task())
+
+        from app.core.sync_manager import tombstone_purge_task
+
+        asyncio.create_task(tombstone_purge_task())
+
         logger.info("✅ Core services initialized successfully")
     except Exception as e:
         logger.error(f"Core services initialization failed: {e}")
@@ -126,6 +150,18 @@ async def lifespan(app: FastAPI):
 
     await stop_instance_tracker()
 
+    from app.core.websocket import close_websocket_broker
+
+    await close_websocket_broker()
+
+    from app.core.cache_service import cache_service
+
+    await cache_service.stop_invalidation_listener()
+
+    from app.services.payment_providers.transport import close_payment_transport
+
+    await close_payment_transport()
+
     logger.info("Closing Redis connection...")
     await close_redis()
 
@@ -213,6 +249,7 @@ app.add_middleware(
         "PATCH",
     ],  # Restricted to specific methods for security
     allow_headers=["*"],  # Could be restricted to specific headers if needed
+    expose_headers=["X-Next-Cursor"],  # Keyset cursor of customer list pages
     allow_origin_regex=vercel_preview_regex,  # None if not enabled
 )
 
@@ -220,6 +257,10 @@ logger.info("CORS middleware configured successfully")
 
 
 # Re-enabled optimized middleware with performance improvements
+# All of these are pure ASGI middlewares; per-middleware timing is opt-in
+if settings.MIDDLEWARE_TIMING_ENABLED:
+    set_timing_hook(middleware_timer.record)
+
 # Add API version middleware for backward compatibility (FIRST in middleware stack)
 app.add_middleware(APIVersionMiddleware)
 
@@ -230,7 +271,12 @@ app.add_middleware(SecurityHeadersMiddleware)
 app.add_middleware(RLSMiddleware)
 
 # Add SQL Injection WAF middleware for additional protection
-app.add_middleware(SQLInjectionWAFMiddleware, enabled=True, log_attacks=True)
+app.add_middleware(
+    SQLInjectionWAFMiddleware,
+    enabled=True,
+    log_attacks=True,
+    max_body_bytes=settings.WAF_MAX_BODY_BYTES,
+)
 
 # Add mobile compatibility middleware (without CORS to avoid duplication)
 app.add_middleware(
@@ -239,7 +285,7 @@ app.add_middleware(
 # Note: MobileDataOptimizationMiddleware not enabled due to async issues
 
 # Add SlowAPI middleware (for rate limiting)
-app.add_middleware(SlowAPIMiddleware)
+app.add_middleware(SlowAPIASGIMiddleware)
 
 # Register standardized exception handlers
 # register_exception_handlers(app) # General handlers
@@ -0,0 +1,70 @@
+"""
+Shared helpers for the pure ASGI middleware stack
+
+The middlewares in app.main wrap ``send`` instead of subclassing
+BaseHTTPMiddleware, so each request runs in a single task and streaming
+responses pass through untouched. Each one reports the time spent in its own
+code (not in the layers below it) to an optional timing hook.
+"""
+
+from typing import Callable, Dict, Optional
+
+from starlette.types import Scope
+
+TimingHook = Callable[[str, float], None]
+
+_timing_hook: Optional[TimingHook] = None
+
+HEALTH_PATHS = frozenset(["/health", "/api/health", "/"])
+
+
+def set_timing_hook(hook: Optional[TimingHook]) -> None:
+    """Install a callable receiving (middleware name, seconds) per request"""
+    global _timing_hook
+    _timing_hook = hook
+
+
+def report_timing(name: str, seconds: float) -> None:
+    """Pass one request's own time for a middleware to the timing hook"""
+    if _timing_hook is not None:
+        _timing_hook(name, seconds)
+
+
+def request_path(scope: Scope) -> str:
+    """The path as ``Request.url.path`` reports it"""
+    return scope.get("root_path", "") + scope["path"]
+
+
+class MiddlewareTimer:
+    """Aggregates per-middleware own time; install ``record`` as the hook"""
+
+    def __init__(self):
+        self._stats: Dict[str, list] = {}
+
+    def record(self, name: str, seconds: float) -> None:
+        stats = self._stats.get(name)
+        if stats is None:
+            self._stats[name] = [1, seconds, seconds]
+            return
+        stats[0] += 1
+        stats[1] += seconds
+        if seconds > stats[2]:
+            stats[2] = seconds
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        return {
+            name: {
+                "requests": count,
+                "mean_us": round(total / count * 1_000_000, 2),
+                "max_us": round(peak * 1_000_000, 2),
+                "total_ms": round(total * 1000, 2),
+            }
+            for name, (count, total, peak) in self._stats.items()
+        }
+
+    def reset(self) -> None:
+        self._stats.clear()
+
+
+# Global timer, installed as the hook when MIDDLEWARE_TIMING_ENABLED is set
+middleware_timer = MiddlewareTimer()
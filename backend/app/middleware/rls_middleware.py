@@ -4,52 +4,52 @@ Automatically sets session variables for database RLS policies
 """
 
 from fastapi import Request, Depends
-from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.types import ASGIApp, Receive, Scope, Send
 import logging
+import time
 from typing import Optional
 
 from app.core.database import RLSContext
 from app.core.auth import get_current_user
 from app.core.database import User
+from app.middleware.asgi import report_timing, request_path
 
 logger = logging.getLogger(__name__)
 
 
-class RLSMiddleware(BaseHTTPMiddleware):
+class RLSMiddleware:
     """
     Middleware to automatically set RLS context based on authenticated user.
     This ensures that all database queries in a request have proper tenant isolation.
     """
 
-    async def dispatch(self, request: Request, call_next):
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
         # Skip RLS for public endpoints
-        if self._is_public_endpoint(request.url.path):
-            return await call_next(request)
+        if scope["type"] != "http" or self._is_public_endpoint(request_path(scope)):
+            await self.app(scope, receive, send)
+            return
 
-        # Try to extract user from request
-        # Note: This is a simplified version. In production, you might want to
-        # extract the token and validate it here, or use a different approach
-        # based on your authentication flow.
+        # For authenticated endpoints, the user will be set by the auth dependency
+        # We'll let the dependency injection handle it, but we can set up
+        # a request state for later use
+        started = time.perf_counter()
+        scope.setdefault("state", {})["rls_context"] = None
+        report_timing("rls", time.perf_counter() - started)
 
         try:
-            # For authenticated endpoints, the user will be set by the auth dependency
-            # We'll let the dependency injection handle it, but we can set up
-            # a request state for later use
-            request.state.rls_context = None
-
-            response = await call_next(request)
-
-            # Clear RLS context after request
-            RLSContext.clear()
-
-            return response
-
+            await self.app(scope, receive, send)
         except Exception as e:
             # Always clear RLS context on error
             RLSContext.clear()
             logger.error(f"Error in RLS middleware: {e}")
             raise
 
+        # Clear RLS context after request
+        RLSContext.clear()
+
     def _is_public_endpoint(self, path: str) -> bool:
         """Check if endpoint is public and doesn't need RLS"""
         public_paths = [
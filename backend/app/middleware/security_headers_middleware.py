@@ -1,12 +1,15 @@
-from fastapi import Request, Response
-from starlette.middleware.base import BaseHTTPMiddleware
-from typing import Callable
+import time
+
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
 from app.core.config import settings
+from app.middleware.asgi import HEALTH_PATHS, report_timing, request_path
 
 
-class SecurityHeadersMiddleware(BaseHTTPMiddleware):
-    def __init__(self, app):
-        super().__init__(app)
+class SecurityHeadersMiddleware:
+    def __init__(self, app: ASGIApp):
+        self.app = app
         # Pre-compute policies for performance
         self._prod_csp = self.get_production_csp()
         self._dev_csp = self.get_development_csp()
@@ -31,20 +34,24 @@ class SecurityHeadersMiddleware(BaseHTTPMiddleware):
             "Permissions-Policy": "camera=(), microphone=(), geolocation=()",
         }
 
-    async def dispatch(self, request: Request, call_next: Callable) -> Response:
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
         # Fast path for health checks - critical for DigitalOcean
-        if request.url.path in ["/health", "/api/health", "/"]:
-            return await call_next(request)
-
-        response = await call_next(request)
+        if scope["type"] != "http" or request_path(scope) in HEALTH_PATHS:
+            await self.app(scope, receive, send)
+            return
 
-        # Use pre-computed headers for performance
-        if settings.ENVIRONMENT == "production":
-            response.headers.update(self._prod_headers)
-        else:
-            response.headers.update(self._dev_headers)
+        async def send_with_headers(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                started = time.perf_counter()
+                # Use pre-computed headers for performance
+                if settings.ENVIRONMENT == "production":
+                    MutableHeaders(scope=message).update(self._prod_headers)
+                else:
+                    MutableHeaders(scope=message).update(self._dev_headers)
+                report_timing("security_headers", time.perf_counter() - started)
+            await send(message)
 
-        return response
+        await self.app(scope, receive, send_with_headers)
 
     def get_production_csp(self):
         # Base policy: restrict to self, allow necessary scripts and styles
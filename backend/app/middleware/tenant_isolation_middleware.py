@@ -4,75 +4,88 @@ Ensures all API requests are properly isolated by restaurant
 Platform owners (Ryan and Arnaud) bypass all restrictions
 """
 
-from fastapi import Request, Response
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.types import ASGIApp
+from fastapi import Request
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 import json
 import logging
-from typing import Callable
+import time
 
 from app.core.tenant_security import TenantSecurity
+from app.middleware.asgi import report_timing, request_path
 
 logger = logging.getLogger(__name__)
 
 
-class TenantIsolationMiddleware(BaseHTTPMiddleware):
+class TenantIsolationMiddleware:
     """
     Middleware to enforce tenant isolation across all API endpoints
     """
 
+    PUBLIC_ENDPOINTS = [
+        "/api/v1/auth/login",
+        "/api/v1/auth/register",
+        "/api/v1/auth/verify",
+        "/api/v1/health",
+        "/api/docs",
+        "/api/openapi.json",
+    ]
+
     def __init__(self, app: ASGIApp):
-        super().__init__(app)
+        self.app = app
 
-    async def dispatch(self, request: Request, call_next: Callable) -> Response:
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
         """
         Process each request to ensure tenant isolation
         """
-        # Skip middleware for non-API routes
-        if not request.url.path.startswith("/api/"):
-            return await call_next(request)
-
-        # Skip for public endpoints
-        public_endpoints = [
-            "/api/v1/auth/login",
-            "/api/v1/auth/register",
-            "/api/v1/auth/verify",
-            "/api/v1/health",
-            "/api/docs",
-            "/api/openapi.json",
-        ]
-
-        if any(request.url.path.startswith(endpoint) for endpoint in public_endpoints):
-            return await call_next(request)
-
-        try:
-            # Log the request for security audit
-            if hasattr(request.state, "user") and request.state.user:
-                user = request.state.user
-                is_platform_owner = TenantSecurity.is_platform_owner(user)
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
 
-                logger.info(
-                    f"API Request: {request.method} {request.url.path} | "
-                    f"User: {user.email} | "
-                    f"Role: {user.role} | "
-                    f"Restaurant: {user.restaurant_id} | "
-                    f"Platform Owner: {is_platform_owner}"
-                )
+        path = request_path(scope)
 
-                # Add security headers to response
-                response = await call_next(request)
-                response.headers["X-Tenant-Isolated"] = "true"
-                response.headers["X-Platform-Owner"] = str(is_platform_owner)
+        # Skip middleware for non-API routes and public endpoints
+        if not path.startswith("/api/") or any(
+            path.startswith(endpoint) for endpoint in self.PUBLIC_ENDPOINTS
+        ):
+            await self.app(scope, receive, send)
+            return
 
-                return response
-            else:
-                # No user context, proceed normally
-                return await call_next(request)
+        user = scope.get("state", {}).get("user")
+        if not user:
+            # No user context, proceed normally
+            await self.app(scope, receive, send)
+            return
 
+        started = time.perf_counter()
+        try:
+            # Log the request for security audit
+            is_platform_owner = TenantSecurity.is_platform_owner(user)
+
+            logger.info(
+                f"API Request: {scope['method']} {path} | "
+                f"User: {user.email} | "
+                f"Role: {user.role} | "
+                f"Restaurant: {user.restaurant_id} | "
+                f"Platform Owner: {is_platform_owner}"
+            )
         except Exception as e:
             logger.error(f"Tenant isolation middleware error: {str(e)}")
             # Don't break the request, just log the error
-            return await call_next(request)
+            await self.app(scope, receive, send)
+            return
+        spent = time.perf_counter() - started
+
+        async def send_with_headers(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                # Add security headers to response
+                response_headers = MutableHeaders(scope=message)
+                response_headers["X-Tenant-Isolated"] = "true"
+                response_headers["X-Platform-Owner"] = str(is_platform_owner)
+                report_timing("tenant_isolation", spent)
+            await send(message)
+
+        await self.app(scope, receive, send_with_headers)
 
 
 class TenantValidationMiddleware:
@@ -5,9 +5,12 @@ Provides automatic version detection and backward compatibility
 
 from fastapi import Request, Response
 import re
+import time
 from typing import Optional
 import logging
 
+from app.middleware.asgi import HEALTH_PATHS, report_timing
+
 logger = logging.getLogger(__name__)
 
 
@@ -39,10 +42,12 @@ class APIVersionMiddleware:
             path = scope.get("path", "")
 
             # Skip health checks for performance
-            if path in ["/health", "/api/health", "/"]:
+            if path in HEALTH_PATHS:
                 await self.app(scope, receive, send)
                 return
 
+            started = time.perf_counter()
+
             # Check cache first
             if path in self._path_cache:
                 rewritten_path = self._path_cache[path]
@@ -66,6 +71,8 @@ class APIVersionMiddleware:
                 scope["path"] = rewritten_path
                 scope["raw_path"] = rewritten_path.encode()
 
+            report_timing("api_version", time.perf_counter() - started)
+
         # Continue with the request
         await self.app(scope, receive, send)
 
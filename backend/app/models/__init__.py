@@ -35,6 +35,9 @@ from .reports import (
     ProductPerformance,
     EmployeePerformance,
     FinancialSummary,
+    HourlySalesRollup,
+    DailySalesRollup,
+    OrderLine,
 )
 
 # Import models from stock_movement.py
@@ -49,6 +52,9 @@ from .stock_movement import (
     InventoryCountItem,
 )
 
+# Import models from sync.py
+from .sync import SyncTombstone
+
 # Import models from subscription.py (singular)
 from .subscription import SubscriptionPlan, RestaurantSubscription, SubscriptionUsage
 
@@ -87,6 +93,9 @@ __all__ = [
     "ProductPerformance",
     "EmployeePerformance",
     "FinancialSummary",
+    "HourlySalesRollup",
+    "DailySalesRollup",
+    "OrderLine",
     # Stock movement models
     "MovementType",
     "Supplier",
@@ -96,6 +105,8 @@ __all__ = [
     "StockAlert",
     "InventoryCount",
     "InventoryCountItem",
+    # Sync models
+    "SyncTombstone",
     # Subscription models
     "SubscriptionPlan",
     "RestaurantSubscription",
@@ -12,6 +12,7 @@ from sqlalchemy import (
     Date,
     DECIMAL,
     ForeignKey,
+    Index,
     UniqueConstraint,
 )
 from sqlalchemy.dialects.postgresql import UUID, JSONB
@@ -309,3 +310,116 @@ class FinancialSummary(Base):
             "restaurant_id", "period_type", "period_start", name="uq_financial_summary"
         ),
     )
+
+
+class SalesRollupMixin:
+    """
+    Additive per-restaurant sales counters for one time bucket.
+
+    Maintained incrementally as orders move in or out of completed/refunded
+    (see app.services.sales_rollup_service), so every column must stay a sum
+    that can be adjusted by a delta.
+    """
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    restaurant_id = Column(
+        UUID(as_uuid=True), ForeignKey("restaurants.id"), nullable=False
+    )
+    bucket_start = Column(DateTime, nullable=False)  # UTC, truncated to the bucket
+
+    # Completed orders
+    order_count = Column(Integer, nullable=False, default=0)
+    revenue = Column(DECIMAL(12, 2), nullable=False, default=0)
+    subtotal = Column(DECIMAL(12, 2), nullable=False, default=0)
+    total_tax = Column(DECIMAL(12, 2), nullable=False, default=0)
+    total_service_charge = Column(DECIMAL(12, 2), nullable=False, default=0)
+    total_discounts = Column(DECIMAL(12, 2), nullable=False, default=0)
+
+    # Payment breakdown of completed orders
+    cash_sales = Column(DECIMAL(12, 2), nullable=False, default=0)
+    card_sales = Column(DECIMAL(12, 2), nullable=False, default=0)
+    qr_sales = Column(DECIMAL(12, 2), nullable=False, default=0)
+    other_sales = Column(DECIMAL(12, 2), nullable=False, default=0)
+
+    # Order types of completed orders
+    dine_in_orders = Column(Integer, nullable=False, default=0)
+    takeaway_orders = Column(Integer, nullable=False, default=0)
+    delivery_orders = Column(Integer, nullable=False, default=0)
+
+    # Refunded orders
+    refunded_orders = Column(Integer, nullable=False, default=0)
+    refunded_amount = Column(DECIMAL(12, 2), nullable=False, default=0)
+
+    updated_at = Column(
+        DateTime(timezone=True), server_default=func.now(), onupdate=func.now()
+    )
+
+
+class HourlySalesRollup(SalesRollupMixin, Base):
+    """Hourly sales buckets per restaurant"""
+
+    __tablename__ = "hourly_sales_rollups"
+
+    __table_args__ = (
+        UniqueConstraint(
+            "restaurant_id", "bucket_start", name="uq_hourly_sales_rollup"
+        ),
+    )
+
+
+class DailySalesRollup(SalesRollupMixin, Base):
+    """Daily sales buckets per restaurant"""
+
+    __tablename__ = "daily_sales_rollups"
+
+    __table_args__ = (
+        UniqueConstraint("restaurant_id", "bucket_start", name="uq_daily_sales_rollup"),
+    )
+
+
+class OrderLine(Base):
+    """
+    One row per line of an order's items JSONB, for product mix reports.
+
+    A projection of orders.items maintained by the listeners in
+    app.services.order_line_service. completed_at is only set while the order
+    is completed, so cancelled and refunded orders drop out of the indexes
+    below while keeping their lines.
+    """
+
+    __tablename__ = "order_lines"
+
+    order_id = Column(
+        UUID(as_uuid=True),
+        ForeignKey("orders.id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    line_number = Column(Integer, primary_key=True)  # position in orders.items
+    restaurant_id = Column(UUID(as_uuid=True), nullable=False)
+    product_id = Column(UUID(as_uuid=True), nullable=True)  # NULL if not a UUID
+    category_id = Column(UUID(as_uuid=True), nullable=True)
+    quantity = Column(Integer, nullable=False, default=0)
+    unit_price = Column(DECIMAL(10, 2), nullable=False, default=0)
+    modifiers_total = Column(DECIMAL(10, 2), nullable=False, default=0)  # per unit
+    line_total = Column(DECIMAL(12, 2), nullable=False, default=0)
+    ordered_at = Column(DateTime(timezone=True), nullable=False)  # orders.created_at
+    completed_at = Column(DateTime(timezone=True), nullable=True)
+
+    __table_args__ = (
+        # Top-N products: range scan per restaurant, grouped without heap reads
+        Index(
+            "idx_order_lines_product_mix",
+            "restaurant_id",
+            "ordered_at",
+            postgresql_include=["product_id", "quantity", "line_total"],
+            postgresql_where=completed_at.isnot(None),
+        ),
+        Index(
+            "idx_order_lines_category_mix",
+            "restaurant_id",
+            "category_id",
+            "ordered_at",
+            postgresql_include=["quantity", "line_total"],
+            postgresql_where=completed_at.isnot(None),
+        ),
+    )
@@ -0,0 +1,27 @@
+"""
+Offline Sync Models
+Tombstones recording deleted rows so devices can drop them on the next sync
+"""
+
+from sqlalchemy import Column, String, DateTime, Index
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.sql import func
+import uuid
+from app.core.database import Base
+
+
+class SyncTombstone(Base):
+    """A deleted order, product, customer or payment, kept for sync clients"""
+
+    __tablename__ = "sync_tombstones"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    restaurant_id = Column(UUID(as_uuid=True), nullable=False)
+    entity_type = Column(String(20), nullable=False)  # orders, products, ...
+    entity_id = Column(UUID(as_uuid=True), nullable=False)
+    deleted_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        # Keyset order used by the sync download cursor
+        Index("ix_sync_tombstones_cursor", "restaurant_id", "deleted_at", "id"),
+    )
@@ -43,6 +43,8 @@ class CustomerSearchRequest(BaseSearchRequest):
     name: Optional[str] = Field(None, max_length=100)
     min_spent: Optional[float] = Field(None, ge=0)
     restaurant_id: Optional[str] = None
+    # next_cursor from the previous page; replaces page
+    cursor: Optional[str] = Field(None, max_length=512)
 
     ALLOWED_SORT_FIELDS: ClassVar[List[str]] = [
         "created_at",
@@ -1,13 +1,13 @@
 """
 Cache Service for Platform Settings
-Provides fast access to frequently requested configuration
+Provides fast access to frequently requested configuration through the
+shared two-tier CacheService
 """
 
-import json
 import logging
 from typing import Dict, Any, Optional
 
-from app.core.redis_client import get_redis
+from app.core.cache_service import cache_service
 
 logger = logging.getLogger(__name__)
 
@@ -26,53 +26,20 @@ class PlatformCacheService:
     @staticmethod
     async def get_service_charge_config() -> Optional[Dict[str, Any]]:
         """Get service charge configuration from cache"""
-        try:
-            redis = await get_redis()
-            if not redis:
-                return None
-
-            cache_key = PlatformCacheService.get_cache_key("service_charge")
-            cached_data = await redis.get(cache_key)
-
-            if cached_data:
-                return json.loads(cached_data)
-
-            return None
-
-        except Exception as e:
-            logger.warning(f"Cache read failed: {e}")
-            return None
+        cache_key = PlatformCacheService.get_cache_key("service_charge")
+        cached_data = await cache_service.get(cache_key)
+        return cached_data if isinstance(cached_data, dict) else None
 
     @staticmethod
     async def set_service_charge_config(
         config: Dict[str, Any], ttl: int = DEFAULT_TTL
     ) -> bool:
         """Set service charge configuration in cache"""
-        try:
-            redis = await get_redis()
-            if not redis:
-                return False
-
-            cache_key = PlatformCacheService.get_cache_key("service_charge")
-            await redis.setex(cache_key, ttl, json.dumps(config))
-            return True
-
-        except Exception as e:
-            logger.warning(f"Cache write failed: {e}")
-            return False
+        cache_key = PlatformCacheService.get_cache_key("service_charge")
+        return await cache_service.set(cache_key, config, ttl)
 
     @staticmethod
     async def invalidate_service_charge_config() -> bool:
-        """Invalidate service charge configuration cache"""
-        try:
-            redis = await get_redis()
-            if not redis:
-                return False
-
-            cache_key = PlatformCacheService.get_cache_key("service_charge")
-            await redis.delete(cache_key)
-            return True
-
-        except Exception as e:
-            logger.warning(f"Cache invalidation failed: {e}")
-            return False
+        """Invalidate service charge configuration cache on every worker"""
+        cache_key = PlatformCacheService.get_cache_key("service_charge")
+        return await cache_service.delete(cache_key)
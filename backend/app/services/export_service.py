@@ -0,0 +1,522 @@
+"""
+Export Service
+Streaming portal exports and bulk menu import
+
+Each dataset is a plain column select read through a server-side cursor in
+EXPORT_BATCH_SIZE partitions and encoded one partition at a time, so memory
+stays flat whether a site exports a day or a year of orders. CSV and JSON
+are written straight to the response; XLSX (openpyxl) and Parquet (pyarrow)
+are optional, spool through a temporary file because both formats need a
+footer, and are streamed back out once complete.
+"""
+
+import csv
+import io
+import json
+import logging
+import tempfile
+import uuid
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Union
+
+from pydantic import BaseModel, Field, ValidationError
+from sqlalchemy import (
+    Boolean,
+    DateTime,
+    Integer,
+    Numeric,
+    insert,
+    select,
+    update,
+)
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import Select
+
+from app.core.config import settings
+from app.core.database import (
+    Category,
+    Customer,
+    InventoryItem,
+    Order,
+    Payment,
+    Product,
+    SessionLocal,
+)
+from app.core.exceptions import FynloException, ErrorCodes, ValidationException
+
+try:
+    from openpyxl import Workbook
+except ImportError:
+    Workbook = None
+
+try:
+    import pyarrow
+    import pyarrow.parquet as parquet
+except ImportError:
+    pyarrow = None
+    parquet = None
+
+logger = logging.getLogger(__name__)
+
+EXPORT_MEDIA_TYPES = {
+    "csv": "text/csv",
+    "json": "application/json",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+# Spooled XLSX/Parquet output stays in memory up to this size, then on disk
+SPOOL_MAX_BYTES = 8 * 1024 * 1024
+READ_CHUNK_BYTES = 64 * 1024
+
+
+def _date_window(query: Select, column, date_from, date_to) -> Select:
+    if date_from:
+        query = query.where(column >= datetime.combine(date_from, time.min))
+    if date_to:
+        end = datetime.combine(date_to + timedelta(days=1), time.min)
+        query = query.where(column < end)
+    return query
+
+
+def _orders_query(restaurant_id: str, date_from, date_to) -> Select:
+    query = select(
+        Order.order_number,
+        Order.created_at,
+        Order.status,
+        Order.order_type,
+        Order.table_number,
+        Order.subtotal,
+        Order.tax_amount,
+        Order.service_charge,
+        Order.discount_amount,
+        Order.total_amount,
+        Order.payment_status,
+    ).where(Order.restaurant_id == restaurant_id)
+    query = _date_window(query, Order.created_at, date_from, date_to)
+    return query.order_by(Order.created_at, Order.id)
+
+
+def _payments_query(restaurant_id: str, date_from, date_to) -> Select:
+    query = (
+        select(
+            Payment.created_at,
+            Order.order_number,
+            Payment.payment_method,
+            Payment.amount,
+            Payment.fee_amount,
+            Payment.net_amount,
+            Payment.status,
+            Payment.processed_at,
+        )
+        .join(Order, Order.id == Payment.order_id)
+        .where(Order.restaurant_id == restaurant_id)
+    )
+    query = _date_window(query, Payment.created_at, date_from, date_to)
+    return query.order_by(Payment.created_at, Payment.id)
+
+
+def _menu_query(restaurant_id: str, date_from, date_to) -> Select:
+    return (
+        select(
+            Category.name.label("category"),
+            Product.name,
+            Product.description,
+            Product.price,
+            Product.sku,
+            Product.is_active,
+            Product.stock_quantity,
+        )
+        .outerjoin(Category, Category.id == Product.category_id)
+        .where(Product.restaurant_id == restaurant_id)
+        .order_by(Category.sort_order, Category.name, Product.name)
+    )
+
+
+def _inventory_query(restaurant_id: str, date_from, date_to) -> Select:
+    return (
+        select(
+            InventoryItem.sku,
+            InventoryItem.name,
+            InventoryItem.qty_g,
+            InventoryItem.par_level_g,
+            InventoryItem.unit,
+            InventoryItem.cost_per_unit,
+            InventoryItem.supplier,
+            InventoryItem.last_updated,
+        )
+        .where(InventoryItem.restaurant_id == restaurant_id)
+        .order_by(InventoryItem.sku)
+    )
+
+
+def _customers_query(restaurant_id: str, date_from, date_to) -> Select:
+    return (
+        select(
+            Customer.first_name,
+            Customer.last_name,
+            Customer.email,
+            Customer.phone,
+            Customer.loyalty_points,
+            Customer.total_spent,
+            Customer.visit_count,
+            Customer.created_at,
+        )
+        .where(Customer.restaurant_id == restaurant_id)
+        .order_by(Customer.created_at, Customer.id)
+    )
+
+
+EXPORT_DATASETS: Dict[str, Callable[..., Select]] = {
+    "orders": _orders_query,
+    "payments": _payments_query,
+    "menu": _menu_query,
+    "inventory": _inventory_query,
+    "customers": _customers_query,
+}
+
+
+def check_export_format(format: str) -> None:
+    """Reject formats whose optional library is not installed"""
+    missing = {"xlsx": (Workbook, "openpyxl"), "parquet": (pyarrow, "pyarrow")}
+    if format in missing and missing[format][0] is None:
+        raise FynloException(
+            message=f"{format.upper()} export requires {missing[format][1]}",
+            error_code=ErrorCodes.VALIDATION_ERROR,
+            status_code=501,
+        )
+
+
+def export_filename(dataset: str, restaurant_id: str, format: str) -> str:
+    return f"{dataset}_{restaurant_id}_{datetime.now().strftime('%Y%m%d')}.{format}"
+
+
+def iter_batches(
+    query: Select,
+    session_factory: Callable[[], Session] = SessionLocal,
+    batch_size: Optional[int] = None,
+) -> Iterator[Sequence[Sequence[Any]]]:
+    """
+    Row batches from a server-side cursor.
+
+    The session is opened here rather than taken from the request because the
+    response body is produced after the request's own session has closed.
+    """
+    db = session_factory()
+    try:
+        result = db.execute(
+            query.execution_options(
+                yield_per=batch_size or settings.EXPORT_BATCH_SIZE
+            )
+        )
+        for partition in result.partitions():
+            yield partition
+    finally:
+        db.close()
+
+
+def _text_value(value: Any) -> Any:
+    if value is None:
+        return ""
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+def _json_value(value: Any) -> Any:
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    return value
+
+
+def _cell_value(value: Any) -> Any:
+    if isinstance(value, datetime) and value.tzinfo is not None:
+        # Excel has no time zones; cells hold naive UTC
+        return value.replace(tzinfo=None) - (value.utcoffset() or timedelta())
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    return value
+
+
+def write_csv(columns: List[str], batches) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for batch in batches:
+        writer.writerows([_text_value(v) for v in row] for row in batch)
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+def write_json(columns: List[str], batches) -> Iterator[bytes]:
+    yield b"["
+    first = True
+    for batch in batches:
+        rows = [
+            json.dumps(dict(zip(columns, map(_json_value, row)))) for row in batch
+        ]
+        if rows:
+            yield (("" if first else ",") + ",".join(rows)).encode()
+            first = False
+    yield b"]"
+
+
+def _drain(spool) -> Iterator[bytes]:
+    spool.seek(0)
+    while True:
+        chunk = spool.read(READ_CHUNK_BYTES)
+        if not chunk:
+            break
+        yield chunk
+
+
+def write_xlsx(columns: List[str], batches) -> Iterator[bytes]:
+    # Write-only worksheets stream rows to a temp file instead of keeping cells
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet()
+    sheet.append(columns)
+    for batch in batches:
+        for row in batch:
+            sheet.append([_cell_value(v) for v in row])
+    with tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES) as spool:
+        workbook.save(spool)
+        yield from _drain(spool)
+
+
+def _arrow_type(column_type):
+    if isinstance(column_type, Boolean):
+        return pyarrow.bool_()
+    if isinstance(column_type, Integer):
+        return pyarrow.int64()
+    if isinstance(column_type, Numeric):
+        return pyarrow.decimal128(column_type.precision or 18, column_type.scale or 2)
+    if isinstance(column_type, DateTime):
+        return pyarrow.timestamp("us", tz="UTC" if column_type.timezone else None)
+    return pyarrow.string()
+
+
+def arrow_schema(query: Select):
+    """Parquet schema from the select's column types, not from sampled rows"""
+    return pyarrow.schema(
+        [(c.key, _arrow_type(c.type)) for c in query.selected_columns]
+    )
+
+
+def write_parquet(columns: List[str], batches, schema) -> Iterator[bytes]:
+    string_columns = [
+        i for i, field in enumerate(schema) if field.type == pyarrow.string()
+    ]
+    with tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES) as spool:
+        with parquet.ParquetWriter(spool, schema) as writer:
+            for batch in batches:
+                data = [list(values) for values in zip(*batch)] or [
+                    [] for _ in columns
+                ]
+                for i in string_columns:
+                    data[i] = [None if v is None else str(v) for v in data[i]]
+                writer.write_table(
+                    pyarrow.Table.from_pydict(dict(zip(columns, data)), schema=schema)
+                )
+        yield from _drain(spool)
+
+
+def stream_export(
+    dataset: str,
+    format: str,
+    restaurant_id: str,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    session_factory: Callable[[], Session] = SessionLocal,
+    batch_size: Optional[int] = None,
+) -> Iterator[bytes]:
+    """Encoded export body for a dataset, produced batch by batch"""
+    check_export_format(format)
+    query = EXPORT_DATASETS[dataset](restaurant_id, date_from, date_to)
+    columns = [c.key for c in query.selected_columns]
+    batches = iter_batches(query, session_factory, batch_size)
+
+    if format == "csv":
+        return write_csv(columns, batches)
+    if format == "json":
+        return write_json(columns, batches)
+    if format == "xlsx":
+        return write_xlsx(columns, batches)
+    return write_parquet(columns, batches, arrow_schema(query))
+
+
+class MenuImportItem(BaseModel):
+    """One product row of a menu import"""
+
+    name: str = Field(..., min_length=1, max_length=255)
+    category: str = Field(..., min_length=1, max_length=255)
+    price: Decimal = Field(..., ge=0, max_digits=10, decimal_places=2)
+    description: Optional[str] = None
+    sku: Optional[str] = Field(None, max_length=100)
+    is_active: bool = True
+
+
+def _menu_payload(payload: Union[List[Any], Dict[str, Any]]):
+    """
+    Item rows and extra category names of a menu import: either the JSON menu
+    export itself (an array of items) or {"items": [...], "categories": ...}
+    with categories as names, {"name": ...} objects or an object keyed by name.
+    """
+    if isinstance(payload, list):
+        return payload, []
+    if not isinstance(payload, dict):
+        raise ValidationException(
+            message="Menu import must be a JSON menu export or an object with items"
+        )
+
+    rows = payload.get("items", [])
+    if not isinstance(rows, list):
+        raise ValidationException(message="items must be a list", field="items")
+
+    categories = payload.get("categories") or []
+    if isinstance(categories, dict):
+        categories = list(categories)
+    if not isinstance(categories, list):
+        raise ValidationException(
+            message="categories must be a list or an object", field="categories"
+        )
+    names = []
+    for category in categories:
+        name = category.get("name") if isinstance(category, dict) else category
+        if not isinstance(name, str) or not 0 < len(name.strip()) <= 255:
+            raise ValidationException(
+                message=f"Invalid category: {category!r}", field="categories"
+            )
+        names.append(name)
+    return rows, names
+
+
+def import_menu(
+    db: Session,
+    restaurant_id: str,
+    payload: Union[List[Any], Dict[str, Any]],
+    batch_size: Optional[int] = None,
+) -> Dict[str, Any]:
+    """
+    Validate and upsert a menu export back into a restaurant.
+
+    Products are matched by name. Existing categories and products are looked
+    up once per batch and written with one bulk INSERT and one bulk UPDATE,
+    all in a single transaction so a failed import leaves the menu untouched.
+    """
+    batch_size = batch_size or settings.EXPORT_BATCH_SIZE
+    rows, extra_categories = _menu_payload(payload)
+    errors: List[Dict[str, Any]] = []
+    items: Dict[str, MenuImportItem] = {}
+    for index, raw in enumerate(rows):
+        try:
+            item = MenuImportItem(**raw)
+        except (ValidationError, TypeError) as e:
+            errors.append({"row": index, "error": str(e)})
+            continue
+        if item.name in items:
+            errors.append({"row": index, "error": f"Duplicate item: {item.name}"})
+            continue
+        items[item.name] = item
+
+    category_names = sorted(
+        set(extra_categories) | {i.category for i in items.values()}
+    )
+    try:
+        category_ids, categories_created = _upsert_categories(
+            db, restaurant_id, category_names
+        )
+        created = updated = 0
+        names = list(items)
+        for start in range(0, len(names), batch_size):
+            batch = [items[name] for name in names[start : start + batch_size]]
+            batch_created, batch_updated = _upsert_products(
+                db, restaurant_id, batch, category_ids
+            )
+            created += batch_created
+            updated += batch_updated
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        raise FynloException(
+            message=f"Menu import failed: {str(e)}",
+            error_code=ErrorCodes.INTERNAL_ERROR,
+            status_code=500,
+        )
+
+    return {
+        "imported": created + updated,
+        "created": created,
+        "updated": updated,
+        "categories_created": categories_created,
+        "errors": errors,
+    }
+
+
+def _upsert_categories(db: Session, restaurant_id: str, names: List[str]):
+    existing = dict(
+        db.execute(
+            select(Category.name, Category.id).where(
+                Category.restaurant_id == restaurant_id, Category.name.in_(names)
+            )
+        ).all()
+    )
+    missing = [name for name in names if name not in existing]
+    if missing:
+        rows = [
+            {
+                "id": uuid.uuid4(),
+                "restaurant_id": restaurant_id,
+                "name": name,
+                "is_active": True,
+                "sort_order": len(existing) + i,
+            }
+            for i, name in enumerate(missing)
+        ]
+        db.execute(insert(Category), rows)
+        existing.update({row["name"]: row["id"] for row in rows})
+    return existing, len(missing)
+
+
+def _upsert_products(
+    db: Session,
+    restaurant_id: str,
+    batch: List[MenuImportItem],
+    category_ids: Dict[str, Any],
+):
+    existing = dict(
+        db.execute(
+            select(Product.name, Product.id).where(
+                Product.restaurant_id == restaurant_id,
+                Product.name.in_([item.name for item in batch]),
+            )
+        ).all()
+    )
+    inserts, updates = [], []
+    for item in batch:
+        values = {
+            "name": item.name,
+            "category_id": category_ids[item.category],
+            "price": item.price,
+            "description": item.description,
+            "sku": item.sku,
+            "is_active": item.is_active,
+        }
+        if item.name in existing:
+            updates.append({"id": existing[item.name], **values})
+        else:
+            inserts.append(
+                {"id": uuid.uuid4(), "restaurant_id": restaurant_id, **values}
+            )
+    if inserts:
+        db.execute(insert(Product), inserts)
+    if updates:
+        db.execute(update(Product), updates)
+    return len(inserts), len(updates)
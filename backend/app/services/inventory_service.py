@@ -3,7 +3,10 @@ Service layer for advanced inventory operations, including recipe deductions.
 """
 
 from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy import insert, update
+from collections import defaultdict
+from datetime import datetime, timezone
 from typing import List, Optional, Dict, Tuple
 from uuid import UUID
 import logging  # For logging stock_overdrawn events
@@ -14,8 +17,12 @@ from app.models import (
     InventoryItem as InventoryItemModel,
     InventoryLedgerEntry as InventoryLedgerModel,
 )
-from app.crud import inventory as crud_inventory
-from app.core.websocket import WebSocketManager
+from app.core.websocket import (
+    ConnectionType,
+    EventType,
+    WebSocketManager,
+    WebSocketMessage,
+)
 
 # from app.services.audit_logger import AuditLoggerService # Assuming an audit logger service
 
@@ -23,6 +30,73 @@ logger = logging.getLogger(__name__)
 # audit_logger = AuditLoggerService() # Initialize if you have a dedicated audit logger
 
 
+def _order_product_quantities(order: OrderModel) -> Dict[UUID, int]:
+    """Total quantity ordered per product, skipping malformed order lines"""
+    quantities: Dict[UUID, int] = defaultdict(int)
+    for order_item_data in order.items:
+        if (
+            not isinstance(order_item_data, dict)
+            or "product_id" not in order_item_data
+            or "quantity" not in order_item_data
+        ):
+            logger.error(
+                f"Malformed order item in order {order.id}: {order_item_data}. Skipping this item."
+            )
+            continue
+
+        product_id_str = order_item_data.get("product_id")
+        quantity_ordered = order_item_data.get("quantity")
+
+        if (
+            not product_id_str
+            or not isinstance(quantity_ordered, (int, float))
+            or quantity_ordered <= 0
+        ):
+            logger.warning(
+                f"Invalid product_id or quantity for item in order {order.id}. Skipping item."
+            )
+            continue
+
+        try:
+            product_id = UUID(str(product_id_str))
+        except ValueError:
+            logger.error(
+                f"Invalid UUID format for product_id '{product_id_str}' in order {order.id}. Skipping item."
+            )
+            continue
+
+        quantities[product_id] += int(quantity_ordered)
+    return quantities
+
+
+def _plan_deductions(
+    order_id: UUID,
+    locked_items: List[InventoryItemModel],
+    requested: Dict[str, int],
+) -> List[Tuple[InventoryItemModel, int, int]]:
+    """
+    (item, new_qty, deducted) for each locked SKU, never taking stock below
+    zero. Logs stock_overdrawn when a deduction is capped.
+    """
+    plan = []
+    for inventory_item in locked_items:
+        total_qty_to_deduct = requested[inventory_item.sku]
+        original_qty = inventory_item.qty_g
+        actual_deducted_amount = min(original_qty, total_qty_to_deduct)
+        if actual_deducted_amount < total_qty_to_deduct:
+            logger.warning(
+                f"Stock overdrawn for SKU {inventory_item.sku} (Order ID: {order_id}). Original: {original_qty}, Requested: {total_qty_to_deduct}, Deducted: {actual_deducted_amount}, New Qty: 0."
+            )
+        plan.append(
+            (
+                inventory_item,
+                original_qty - actual_deducted_amount,
+                actual_deducted_amount,
+            )
+        )
+    return plan
+
+
 async def apply_recipe_deductions_for_order(
     db: Session,
     order_id: UUID,
@@ -33,7 +107,14 @@ async def apply_recipe_deductions_for_order(
     """
     Applies recipe deductions for all items in a confirmed order.
     Logs stock_overdrawn events if an item's quantity drops to zero due to deduction.
-    Emits WebSocket events for inventory updates.
+    Emits a single inventory.updated WebSocket event for the affected SKUs.
+
+    Work is batched so the cost does not grow in round-trips with the order
+    size: one query loads every recipe line for the ordered products, the
+    affected inventory rows are locked with SELECT ... FOR UPDATE in SKU order
+    (so concurrent confirmations sharing SKUs queue instead of deadlocking or
+    losing updates), and the new quantities and ledger entries are written
+    with one bulk UPDATE and one bulk INSERT.
 
     Args:
         db: The database session.
@@ -43,9 +124,6 @@ async def apply_recipe_deductions_for_order(
     Returns:
         A list of tuples, each containing the updated InventoryItemModel and the created InventoryLedgerModel.
         Returns an empty list if the order is not found or has no processable items.
-
-    Raises:
-        HTTPException or custom exceptions for critical errors (e.g., if an item in order has no product entry).
     """
     order = db.query(OrderModel).filter(OrderModel.id == order_id).first()
     if not order:
@@ -60,180 +138,132 @@ async def apply_recipe_deductions_for_order(
         )
         return []
 
-    updated_inventory_and_ledger_entries: List[
-        Tuple[InventoryItemModel, InventoryLedgerModel]
-    ] = []
-
     # Order.items is expected to be a JSONB field like:
     # [{"product_id": "uuid", "quantity": 2, "price_at_sale": 10.99}, ...]
-    # We need to ensure 'product_id' and 'quantity' are present.
-
     if not order.items or not isinstance(order.items, list):
         logger.warning(
             f"Order ID {order_id} has no items or items are malformed. Skipping deduction."
         )
         return []
 
-    # Aggregate deductions per SKU to make fewer DB calls if an ingredient is in multiple recipes
-    aggregated_deductions: Dict[str, int] = {}  # sku: total_quantity_to_deduct
-
-    for order_item_data in order.items:
-        if (
-            not isinstance(order_item_data, dict)
-            or "product_id" not in order_item_data
-            or "quantity" not in order_item_data
-        ):
-            logger.error(
-                f"Malformed order item in order {order_id}: {order_item_data}. Skipping this item."
-            )
-            continue
-
-        product_id_str = order_item_data.get("product_id")
-        quantity_ordered = order_item_data.get("quantity")
-
-        if (
-            not product_id_str
-            or not isinstance(quantity_ordered, (int, float))
-            or quantity_ordered <= 0
-        ):
-            logger.warning(
-                f"Invalid product_id or quantity for item in order {order_id}. Skipping item."
-            )
-            continue
-
-        try:
-            product_id = UUID(product_id_str)
-        except ValueError:
-            logger.error(
-                f"Invalid UUID format for product_id '{product_id_str}' in order {order_id}. Skipping item."
-            )
-            continue
+    quantities = _order_product_quantities(order)
+    if not quantities:
+        return []
 
-        # Fetch the recipe for this product
-        recipe_ingredients = (
-            db.query(RecipeModel).filter(RecipeModel.item_id == product_id).all()
+    # Every recipe line for the ordered products in one query, aggregated per
+    # SKU since an ingredient can appear in several recipes
+    recipe_lines = (
+        db.query(
+            RecipeModel.item_id, RecipeModel.ingredient_sku, RecipeModel.qty_g
         )
+        .filter(RecipeModel.item_id.in_(list(quantities)))
+        .all()
+    )
+    requested: Dict[str, int] = defaultdict(int)
+    for product_id, sku, qty_g in recipe_lines:
+        requested[sku] += qty_g * quantities[product_id]
+    requested = {sku: qty for sku, qty in requested.items() if qty > 0}
+    if not requested:
+        return []
 
-        if not recipe_ingredients:
-            # Product might not have a recipe, which is fine. Log for info if needed.
-            # logger.info(f"Product ID {product_id} in order {order_id} has no recipe. No deductions for this item.")
-            continue
-
-        for recipe_ingredient in recipe_ingredients:
-            total_deduction_for_ingredient = recipe_ingredient.qty_g * int(
-                quantity_ordered
-            )
-
-            current_total = aggregated_deductions.get(
-                recipe_ingredient.ingredient_sku, 0
-            )
-            aggregated_deductions[recipe_ingredient.ingredient_sku] = (
-                current_total + total_deduction_for_ingredient
-            )
-
-    # Apply aggregated deductions
-    skus_updated = []
-    for sku, total_qty_to_deduct in aggregated_deductions.items():
-        if (
-            total_qty_to_deduct == 0
-        ):  # Should not happen if qty_g > 0 and quantity_ordered > 0
-            continue
-
-        inventory_item = (
-            db.query(InventoryItemModel).filter(InventoryItemModel.sku == sku).first()
+    # Lock the affected rows in a deterministic order before reading stock
+    locked_items = (
+        db.query(InventoryItemModel)
+        .filter(InventoryItemModel.sku.in_(sorted(requested)))
+        .order_by(InventoryItemModel.sku)
+        .with_for_update()
+        .all()
+    )
+    for sku in sorted(set(requested) - {item.sku for item in locked_items}):
+        logger.error(
+            f"Inventory item with SKU {sku} not found for recipe deduction in order {order_id}. Deduction skipped for this SKU."
         )
-        if not inventory_item:
-            logger.error(
-                f"Inventory item with SKU {sku} not found for recipe deduction in order {order_id}. Deduction skipped for this SKU."
-            )
-            continue
 
-        original_qty = inventory_item.qty_g
+    plan = _plan_deductions(order_id, locked_items, requested)
+    if not plan:
+        return []
 
-        # Calculate actual change, ensuring quantity doesn't go below 0
-        if inventory_item.qty_g - total_qty_to_deduct < 0:
-            actual_deducted_amount = (
-                inventory_item.qty_g
-            )  # Deduct only what's available
-            inventory_item.qty_g = 0
-            # Log stock_overdrawn event
-            logger.warning(
-                f"Stock overdrawn for SKU {sku} (Order ID: {order_id}). Original: {original_qty}, Requested: {total_qty_to_deduct}, Deducted: {actual_deducted_amount}, New Qty: 0."
-            )
-            # audit_logger.log_event(
-            #     event_type="stock_overdrawn",
-            #     details={
-            #         "sku": sku,
-            #         "order_id": str(order_id),
-            #         "requested_deduction": total_qty_to_deduct,
-            #         "actual_deduction": actual_deducted_amount,
-            #         "original_quantity": original_qty
-            #     },
-            #     # Assuming user_id is available from order or a system user context
-            #     user_id=str(order.created_by) if order.created_by else "system"
-            # )
-        else:
-            actual_deducted_amount = total_qty_to_deduct
-            inventory_item.qty_g -= total_qty_to_deduct
-
-        inventory_item.last_updated = func.now()
-
-        # Create ledger entry for the actual change
+    now = datetime.now(timezone.utc)
+    try:
+        db.execute(
+            update(InventoryItemModel),
+            [
+                {"sku": item.sku, "qty_g": new_qty, "last_updated": now}
+                for item, new_qty, _ in plan
+            ],
+        )
         # Note: delta_g is negative for deductions
-        ledger_entry = InventoryLedgerModel(
-            sku=sku,
-            delta_g=-actual_deducted_amount,
-            source="order_fulfillment",
-            source_id=str(order_id),
+        ledger_entries = db.scalars(
+            insert(InventoryLedgerModel).returning(
+                InventoryLedgerModel, sort_by_parameter_order=True
+            ),
+            [
+                {
+                    "sku": item.sku,
+                    "restaurant_id": item.restaurant_id,
+                    "delta_g": -deducted,
+                    "source": "order_fulfillment",
+                    "source_id": str(order_id),
+                }
+                for item, _, deducted in plan
+            ],
+        ).all()
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Error committing recipe deductions for order {order_id}: {e}")
+        raise
+
+    # The locked rows are current; record the written values on them instead
+    # of re-fetching each SKU
+    for item, new_qty, _ in plan:
+        set_committed_value(item, "qty_g", new_qty)
+        set_committed_value(item, "last_updated", now)
+
+    if websocket_manager:
+        await _broadcast_inventory_update(websocket_manager, order, locked_items)
+
+    return list(zip(locked_items, ledger_entries))
+
+
+async def _broadcast_inventory_update(
+    websocket_manager: WebSocketManager,
+    order: OrderModel,
+    items: List[InventoryItemModel],
+) -> None:
+    """One inventory.updated event for every SKU touched by the order"""
+    restaurant_id = str(order.restaurant_id)
+    message = WebSocketMessage(
+        event_type=EventType.INVENTORY_UPDATED,
+        data={
+            "order_id": str(order.id),
+            "items": [
+                {
+                    "sku": item.sku,
+                    "name": item.name,
+                    "qty_g": item.qty_g,
+                    "par_level_g": item.par_level_g,
+                    "unit": item.unit,
+                    "last_updated": item.last_updated.isoformat(),
+                }
+                for item in items
+            ],
+        },
+        restaurant_id=restaurant_id,
+        connection_types=[
+            ConnectionType.POS,
+            ConnectionType.KITCHEN,
+            ConnectionType.MANAGEMENT,
+        ],
+    )
+    try:
+        # Deductions are already committed; a failed broadcast must not undo them
+        await websocket_manager.broadcast_to_restaurant(restaurant_id, message)
+        logger.info(
+            f"Broadcasted inventory.updated event for {len(items)} items from order {order.id}."
         )
-        db.add(ledger_entry)
-        updated_inventory_and_ledger_entries.append((inventory_item, ledger_entry))
-        skus_updated.append(sku)
-
-    if updated_inventory_and_ledger_entries:
-        try:
-            db.commit()
-            for item, ledger in updated_inventory_and_ledger_entries:
-                db.refresh(item)
-                db.refresh(ledger)
-
-            # Emit WebSocket event for updated SKUs
-            if websocket_manager and skus_updated:
-                # Fetch the latest state of updated items for the payload
-                updated_items_payload = []
-                for sku_val in skus_updated:
-                    item = crud_inventory.get_inventory_item(
-                        db, sku_val
-                    )  # Re-fetch to get committed state
-                    if item:
-                        updated_items_payload.append(
-                            {
-                                "sku": item.sku,
-                                "name": item.name,
-                                "qty_g": item.qty_g,
-                                "par_level_g": item.par_level_g,
-                                "unit": item.unit,
-                                "last_updated": item.last_updated.isoformat(),
-                            }
-                        )
-                if updated_items_payload:
-                    # Consider rate limiting or batching if many items are updated frequently
-                    await websocket_manager.broadcast_json(
-                        {"event": "inventory.updated", "data": updated_items_payload}
-                    )
-                    logger.info(
-                        f"Broadcasted inventory.updated event for {len(updated_items_payload)} items from order {order_id}."
-                    )
-
-        except Exception as e:
-            db.rollback()
-            logger.error(
-                f"Error committing recipe deductions for order {order_id}: {e}"
-            )
-            # Potentially re-raise or handle more gracefully
-            raise
-
-    return updated_inventory_and_ledger_entries
+    except Exception as e:
+        logger.warning(f"Failed to broadcast inventory update for {order.id}: {e}")
 
 
 # Example of how this service might be called (e.g., from an order processing endpoint or task)
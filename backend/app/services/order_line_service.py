@@ -0,0 +1,462 @@
+"""
+Order Line Service
+Maintains order_lines, a row-per-line projection of the orders.items JSONB
+
+Product mix reports need units and revenue per product or category, which
+the JSONB blob can only provide by unnesting every order in the window. A
+mapper listener writes each order's lines in the transaction that creates it,
+rewrites them when its items change and flips completed_at as it moves in or
+out of "completed" (confirm, complete, cancel, refund), so reports become one
+indexed GROUP BY over order_lines. rebuild() backfills lines from orders and
+check_consistency() reports orders whose lines disagree with their JSONB.
+"""
+
+import logging
+import uuid
+from datetime import date, datetime, timezone
+from decimal import Decimal, InvalidOperation
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import (
+    Integer,
+    Numeric,
+    and_,
+    case,
+    cast,
+    column,
+    delete,
+    desc,
+    event,
+    func,
+    insert,
+    literal,
+    select,
+    true,
+    update,
+)
+from sqlalchemy.dialects.postgresql import JSONB, UUID
+from sqlalchemy.orm import Session
+
+from app.core.database import Order, Product
+from app.core.projections import flushed_states, on_order_change, utc_bounds
+from app.models.reports import OrderLine
+
+logger = logging.getLogger(__name__)
+
+COMPLETED_STATUS = "completed"
+
+UUID_PATTERN = "^[0-9a-f]{8}-?[0-9a-f]{4}-?[0-9a-f]{4}-?[0-9a-f]{4}-?[0-9a-f]{12}$"
+
+_TRACKED_FIELDS = ("items", "status", "created_at")
+
+
+def _decimal(value: Any) -> Decimal:
+    try:
+        return Decimal(str(value)) if value is not None else Decimal("0")
+    except (InvalidOperation, ValueError):
+        return Decimal("0")
+
+
+def _product_uuid(value: Any) -> Optional[uuid.UUID]:
+    try:
+        return uuid.UUID(str(value)) if value else None
+    except ValueError:
+        return None
+
+
+def modifiers_total(modifiers: Any) -> Decimal:
+    """Sum of the per-unit prices of a line's selected modifiers"""
+    if not isinstance(modifiers, list):
+        return Decimal("0")
+    return sum(
+        (
+            _decimal(modifier.get("price"))
+            for modifier in modifiers
+            if isinstance(modifier, dict)
+        ),
+        Decimal("0"),
+    )
+
+
+def build_order_lines(items: Any) -> List[Dict[str, Any]]:
+    """Line rows (without order columns) for an orders.items value"""
+    if not isinstance(items, list):
+        return []
+    lines = []
+    for line_number, item in enumerate(items, start=1):
+        if not isinstance(item, dict):
+            continue
+        quantity = int(_decimal(item.get("quantity")))
+        unit_price = _decimal(item.get("unit_price"))
+        line_total = item.get("total_price")
+        lines.append(
+            {
+                "line_number": line_number,
+                "product_id": _product_uuid(item.get("product_id")),
+                "quantity": quantity,
+                "unit_price": unit_price,
+                "modifiers_total": modifiers_total(item.get("modifiers")),
+                "line_total": (
+                    _decimal(line_total)
+                    if line_total is not None
+                    else unit_price * quantity
+                ),
+            }
+        )
+    return lines
+
+
+def completed_at_change(
+    before_status: Optional[str], after_status: Optional[str], now: datetime
+) -> Optional[Dict[str, Optional[datetime]]]:
+    """New completed_at for a status change, or None if it stays as it is"""
+    was_completed = before_status == COMPLETED_STATUS
+    is_completed = after_status == COMPLETED_STATUS
+    if was_completed == is_completed:
+        return None
+    return {"completed_at": now if is_completed else None}
+
+
+def _category_ids(connection, restaurant_id, product_ids) -> Dict[uuid.UUID, Any]:
+    if not product_ids:
+        return {}
+    rows = connection.execute(
+        select(Product.id, Product.category_id).where(
+            Product.restaurant_id == restaurant_id,
+            Product.id.in_(product_ids),
+        )
+    )
+    return {product_id: category_id for product_id, category_id in rows}
+
+
+def _write_lines(connection, target, ordered_at, completed_at) -> None:
+    lines = build_order_lines(target.items)
+    connection.execute(delete(OrderLine).where(OrderLine.order_id == target.id))
+    if not lines:
+        return
+    categories = _category_ids(
+        connection,
+        target.restaurant_id,
+        {line["product_id"] for line in lines if line["product_id"]},
+    )
+    connection.execute(
+        insert(OrderLine.__table__),
+        [
+            {
+                **line,
+                "order_id": target.id,
+                "restaurant_id": target.restaurant_id,
+                "category_id": categories.get(line["product_id"]),
+                "ordered_at": ordered_at,
+                "completed_at": completed_at,
+            }
+            for line in lines
+        ],
+    )
+
+
+@on_order_change(_TRACKED_FIELDS)
+def _on_order_changed(
+    connection, target, before: Dict[str, Any], after: Dict[str, Any], inserted: bool
+) -> None:
+    if before == after:
+        return
+    now = datetime.now(timezone.utc)
+    ordered_at = after["created_at"] or now
+
+    try:
+        # A savepoint keeps a projection failure from aborting the order write;
+        # rebuild() repairs orders reported by check_consistency()
+        with connection.begin_nested():
+            if inserted or before["items"] != after["items"]:
+                completed_at = None
+                if after["status"] == COMPLETED_STATUS:
+                    previous = None
+                    if before["status"] == COMPLETED_STATUS:
+                        # Editing a completed order keeps its completion time
+                        previous = connection.execute(
+                            select(func.min(OrderLine.completed_at)).where(
+                                OrderLine.order_id == target.id
+                            )
+                        ).scalar()
+                    completed_at = previous or now
+                _write_lines(connection, target, ordered_at, completed_at)
+                return
+
+            values = completed_at_change(before["status"], after["status"], now) or {}
+            if before["created_at"] != after["created_at"]:
+                values["ordered_at"] = ordered_at
+            if values:
+                connection.execute(
+                    update(OrderLine)
+                    .where(OrderLine.order_id == target.id)
+                    .values(**values)
+                )
+    except Exception as e:
+        logger.warning(f"Order line update failed for order {target.id}: {e}")
+
+
+def _on_order_flushed(connection, target, inserted: bool) -> None:
+    before, after = flushed_states(target, _TRACKED_FIELDS, inserted)
+    _on_order_changed(connection, target, before, after, inserted)
+
+
+def _load_previous_value(target, value, oldvalue, initiator) -> None:
+    pass
+
+
+# Setting an attribute on an expired order (e.g. after a commit) records no
+# history unless the old value is loaded first; without it a refund would be
+# flushed as completed -> refunded with nothing to compare against
+for _field in _TRACKED_FIELDS:
+    event.listen(
+        getattr(Order, _field),
+        "set",
+        _load_previous_value,
+        active_history=True,
+    )
+
+
+@event.listens_for(Order, "after_insert")
+def _order_inserted(mapper, connection, target) -> None:
+    _on_order_flushed(connection, target, inserted=True)
+
+
+@event.listens_for(Order, "after_update")
+def _order_updated(mapper, connection, target) -> None:
+    """Keep order lines in step with item edits and status changes"""
+    _on_order_flushed(connection, target, inserted=False)
+
+
+class OrderLineService:
+    """Backfill, consistency checks and product mix reads for order lines"""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def _lines_select(
+        self, start: datetime, end: datetime, restaurant_id: Optional[str] = None
+    ):
+        """order_lines rows recomputed from orders.items, matching the listener"""
+        # jsonb_array_elements() raises on anything but an array
+        items = case(
+            (func.jsonb_typeof(Order.items) == "array", Order.items),
+            else_=literal([], JSONB),
+        )
+        item = (
+            func.jsonb_array_elements(items)
+            .table_valued(column("value", JSONB), with_ordinality="line_number")
+            .alias("item")
+        )
+        value = item.c.value
+        raw_product_id = value["product_id"].astext
+        product_id = case(
+            (raw_product_id.op("~*")(UUID_PATTERN), cast(raw_product_id, UUID)),
+            else_=None,
+        )
+        quantity = cast(
+            func.coalesce(value["quantity"].astext.cast(Numeric), 0), Integer
+        )
+        unit_price = func.coalesce(value["unit_price"].astext.cast(Numeric), 0)
+
+        item_modifiers = value["modifiers"]
+        modifier = (
+            func.jsonb_array_elements(
+                case(
+                    (func.jsonb_typeof(item_modifiers) == "array", item_modifiers),
+                    else_=literal([], JSONB),
+                )
+            )
+            .table_valued(column("value", JSONB))
+            .alias("modifier")
+        )
+        modifier_prices = (
+            select(
+                func.coalesce(
+                    func.sum(modifier.c.value["price"].astext.cast(Numeric)), 0
+                )
+            )
+            .select_from(modifier)
+            .scalar_subquery()
+        )
+
+        stmt = (
+            select(
+                Order.id.label("order_id"),
+                item.c.line_number,
+                Order.restaurant_id,
+                product_id.label("product_id"),
+                Product.category_id,
+                quantity.label("quantity"),
+                unit_price.label("unit_price"),
+                modifier_prices.label("modifiers_total"),
+                func.coalesce(
+                    value["total_price"].astext.cast(Numeric), unit_price * quantity
+                ).label("line_total"),
+                Order.created_at.label("ordered_at"),
+                case(
+                    (
+                        Order.status == COMPLETED_STATUS,
+                        func.coalesce(Order.updated_at, Order.created_at),
+                    ),
+                    else_=None,
+                ).label("completed_at"),
+            )
+            .select_from(Order)
+            .join(item, true())
+            .outerjoin(
+                Product,
+                and_(
+                    Product.id == product_id,
+                    Product.restaurant_id == Order.restaurant_id,
+                ),
+            )
+            .where(
+                Order.created_at >= start,
+                Order.created_at < end,
+                func.jsonb_typeof(value) == "object",
+            )
+        )
+        if restaurant_id:
+            stmt = stmt.where(Order.restaurant_id == restaurant_id)
+        return stmt
+
+    def _orders_in_window(
+        self, start: datetime, end: datetime, restaurant_id: Optional[str]
+    ):
+        stmt = select(Order.id).where(Order.created_at >= start, Order.created_at < end)
+        if restaurant_id:
+            stmt = stmt.where(Order.restaurant_id == restaurant_id)
+        return stmt
+
+    def rebuild(
+        self, start_date: date, end_date: date, restaurant_id: Optional[str] = None
+    ) -> int:
+        """
+        Replace the lines of orders created in the date range (inclusive) with
+        lines unnested from their items JSONB. Used for the initial backfill
+        and to repair orders reported by check_consistency().
+        """
+        start, end = utc_bounds(start_date, end_date)
+        try:
+            self.db.execute(
+                delete(OrderLine).where(
+                    OrderLine.order_id.in_(
+                        self._orders_in_window(start, end, restaurant_id)
+                    )
+                )
+            )
+            result = self.db.execute(
+                insert(OrderLine.__table__).from_select(
+                    [
+                        "order_id",
+                        "line_number",
+                        "restaurant_id",
+                        "product_id",
+                        "category_id",
+                        "quantity",
+                        "unit_price",
+                        "modifiers_total",
+                        "line_total",
+                        "ordered_at",
+                        "completed_at",
+                    ],
+                    self._lines_select(start, end, restaurant_id),
+                )
+            )
+            self.db.commit()
+        except Exception:
+            self.db.rollback()
+            raise
+
+        logger.info(
+            f"Rebuilt order lines {start_date}..{end_date} "
+            f"({restaurant_id or 'all restaurants'}): {result.rowcount} lines"
+        )
+        return result.rowcount
+
+    def check_consistency(
+        self, start_date: date, end_date: date, restaurant_id: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Compare each order's stored lines with lines recomputed from its items
+        and return one entry per differing order (empty when all match)
+        """
+        start, end = utc_bounds(start_date, end_date)
+        expected_lines = self._lines_select(start, end, restaurant_id).subquery()
+
+        def summaries(source):
+            rows = self.db.execute(
+                select(
+                    source.c.order_id,
+                    func.count().label("lines"),
+                    func.sum(source.c.quantity).label("quantity"),
+                    func.sum(source.c.line_total).label("line_total"),
+                    func.count(source.c.completed_at).label("completed_lines"),
+                ).group_by(source.c.order_id)
+            )
+            return {
+                str(row.order_id): (
+                    row.lines,
+                    row.quantity,
+                    row.line_total,
+                    row.completed_lines,
+                )
+                for row in rows
+            }
+
+        stored_lines = (
+            select(OrderLine)
+            .where(
+                OrderLine.order_id.in_(
+                    self._orders_in_window(start, end, restaurant_id)
+                )
+            )
+            .subquery()
+        )
+        expected = summaries(expected_lines)
+        stored = summaries(stored_lines)
+        fields = ("lines", "quantity", "line_total", "completed_lines")
+        return [
+            {
+                "order_id": order_id,
+                "expected": dict(zip(fields, expected.get(order_id, (0, 0, 0, 0)))),
+                "actual": dict(zip(fields, stored.get(order_id, (0, 0, 0, 0)))),
+            }
+            for order_id in sorted(expected.keys() | stored.keys())
+            if expected.get(order_id) != stored.get(order_id)
+        ]
+
+    def top_products(
+        self,
+        restaurant_id: str,
+        start: datetime,
+        end: datetime,
+        limit: int = 5,
+    ) -> List[Any]:
+        """Best sellers by revenue among completed orders created in the window"""
+        revenue = func.sum(OrderLine.line_total)
+        return (
+            self.db.query(
+                OrderLine.product_id,
+                Product.name,
+                func.sum(OrderLine.quantity).label("quantity"),
+                revenue.label("revenue"),
+            )
+            .join(Product, Product.id == OrderLine.product_id)
+            .filter(
+                OrderLine.restaurant_id == restaurant_id,
+                OrderLine.ordered_at >= start,
+                OrderLine.ordered_at < end,
+                OrderLine.completed_at.isnot(None),
+            )
+            .group_by(OrderLine.product_id, Product.name)
+            .order_by(desc(revenue))
+            .limit(limit)
+            .all()
+        )
+
+
+def get_order_line_service(db: Session) -> OrderLineService:
+    """Factory function to get the order line service"""
+    return OrderLineService(db)
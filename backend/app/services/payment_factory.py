@@ -4,6 +4,7 @@ from .payment_providers.base_provider import BasePaymentProvider, IGatewayRefund
 from .payment_providers.stripe_provider import StripeProvider
 from .payment_providers.sumup_provider import SumUpProvider
 from .payment_providers.cash_provider import CashProvider
+from .payment_providers.health import CircuitState, get_breaker
 from .smart_routing import SmartRoutingService, RoutingStrategy
 from .payment_analytics import PaymentAnalyticsService
 from ..core.config import settings
@@ -156,6 +157,9 @@ class PaymentProviderFactory:
         sorted_providers = sorted(provider_costs.items(), key=lambda x: x[1])
 
         for provider_name, cost in sorted_providers:
+            if get_breaker(provider_name).state == CircuitState.OPEN:
+                logger.info(f"Skipping {provider_name}: circuit breaker open")
+                continue
             if provider_name in self.providers:
                 logger.info(
                     f"Selected {provider_name} for £{amount} transaction "
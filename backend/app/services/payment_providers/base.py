@@ -9,6 +9,8 @@ from enum import Enum
 import logging
 from datetime import datetime
 
+from .transport import ProviderTransport
+
 logger = logging.getLogger(__name__)
 
 
@@ -37,6 +39,9 @@ class PaymentProvider(ABC):
         self.config = config
         self.provider_name = self.__class__.__name__.replace("Provider", "").lower()
         self.logger = logging.getLogger(f"{__name__}.{self.provider_name}")
+        # All provider I/O goes through the transport: pooled HTTP for REST
+        # APIs, the payment thread pool for blocking SDKs
+        self.transport = ProviderTransport(self.provider_name)
 
     @abstractmethod
     async def initialize(self) -> bool:
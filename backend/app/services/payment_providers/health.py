@@ -0,0 +1,244 @@
+"""
+Payment Provider Health
+Per-provider circuit breakers fed by live call outcomes and latencies
+
+Every call a ProviderTransport makes is recorded against its provider's
+breaker: whether the gateway answered properly and how long it took. Outcomes
+land in a rolling window of time slices, each holding a latency histogram, so
+failure rate, slow-call rate and latency percentiles are cheap to read on
+every routing decision.
+
+A closed breaker lets everything through. Once the window holds enough calls
+and too many failed or were slow it opens, and calls are refused at once
+instead of waiting for a degraded gateway to time out. After a cool-down it
+goes half-open and lets a few probe calls through: if they all succeed it
+closes with a fresh window, if any fails it opens again.
+
+State is per worker process; each worker learns about a brownout from its own
+traffic within a few calls.
+"""
+
+import math
+import time
+from enum import Enum
+from typing import Callable, Dict, List, Optional
+
+from app.core.config import settings
+from app.core.exceptions import ServiceUnavailableError
+
+# Upper bounds (seconds) of the latency histogram buckets
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, math.inf)
+WINDOW_SLICES = 10
+
+
+class CircuitState(str, Enum):
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(ServiceUnavailableError):
+    """Raised instead of calling a provider whose breaker is open"""
+
+    def __init__(self, provider: str, retry_after: Optional[float] = None):
+        super().__init__(
+            message=f"Payment provider {provider} is temporarily unavailable",
+            service_name=provider,
+            retry_after=math.ceil(retry_after) if retry_after else None,
+        )
+        self.provider = provider
+
+
+class _Slice:
+    """Outcomes recorded during one slice of the rolling window"""
+
+    __slots__ = ("start", "calls", "failures", "slow", "buckets")
+
+    def __init__(self, start: float):
+        self.start = start
+        self.calls = 0
+        self.failures = 0
+        self.slow = 0
+        self.buckets = [0] * len(LATENCY_BUCKETS)
+
+
+class CircuitBreaker:
+    """Rolling outcome/latency window and breaker state for one provider"""
+
+    def __init__(self, provider: str, clock: Callable[[], float] = time.monotonic):
+        self.provider = provider
+        self._clock = clock
+        self._slices: List[_Slice] = []
+        self._state = CircuitState.CLOSED
+        self._opened_at = 0.0
+        self._probes_in_flight = 0
+        self._probe_successes = 0
+
+    @property
+    def state(self) -> CircuitState:
+        if (
+            self._state == CircuitState.OPEN
+            and self._clock() - self._opened_at >= settings.PAYMENT_BREAKER_OPEN_SECONDS
+        ):
+            self._state = CircuitState.HALF_OPEN
+            self._probes_in_flight = 0
+            self._probe_successes = 0
+        return self._state
+
+    def allow_request(self) -> bool:
+        """Whether a call may go out now; half-open admits a few probes"""
+        state = self.state
+        if state == CircuitState.CLOSED:
+            return True
+        if state == CircuitState.HALF_OPEN:
+            if self._probes_in_flight < settings.PAYMENT_BREAKER_HALF_OPEN_PROBES:
+                self._probes_in_flight += 1
+                return True
+        return False
+
+    def before_call(self) -> None:
+        """Raise CircuitOpenError if the call must not go out"""
+        if not self.allow_request():
+            raise CircuitOpenError(self.provider, self.retry_after())
+
+    def retry_after(self) -> Optional[float]:
+        if self._state != CircuitState.OPEN:
+            return None
+        elapsed = self._clock() - self._opened_at
+        return max(settings.PAYMENT_BREAKER_OPEN_SECONDS - elapsed, 0.0)
+
+    def record(self, success: bool, latency: float) -> None:
+        """Record the outcome of a call admitted by allow_request"""
+        now = self._clock()
+        current = self._current_slice(now)
+        current.calls += 1
+        if not success:
+            current.failures += 1
+        if latency >= settings.PAYMENT_BREAKER_SLOW_CALL_SECONDS:
+            current.slow += 1
+        for index, bound in enumerate(LATENCY_BUCKETS):
+            if latency <= bound:
+                current.buckets[index] += 1
+                break
+
+        if self._state == CircuitState.HALF_OPEN:
+            self._probes_in_flight = max(self._probes_in_flight - 1, 0)
+            if not success:
+                self._open(now)
+            else:
+                self._probe_successes += 1
+                if self._probe_successes >= settings.PAYMENT_BREAKER_HALF_OPEN_PROBES:
+                    self._close()
+        elif self._state == CircuitState.CLOSED and self._should_open():
+            self._open(now)
+
+    def release(self) -> None:
+        """Give back a probe slot for a call that ended without an outcome"""
+        if self._state == CircuitState.HALF_OPEN:
+            self._probes_in_flight = max(self._probes_in_flight - 1, 0)
+
+    def call_count(self) -> int:
+        return sum(s.calls for s in self._window())
+
+    def failure_rate(self) -> float:
+        window = self._window()
+        calls = sum(s.calls for s in window)
+        return sum(s.failures for s in window) / calls if calls else 0.0
+
+    def slow_call_rate(self) -> float:
+        window = self._window()
+        calls = sum(s.calls for s in window)
+        return sum(s.slow for s in window) / calls if calls else 0.0
+
+    def latency_quantile(self, quantile: float) -> Optional[float]:
+        """Upper bound of the histogram bucket holding the given quantile"""
+        counts = [0] * len(LATENCY_BUCKETS)
+        for s in self._window():
+            for index, count in enumerate(s.buckets):
+                counts[index] += count
+        total = sum(counts)
+        if not total:
+            return None
+        rank = quantile * total
+        seen = 0
+        for bound, count in zip(LATENCY_BUCKETS, counts):
+            seen += count
+            if seen >= rank:
+                # The overflow bucket has no upper bound; report the last one
+                return bound if bound != math.inf else LATENCY_BUCKETS[-2]
+        return LATENCY_BUCKETS[-2]
+
+    def availability(self) -> float:
+        """0-1 estimate of how likely a call is to succeed right now"""
+        state = self.state
+        if state == CircuitState.OPEN:
+            return 0.0
+        if state == CircuitState.HALF_OPEN:
+            return 0.5
+        if self.call_count() < settings.PAYMENT_BREAKER_MIN_CALLS:
+            return 1.0
+        return 1.0 - self.failure_rate()
+
+    def snapshot(self) -> Dict[str, object]:
+        return {
+            "state": self.state.value,
+            "calls": self.call_count(),
+            "failure_rate": round(self.failure_rate(), 4),
+            "slow_call_rate": round(self.slow_call_rate(), 4),
+            "p50_latency": self.latency_quantile(0.5),
+            "p95_latency": self.latency_quantile(0.95),
+            "retry_after": self.retry_after(),
+        }
+
+    def _should_open(self) -> bool:
+        if self.call_count() < settings.PAYMENT_BREAKER_MIN_CALLS:
+            return False
+        return (
+            self.failure_rate() >= settings.PAYMENT_BREAKER_FAILURE_RATE
+            or self.slow_call_rate() >= settings.PAYMENT_BREAKER_SLOW_CALL_RATE
+        )
+
+    def _open(self, now: float) -> None:
+        self._state = CircuitState.OPEN
+        self._opened_at = now
+        self._probes_in_flight = 0
+
+    def _close(self) -> None:
+        self._state = CircuitState.CLOSED
+        self._slices = []
+        self._probes_in_flight = 0
+        self._probe_successes = 0
+
+    def _slice_width(self) -> float:
+        return settings.PAYMENT_BREAKER_WINDOW_SECONDS / WINDOW_SLICES
+
+    def _current_slice(self, now: float) -> _Slice:
+        width = self._slice_width()
+        start = now - (now % width)
+        if not self._slices or self._slices[-1].start != start:
+            self._slices.append(_Slice(start))
+        self._prune(now)
+        return self._slices[-1]
+
+    def _window(self) -> List[_Slice]:
+        self._prune(self._clock())
+        return self._slices
+
+    def _prune(self, now: float) -> None:
+        cutoff = now - settings.PAYMENT_BREAKER_WINDOW_SECONDS
+        while self._slices and self._slices[0].start + self._slice_width() <= cutoff:
+            self._slices.pop(0)
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+
+
+def get_breaker(provider: str) -> CircuitBreaker:
+    """The breaker shared by every instance and caller of a provider"""
+    if provider not in _breakers:
+        _breakers[provider] = CircuitBreaker(provider)
+    return _breakers[provider]
+
+
+def reset_breakers() -> None:
+    _breakers.clear()
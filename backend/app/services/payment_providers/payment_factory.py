@@ -2,17 +2,19 @@
 Payment Provider Factory with Smart Routing
 """
 
-from typing import Dict, Any, List, Optional
+from typing import Awaitable, Callable, Dict, Any, List, Optional
 from decimal import Decimal
+import asyncio
 import logging
 from datetime import datetime, timedelta
 
+from app.core.config import settings
 from .base import PaymentProvider, PaymentStatus
+from .health import CircuitState, get_breaker
 from .stripe_provider import StripeProvider
 from .square_provider import SquareProvider
 from .sumup_provider import SumUpProvider
-from ...core.database import get_db
-from ..secure_payment_config import PaymentProviderConfig
+from ..secure_payment_config import PaymentProviderConfig, SecurePaymentConfigService
 
 logger = logging.getLogger(__name__)
 
@@ -20,9 +22,9 @@ logger = logging.getLogger(__name__)
 class PaymentProviderFactory:
     """Factory for creating and managing payment providers with smart routing"""
 
-    def __init__(self):
+    def __init__(self, config_service: Optional[SecurePaymentConfigService] = None):
         self.providers: Dict[str, PaymentProvider] = {}
-        self.config_service = SecurePaymentConfig()
+        self.config_service = config_service
         self._initialized = False
 
     async def initialize(self, restaurant_id: str):
@@ -35,12 +37,9 @@ class PaymentProviderFactory:
             configs = await self._get_provider_configs(restaurant_id)
 
             for config in configs:
-                if config.is_active:
-                    provider = await self._create_provider(
-                        config.provider_name, config.config_data, restaurant_id
-                    )
-                    if provider:
-                        self.providers[config.provider_name] = provider
+                provider = await self._create_provider(config.provider, restaurant_id)
+                if provider:
+                    self.providers[config.provider] = provider
 
             self._initialized = True
             logger.info(
@@ -62,44 +61,18 @@ class PaymentProviderFactory:
         Get the best provider based on fees, availability, and performance
 
         Selection criteria:
-        1. Provider must be available and support the payment method
+        1. Provider must be available, support the payment method and not
+           have an open circuit breaker
         2. Lowest fee for the transaction amount
         3. Best performance metrics (success rate, response time)
         """
-        available_providers = []
-
-        for name, provider in self.providers.items():
-            if (
-                provider.is_available()
-                and payment_method in provider.get_supported_payment_methods()
-                and currency in provider.get_supported_currencies()
-            ):
-                # Calculate fee for this provider
-                fee = provider.calculate_fee(amount)
-
-                # Get performance metrics
-                metrics = await self._get_provider_metrics(name)
-
-                available_providers.append(
-                    {
-                        "provider": provider,
-                        "name": name,
-                        "fee": fee,
-                        "success_rate": metrics.get("success_rate", 0.95),
-                        "avg_response_time": metrics.get("avg_response_time", 1.0),
-                    }
-                )
+        ranked = await self._rank_providers(amount, payment_method, currency)
 
-        if not available_providers:
+        if not ranked:
             logger.warning("No available providers found")
             return None
 
-        # Sort by fee (ascending) and success rate (descending)
-        available_providers.sort(
-            key=lambda x: (x["fee"], -x["success_rate"], x["avg_response_time"])
-        )
-
-        best = available_providers[0]
+        best = ranked[0]
         logger.info(
             f"Selected {best['name']} provider with fee {best['fee']} for amount {amount}"
         )
@@ -112,38 +85,151 @@ class PaymentProviderFactory:
         """
         Get ordered list of providers for fallback processing
 
-        Returns providers ordered by preference for automatic fallback
+        Returns providers ordered by preference for automatic fallback.
+        Providers whose breaker is open are left out; half-open ones go last
+        so they only see traffic the healthy providers could not take.
+        """
+        ranked = await self._rank_providers(amount, payment_method, currency)
+        return [p["provider"] for p in ranked]
+
+    async def execute_with_fallback(
+        self,
+        providers: List[PaymentProvider],
+        operation: Callable[[PaymentProvider], Awaitable[Dict[str, Any]]],
+        idempotent: bool = False,
+        hedge: bool = False,
+    ) -> Dict[str, Any]:
+        """
+        Run operation against providers in order until one succeeds
+
+        A provider that raises or returns an unsuccessful result hands over to
+        the next one. With hedge=True an idempotent operation is also started
+        on the next provider once the current one has run past its p95
+        latency; the first success wins and the other attempts are cancelled.
+        Never hedge an operation that could take money twice.
         """
+        if not providers:
+            raise ValueError("No payment providers available")
+
+        hedge = hedge and idempotent
+        remaining = list(providers)
+        in_flight: Dict[asyncio.Task, PaymentProvider] = {}
+        last_result: Optional[Dict[str, Any]] = None
+        last_error: Optional[Exception] = None
+
+        def launch() -> PaymentProvider:
+            provider = remaining.pop(0)
+            in_flight[asyncio.ensure_future(operation(provider))] = provider
+            return provider
+
+        try:
+            newest = launch()
+            while in_flight:
+                timeout = self._hedge_delay(newest) if hedge and remaining else None
+                done, _ = await asyncio.wait(
+                    in_flight, timeout=timeout, return_when=asyncio.FIRST_COMPLETED
+                )
+
+                if not done:
+                    logger.info(
+                        f"Hedging slow {newest.provider_name} call with "
+                        f"{remaining[0].provider_name}"
+                    )
+                    newest = launch()
+                    continue
+
+                for task in done:
+                    provider = in_flight.pop(task)
+                    try:
+                        result = task.result()
+                    except Exception as e:
+                        last_error, last_result = e, None
+                        logger.warning(f"{provider.provider_name} failed: {str(e)}")
+                    else:
+                        if self._succeeded(result):
+                            return result
+                        last_error, last_result = None, result
+                        logger.warning(
+                            f"{provider.provider_name} failed: {result.get('error')}"
+                        )
+                    if remaining:
+                        newest = launch()
+        finally:
+            for task in in_flight:
+                task.cancel()
+
+        if last_error is not None:
+            raise last_error
+        return last_result
+
+    async def _rank_providers(
+        self, amount: Decimal, payment_method: str, currency: str
+    ) -> List[Dict[str, Any]]:
+        """Eligible providers, cheapest and healthiest first"""
         available_providers = []
 
         for name, provider in self.providers.items():
-            if (
+            if not (
                 provider.is_available()
                 and payment_method in provider.get_supported_payment_methods()
                 and currency in provider.get_supported_currencies()
             ):
-                fee = provider.calculate_fee(amount)
-                metrics = await self._get_provider_metrics(name)
-
-                available_providers.append(
-                    {
-                        "provider": provider,
-                        "name": name,
-                        "fee": fee,
-                        "success_rate": metrics.get("success_rate", 0.95),
-                        "avg_response_time": metrics.get("avg_response_time", 1.0),
-                    }
-                )
+                continue
+
+            breaker = get_breaker(provider.provider_name)
+            state = breaker.state
+            if state == CircuitState.OPEN:
+                logger.info(f"Skipping {name}: circuit breaker open")
+                continue
+
+            fee = provider.calculate_fee(amount)
+            metrics = await self._get_provider_metrics(name)
+            live_latency = breaker.latency_quantile(0.5)
+
+            available_providers.append(
+                {
+                    "provider": provider,
+                    "name": name,
+                    "fee": fee,
+                    "half_open": state == CircuitState.HALF_OPEN,
+                    "success_rate": metrics.get("success_rate", 0.95)
+                    * breaker.availability(),
+                    "avg_response_time": (
+                        live_latency
+                        if live_latency is not None
+                        else metrics.get("avg_response_time", 1.0)
+                    ),
+                }
+            )
 
-        # Sort by fee and performance
+        # Sort by health, then fee (ascending), success rate (descending)
         available_providers.sort(
-            key=lambda x: (x["fee"], -x["success_rate"], x["avg_response_time"])
+            key=lambda x: (
+                x["half_open"],
+                x["fee"],
+                -x["success_rate"],
+                x["avg_response_time"],
+            )
+        )
+
+        return available_providers
+
+    @staticmethod
+    def _succeeded(result: Dict[str, Any]) -> bool:
+        return (
+            result.get("success") is not False
+            and result.get("status") != PaymentStatus.FAILED
         )
 
-        return [p["provider"] for p in available_providers]
+    @staticmethod
+    def _hedge_delay(provider: PaymentProvider) -> float:
+        p95 = get_breaker(provider.provider_name).latency_quantile(0.95)
+        if p95 is None:
+            p95 = settings.PAYMENT_BREAKER_SLOW_CALL_SECONDS
+        return max(p95, settings.PAYMENT_HEDGE_MIN_DELAY_SECONDS)
 
     async def _create_provider(
-        self, provider_name: str, encrypted_config: str, restaurant_id: str
+        self, provider_name: str, restaurant_id: str
     ) -> Optional[PaymentProvider]:
         """Create a payment provider instance"""
         try:
@@ -184,60 +270,51 @@ class PaymentProviderFactory:
     async def _get_provider_configs(
         self, restaurant_id: str
     ) -> List[PaymentProviderConfig]:
-        """Get all provider configurations for a restaurant"""
-        from sqlalchemy import select
-
-        async with get_db() as db:
-            result = await db.execute(
-                select(PaymentProviderConfig).filter(
-                    PaymentProviderConfig.restaurant_id == restaurant_id,
-                    PaymentProviderConfig.is_active == True,
-                )
+        """Get all enabled provider configurations for a restaurant"""
+        return (
+            self.config_service.db.query(PaymentProviderConfig)
+            .filter(
+                PaymentProviderConfig.restaurant_id == restaurant_id,
+                PaymentProviderConfig.enabled == True,
             )
-            return result.scalars().all()
+            .all()
+        )
 
     async def _get_provider_metrics(self, provider_name: str) -> Dict[str, Any]:
         """Get performance metrics for a provider"""
-        from sqlalchemy import select, func
+        from sqlalchemy import case, func
+
+        # Imported here: the processor imports this package
+        from app.services.secure_payment_processor import Payment
 
         # Calculate metrics for last 30 days
         cutoff_date = datetime.utcnow() - timedelta(days=30)
 
-        async with get_db() as db:
-            # Get success rate
-            result = await db.execute(
-                select(
-                    func.count(PaymentTransaction.id).label("total"),
-                    func.sum(
-                        func.case(
-                            (
-                                PaymentTransaction.status
-                                == PaymentStatus.COMPLETED.value,
-                                1,
-                            ),
-                            else_=0,
-                        )
-                    ).label("successful"),
-                ).filter(
-                    PaymentTransaction.provider == provider_name,
-                    PaymentTransaction.created_at >= cutoff_date,
-                )
+        total, successful = (
+            self.config_service.db.query(
+                func.count(Payment.id),
+                func.sum(
+                    case((Payment.status == PaymentStatus.COMPLETED.value, 1), else_=0)
+                ),
             )
+            .filter(
+                Payment.provider == provider_name,
+                Payment.created_at >= cutoff_date,
+            )
+            .one()
+        )
 
-            metrics = result.first()
+        if total:
+            success_rate = float(successful or 0) / float(total)
+        else:
+            success_rate = 0.95  # Default success rate for new providers
 
-            if metrics and metrics.total > 0:
-                success_rate = float(metrics.successful or 0) / float(metrics.total)
-            else:
-                success_rate = 0.95  # Default success rate for new providers
-
-            # Get average response time (if tracked)
-            # For now, return default values
-            return {
-                "success_rate": success_rate,
-                "avg_response_time": 1.0,  # seconds
-                "total_transactions": metrics.total if metrics else 0,
-            }
+        # Response times come from the circuit breaker's live window
+        return {
+            "success_rate": success_rate,
+            "avg_response_time": 1.0,  # seconds
+            "total_transactions": total,
+        }
 
     def get_provider_info(self) -> Dict[str, Any]:
         """Get information about all configured providers"""
@@ -252,6 +329,7 @@ class PaymentProviderFactory:
                 "supports_refunds": provider.supports_refunds(),
                 "minimum_amount": str(provider.get_minimum_amount()),
                 "maximum_amount": str(provider.get_maximum_amount()),
+                "health": get_breaker(provider.provider_name).snapshot(),
             }
 
         return info
@@ -8,7 +8,7 @@ import logging
 import uuid
 
 try:
-    from square import client as Client
+    from square.client import Client
     from square.models import (
         CreatePaymentRequest,
         Money,
@@ -23,6 +23,16 @@ except ImportError:
     UpdatePaymentRequest = None
     RefundPaymentRequest = None
 
+try:
+    import requests
+
+    # Connection failures from the SDK's HTTP adapter; Square payments and
+    # refunds carry an idempotency key, so repeating them is safe
+    SQUARE_TRANSIENT_ERRORS = (requests.ConnectionError, requests.Timeout)
+except ImportError:
+    SQUARE_TRANSIENT_ERRORS = ()
+
+from app.core.config import settings
 from .base import PaymentProvider, PaymentStatus
 
 logger = logging.getLogger(__name__)
@@ -52,10 +62,14 @@ class SquareProvider(PaymentProvider):
                     if self.config.get("mode") == "production"
                     else "sandbox"
                 ),
+                timeout=settings.PAYMENT_HTTP_TIMEOUT_SECONDS,
             )
 
             # Test the connection
-            result = self.client.locations.list_locations()
+            result = await self.transport.run(
+                self.client.locations.list_locations,
+                retry_on=SQUARE_TRANSIENT_ERRORS,
+            )
 
             if result.is_error():
                 self.logger.error(f"Failed to initialize Square: {result.errors}")
@@ -108,7 +122,11 @@ class SquareProvider(PaymentProvider):
                 request_body.buyer_email_address = customer_info["email"]
 
             # Create payment
-            result = self.client.payments.create_payment(request_body)
+            result = await self.transport.run(
+                self.client.payments.create_payment,
+                request_body,
+                retry_on=SQUARE_TRANSIENT_ERRORS,
+            )
 
             if result.is_error():
                 self.logger.error(f"Payment creation failed: {result.errors}")
@@ -150,7 +168,11 @@ class SquareProvider(PaymentProvider):
         # Square doesn't support separate auth/capture flow for most payment types
         # Payments are captured automatically
         try:
-            result = self.client.payments.get_payment(transaction_id)
+            result = await self.transport.run(
+                self.client.payments.get_payment,
+                transaction_id,
+                retry_on=SQUARE_TRANSIENT_ERRORS,
+            )
 
             if result.is_error():
                 return {
@@ -185,7 +207,11 @@ class SquareProvider(PaymentProvider):
         """Refund a payment"""
         try:
             # Get the original payment
-            payment_result = self.client.payments.get_payment(transaction_id)
+            payment_result = await self.transport.run(
+                self.client.payments.get_payment,
+                transaction_id,
+                retry_on=SQUARE_TRANSIENT_ERRORS,
+            )
 
             if payment_result.is_error():
                 return {
@@ -213,7 +239,11 @@ class SquareProvider(PaymentProvider):
                 reason=reason or "Customer requested refund",
             )
 
-            result = self.client.refunds.refund_payment(request_body)
+            result = await self.transport.run(
+                self.client.refunds.refund_payment,
+                request_body,
+                retry_on=SQUARE_TRANSIENT_ERRORS,
+            )
 
             if result.is_error():
                 return {
@@ -242,7 +272,11 @@ class SquareProvider(PaymentProvider):
     async def get_transaction_status(self, transaction_id: str) -> Dict[str, Any]:
         """Get current status of a transaction"""
         try:
-            result = self.client.payments.get_payment(transaction_id)
+            result = await self.transport.run(
+                self.client.payments.get_payment,
+                transaction_id,
+                retry_on=SQUARE_TRANSIENT_ERRORS,
+            )
 
             if result.is_error():
                 return {
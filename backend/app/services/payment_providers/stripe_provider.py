@@ -6,12 +6,21 @@ import stripe
 from decimal import Decimal
 from typing import Dict, Any, Optional
 import logging
+import uuid
 from datetime import datetime
 
+from app.core.config import settings
 from .base import PaymentProvider, PaymentStatus
 
 logger = logging.getLogger(__name__)
 
+# Network and rate-limit failures; only retried for reads and for writes sent
+# with an idempotency key, which Stripe de-duplicates
+STRIPE_TRANSIENT_ERRORS = (
+    stripe.error.APIConnectionError,
+    stripe.error.RateLimitError,
+)
+
 
 class StripeProvider(PaymentProvider):
     """Stripe payment provider implementation"""
@@ -21,9 +30,16 @@ class StripeProvider(PaymentProvider):
         try:
             stripe.api_key = self.config.get("secret_key")
             stripe.api_version = "2023-10-16"
+            # SDK calls run on the payment thread pool; give the SDK the same
+            # deadline so a timed-out call also frees its thread
+            stripe.default_http_client = stripe.http_client.RequestsClient(
+                timeout=settings.PAYMENT_HTTP_TIMEOUT_SECONDS
+            )
 
             # Test the connection
-            stripe.Account.retrieve()
+            await self.transport.run(
+                stripe.Account.retrieve, retry_on=STRIPE_TRANSIENT_ERRORS
+            )
 
             self.logger.info("Stripe provider initialized successfully")
             return True
@@ -71,7 +87,12 @@ class StripeProvider(PaymentProvider):
                 intent_data["confirm"] = True
 
             # Create payment intent
-            intent = stripe.PaymentIntent.create(**intent_data)
+            intent = await self.transport.run(
+                stripe.PaymentIntent.create,
+                idempotency_key=str(uuid.uuid4()),
+                retry_on=STRIPE_TRANSIENT_ERRORS,
+                **intent_data,
+            )
 
             # Calculate fees
             fee = self.calculate_fee(amount)
@@ -113,7 +134,13 @@ class StripeProvider(PaymentProvider):
             if amount:
                 capture_data["amount_to_capture"] = self.format_amount(amount, "gbp")
 
-            intent = stripe.PaymentIntent.capture(transaction_id, **capture_data)
+            intent = await self.transport.run(
+                stripe.PaymentIntent.capture,
+                transaction_id,
+                idempotency_key=str(uuid.uuid4()),
+                retry_on=STRIPE_TRANSIENT_ERRORS,
+                **capture_data,
+            )
 
             return {
                 "success": True,
@@ -147,7 +174,11 @@ class StripeProvider(PaymentProvider):
 
             if amount:
                 # Get the payment intent to know the currency
-                intent = stripe.PaymentIntent.retrieve(transaction_id)
+                intent = await self.transport.run(
+                    stripe.PaymentIntent.retrieve,
+                    transaction_id,
+                    retry_on=STRIPE_TRANSIENT_ERRORS,
+                )
                 refund_data["amount"] = self.format_amount(amount, intent.currency)
 
             if reason:
@@ -159,7 +190,12 @@ class StripeProvider(PaymentProvider):
                 }
                 refund_data["reason"] = reason_map.get(reason, "requested_by_customer")
 
-            refund = stripe.Refund.create(**refund_data)
+            refund = await self.transport.run(
+                stripe.Refund.create,
+                idempotency_key=str(uuid.uuid4()),
+                retry_on=STRIPE_TRANSIENT_ERRORS,
+                **refund_data,
+            )
 
             return {
                 "success": True,
@@ -181,7 +217,11 @@ class StripeProvider(PaymentProvider):
     async def get_transaction_status(self, transaction_id: str) -> Dict[str, Any]:
         """Get current status of a transaction"""
         try:
-            intent = stripe.PaymentIntent.retrieve(transaction_id)
+            intent = await self.transport.run(
+                stripe.PaymentIntent.retrieve,
+                transaction_id,
+                retry_on=STRIPE_TRANSIENT_ERRORS,
+            )
 
             return {
                 "transaction_id": intent.id,
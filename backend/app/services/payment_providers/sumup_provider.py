@@ -5,9 +5,9 @@ SumUp Payment Provider Implementation
 from decimal import Decimal
 from typing import Dict, Any, Optional
 import logging
-import httpx
 
 from .base import PaymentProvider, PaymentStatus
+from .transport import ProviderTransport
 
 logger = logging.getLogger(__name__)
 
@@ -24,7 +24,8 @@ class SumUpProvider(PaymentProvider):
         )
         self.access_token = config.get("access_token")
         self.merchant_code = config.get("merchant_code")
-        self.client = httpx.AsyncClient(
+        self.transport = ProviderTransport(
+            self.provider_name,
             base_url=self.base_url,
             headers={
                 "Authorization": f"Bearer {self.access_token}",
@@ -36,7 +37,7 @@ class SumUpProvider(PaymentProvider):
         """Initialize SumUp connection"""
         try:
             # Test the connection by getting merchant info
-            response = await self.client.get("/me")
+            response = await self.transport.request("GET", "/me")
 
             if response.status_code != 200:
                 self.logger.error(f"Failed to initialize SumUp: {response.text}")
@@ -85,7 +86,9 @@ class SumUpProvider(PaymentProvider):
                 checkout_data["customer_email"] = customer_info["email"]
 
             # Create checkout
-            response = await self.client.post("/checkouts", json=checkout_data)
+            response = await self.transport.request(
+                "POST", "/checkouts", json=checkout_data
+            )
 
             if response.status_code not in [200, 201]:
                 self.logger.error(f"Payment creation failed: {response.text}")
@@ -132,7 +135,9 @@ class SumUpProvider(PaymentProvider):
         # Payments are captured automatically when completed
         try:
             # Get checkout status
-            response = await self.client.get(f"/checkouts/{transaction_id}")
+            response = await self.transport.request(
+                "GET", f"/checkouts/{transaction_id}"
+            )
 
             if response.status_code != 200:
                 return {"success": False, "error": response.text, "raw_response": None}
@@ -172,12 +177,14 @@ class SumUpProvider(PaymentProvider):
         try:
             # For SumUp, we need the transaction ID, not checkout ID
             # First, try to get transaction details
-            response = await self.client.get(f"/me/transactions/{transaction_id}")
+            response = await self.transport.request(
+                "GET", f"/me/transactions/{transaction_id}"
+            )
 
             if response.status_code != 200:
                 # Try getting from checkout
-                checkout_response = await self.client.get(
-                    f"/checkouts/{transaction_id}"
+                checkout_response = await self.transport.request(
+                    "GET", f"/checkouts/{transaction_id}"
                 )
                 if checkout_response.status_code == 200:
                     checkout = checkout_response.json()
@@ -201,8 +208,8 @@ class SumUpProvider(PaymentProvider):
             if amount:
                 refund_data["amount"] = float(amount)
 
-            response = await self.client.post(
-                f"/me/refund/{transaction_id}", json=refund_data
+            response = await self.transport.request(
+                "POST", f"/me/refund/{transaction_id}", json=refund_data
             )
 
             if response.status_code not in [200, 201]:
@@ -235,7 +242,9 @@ class SumUpProvider(PaymentProvider):
         """Get current status of a transaction"""
         try:
             # Try as transaction ID first
-            response = await self.client.get(f"/me/transactions/{transaction_id}")
+            response = await self.transport.request(
+                "GET", f"/me/transactions/{transaction_id}"
+            )
 
             if response.status_code == 200:
                 transaction = response.json()
@@ -249,7 +258,9 @@ class SumUpProvider(PaymentProvider):
                 }
 
             # Try as checkout ID
-            response = await self.client.get(f"/checkouts/{transaction_id}")
+            response = await self.transport.request(
+                "GET", f"/checkouts/{transaction_id}"
+            )
 
             if response.status_code == 200:
                 checkout = response.json()
@@ -377,5 +388,4 @@ class SumUpProvider(PaymentProvider):
         return self
 
     async def __aexit__(self, exc_type, exc_val, exc_tb):
-        """Async context manager exit - close HTTP client"""
-        await self.client.aclose()
+        """Async context manager exit - the pooled HTTP client stays open"""
@@ -0,0 +1,279 @@
+"""
+Payment Provider Transport
+Non-blocking, bounded I/O shared by the payment providers
+
+Providers with an HTTP API send requests through one process-wide
+httpx.AsyncClient, so TLS connections to a provider stay alive and are reused
+across payments. Providers whose SDK is synchronous (Stripe, Square) run each
+SDK call on a dedicated thread pool instead of on the event loop, and separate
+from the default executor other code uses. Either way a provider is limited to
+PAYMENT_PROVIDER_CONCURRENCY calls in flight, every call has a deadline, and
+transient failures are retried with jittered exponential backoff only when the
+call is safe to repeat.
+
+Every attempt is checked against and recorded in the provider's circuit
+breaker (see health.py), so calls to a provider whose breaker is open fail
+fast with CircuitOpenError instead of waiting on a degraded gateway.
+"""
+
+import asyncio
+import functools
+import logging
+import random
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, Tuple, Type
+
+import httpx
+
+from app.core.config import settings
+from .health import get_breaker
+
+logger = logging.getLogger(__name__)
+
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE"})
+RETRY_STATUS_CODES = frozenset({429, 502, 503, 504})
+# Failures where the request never reached the provider; always safe to retry
+NOT_SENT_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+MAX_RETRY_AFTER_SECONDS = 5.0
+
+_http_client: Optional[httpx.AsyncClient] = None
+_sdk_executor: Optional[ThreadPoolExecutor] = None
+_provider_limits: Dict[str, asyncio.Semaphore] = {}
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """The shared keep-alive client, created on first use"""
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        _http_client = httpx.AsyncClient(
+            timeout=httpx.Timeout(
+                settings.PAYMENT_HTTP_TIMEOUT_SECONDS,
+                connect=settings.PAYMENT_HTTP_CONNECT_TIMEOUT_SECONDS,
+            ),
+            limits=httpx.Limits(
+                max_connections=settings.PAYMENT_HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.PAYMENT_HTTP_MAX_KEEPALIVE,
+            ),
+        )
+    return _http_client
+
+
+def get_sdk_executor() -> ThreadPoolExecutor:
+    """Threads reserved for blocking provider SDK calls"""
+    global _sdk_executor
+    if _sdk_executor is None:
+        _sdk_executor = ThreadPoolExecutor(
+            max_workers=settings.PAYMENT_SDK_THREADS,
+            thread_name_prefix="payment-sdk",
+        )
+    return _sdk_executor
+
+
+def provider_limit(provider: str) -> asyncio.Semaphore:
+    """In-flight call limit shared by every instance of a provider"""
+    if provider not in _provider_limits:
+        _provider_limits[provider] = asyncio.Semaphore(
+            settings.PAYMENT_PROVIDER_CONCURRENCY
+        )
+    return _provider_limits[provider]
+
+
+async def close_payment_transport() -> None:
+    """Close pooled connections and the SDK threads on shutdown"""
+    global _http_client, _sdk_executor
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+    if _sdk_executor is not None:
+        _sdk_executor.shutdown(wait=False)
+        _sdk_executor = None
+    _provider_limits.clear()
+
+
+def _submit_sdk_call(
+    loop: asyncio.AbstractEventLoop, limit: asyncio.Semaphore, call: Callable
+) -> Future:
+    """
+    Start an SDK call on the payment thread pool, holding an acquired slot of
+    the provider's limit until the thread finishes. A timed-out call keeps
+    its thread busy, so it keeps its slot too.
+    """
+
+    def release(_: Future) -> None:
+        try:
+            loop.call_soon_threadsafe(limit.release)
+        except RuntimeError:
+            # The event loop has closed; nothing is waiting for the slot
+            pass
+
+    try:
+        future = get_sdk_executor().submit(call)
+    except BaseException:
+        limit.release()
+        raise
+    future.add_done_callback(release)
+    return future
+
+
+def backoff_delay(attempt: int) -> float:
+    """Full-jitter exponential backoff for the given retry attempt (0-based)"""
+    return random.uniform(0, settings.PAYMENT_RETRY_BACKOFF_SECONDS * 2**attempt)
+
+
+def _retry_after(response: httpx.Response) -> Optional[float]:
+    try:
+        seconds = float(response.headers["Retry-After"])
+    except (KeyError, ValueError):
+        return None
+    return min(max(seconds, 0.0), MAX_RETRY_AFTER_SECONDS)
+
+
+class ProviderTransport:
+    """Pooled HTTP and off-loop SDK calls for one payment provider"""
+
+    def __init__(
+        self,
+        provider: str,
+        base_url: str = "",
+        headers: Optional[Dict[str, str]] = None,
+        client: Optional[httpx.AsyncClient] = None,
+    ):
+        self.provider = provider
+        self.base_url = base_url.rstrip("/")
+        self.headers = headers or {}
+        self._client = client
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        return self._client or get_http_client()
+
+    async def request(
+        self,
+        method: str,
+        path: str,
+        *,
+        idempotency_key: Optional[str] = None,
+        retry: Optional[bool] = None,
+        **kwargs: Any,
+    ) -> httpx.Response:
+        """
+        Send a request to the provider.
+
+        Idempotent methods and requests carrying an idempotency key are
+        retried on 429/5xx gateway errors and dropped connections; anything
+        else is only retried when the request provably never left this host.
+        """
+        method = method.upper()
+        headers = {**self.headers, **kwargs.pop("headers", {})}
+        if idempotency_key:
+            headers["Idempotency-Key"] = idempotency_key
+        if retry is None:
+            retry = method in IDEMPOTENT_METHODS or idempotency_key is not None
+        url = path if "://" in path else f"{self.base_url}{path}"
+
+        attempt = 0
+        while True:
+            breaker = get_breaker(self.provider)
+            breaker.before_call()
+            started = time.monotonic()
+            try:
+                async with provider_limit(self.provider):
+                    # Time the provider, not the wait for a concurrency slot
+                    started = time.monotonic()
+                    response = await self.client.request(
+                        method, url, headers=headers, **kwargs
+                    )
+            except httpx.TransportError as e:
+                breaker.record(False, time.monotonic() - started)
+                retryable = retry or isinstance(e, NOT_SENT_ERRORS)
+                if not retryable or attempt >= settings.PAYMENT_MAX_RETRIES:
+                    raise
+                delay = backoff_delay(attempt)
+                reason = type(e).__name__
+            except BaseException:
+                breaker.release()
+                raise
+            else:
+                breaker.record(
+                    response.status_code not in RETRY_STATUS_CODES
+                    and response.status_code < 500,
+                    time.monotonic() - started,
+                )
+                if (
+                    not retry
+                    or response.status_code not in RETRY_STATUS_CODES
+                    or attempt >= settings.PAYMENT_MAX_RETRIES
+                ):
+                    return response
+                delay = _retry_after(response)
+                if delay is None:
+                    delay = backoff_delay(attempt)
+                reason = f"HTTP {response.status_code}"
+
+            attempt += 1
+            logger.warning(
+                f"{self.provider} {method} {path} failed ({reason}); "
+                f"retry {attempt} in {delay:.2f}s"
+            )
+            await asyncio.sleep(delay)
+
+    async def run(
+        self,
+        fn: Callable[..., Any],
+        *args: Any,
+        retry_on: Tuple[Type[BaseException], ...] = (),
+        **kwargs: Any,
+    ) -> Any:
+        """
+        Run a blocking SDK call on the payment thread pool.
+
+        Only exceptions listed in retry_on are retried, so callers decide what
+        is transient and must make non-idempotent calls safe to repeat (e.g.
+        with an idempotency key) before listing anything. The deadline bounds
+        the wait, not the thread; SDK clients get the same timeout so the
+        thread is released too, and until it is the call keeps its slot in
+        the provider's concurrency limit.
+        """
+        loop = asyncio.get_running_loop()
+        call = functools.partial(fn, *args, **kwargs)
+
+        attempt = 0
+        while True:
+            breaker = get_breaker(self.provider)
+            breaker.before_call()
+            started = time.monotonic()
+            try:
+                limit = provider_limit(self.provider)
+                await limit.acquire()
+                started = time.monotonic()
+                future = _submit_sdk_call(loop, limit, call)
+                result = await asyncio.wait_for(
+                    asyncio.wrap_future(future),
+                    settings.PAYMENT_HTTP_TIMEOUT_SECONDS,
+                )
+            except asyncio.TimeoutError:
+                breaker.record(False, time.monotonic() - started)
+                raise
+            except retry_on as e:
+                breaker.record(False, time.monotonic() - started)
+                if attempt >= settings.PAYMENT_MAX_RETRIES:
+                    raise
+                delay = backoff_delay(attempt)
+                attempt += 1
+                logger.warning(
+                    f"{self.provider} {getattr(fn, '__qualname__', fn)} failed "
+                    f"({type(e).__name__}); retry {attempt} in {delay:.2f}s"
+                )
+                await asyncio.sleep(delay)
+            except Exception:
+                # The gateway answered (e.g. a card decline), so the call
+                # counts as healthy even though it raised
+                breaker.record(True, time.monotonic() - started)
+                raise
+            except BaseException:
+                breaker.release()
+                raise
+            else:
+                breaker.record(True, time.monotonic() - started)
+                return result
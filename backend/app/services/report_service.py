@@ -1,6 +1,6 @@
 """
 Report Aggregation Service
-Generates and populates DailyReport and HourlyMetric models from actual order data
+Generates and populates DailyReport and HourlyMetric models from sales rollups
 """
 
 from datetime import datetime, date, timedelta
@@ -10,14 +10,19 @@ from sqlalchemy.orm import Session
 from sqlalchemy import func, and_
 import logging
 
-from app.core.database import Order, User, DailyReport, HourlyMetric
-from app.models.reports import DailyReport, HourlyMetric
+from app.core.database import User
+from app.models.reports import (
+    DailyReport,
+    DailySalesRollup,
+    HourlyMetric,
+    HourlySalesRollup,
+)
 
 logger = logging.getLogger(__name__)
 
 
 class ReportAggregationService:
-    """Service for aggregating real order data into report models"""
+    """Service for turning sales rollup buckets into report models"""
 
     def __init__(self, db: Session):
         self.db = db
@@ -26,7 +31,7 @@ class ReportAggregationService:
         self, restaurant_id: str, report_date: date
     ) -> Optional[DailyReport]:
         """
-        Generate comprehensive daily report from actual order data
+        Generate a daily report from the day's sales rollup buckets
         """
         try:
             # Check if report already exists for this date
@@ -47,66 +52,26 @@ class ReportAggregationService:
                 )
                 return existing_report
 
-            # Get all completed orders for the date
-            date_start = datetime.combine(report_date, datetime.min.time())
-            date_end = date_start + timedelta(days=1)
-
-            orders = (
-                self.db.query(Order)
+            day = datetime.combine(report_date, datetime.min.time())
+            rollup = (
+                self.db.query(DailySalesRollup)
                 .filter(
-                    and_(
-                        Order.restaurant_id == restaurant_id,
-                        Order.status == "completed",
-                        Order.created_at >= date_start,
-                        Order.created_at < date_end,
-                    )
+                    DailySalesRollup.restaurant_id == restaurant_id,
+                    DailySalesRollup.bucket_start == day,
                 )
-                .all()
+                .first()
             )
 
-            if not orders:
+            if not rollup or not rollup.order_count:
                 logger.info(f"No orders found for {restaurant_id} on {report_date}")
                 return None
 
-            # Calculate aggregated metrics
-            total_revenue = sum(order.total_amount for order in orders)
-            total_orders = len(orders)
-            average_order_value = (
-                total_revenue / total_orders if total_orders > 0 else Decimal("0.00")
-            )
-
-            # Payment method breakdown
-            cash_sales = sum(
-                order.total_amount for order in orders if order.payment_method == "cash"
-            )
-            card_sales = sum(
-                order.total_amount for order in orders if order.payment_method == "card"
-            )
-            qr_sales = sum(
-                order.total_amount for order in orders if order.payment_method == "qr"
-            )
-            other_sales = sum(
-                order.total_amount
-                for order in orders
-                if order.payment_method not in ["cash", "card", "qr"]
-            )
-
-            # Order type breakdown
-            dine_in_orders = len([o for o in orders if o.order_type == "dine_in"])
-            takeaway_orders = len([o for o in orders if o.order_type == "takeaway"])
-            delivery_orders = len([o for o in orders if o.order_type == "delivery"])
-
-            # Tax and fee calculations
-            total_tax = sum(order.tax_amount or Decimal("0.00") for order in orders)
-            total_service_charge = sum(
-                order.service_charge or Decimal("0.00") for order in orders
-            )
-            total_discounts = sum(
-                order.discount_amount or Decimal("0.00") for order in orders
-            )
+            total_revenue = rollup.revenue
+            total_orders = rollup.order_count
+            average_order_value = total_revenue / total_orders
 
             # Calculate payment processing fees (approximate)
-            payment_processing_fees = (card_sales + qr_sales) * Decimal(
+            payment_processing_fees = (rollup.card_sales + rollup.qr_sales) * Decimal(
                 "0.029"
             )  # 2.9% for cards/QR
 
@@ -136,6 +101,19 @@ class ReportAggregationService:
             cogs = total_revenue * Decimal("0.30")  # Approximate 30% food cost
             waste_cost = cogs * Decimal("0.05")  # Approximate 5% waste
 
+            # Hourly breakdown from the hourly buckets of the same day
+            hourly = self.db.query(HourlySalesRollup).filter(
+                HourlySalesRollup.restaurant_id == restaurant_id,
+                HourlySalesRollup.bucket_start >= day,
+                HourlySalesRollup.bucket_start < day + timedelta(days=1),
+                HourlySalesRollup.order_count > 0,
+            )
+            hourly_sales, hourly_orders = {}, {}
+            for bucket in hourly:
+                hour = f"{bucket.bucket_start.hour:02d}"
+                hourly_sales[hour] = float(bucket.revenue)
+                hourly_orders[hour] = bucket.order_count
+
             # Create DailyReport instance
             daily_report = DailyReport(
                 restaurant_id=restaurant_id,
@@ -143,22 +121,24 @@ class ReportAggregationService:
                 total_revenue=total_revenue,
                 total_orders=total_orders,
                 average_order_value=average_order_value,
-                cash_sales=cash_sales,
-                card_sales=card_sales,
-                qr_sales=qr_sales,
-                other_sales=other_sales,
-                dine_in_orders=dine_in_orders,
-                takeaway_orders=takeaway_orders,
-                delivery_orders=delivery_orders,
-                total_tax=total_tax,
-                total_service_charge=total_service_charge,
-                total_discounts=total_discounts,
+                cash_sales=rollup.cash_sales,
+                card_sales=rollup.card_sales,
+                qr_sales=rollup.qr_sales,
+                other_sales=rollup.other_sales,
+                dine_in_orders=rollup.dine_in_orders,
+                takeaway_orders=rollup.takeaway_orders,
+                delivery_orders=rollup.delivery_orders,
+                total_tax=rollup.total_tax,
+                total_service_charge=rollup.total_service_charge,
+                total_discounts=rollup.total_discounts,
                 payment_processing_fees=payment_processing_fees,
                 total_labor_hours=total_labor_hours,
                 total_labor_cost=total_labor_cost,
                 employees_worked=employees_worked,
                 cogs=cogs,
                 waste_cost=waste_cost,
+                hourly_sales=hourly_sales,
+                hourly_orders=hourly_orders,
             )
 
             # Save to database
@@ -187,56 +167,30 @@ class ReportAggregationService:
         Generate hourly breakdown metrics for a specific date
         """
         try:
-            hourly_metrics = []
             date_start = datetime.combine(report_date, datetime.min.time())
-
-            for hour in range(24):
-                hour_start = date_start + timedelta(hours=hour)
-                hour_end = hour_start + timedelta(hours=1)
-
-                # Get orders for this hour
-                hourly_orders = (
-                    self.db.query(Order)
-                    .filter(
-                        and_(
-                            Order.restaurant_id == restaurant_id,
-                            Order.status == "completed",
-                            Order.created_at >= hour_start,
-                            Order.created_at < hour_end,
-                        )
-                    )
-                    .all()
+            buckets = (
+                self.db.query(HourlySalesRollup)
+                .filter(
+                    HourlySalesRollup.restaurant_id == restaurant_id,
+                    HourlySalesRollup.bucket_start >= date_start,
+                    HourlySalesRollup.bucket_start < date_start + timedelta(days=1),
+                    HourlySalesRollup.order_count > 0,
                 )
+                .order_by(HourlySalesRollup.bucket_start)
+                .all()
+            )
 
-                if hourly_orders:
-                    hourly_revenue = sum(order.total_amount for order in hourly_orders)
-                    hourly_order_count = len(hourly_orders)
-                    avg_order_value = (
-                        hourly_revenue / hourly_order_count
-                        if hourly_order_count > 0
-                        else Decimal("0.00")
-                    )
-
-                    # Customer count (unique customers per hour)
-                    unique_customers = len(
-                        set(
-                            order.customer_id
-                            for order in hourly_orders
-                            if order.customer_id
-                        )
-                    )
-
-                    hourly_metric = HourlyMetric(
-                        restaurant_id=restaurant_id,
-                        report_date=report_date,
-                        hour=hour,
-                        revenue=hourly_revenue,
-                        order_count=hourly_order_count,
-                        customer_count=unique_customers,
-                        avg_order_value=avg_order_value,
-                    )
-
-                    hourly_metrics.append(hourly_metric)
+            hourly_metrics = [
+                HourlyMetric(
+                    restaurant_id=restaurant_id,
+                    metric_datetime=bucket.bucket_start,
+                    hour=bucket.bucket_start.hour,
+                    revenue=bucket.revenue,
+                    order_count=bucket.order_count,
+                    average_order_value=bucket.revenue / bucket.order_count,
+                )
+                for bucket in buckets
+            ]
 
             # Bulk save
             if hourly_metrics:
@@ -0,0 +1,488 @@
+"""
+Sales Rollup Service
+Incrementally maintained hourly and daily sales buckets per restaurant
+
+Orders contribute to the bucket of their created_at (UTC) while they are
+completed or refunded. A mapper listener applies the difference between an
+order's old and new contribution as an upsert in the same transaction that
+changes it, so dashboards can read a handful of bucket rows instead of
+scanning orders. rebuild() recomputes buckets from orders (backfill, or
+repair after drift) and check_consistency() reports buckets that disagree.
+"""
+
+import logging
+from collections import defaultdict
+from datetime import date, datetime, time, timezone
+from decimal import Decimal
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import and_, case, delete, event, func, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from app.core.database import Order, Payment
+from app.core.projections import flushed_states, on_order_change, utc_bounds
+from app.models.reports import DailySalesRollup, HourlySalesRollup
+
+logger = logging.getLogger(__name__)
+
+COMPLETED_STATUS = "completed"
+REFUNDED_STATUSES = ("refunded", "partially_refunded")
+# Refunding flips payments to "refunded"; they still count towards the
+# payment breakdown of the order they were taken for
+CAPTURED_PAYMENT_STATUSES = ("completed", "refunded")
+
+PAYMENT_METHOD_COLUMNS = {
+    "cash": "cash_sales",
+    "card": "card_sales",
+    "qr_code": "qr_sales",
+    "qr": "qr_sales",
+}
+ORDER_TYPE_COLUMNS = {
+    "dine_in": "dine_in_orders",
+    "takeaway": "takeaway_orders",
+    "delivery": "delivery_orders",
+}
+PAYMENT_COLUMNS = ("cash_sales", "card_sales", "qr_sales", "other_sales")
+
+# Order column summed into each amount metric for completed orders
+AMOUNT_COLUMNS = {
+    "revenue": "total_amount",
+    "subtotal": "subtotal",
+    "total_tax": "tax_amount",
+    "total_service_charge": "service_charge",
+    "total_discounts": "discount_amount",
+}
+
+ROLLUP_METRICS = (
+    "order_count",
+    *AMOUNT_COLUMNS,
+    *PAYMENT_COLUMNS,
+    *ORDER_TYPE_COLUMNS.values(),
+    "refunded_orders",
+    "refunded_amount",
+)
+
+ROLLUP_TABLES = {"hour": HourlySalesRollup, "day": DailySalesRollup}
+
+_TRACKED_FIELDS = ("status", "order_type", "created_at", *AMOUNT_COLUMNS.values())
+
+Contribution = Dict[str, Any]
+
+
+def _sum_if(condition, value):
+    return func.coalesce(func.sum(case((condition, value), else_=0)), 0)
+
+
+def _naive_utc(moment: datetime) -> datetime:
+    if moment.tzinfo is not None:
+        moment = moment.astimezone(timezone.utc).replace(tzinfo=None)
+    return moment
+
+
+def bucket_start(moment: datetime, granularity: str) -> datetime:
+    """Naive UTC start of the hour or day containing the given time"""
+    moment = _naive_utc(moment)
+    if granularity == "day":
+        return datetime.combine(moment.date(), time.min)
+    return moment.replace(minute=0, second=0, microsecond=0)
+
+
+def order_contribution(
+    order: Dict[str, Any], payments: Dict[str, Decimal]
+) -> Contribution:
+    """Metrics an order adds to its buckets, given its fields and payment totals"""
+    status = order["status"]
+    if status == COMPLETED_STATUS:
+        contribution: Contribution = {
+            "order_count": 1,
+            **{
+                metric: order[column] or Decimal("0")
+                for metric, column in AMOUNT_COLUMNS.items()
+            },
+        }
+        order_type_column = ORDER_TYPE_COLUMNS.get(order["order_type"])
+        if order_type_column:
+            contribution[order_type_column] = 1
+        for method, amount in payments.items():
+            column = PAYMENT_METHOD_COLUMNS.get(method, "other_sales")
+            contribution[column] = contribution.get(column, 0) + amount
+        return contribution
+    if status in REFUNDED_STATUSES:
+        return {
+            "refunded_orders": 1,
+            "refunded_amount": order["total_amount"] or Decimal("0"),
+        }
+    return {}
+
+
+def _counts_towards_rollups(status: Optional[str]) -> bool:
+    return status == COMPLETED_STATUS or status in REFUNDED_STATUSES
+
+
+def _order_payments(connection, order_id) -> Dict[str, Decimal]:
+    rows = connection.execute(
+        select(Payment.payment_method, func.sum(Payment.amount))
+        .where(
+            Payment.order_id == order_id,
+            Payment.status.in_(CAPTURED_PAYMENT_STATUSES),
+        )
+        .group_by(Payment.payment_method)
+    )
+    return {method: amount for method, amount in rows}
+
+
+def rollup_deltas(
+    before: Dict[str, Any], after: Dict[str, Any], payments: Dict[str, Decimal]
+) -> Dict[Tuple[str, datetime], Contribution]:
+    """Per-bucket metric changes for an order moving from before to after"""
+    deltas: Dict[Tuple[str, datetime], Contribution] = defaultdict(dict)
+    for values, sign in ((before, -1), (after, 1)):
+        contribution = order_contribution(values, payments)
+        for granularity in ROLLUP_TABLES:
+            bucket = (granularity, bucket_start(values["created_at"], granularity))
+            for metric, amount in contribution.items():
+                deltas[bucket][metric] = deltas[bucket].get(metric, 0) + sign * amount
+    return {
+        bucket: metrics
+        for bucket, metrics in deltas.items()
+        if any(metrics.values())
+    }
+
+
+def apply_rollup_deltas(
+    connection,
+    restaurant_id,
+    deltas: Dict[Tuple[str, datetime], Contribution],
+) -> None:
+    """Add metric deltas to their buckets, creating buckets as needed"""
+    for (granularity, bucket), metrics in deltas.items():
+        table = ROLLUP_TABLES[granularity].__table__
+        values = {metric: metrics.get(metric, 0) for metric in ROLLUP_METRICS}
+        stmt = insert(table).values(
+            restaurant_id=restaurant_id, bucket_start=bucket, **values
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.restaurant_id, table.c.bucket_start],
+            set_={
+                **{
+                    metric: table.c[metric] + stmt.excluded[metric]
+                    for metric in metrics
+                },
+                "updated_at": func.now(),
+            },
+        )
+        connection.execute(stmt)
+
+
+def _apply_safely(connection, description: str, build_deltas) -> None:
+    # A savepoint keeps a rollup failure from aborting the order/payment write;
+    # check_consistency() and rebuild() repair any bucket left behind
+    try:
+        with connection.begin_nested():
+            for restaurant_id, deltas in build_deltas():
+                apply_rollup_deltas(connection, restaurant_id, deltas)
+    except Exception as e:
+        logger.warning(f"Sales rollup update failed for {description}: {e}")
+
+
+@on_order_change(_TRACKED_FIELDS)
+def _on_order_changed(
+    connection, target, before: Dict[str, Any], after: Dict[str, Any], inserted: bool
+) -> None:
+    if not (
+        _counts_towards_rollups(before["status"])
+        or _counts_towards_rollups(after["status"])
+    ):
+        return
+    now = datetime.now(timezone.utc)
+    for values in (before, after):
+        values["created_at"] = values["created_at"] or now
+
+    def build():
+        payments = _order_payments(connection, target.id)
+        yield target.restaurant_id, rollup_deltas(before, after, payments)
+
+    _apply_safely(connection, f"order {target.id}", build)
+
+
+def _on_order_flushed(connection, target, inserted: bool) -> None:
+    before, after = flushed_states(target, _TRACKED_FIELDS, inserted)
+    _on_order_changed(connection, target, before, after, inserted)
+
+
+def _on_payment_flushed(connection, target, inserted: bool) -> None:
+    before, after = flushed_states(
+        target, ("payment_method", "amount", "status"), inserted
+    )
+    captured = [
+        values
+        for values in (before, after)
+        if values["status"] in CAPTURED_PAYMENT_STATUSES
+    ]
+    if not captured or before == after:
+        return
+
+    def build():
+        # Payments taken after the order completed still move its breakdown;
+        # payments flushed before completion are picked up by the order itself
+        order = connection.execute(
+            select(Order.restaurant_id, Order.status, Order.created_at).where(
+                Order.id == target.order_id
+            )
+        ).first()
+        if order is None or order.status != COMPLETED_STATUS:
+            return
+        deltas: Dict[Tuple[str, datetime], Contribution] = defaultdict(dict)
+        for values, sign in ((before, -1), (after, 1)):
+            if values["status"] not in CAPTURED_PAYMENT_STATUSES:
+                continue
+            column = PAYMENT_METHOD_COLUMNS.get(values["payment_method"], "other_sales")
+            for granularity in ROLLUP_TABLES:
+                bucket = bucket_start(order.created_at, granularity)
+                metrics = deltas[(granularity, bucket)]
+                metrics[column] = metrics.get(column, 0) + sign * values["amount"]
+        yield order.restaurant_id, deltas
+
+    _apply_safely(connection, f"payment {target.id}", build)
+
+
+@event.listens_for(Order, "after_insert")
+def _order_inserted(mapper, connection, target) -> None:
+    _on_order_flushed(connection, target, inserted=True)
+
+
+@event.listens_for(Order, "after_update")
+def _order_updated(mapper, connection, target) -> None:
+    """Keep rollup buckets in step with order status and amount changes"""
+    _on_order_flushed(connection, target, inserted=False)
+
+
+@event.listens_for(Payment, "after_insert")
+def _payment_inserted(mapper, connection, target) -> None:
+    _on_payment_flushed(connection, target, inserted=True)
+
+
+@event.listens_for(Payment, "after_update")
+def _payment_updated(mapper, connection, target) -> None:
+    _on_payment_flushed(connection, target, inserted=False)
+
+
+class SalesRollupService:
+    """Backfill, consistency checks and reads for sales rollup buckets"""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def _aggregate_select(
+        self,
+        granularity: str,
+        start: datetime,
+        end: datetime,
+        restaurant_id: Optional[str] = None,
+    ):
+        """Bucket metrics recomputed from orders, matching the incremental path"""
+        payments = (
+            select(
+                Payment.order_id,
+                *[
+                    _sum_if(Payment.payment_method.in_(methods), Payment.amount).label(
+                        column
+                    )
+                    for column, methods in _payment_method_groups().items()
+                ],
+                _sum_if(
+                    Payment.payment_method.notin_(list(PAYMENT_METHOD_COLUMNS)),
+                    Payment.amount,
+                ).label("other_sales"),
+            )
+            .where(Payment.status.in_(CAPTURED_PAYMENT_STATUSES))
+            .group_by(Payment.order_id)
+            .subquery("order_payments")
+        )
+
+        bucket = func.date_trunc(granularity, func.timezone("UTC", Order.created_at))
+        completed = Order.status == COMPLETED_STATUS
+        refunded = Order.status.in_(REFUNDED_STATUSES)
+        stmt = (
+            select(
+                Order.restaurant_id.label("restaurant_id"),
+                bucket.label("bucket_start"),
+                _sum_if(completed, 1).label("order_count"),
+                *[
+                    _sum_if(completed, func.coalesce(getattr(Order, column), 0)).label(
+                        metric
+                    )
+                    for metric, column in AMOUNT_COLUMNS.items()
+                ],
+                *[
+                    _sum_if(completed, func.coalesce(payments.c[column], 0)).label(
+                        column
+                    )
+                    for column in PAYMENT_COLUMNS
+                ],
+                *[
+                    _sum_if(and_(completed, Order.order_type == order_type), 1).label(
+                        column
+                    )
+                    for order_type, column in ORDER_TYPE_COLUMNS.items()
+                ],
+                _sum_if(refunded, 1).label("refunded_orders"),
+                _sum_if(refunded, func.coalesce(Order.total_amount, 0)).label(
+                    "refunded_amount"
+                ),
+            )
+            .outerjoin(payments, payments.c.order_id == Order.id)
+            .where(
+                Order.created_at >= start,
+                Order.created_at < end,
+                Order.status.in_((COMPLETED_STATUS, *REFUNDED_STATUSES)),
+            )
+            .group_by(Order.restaurant_id, bucket)
+        )
+        if restaurant_id:
+            stmt = stmt.where(Order.restaurant_id == restaurant_id)
+        return stmt
+
+    def _bucket_filter(
+        self, table, start: Optional[datetime], end: Optional[datetime], restaurant_id
+    ):
+        clauses = []
+        if start is not None:
+            clauses.append(table.bucket_start >= _naive_utc(start))
+        if end is not None:
+            clauses.append(table.bucket_start < _naive_utc(end))
+        if restaurant_id:
+            clauses.append(table.restaurant_id == restaurant_id)
+        return clauses
+
+    def rebuild(
+        self, start_date: date, end_date: date, restaurant_id: Optional[str] = None
+    ) -> Dict[str, int]:
+        """
+        Replace hourly and daily buckets for the date range (inclusive) with
+        values recomputed from orders. Used for the initial backfill and to
+        repair buckets reported by check_consistency().
+        """
+        start, end = utc_bounds(start_date, end_date)
+        rebuilt = {}
+        try:
+            for granularity, table in ROLLUP_TABLES.items():
+                self.db.execute(
+                    delete(table).where(
+                        *self._bucket_filter(table, start, end, restaurant_id)
+                    )
+                )
+                aggregate = self._aggregate_select(
+                    granularity, start, end, restaurant_id
+                ).add_columns(func.gen_random_uuid())
+                result = self.db.execute(
+                    insert(table.__table__).from_select(
+                        ["restaurant_id", "bucket_start", *ROLLUP_METRICS, "id"],
+                        aggregate,
+                    )
+                )
+                rebuilt[granularity] = result.rowcount
+            self.db.commit()
+        except Exception:
+            self.db.rollback()
+            raise
+
+        logger.info(
+            f"Rebuilt sales rollups {start_date}..{end_date} "
+            f"({restaurant_id or 'all restaurants'}): {rebuilt}"
+        )
+        return rebuilt
+
+    def check_consistency(
+        self, start_date: date, end_date: date, restaurant_id: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Compare stored buckets with values recomputed from orders and return
+        one entry per differing metric (empty when everything matches)
+        """
+        start, end = utc_bounds(start_date, end_date)
+        mismatches = []
+        for granularity, table in ROLLUP_TABLES.items():
+            expected = {
+                (str(row.restaurant_id), row.bucket_start): row
+                for row in self.db.execute(
+                    self._aggregate_select(granularity, start, end, restaurant_id)
+                )
+            }
+            stored = {
+                (str(row.restaurant_id), row.bucket_start): row
+                for row in self.db.query(table).filter(
+                    *self._bucket_filter(table, start, end, restaurant_id)
+                )
+            }
+            for key in sorted(expected.keys() | stored.keys(), key=lambda k: k[1]):
+                for metric in ROLLUP_METRICS:
+                    want = getattr(expected.get(key), metric, 0) or 0
+                    have = getattr(stored.get(key), metric, 0) or 0
+                    if want != have:
+                        mismatches.append(
+                            {
+                                "granularity": granularity,
+                                "restaurant_id": key[0],
+                                "bucket_start": key[1].isoformat(),
+                                "metric": metric,
+                                "expected": want,
+                                "actual": have,
+                            }
+                        )
+        return mismatches
+
+    def buckets(
+        self,
+        restaurant_ids: Iterable[str],
+        start: datetime,
+        end: datetime,
+        granularity: str = "day",
+    ) -> List[Any]:
+        """Metric sums per bucket across the given restaurants, oldest first"""
+        table = ROLLUP_TABLES[granularity]
+        return (
+            self.db.query(
+                table.bucket_start,
+                *[func.sum(getattr(table, m)).label(m) for m in ROLLUP_METRICS],
+            )
+            .filter(
+                table.restaurant_id.in_(list(restaurant_ids)),
+                *self._bucket_filter(table, start, end, None),
+            )
+            .group_by(table.bucket_start)
+            .order_by(table.bucket_start)
+            .all()
+        )
+
+    def totals_by_restaurant(
+        self,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        restaurant_ids: Optional[Iterable[str]] = None,
+    ) -> Dict[str, Any]:
+        """Metric sums per restaurant for the period (open-ended if unset)"""
+        table = DailySalesRollup
+        query = self.db.query(
+            table.restaurant_id,
+            *[func.sum(getattr(table, m)).label(m) for m in ROLLUP_METRICS],
+        ).filter(*self._bucket_filter(table, start, end, None))
+        if restaurant_ids is not None:
+            query = query.filter(table.restaurant_id.in_(list(restaurant_ids)))
+        return {
+            str(row.restaurant_id): row
+            for row in query.group_by(table.restaurant_id).all()
+        }
+
+
+def _payment_method_groups() -> Dict[str, List[str]]:
+    groups: Dict[str, List[str]] = defaultdict(list)
+    for method, column in PAYMENT_METHOD_COLUMNS.items():
+        groups[column].append(method)
+    return groups
+
+
+def get_sales_rollup_service(db: Session) -> SalesRollupService:
+    """Factory function to get the sales rollup service"""
+    return SalesRollupService(db)
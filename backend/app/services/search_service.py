@@ -0,0 +1,251 @@
+"""
+Search Service
+Ranked customer lookup and product search
+
+On PostgreSQL every match is answered from an index on the search
+expressions in app.core.database: pg_trgm GIN indexes for substring and
+word similarity (%>) matches on names, emails and phone digits,
+text_pattern_ops b-trees for email and phone prefixes, and a tsvector GIN
+index over product descriptions. Results rank by how much of the term
+appears in the name (word_similarity), with exact email or phone prefixes
+first. Databases without pg_trgm (the SQLite test
+and benchmark setups) rank the restaurant's rows with TrigramIndex, an
+in-memory index applying the same rules.
+"""
+
+import re
+from dataclasses import dataclass
+from typing import Any, List, Optional, Set
+
+from sqlalchemy import String, case, func, literal, or_, select
+from sqlalchemy.orm import Session
+
+from app.core.database import (
+    CUSTOMER_SEARCH_EMAIL,
+    CUSTOMER_SEARCH_NAME,
+    CUSTOMER_SEARCH_PHONE,
+    PRODUCT_SEARCH_DESCRIPTION,
+    Customer,
+    Product,
+)
+from app.core.security_utils import sanitize_sql_like_pattern
+
+# pg_trgm.word_similarity_threshold default, applied by the %> operator
+MIN_WORD_SIMILARITY = 0.6
+# Shorter digit runs would match most phone numbers
+MIN_PHONE_DIGITS = 3
+# Rank given to an exact email or phone prefix, above any similarity
+PREFIX_SCORE = 1.0
+# Added to the name score of products whose description matches
+DESCRIPTION_SCORE = 0.1
+
+
+def trigrams(text: Optional[str]) -> Set[str]:
+    """
+    pg_trgm's trigrams of a string: each lower-cased alphanumeric word is
+    padded with two spaces in front and one behind before being split.
+    """
+    result = set()
+    for word in re.findall(r"[^\W_]+", (text or "").lower()):
+        padded = f"  {word} "
+        result.update(padded[i : i + 3] for i in range(len(padded) - 2))
+    return result
+
+
+def word_similarity(term: Optional[str], text: Optional[str]) -> float:
+    """
+    pg_trgm word_similarity(): the share of the term's trigrams found in the
+    text, so a term matching one word of a longer name still scores high.
+    """
+    wanted = trigrams(term)
+    if not wanted:
+        return 0.0
+    return len(wanted & trigrams(text)) / len(wanted)
+
+
+def words(text: Optional[str]) -> Set[str]:
+    """Lexemes of the 'simple' text search configuration"""
+    return set(re.findall(r"[^\W_]+", (text or "").lower()))
+
+
+def phone_digits(value: Optional[str]) -> str:
+    return re.sub(r"\D", "", value or "")
+
+
+@dataclass
+class SearchHit:
+    """A matched customer or product and its rank (higher is better)"""
+
+    entity: Any
+    score: float
+
+
+class TrigramIndex:
+    """
+    In-memory stand-in for the search indexes.
+
+    Matches and ranks documents like the PostgreSQL queries: a name
+    containing the term or a word similar to it, an email or phone starting
+    with it, or a description containing all of its words.
+    """
+
+    def __init__(self):
+        self.documents = []
+
+    def add(
+        self,
+        entity,
+        name: Optional[str],
+        email: Optional[str] = None,
+        phone: Optional[str] = None,
+        description: Optional[str] = None,
+    ):
+        self.documents.append(
+            (
+                entity,
+                name or "",
+                (email or "").lower(),
+                phone_digits(phone),
+                words(description),
+            )
+        )
+
+    def search(self, term: str, limit: int) -> List[SearchHit]:
+        lowered = term.lower()
+        digits = phone_digits(term)
+        term_words = words(term)
+        hits = []
+        for entity, name, email, phone, description in self.documents:
+            score = word_similarity(term, name)
+            matched = lowered in name.lower() or score >= MIN_WORD_SIMILARITY
+            if (email and email.startswith(lowered)) or (
+                len(digits) >= MIN_PHONE_DIGITS and phone.startswith(digits)
+            ):
+                score = max(score, PREFIX_SCORE)
+                matched = True
+            if term_words and term_words <= description:
+                score += DESCRIPTION_SCORE
+                matched = True
+            if matched:
+                hits.append((-score, name, str(entity.id), SearchHit(entity, score)))
+        hits.sort(key=lambda hit: hit[:3])
+        return [hit for *_, hit in hits[:limit]]
+
+
+class SearchService:
+    """Customer lookup and product search for one database session"""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    @property
+    def indexed(self) -> bool:
+        """Whether the database has the pg_trgm and full-text indexes"""
+        return self.db.get_bind().dialect.name == "postgresql"
+
+    def customer_filter(self, term: str):
+        """
+        Filter for customers whose name, email or phone contains the term,
+        for list endpoints that keep their own ordering.
+        """
+        pattern = f"%{sanitize_sql_like_pattern(term)}%"
+        if not self.indexed:
+            return or_(
+                Customer.first_name.ilike(pattern),
+                Customer.last_name.ilike(pattern),
+                Customer.email.ilike(pattern),
+                Customer.phone.ilike(pattern),
+            )
+        conditions = [
+            CUSTOMER_SEARCH_NAME.ilike(pattern),
+            CUSTOMER_SEARCH_EMAIL.like(pattern.lower()),
+        ]
+        digits = phone_digits(term)
+        if len(digits) >= MIN_PHONE_DIGITS:
+            conditions.append(CUSTOMER_SEARCH_PHONE.like(f"%{digits}%"))
+        return or_(*conditions)
+
+    def search_customers(
+        self, restaurant_id: str, term: str, limit: int = 10
+    ) -> List[SearchHit]:
+        """Customers matching a name, email or phone fragment, best first"""
+        term = term.strip()
+        if not self.indexed:
+            index = TrigramIndex()
+            for customer in self.db.query(Customer).filter(
+                Customer.restaurant_id == restaurant_id
+            ):
+                name = f"{customer.first_name or ''} {customer.last_name or ''}"
+                index.add(customer, name, customer.email, customer.phone)
+            return index.search(term, limit)
+
+        escaped = sanitize_sql_like_pattern(term)
+        prefixes = [CUSTOMER_SEARCH_EMAIL.like(f"{escaped.lower()}%")]
+        digits = phone_digits(term)
+        if len(digits) >= MIN_PHONE_DIGITS:
+            prefixes.append(CUSTOMER_SEARCH_PHONE.like(f"{digits}%"))
+        score = func.greatest(
+            func.word_similarity(term, CUSTOMER_SEARCH_NAME),
+            case((or_(*prefixes), PREFIX_SCORE), else_=0.0),
+        ).label("score")
+        rows = self.db.execute(
+            select(Customer, score)
+            .where(
+                Customer.restaurant_id == restaurant_id,
+                or_(
+                    CUSTOMER_SEARCH_NAME.ilike(f"%{escaped}%"),
+                    CUSTOMER_SEARCH_NAME.op("%>")(term),
+                    *prefixes,
+                ),
+            )
+            .order_by(score.desc(), CUSTOMER_SEARCH_NAME, Customer.id)
+            .limit(limit)
+        ).all()
+        return [SearchHit(customer, float(score)) for customer, score in rows]
+
+    def search_products(
+        self,
+        restaurant_id: str,
+        term: str,
+        limit: int = 20,
+        category_id: Optional[str] = None,
+    ) -> List[SearchHit]:
+        """Active products matching a name fragment or description words"""
+        term = term.strip()
+        query = self.db.query(Product).filter(
+            Product.restaurant_id == restaurant_id, Product.is_active == True
+        )
+        if category_id:
+            query = query.filter(Product.category_id == category_id)
+        if not self.indexed:
+            index = TrigramIndex()
+            for product in query:
+                index.add(product, product.name, description=product.description)
+            return index.search(term, limit)
+
+        described = PRODUCT_SEARCH_DESCRIPTION.op("@@")(
+            func.plainto_tsquery(literal("simple", String), term)
+        )
+        score = (
+            func.word_similarity(term, Product.name)
+            + case((described, DESCRIPTION_SCORE), else_=0.0)
+        ).label("score")
+        rows = (
+            query.add_columns(score)
+            .filter(
+                or_(
+                    Product.name.ilike(f"%{sanitize_sql_like_pattern(term)}%"),
+                    Product.name.op("%>")(term),
+                    described,
+                )
+            )
+            .order_by(score.desc(), Product.name, Product.id)
+            .limit(limit)
+            .all()
+        )
+        return [SearchHit(product, float(score)) for product, score in rows]
+
+
+def get_search_service(db: Session) -> SearchService:
+    """Factory function to get the search service"""
+    return SearchService(db)
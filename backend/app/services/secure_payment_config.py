@@ -19,6 +19,15 @@ from app.core.database import Base
 from app.core.exceptions import FynloException
 
 
+def _invalidate_routing(restaurant_id: str) -> None:
+    """Drop the smart routing table's cached inputs for a restaurant"""
+    # Imported here: smart_routing imports the payment providers package,
+    # whose factory imports this module
+    from app.services.smart_routing import invalidate_routing
+
+    invalidate_routing(restaurant_id)
+
+
 class PaymentProviderConfig(Base):
     """Database model for encrypted payment provider configurations"""
 
@@ -147,6 +156,7 @@ class SecurePaymentConfigService:
 
         try:
             self.db.commit()
+            _invalidate_routing(restaurant_id)
             return config_id
         except Exception as e:
             self.db.rollback()
@@ -257,6 +267,7 @@ class SecurePaymentConfigService:
 
         try:
             self.db.commit()
+            _invalidate_routing(restaurant_id)
             return True
         except Exception as e:
             self.db.rollback()
@@ -14,8 +14,11 @@ import logging
 from app.core.database import Base
 from app.core.exceptions import FynloException
 from app.services.secure_payment_config import SecurePaymentConfigService
-from app.services.payment_providers import PaymentStatus
-from app.services.payment_factory import PaymentProviderFactory
+from app.services.payment_providers import (
+    PaymentProvider,
+    PaymentProviderFactory,
+    PaymentStatus,
+)
 
 
 class PaymentProcessingError(FynloException):
@@ -95,7 +98,7 @@ class SecurePaymentProcessor:
     def __init__(self, db: Session, request_context: Optional[Dict[str, Any]] = None):
         self.db = db
         self.config_service = SecurePaymentConfigService(db)
-        self.provider_factory = PaymentProviderFactory()
+        self.provider_factory = PaymentProviderFactory(self.config_service)
         self.request_context = request_context or {}
         self.logger = logging.getLogger(__name__)
         self._initialized = False
@@ -176,22 +179,19 @@ class SecurePaymentProcessor:
                     payment_id=payment.id,
                 )
 
-            # Try each provider
-            last_error = None
-            for provider in providers:
-                try:
-                    provider_name = provider.provider_name
+            async def charge(provider: PaymentProvider) -> Dict[str, Any]:
+                provider_name = provider.provider_name
 
-                    # Log provider attempt
-                    self._log_action(
-                        payment_id=payment.id,
-                        action="provider_attempt",
-                        provider=provider_name,
-                        request_data={"provider": provider_name},
-                    )
+                # Log provider attempt
+                self._log_action(
+                    payment_id=payment.id,
+                    action="provider_attempt",
+                    provider=provider_name,
+                    request_data={"provider": provider_name},
+                )
 
-                    # Process payment
-                    result = await self._process_with_provider(
+                try:
+                    return await self._process_with_provider(
                         provider=provider,
                         provider_name=provider_name,
                         payment=payment,
@@ -199,12 +199,7 @@ class SecurePaymentProcessor:
                         payment_details=payment_details,
                         order_id=order_id,
                     )
-
-                    # Payment successful
-                    return result
-
                 except Exception as e:
-                    last_error = e
                     self.logger.error(f"Provider {provider_name} failed: {str(e)}")
 
                     # Log provider failure
@@ -214,9 +209,16 @@ class SecurePaymentProcessor:
                         provider=provider_name,
                         error_message=str(e),
                     )
+                    raise
 
-                    # Continue to next provider
-                    continue
+            # Try each provider in turn; a charge is never hedged, since two
+            # providers could both take the money
+            try:
+                return await self.provider_factory.execute_with_fallback(
+                    providers, charge, idempotent=False
+                )
+            except Exception as e:
+                last_error = e
 
             # All providers failed
             payment.status = "failed"
@@ -246,7 +248,7 @@ class SecurePaymentProcessor:
 
     async def _process_with_provider(
         self,
-        provider: "PaymentProvider",
+        provider: PaymentProvider,
         provider_name: str,
         payment: Payment,
         amount: Decimal,
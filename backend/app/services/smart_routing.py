@@ -1,16 +1,27 @@
 """
 Smart Payment Routing Service
 Advanced algorithms for optimal payment provider selection based on multiple factors
+
+The analytics behind a routing decision (volume projection, provider health)
+come from several payment queries, so they are kept per restaurant in a
+RoutingTable. route_payment reads the table and only does the per-payment
+arithmetic; stale entries are rebuilt in the background and entries are
+dropped when a restaurant's provider configuration changes.
 """
 
+import asyncio
 import logging
+import time
+import weakref
 from datetime import datetime, timedelta
 from decimal import Decimal
-from typing import Dict, List, Optional, Tuple
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
 from dataclasses import dataclass
 from enum import Enum
 
+from app.core.config import settings
 from app.services.payment_analytics import PaymentAnalyticsService
+from app.services.payment_providers.health import CircuitState, get_breaker
 
 logger = logging.getLogger(__name__)
 
@@ -50,11 +61,145 @@ class RoutingDecision:
     risk_factors: List[str]
 
 
+@dataclass
+class RoutingTableEntry:
+    """Precomputed routing inputs for one restaurant"""
+
+    analytics_data: Dict
+    # provider -> amount-independent scores (reliability, speed)
+    base_scores: Dict[str, Dict[str, float]]
+    built_at: float
+
+
+class RoutingTable:
+    """Per-restaurant routing inputs served from memory"""
+
+    def __init__(self, ttl_seconds: Optional[float] = None):
+        self.ttl_seconds = (
+            ttl_seconds
+            if ttl_seconds is not None
+            else settings.ROUTING_TABLE_TTL_SECONDS
+        )
+        self._entries: Dict[str, RoutingTableEntry] = {}
+        self._builds: Dict[str, asyncio.Task] = {}
+        # Bumped on invalidation so a build started before the change is not
+        # stored over it
+        self._generations: Dict[str, int] = {}
+        _routing_tables.add(self)
+
+    def get(self, restaurant_id: str) -> Optional[RoutingTableEntry]:
+        return self._entries.get(restaurant_id)
+
+    def is_stale(self, entry: RoutingTableEntry) -> bool:
+        return time.monotonic() - entry.built_at >= self.ttl_seconds
+
+    async def lookup(
+        self,
+        restaurant_id: str,
+        build: Callable[[], Awaitable[RoutingTableEntry]],
+    ) -> RoutingTableEntry:
+        """
+        Entry for a restaurant, building it on first use. A stale entry is
+        still returned while a background rebuild replaces it.
+        """
+        entry = self._entries.get(restaurant_id)
+        while entry is None:
+            # Shielded so one cancelled caller does not cancel the build the
+            # other callers are waiting on. None means a shared background
+            # refresh failed after the entry was invalidated: build again
+            entry = await asyncio.shield(
+                self._start_build(restaurant_id, build, background=False)
+            )
+        if self.is_stale(entry):
+            self._start_build(restaurant_id, build, background=True)
+        return entry
+
+    def invalidate(self, restaurant_id: Optional[str] = None) -> None:
+        """Drop one restaurant's entry, or every entry"""
+        restaurant_ids = (
+            [restaurant_id]
+            if restaurant_id is not None
+            else set(self._entries) | set(self._builds)
+        )
+        for rid in restaurant_ids:
+            self._entries.pop(rid, None)
+            self._generations[rid] = self._generations.get(rid, 0) + 1
+
+    def record_volume(self, restaurant_id: str, amount: Decimal) -> None:
+        """Fold a completed payment into the cached monthly projection"""
+        entry = self._entries.get(restaurant_id)
+        if entry is None:
+            return
+        # Matches _get_routing_context: a week of volume projected to 30 days
+        entry.analytics_data["monthly_volume"] = float(
+            entry.analytics_data.get("monthly_volume", 0)
+        ) + float(amount) * (30 / 7)
+
+    def _start_build(
+        self,
+        restaurant_id: str,
+        build: Callable[[], Awaitable[RoutingTableEntry]],
+        background: bool,
+    ) -> "asyncio.Future[RoutingTableEntry]":
+        # One build per restaurant at a time; concurrent misses share it
+        task = self._builds.get(restaurant_id)
+        if task is None:
+            task = asyncio.ensure_future(
+                self._run_build(restaurant_id, build, background)
+            )
+            self._builds[restaurant_id] = task
+        return task
+
+    async def _run_build(
+        self,
+        restaurant_id: str,
+        build: Callable[[], Awaitable[RoutingTableEntry]],
+        background: bool,
+    ) -> Optional[RoutingTableEntry]:
+        generation = self._generations.get(restaurant_id, 0)
+        try:
+            entry = await build()
+        except Exception as e:
+            if not background:
+                raise
+            logger.warning(
+                f"Routing table refresh failed for {restaurant_id}, "
+                f"keeping previous entry: {e}"
+            )
+            return None
+        finally:
+            self._builds.pop(restaurant_id, None)
+
+        if self._generations.get(restaurant_id, 0) == generation:
+            self._entries[restaurant_id] = entry
+        return entry
+
+
+_routing_tables: "weakref.WeakSet[RoutingTable]" = weakref.WeakSet()
+
+
+def invalidate_routing(restaurant_id: Optional[str] = None) -> None:
+    """Drop cached routing inputs after a provider configuration change"""
+    for table in list(_routing_tables):
+        table.invalidate(restaurant_id)
+
+
+def record_routing_volume(restaurant_id: str, amount: Decimal) -> None:
+    """Count a completed payment towards the cached volume projections"""
+    for table in list(_routing_tables):
+        table.record_volume(restaurant_id, amount)
+
+
 class SmartRoutingService:
     """Service for intelligent payment provider routing"""
 
-    def __init__(self, analytics_service: PaymentAnalyticsService):
+    def __init__(
+        self,
+        analytics_service: PaymentAnalyticsService,
+        routing_table: Optional[RoutingTable] = None,
+    ):
         self.analytics = analytics_service
+        self.routing_table = routing_table or RoutingTable()
         self.provider_configs = {
             "stripe": {
                 "base_fee_percentage": Decimal("0.014"),  # 1.4%
@@ -114,12 +259,24 @@ class SmartRoutingService:
                 risk_factors=[],
             )
 
-        # Get historical data and current state
-        analytics_data = await self._get_routing_context(restaurant_id, amount)
+        # Historical data comes from the routing table; only the first payment
+        # for a restaurant (or one after invalidation) waits for the queries
+        entry = await self.routing_table.lookup(
+            restaurant_id,
+            lambda: self._build_routing_entry(restaurant_id, amount),
+        )
+        analytics_data = {
+            **entry.analytics_data,
+            "current_transaction_amount": float(amount),
+        }
 
         # Score all providers
         provider_scores = await self._score_providers(
-            amount, restaurant_id, analytics_data, strategy
+            amount,
+            restaurant_id,
+            analytics_data,
+            strategy,
+            base_scores=entry.base_scores,
         )
 
         # Make routing decision
@@ -247,31 +404,62 @@ class SmartRoutingService:
             "current_transaction_amount": float(amount),
         }
 
+    async def _build_routing_entry(
+        self, restaurant_id: str, amount: Decimal
+    ) -> RoutingTableEntry:
+        """Run the analytics queries and precompute per-provider scores"""
+
+        analytics_data = await self._get_routing_context(restaurant_id, amount)
+        analytics_data.pop("current_transaction_amount", None)
+
+        base_scores = {}
+        for provider, config in self.provider_configs.items():
+            base_scores[provider] = {
+                "reliability": await self._calculate_reliability_score(
+                    provider, analytics_data, config
+                ),
+                "speed": await self._calculate_speed_score(provider, config),
+            }
+
+        return RoutingTableEntry(
+            analytics_data=analytics_data,
+            base_scores=base_scores,
+            built_at=time.monotonic(),
+        )
+
     async def _score_providers(
         self,
         amount: Decimal,
         restaurant_id: str,
         analytics_data: Dict,
         strategy: RoutingStrategy,
+        base_scores: Optional[Dict[str, Dict[str, float]]] = None,
     ) -> List[ProviderScore]:
         """Score all available providers based on multiple factors"""
 
         scores = []
         monthly_volume = Decimal(str(analytics_data["monthly_volume"]))
+        weights = self._get_strategy_weights(strategy)
 
         for provider, config in self.provider_configs.items():
+            precomputed = (base_scores or {}).get(provider)
+
             # Cost score (0-100, higher is better/cheaper)
             cost_score = await self._calculate_cost_score(
                 provider, amount, monthly_volume, config
             )
 
-            # Reliability score (0-100)
-            reliability_score = await self._calculate_reliability_score(
-                provider, analytics_data, config
-            )
+            if precomputed:
+                reliability_score = precomputed["reliability"]
+                speed_score = precomputed["speed"]
+            else:
+                # Reliability score (0-100)
+                reliability_score = await self._calculate_reliability_score(
+                    provider, analytics_data, config
+                )
 
-            # Speed score (0-100, faster is better)
-            speed_score = await self._calculate_speed_score(provider, config)
+                # Speed score (0-100, faster is better)
+                speed_score = await self._calculate_speed_score(provider, config)
 
             # Volume appropriateness score (0-100)
             volume_score = await self._calculate_volume_score(
@@ -284,7 +472,6 @@ class SmartRoutingService:
             )
 
             # Calculate weighted total based on strategy
-            weights = self._get_strategy_weights(strategy)
             total_score = (
                 cost_score * weights["cost"]
                 + reliability_score * weights["reliability"]
@@ -421,16 +608,19 @@ class SmartRoutingService:
         return 80  # Default score
 
     async def _calculate_availability_score(self, provider: str, config: Dict) -> float:
-        """Calculate availability score based on geographic and time factors"""
+        """Calculate availability score from geography and live breaker health"""
 
-        # For now, return 100 if available in UK
         availability_zones = config.get("availability_zones", [])
         if "UK" in availability_zones or "GLOBAL" in availability_zones:
-            return 100
+            zone_score = 100
         elif "EU" in availability_zones:
-            return 90
+            zone_score = 90
         else:
-            return 70
+            zone_score = 70
+
+        # Scale by how likely a call is to get through right now: 0 while the
+        # breaker is open, halved while it probes, else the live success rate
+        return zone_score * get_breaker(provider).availability()
 
     def _get_strategy_weights(self, strategy: RoutingStrategy) -> Dict[str, float]:
         """Get weighting factors for different strategies"""
@@ -487,6 +677,14 @@ class SmartRoutingService:
         if not provider_scores:
             raise ValueError("No providers available for routing")
 
+        # Providers with an open breaker would only fail fast; keep them as a
+        # last resort when every breaker is open
+        provider_scores = [
+            score
+            for score in provider_scores
+            if get_breaker(score.provider).state != CircuitState.OPEN
+        ] or provider_scores
+
         # Select top provider
         selected = provider_scores[0]
 
@@ -533,6 +731,8 @@ class SmartRoutingService:
             risk_factors.append("Below average reliability")
         if selected.availability_score < 90:
             risk_factors.append("Limited availability")
+        if get_breaker(selected.provider).state != CircuitState.CLOSED:
+            risk_factors.append("Provider recovering from an outage")
         if confidence < 0.7:
             risk_factors.append("Low confidence in selection")
 
@@ -0,0 +1,387 @@
+"""
+In-process harness for benchmarking app.main:app end to end.
+
+Requests go through httpx's ASGI transport, so the full middleware stack,
+routing, auth and endpoint code run without a server. External services never
+leave the process:
+
+- Database: a throwaway SQLite file with the schema from Base.metadata, or a
+  local Postgres named in BENCH_DATABASE_URL (its name must contain "bench"
+  or "test", since every table is dropped and recreated)
+- Redis: RedisClient's in-memory fallback, never connected
+- Supabase: tokens are HS256-signed locally and checked by the local verifier
+- Stripe: PaymentIntent.create is replaced with a stub
+
+Importing this module configures the app settings, so import it before
+anything from ``app``.
+"""
+
+import os
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from decimal import ROUND_HALF_UP, Decimal
+from types import SimpleNamespace
+from typing import Dict, List, Optional
+
+import common  # noqa: F401 - puts the backend on sys.path
+
+HMAC_SECRET = "benchmark-jwt-secret-benchmark-jwt-secret"
+SUPABASE_URL = "https://bench.supabase.co"
+
+DATABASE_URL = os.environ.get("BENCH_DATABASE_URL")
+if DATABASE_URL:
+    if "bench" not in DATABASE_URL and "test" not in DATABASE_URL:
+        raise SystemExit(
+            "BENCH_DATABASE_URL must name a database containing 'bench' or 'test'; "
+            "the harness drops and recreates every table"
+        )
+else:
+    DATABASE_URL = f"sqlite:///{tempfile.mkdtemp(prefix='fynlo-bench-')}/bench.db"
+
+os.environ.update(
+    {
+        "DATABASE_URL": DATABASE_URL,
+        # RedisClient only falls back to in-memory storage in these environments
+        "ENVIRONMENT": "testing",
+        "DEBUG": "false",
+        "AUTH_VERIFICATION_MODE": "local",
+        "SUPABASE_URL": SUPABASE_URL,
+        "SUPABASE_JWT_SECRET": HMAC_SECRET,
+    }
+)
+
+import httpx  # noqa: E402
+import stripe  # noqa: E402
+from jose import jwt  # noqa: E402
+from sqlalchemy import event, types  # noqa: E402
+from sqlalchemy.dialects import sqlite  # noqa: E402
+from sqlalchemy.dialects.postgresql import INET, JSONB, UUID  # noqa: E402
+from sqlalchemy.ext.compiler import compiles  # noqa: E402
+from sqlalchemy.sql import functions  # noqa: E402
+
+# SQLite stand-ins for the Postgres column types. Endpoints compare UUID
+# columns with plain strings, which psycopg2 accepts, and sync cursors compare
+# timestamptz values, which psycopg2 returns timezone-aware.
+
+
+class _StringTolerantUuid(types.Uuid):
+    def bind_processor(self, dialect):
+        process = super().bind_processor(dialect)
+        if process is None:
+            return None
+
+        def coerce(value):
+            if isinstance(value, str):
+                value = uuid.UUID(value)
+            return process(value)
+
+        return coerce
+
+
+class _UtcDateTime(sqlite.DATETIME):
+    def bind_processor(self, dialect):
+        process = super().bind_processor(dialect)
+
+        def to_utc(value):
+            if value is not None and getattr(value, "tzinfo", None) is not None:
+                value = value.astimezone(timezone.utc)
+            return process(value)
+
+        return to_utc
+
+    def result_processor(self, dialect, coltype):
+        process = super().result_processor(dialect, coltype)
+        if not self.timezone:
+            return process
+
+        def attach_utc(value):
+            if process is not None:
+                value = process(value)
+            if value is not None and value.tzinfo is None:
+                value = value.replace(tzinfo=timezone.utc)
+            return value
+
+        return attach_utc
+
+
+@compiles(JSONB, "sqlite")
+def _compile_jsonb(type_, compiler, **kw):
+    return "JSON"
+
+
+@compiles(UUID, "sqlite")
+def _compile_uuid(type_, compiler, **kw):
+    return "CHAR(32)"
+
+
+@compiles(INET, "sqlite")
+def _compile_inet(type_, compiler, **kw):
+    return "VARCHAR(45)"
+
+
+from app.main import app  # noqa: E402
+from app.core.database import (  # noqa: E402
+    Base,
+    Category,
+    InventoryItem,
+    Order,
+    Product,
+    Recipe,
+    Restaurant,
+    SessionLocal,
+    User,
+    engine,
+)
+from app.core.redis_client import redis_client  # noqa: E402
+from app.middleware.rate_limit_middleware import limiter  # noqa: E402
+
+if engine.dialect.name == "sqlite":
+    engine.dialect.colspecs = {
+        **engine.dialect.colspecs,
+        types.Uuid: _StringTolerantUuid,
+        types.DateTime: _UtcDateTime,
+    }
+    # now() is a timestamptz in Postgres
+    functions.now.type = types.DateTime(timezone=True)
+
+    @event.listens_for(engine, "connect")
+    def _skip_fsync(dbapi_connection, connection_record):
+        # Disk flush times vary far more than the code under test
+        dbapi_connection.execute("PRAGMA synchronous=OFF")
+
+# Stay on the in-memory fallback instead of trying localhost on first use
+redis_client._is_connected = True
+
+
+def money(amount: Decimal) -> Decimal:
+    return amount.quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
+
+
+class FakeSocket:
+    """WebSocket stand-in that accepts every frame immediately"""
+
+    def __init__(self):
+        self.received = 0
+
+    async def accept(self):
+        pass
+
+    async def close(self, code: int = 1000):
+        pass
+
+    async def send_text(self, text):
+        self.received += 1
+
+
+def stub_payment_intent(rtt_ms: float = 0.0):
+    """Replacement for stripe.PaymentIntent.create, optionally sleeping"""
+    delay = rtt_ms / 1000
+
+    def create(**kwargs):
+        if delay:
+            time.sleep(delay)
+        return SimpleNamespace(id=f"pi_{uuid.uuid4().hex[:24]}", status="succeeded")
+
+    return create
+
+
+class ApiHarness:
+    """Seeded restaurant plus an authenticated ASGI client for it"""
+
+    def __init__(self, products: int = 60, categories: int = 8, history: int = 500):
+        self.product_count = products
+        self.category_count = categories
+        self.history_count = history
+        self.restaurant_id = uuid.uuid4()
+        self.user_id = uuid.uuid4()
+        self.supabase_id = uuid.uuid4()
+        self.product_ids: List[str] = []
+        self.prices: Dict[str, Decimal] = {}
+        self.history_ids: List[str] = []
+        self.totals: Dict[str, Decimal] = {}
+        self.client: Optional[httpx.AsyncClient] = None
+
+    @property
+    def dialect(self) -> str:
+        return engine.dialect.name
+
+    def setup(self, stripe_rtt_ms: float = 0.0) -> None:
+        """Recreate the schema, seed it and stub the payment provider"""
+        Base.metadata.drop_all(bind=engine)
+        Base.metadata.create_all(bind=engine)
+        self._seed()
+
+        # Every iteration reuses one user, which the limits would soon throttle
+        app.state.limiter = limiter
+        limiter.enabled = False
+        stripe.PaymentIntent.create = stub_payment_intent(stripe_rtt_ms)
+
+        token = jwt.encode(
+            {
+                "sub": str(self.supabase_id),
+                "aud": "authenticated",
+                "iss": f"{SUPABASE_URL}/auth/v1",
+                "exp": int(time.time()) + 24 * 3600,
+                "email": "bench@example.com",
+            },
+            HMAC_SECRET,
+            algorithm="HS256",
+        )
+        self.client = httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=app),
+            base_url="http://testserver",
+            headers={
+                "Authorization": f"Bearer {token}",
+                "User-Agent": "Fynlo/2.0 (iPhone; iOS 17.0)",
+            },
+        )
+
+    async def close(self) -> None:
+        if self.client:
+            await self.client.aclose()
+
+    def _seed(self) -> None:
+        db = SessionLocal()
+        try:
+            db.add(
+                Restaurant(
+                    id=self.restaurant_id,
+                    name="Bench Taqueria",
+                    address={"line1": "1 Bench Street", "city": "London"},
+                    email="bench@example.com",
+                )
+            )
+            db.add(
+                User(
+                    id=self.user_id,
+                    email="bench@example.com",
+                    supabase_id=self.supabase_id,
+                    first_name="Bench",
+                    last_name="Manager",
+                    role="manager",
+                    restaurant_id=self.restaurant_id,
+                    is_active=True,
+                )
+            )
+            db.flush()
+
+            categories = []
+            for i in range(self.category_count):
+                category = Category(
+                    restaurant_id=self.restaurant_id,
+                    name=f"Category {i}",
+                    sort_order=i,
+                    is_active=True,
+                )
+                db.add(category)
+                categories.append(category)
+            db.flush()
+
+            # Seeded rows predate the run, so sync downloads page through them
+            seeded_at = datetime.now(timezone.utc) - timedelta(days=1)
+            for i in range(self.product_count):
+                price = Decimal("3.50") + i % 7
+                product = Product(
+                    id=uuid.uuid4(),
+                    restaurant_id=self.restaurant_id,
+                    category_id=categories[i % len(categories)].id,
+                    name=f"Product {i}",
+                    price=price,
+                    is_active=True,
+                    stock_tracking=False,
+                    created_at=seeded_at,
+                )
+                db.add(product)
+                self.product_ids.append(str(product.id))
+                self.prices[str(product.id)] = price
+
+            # Two ingredients per product, so confirmation runs real deductions
+            for i in range(self.product_count // 2):
+                db.add(
+                    InventoryItem(
+                        sku=f"BENCH-{i:04d}",
+                        restaurant_id=self.restaurant_id,
+                        name=f"Ingredient {i}",
+                        qty_g=10**9,
+                        par_level_g=1000,
+                    )
+                )
+            db.flush()
+            ingredients = self.product_count // 2
+            for i, product_id in enumerate(self.product_ids):
+                for offset in (0, 1):
+                    db.add(
+                        Recipe(
+                            restaurant_id=self.restaurant_id,
+                            item_id=uuid.UUID(product_id),
+                            ingredient_sku=f"BENCH-{(i + offset) % ingredients:04d}",
+                            qty_g=25,
+                        )
+                    )
+            db.commit()
+        finally:
+            db.close()
+
+        self.history_ids = self.create_orders(
+            self.history_count, status="completed", history=True
+        )
+
+    def order_items(self, count: int, start: int = 0) -> List[dict]:
+        items = []
+        for i in range(count):
+            product_id = self.product_ids[(start + i) % len(self.product_ids)]
+            price = float(self.prices[product_id])
+            items.append(
+                {
+                    "product_id": product_id,
+                    "quantity": 2,
+                    "unit_price": price,
+                    "total_price": price * 2,
+                    "modifiers": [],
+                    "special_instructions": "no onions" if i % 3 == 0 else None,
+                }
+            )
+        return items
+
+    def create_orders(
+        self, count: int, items: int = 5, status: str = "pending", history: bool = False
+    ) -> List[str]:
+        """Insert orders directly, for scenarios that consume one per call
+
+        History orders are spread over the minutes before the run.
+        """
+        db = SessionLocal()
+        ids = []
+        now = datetime.now(timezone.utc)
+        try:
+            for i in range(count):
+                order_items = self.order_items(items, start=i)
+                subtotal = sum(
+                    Decimal(str(item["total_price"])) for item in order_items
+                )
+                order = Order(
+                    id=uuid.uuid4(),
+                    restaurant_id=self.restaurant_id,
+                    order_number=f"BENCH-{uuid.uuid4().hex[:10].upper()}",
+                    table_number=str(i % 30 + 1),
+                    order_type="dine_in",
+                    status=status,
+                    items=order_items,
+                    subtotal=subtotal,
+                    tax_amount=money(subtotal * Decimal("0.2")),
+                    service_charge=money(subtotal * Decimal("0.125")),
+                    discount_amount=0,
+                    total_amount=money(subtotal * Decimal("1.325")),
+                    payment_status="completed" if status == "completed" else "pending",
+                    created_by=self.user_id,
+                    created_at=now - timedelta(minutes=count - i) if history else now,
+                )
+                db.add(order)
+                ids.append(str(order.id))
+                self.totals[str(order.id)] = order.total_amount
+            db.commit()
+        finally:
+            db.close()
+        return ids
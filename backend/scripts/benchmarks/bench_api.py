@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+"""
+Benchmark the main API flows end to end against an in-process app.main:app.
+
+See api_harness.py for how the database, Redis, Supabase and Stripe are
+replaced. Each scenario sends real requests through the full middleware stack
+with a seeded restaurant: menu fetch (served from cache, and with the
+restaurant's cache invalidated before each call), order create, order confirm
+(with recipe deductions), cash and Stripe payments, sync batch upload and
+download, and a websocket broadcast to --sockets connected devices. Order
+create/confirm also broadcast to those devices, as they do in production.
+
+Latency is measured first; allocations are then traced with tracemalloc over
+--alloc-iterations further calls, so tracing does not skew the timings.
+
+Usage:
+    python scripts/benchmarks/bench_api.py --output api.json
+    python scripts/benchmarks/bench_api.py --baseline api.json --fail-over 20
+    BENCH_DATABASE_URL=postgresql://localhost/fynlo_bench python scripts/benchmarks/bench_api.py
+"""
+
+import argparse
+import platform
+import sys
+from datetime import datetime, timezone
+
+from api_harness import ApiHarness, FakeSocket
+from common import (
+    compare_reports,
+    measure_allocations_async,
+    measure_async,
+    print_results,
+    run,
+    write_report,
+)
+
+import sqlalchemy
+
+from app.core.cache_service import cache_service
+from app.core.websocket import EventType, WebSocketMessage, websocket_manager
+
+WARMUP = 10
+
+
+def check(response, *expected):
+    if response.status_code not in expected:
+        raise RuntimeError(
+            f"{response.request.method} {response.request.url.path} returned "
+            f"{response.status_code}: {response.text[:500]}"
+        )
+    return response
+
+
+def consume(ids):
+    """Callable handing out one pre-created order id per call"""
+    iterator = iter(ids)
+    return lambda: next(iterator)
+
+
+def build_scenarios(harness, args):
+    client = harness.client
+    restaurant_id = str(harness.restaurant_id)
+    per_scenario = WARMUP + args.iterations + args.alloc_iterations
+
+    async def menu_cached():
+        check(await client.get("/api/v1/menu/items"), 200)
+
+    async def menu_uncached():
+        await cache_service.invalidate_restaurant_cache(restaurant_id)
+        check(await client.get("/api/v1/menu/items"), 200)
+
+    order_body = {
+        "table_number": "12",
+        "order_type": "dine_in",
+        "items": harness.order_items(args.items),
+        "special_instructions": "Birthday table, bring the cake last",
+    }
+
+    async def order_create():
+        check(await client.post("/api/v1/orders/", json=order_body), 200)
+
+    next_to_confirm = consume(harness.create_orders(per_scenario, args.items))
+
+    async def order_confirm():
+        check(await client.post(f"/api/v1/orders/{next_to_confirm()}/confirm"), 200)
+
+    next_cash = consume(harness.create_orders(per_scenario, args.items))
+
+    async def payment_cash():
+        order_id = next_cash()
+        amount = harness.totals[order_id]
+        body = {
+            "order_id": order_id,
+            "amount": str(amount),
+            "received_amount": str(amount + 5),
+        }
+        check(await client.post("/api/v1/payments/cash", json=body), 200)
+
+    next_card = consume(harness.create_orders(per_scenario, args.items))
+
+    async def payment_stripe():
+        order_id = next_card()
+        body = {
+            "order_id": order_id,
+            "amount": str(harness.totals[order_id]),
+            "payment_method_id": "pm_card_visa",
+        }
+        check(await client.post("/api/v1/payments/stripe", json=body), 200)
+
+    history = harness.history_ids
+    upload_offset = 0
+
+    async def sync_upload():
+        nonlocal upload_offset
+        actions = []
+        for i in range(args.sync_actions):
+            order_id = history[(upload_offset + i) % len(history)]
+            actions.append(
+                {
+                    "entity_type": "orders",
+                    "entity_id": order_id,
+                    "action": "update",
+                    "data": {"id": order_id, "status": "completed"},
+                    "client_timestamp": datetime.now(timezone.utc).isoformat(),
+                }
+            )
+        upload_offset += args.sync_actions
+        body = {"device_id": "bench-ipad", "sync_actions": actions}
+        check(await client.post("/api/v1/sync/upload-batch", json=body), 200)
+
+    async def sync_download():
+        params = {"entity_types": "orders,products", "limit": args.sync_page_size}
+        check(await client.get("/api/v1/sync/download-changes", params=params), 200)
+
+    message = WebSocketMessage(
+        event_type=EventType.ORDER_CREATED,
+        data={"order_id": "bench-order", "items": order_body["items"]},
+        restaurant_id=restaurant_id,
+    )
+
+    async def ws_broadcast():
+        await websocket_manager.broadcast_to_restaurant(restaurant_id, message)
+        await websocket_manager.flush()
+
+    return {
+        "menu fetch (cached)": menu_cached,
+        "menu fetch (cache miss)": menu_uncached,
+        "order create": order_create,
+        "order confirm": order_confirm,
+        "payment cash": payment_cash,
+        "payment stripe": payment_stripe,
+        "sync upload": sync_upload,
+        "sync download": sync_download,
+        "websocket broadcast": ws_broadcast,
+    }
+
+
+async def main(args):
+    harness = ApiHarness(
+        products=args.products, categories=args.categories, history=args.history
+    )
+    harness.setup(stripe_rtt_ms=args.stripe_rtt_ms)
+    for i in range(args.sockets):
+        await websocket_manager.connect(
+            FakeSocket(), str(harness.restaurant_id), user_id=f"device-{i}"
+        )
+
+    scenarios = build_scenarios(harness, args)
+    selected = args.scenario or list(scenarios)
+    results = {}
+    try:
+        for name in selected:
+            fn = scenarios[name]
+            results[name] = await measure_async(fn, args.iterations, warmup=WARMUP)
+            results[name].update(
+                await measure_allocations_async(fn, args.alloc_iterations)
+            )
+    finally:
+        await websocket_manager.flush()
+        await harness.close()
+
+    print_results(
+        f"API scenarios ({harness.dialect}, {args.items} items per order, "
+        f"{args.sockets} sockets)",
+        results,
+    )
+    print(f"\n{'scenario':<40}{'peak KiB':>12}{'kept KiB':>12}")
+    for name, stats in results.items():
+        print(
+            f"{name:<40}{stats['alloc_peak_kib']:>12}{stats['alloc_retained_kib']:>12}"
+        )
+
+    report = dict(results)
+    report["_meta"] = {
+        "database": harness.dialect,
+        "python": platform.python_version(),
+        "sqlalchemy": sqlalchemy.__version__,
+        "args": vars(args),
+    }
+    write_report(args.output, report)
+
+    if args.baseline:
+        regressions = compare_reports(args.baseline, results, args.fail_over)
+        if regressions:
+            print(f"\np95 regressed by more than {args.fail_over}%: {regressions}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--iterations", type=int, default=300)
+    parser.add_argument("--alloc-iterations", type=int, default=30)
+    parser.add_argument(
+        "--scenario", action="append", help="Run only this scenario (repeatable)"
+    )
+    parser.add_argument("--items", type=int, default=5, help="Lines per order")
+    parser.add_argument("--products", type=int, default=60)
+    parser.add_argument("--categories", type=int, default=8)
+    parser.add_argument("--history", type=int, default=500, help="Seeded orders")
+    parser.add_argument("--sync-actions", type=int, default=25)
+    parser.add_argument("--sync-page-size", type=int, default=100)
+    parser.add_argument("--sockets", type=int, default=20)
+    parser.add_argument("--stripe-rtt-ms", type=float, default=0.0)
+    parser.add_argument("--output", help="Write results as JSON to this path")
+    parser.add_argument("--baseline", help="Earlier --output file to compare with")
+    parser.add_argument(
+        "--fail-over",
+        type=float,
+        default=20.0,
+        help="Exit non-zero when a p95 grew by more than this percentage",
+    )
+    run(main(parser.parse_args()))
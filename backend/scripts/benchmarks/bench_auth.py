@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+"""
+Benchmark the get_current_user dependency in "remote" and "local" modes.
+
+Remote mode is simulated with a stub Supabase client and a stub user query
+that sleep for the configured round-trip times, since the real cost is network
+latency. The per-request audit log write and commit sleep for one database
+round-trip. Local mode runs the real JWKS verifier and user cache.
+
+Usage:
+    python scripts/benchmarks/bench_auth.py --iterations 2000 --output auth.json
+"""
+
+import argparse
+import time
+import uuid
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from common import measure_async, print_results, run, write_report
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec
+from jose import jwk, jwt
+from sqlalchemy.orm import Session, make_transient_to_detached
+
+from app.core import auth, token_verifier
+from app.core.auth_cache import AuthUserCache
+from app.core.config import settings
+from app.core.database import User
+from app.core.token_verifier import JWKSCache, SupabaseTokenVerifier
+from starlette.requests import Request
+
+ISSUER = "https://bench.supabase.co/auth/v1"
+HMAC_SECRET = "benchmark-jwt-secret-benchmark-jwt-secret"
+
+
+class StubQuery:
+    def __init__(self, session, user, delay):
+        self.session = session
+        self.user = user
+        self.delay = delay
+
+    def filter(self, *args):
+        return self
+
+    def first(self):
+        time.sleep(self.delay)
+        # Loaded into the session like a real query result
+        return self.session.merge(self.user, load=False)
+
+
+class StubSession(Session):
+    """Session whose user lookup costs a fixed simulated round-trip"""
+
+    def __init__(self, user, delay):
+        super().__init__()
+        self._stub_query = StubQuery(self, user, delay)
+        self.queries = 0
+
+    def query(self, *entities):
+        self.queries += 1
+        return self._stub_query
+
+
+class StubAuditLogger:
+    """Audit log write that costs a round-trip and commits the request session"""
+
+    delay = 0.0
+
+    def __init__(self, db):
+        self.db = db
+
+    async def create_audit_log(self, commit=False, **kwargs):
+        time.sleep(self.delay)
+        if commit:
+            self.db.commit()
+
+
+class StubRedis:
+    async def get(self, key):
+        return None
+
+    async def set(self, key, value, expire=None):
+        return True
+
+    async def exists(self, key):
+        return False
+
+    async def delete(self, key):
+        return True
+
+
+def build_tokens(supabase_id):
+    claims = {
+        "sub": supabase_id,
+        "aud": "authenticated",
+        "iss": ISSUER,
+        "exp": int(time.time()) + 3600,
+        "session_id": str(uuid.uuid4()),
+        "email": "bench@example.com",
+    }
+    private_key = ec.generate_private_key(ec.SECP256R1())
+    private_pem = private_key.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.PKCS8,
+        serialization.NoEncryption(),
+    )
+    public_pem = private_key.public_key().public_bytes(
+        serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo
+    )
+    public_jwk = jwk.construct(public_pem, "ES256").to_dict()
+    public_jwk["kid"] = "bench-key"
+    jwks_cache = JWKSCache(jwks_url=None)
+    jwks_cache.load({"keys": [public_jwk]})
+    return {
+        "HS256": jwt.encode(claims, HMAC_SECRET, algorithm="HS256"),
+        "ES256": jwt.encode(
+            claims, private_pem, algorithm="ES256", headers={"kid": "bench-key"}
+        ),
+    }, jwks_cache
+
+
+async def main(args):
+    supabase_id = str(uuid.uuid4())
+    user = User(
+        id=uuid.uuid4(),
+        email="bench@example.com",
+        supabase_id=uuid.UUID(supabase_id),
+        first_name="Bench",
+        last_name="User",
+        role="employee",
+        restaurant_id=uuid.uuid4(),
+        is_active=True,
+    )
+    # A fully loaded row, as a query would return it
+    for column in User.__table__.columns:
+        if column.key not in user.__dict__:
+            setattr(user, column.key, None)
+    make_transient_to_detached(user)
+    tokens, jwks_cache = build_tokens(supabase_id)
+    verifier = SupabaseTokenVerifier(
+        jwks_cache=jwks_cache, hmac_secret=HMAC_SECRET, issuer=ISSUER
+    )
+    supabase_stub = SimpleNamespace(
+        auth=SimpleNamespace(
+            get_user=lambda token: (
+                time.sleep(args.supabase_rtt_ms / 1000),
+                SimpleNamespace(
+                    user=SimpleNamespace(id=supabase_id, email=user.email)
+                ),
+            )[1]
+        )
+    )
+    db_delay = args.db_rtt_ms / 1000
+    results = {}
+
+    StubAuditLogger.delay = db_delay
+    request = Request(
+        {
+            "type": "http",
+            "method": "GET",
+            "path": "/api/v1/orders",
+            "headers": [(b"user-agent", b"bench")],
+            "client": ("127.0.0.1", 1234),
+        }
+    )
+
+    async def resolve(token, db):
+        current = await auth.get_current_user(request, f"Bearer {token}", db)
+        # A handler reading the user must not trigger a reload
+        return current.restaurant_id
+
+    with patch.object(auth, "supabase_admin", supabase_stub), patch.object(
+        auth, "AuditLoggerService", StubAuditLogger
+    ):
+        settings.AUTH_VERIFICATION_MODE = "remote"
+        db = StubSession(user, db_delay)
+        results["remote (supabase + query)"] = await measure_async(
+            lambda: resolve(tokens["HS256"], db), args.remote_iterations
+        )
+
+    settings.AUTH_VERIFICATION_MODE = "local"
+    token_verifier._verifier = verifier
+    audit_patch = patch.object(auth, "AuditLoggerService", StubAuditLogger)
+    audit_patch.start()
+    for alg, token in tokens.items():
+        cold_cache = AuthUserCache(ttl=0, redis=StubRedis())
+        with patch.object(auth, "auth_user_cache", cold_cache):
+            db = StubSession(user, db_delay)
+            results[f"local {alg} (cache miss)"] = await measure_async(
+                lambda: resolve(token, db), args.remote_iterations
+            )
+
+        warm_cache = AuthUserCache(ttl=3600, redis=StubRedis())
+        with patch.object(auth, "auth_user_cache", warm_cache):
+            db = StubSession(user, db_delay)
+            results[f"local {alg} (cache hit)"] = await measure_async(
+                lambda: resolve(token, db), args.iterations
+            )
+            results[f"local {alg} (cache hit)"]["db_queries"] = db.queries
+    audit_patch.stop()
+
+    print_results(
+        f"get_current_user (supabase rtt {args.supabase_rtt_ms}ms, "
+        f"db rtt {args.db_rtt_ms}ms)",
+        results,
+    )
+    write_report(args.output, results)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--iterations", type=int, default=5000)
+    parser.add_argument("--remote-iterations", type=int, default=200)
+    parser.add_argument("--supabase-rtt-ms", type=float, default=40.0)
+    parser.add_argument("--db-rtt-ms", type=float, default=1.0)
+    parser.add_argument("--output", help="Write results as JSON to this path")
+    run(main(parser.parse_args()))
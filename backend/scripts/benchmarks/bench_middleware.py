@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Benchmark per-request overhead of the HTTP middleware stack from app.main.
+
+Requests are driven straight through the ASGI app with in-memory
+receive/send, so only middleware and routing cost is measured. "bare" has no
+middleware, "stack" is the pure ASGI stack in app.main's order, and
+"BaseHTTPMiddleware x5" is the previous fixed cost: five pass-through
+BaseHTTPMiddleware layers doing no work of their own. The stack run also
+reports each middleware's own time from the timing hook.
+
+Usage:
+    python scripts/benchmarks/bench_middleware.py --iterations 5000 --output middleware.json
+"""
+
+import argparse
+import asyncio
+import json
+
+from common import measure_async, print_results, run, write_report
+
+from fastapi import FastAPI, Request
+from starlette.middleware.base import BaseHTTPMiddleware
+from slowapi.middleware import SlowAPIASGIMiddleware
+
+from app.core.mobile_middleware import MobileCompatibilityMiddleware
+from app.middleware.asgi import MiddlewareTimer, set_timing_hook
+from app.middleware.rate_limit_middleware import limiter
+from app.middleware.rls_middleware import RLSMiddleware
+from app.middleware.security_headers_middleware import SecurityHeadersMiddleware
+from app.middleware.sql_injection_waf import SQLInjectionWAFMiddleware
+from app.middleware.version_middleware import APIVersionMiddleware, API_VERSION_CONFIG
+
+ORDER = {
+    "restaurant_id": "6f1c2d3e-1111-2222-3333-444455556666",
+    "order_type": "dine_in",
+    "table_number": "12",
+    "items": [
+        {"product_id": f"6f1c2d3e-1111-2222-3333-4444555{i:05d}", "quantity": 2}
+        for i in range(10)
+    ],
+}
+
+
+class PassThrough(BaseHTTPMiddleware):
+    async def dispatch(self, request, call_next):
+        return await call_next(request)
+
+
+def build_app(stack):
+    app = FastAPI()
+    app.state.limiter = limiter
+
+    @app.get("/api/v1/ping")
+    async def ping():
+        return {"status": "ok"}
+
+    @app.post("/api/v1/orders")
+    async def create_order(request: Request):
+        return {"items": len((await request.json())["items"])}
+
+    if stack == "stack":
+        app.add_middleware(APIVersionMiddleware)
+        app.add_middleware(SecurityHeadersMiddleware)
+        app.add_middleware(RLSMiddleware)
+        app.add_middleware(SQLInjectionWAFMiddleware, enabled=True, log_attacks=True)
+        app.add_middleware(
+            MobileCompatibilityMiddleware, enable_cors=False, enable_port_redirect=True
+        )
+        app.add_middleware(SlowAPIASGIMiddleware)
+    elif stack == "basehttp":
+        for _ in range(5):
+            app.add_middleware(PassThrough)
+    return app
+
+
+def make_request(app, method, path, body=b""):
+    headers = [
+        (b"host", b"testserver"),
+        (b"user-agent", b"Fynlo/2.0 (iPhone; iOS 17.0)"),
+        (b"content-type", b"application/json"),
+        (b"content-length", str(len(body)).encode()),
+    ]
+
+    async def call():
+        scope = {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": method,
+            "scheme": "http",
+            "path": path,
+            "raw_path": path.encode(),
+            "root_path": "",
+            "query_string": b"",
+            "headers": headers,
+            "client": ("127.0.0.1", 50000),
+            "server": ("testserver", 80),
+        }
+        received = False
+
+        async def receive():
+            nonlocal received
+            if received:
+                # Like a server, only report a disconnect when there is one
+                await asyncio.get_running_loop().create_future()
+            received = True
+            return {"type": "http.request", "body": body, "more_body": False}
+
+        async def send(message):
+            pass
+
+        await app(scope, receive, send)
+
+    return call
+
+
+async def main(args):
+    API_VERSION_CONFIG["log_version_rewrites"] = False
+    body = json.dumps(ORDER).encode()
+    results = {}
+    timer = MiddlewareTimer()
+
+    for stack in ("bare", "basehttp", "stack"):
+        app = build_app(stack)
+        label = {"basehttp": "BaseHTTPMiddleware x5"}.get(stack, stack)
+        if stack == "stack":
+            set_timing_hook(timer.record)
+
+        results[f"{label} GET"] = await measure_async(
+            make_request(app, "GET", "/api/v1/ping"), args.iterations
+        )
+        results[f"{label} POST"] = await measure_async(
+            make_request(app, "POST", "/api/v1/orders", body), args.iterations
+        )
+        set_timing_hook(None)
+
+    print_results("Middleware stack overhead (in-process ASGI)", results)
+
+    print("\nOwn time per middleware (stack, GET and POST)")
+    for name, stats in timer.snapshot().items():
+        print(f"{name:<40}{stats['mean_us']:>12} µs mean{stats['max_us']:>12} µs max")
+    results["middleware_own_time"] = timer.snapshot()
+
+    write_report(args.output, results)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--iterations", type=int, default=5000)
+    parser.add_argument("--output", help="Write results as JSON to this path")
+    run(main(parser.parse_args()))
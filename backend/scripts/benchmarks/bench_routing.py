@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Benchmark SmartRoutingService.route_payment with and without the routing table.
+
+The analytics queries are simulated with a stub PaymentAnalyticsService that
+blocks for the configured round-trip per query, like the real synchronous
+Session does. "uncached" invalidates the restaurant before every decision so
+each one runs the queries; "routing table" serves a warm entry.
+
+Usage:
+    python scripts/benchmarks/bench_routing.py --iterations 20000 --output routing.json
+"""
+
+import argparse
+import time
+from decimal import Decimal
+
+from common import measure_async, print_results, run, write_report
+
+from app.services.smart_routing import (
+    RoutingStrategy,
+    RoutingTable,
+    SmartRoutingService,
+)
+
+
+class StubAnalytics:
+    """Analytics whose queries cost a fixed simulated round-trip"""
+
+    def __init__(self, delay):
+        self.delay = delay
+        self.queries = 0
+
+    async def get_provider_performance_summary(self, *args, **kwargs):
+        self.queries += 1
+        time.sleep(self.delay)
+        return {
+            "overall_metrics": {"total_volume": 2400.0, "total_fees": 30.0},
+            "provider_performance": {},
+        }
+
+    async def get_provider_health_scores(self, *args, **kwargs):
+        self.queries += 1
+        time.sleep(self.delay)
+        return {"health_scores": {}}
+
+
+async def main(args):
+    delay = args.db_rtt_ms / 1000
+    amount = Decimal("27.50")
+    results = {}
+
+    for strategy in (RoutingStrategy.BALANCED, RoutingStrategy.COST_OPTIMAL):
+        analytics = StubAnalytics(delay)
+        table = RoutingTable(ttl_seconds=3600)
+        router = SmartRoutingService(analytics, routing_table=table)
+
+        async def uncached():
+            table.invalidate("bench")
+            await router.route_payment(amount, "bench", strategy=strategy)
+
+        results[f"uncached {strategy.value}"] = await measure_async(
+            uncached, args.uncached_iterations
+        )
+
+        analytics.queries = 0
+        results[f"routing table {strategy.value}"] = await measure_async(
+            lambda: router.route_payment(amount, "bench", strategy=strategy),
+            args.iterations,
+        )
+        results[f"routing table {strategy.value}"]["queries"] = analytics.queries
+
+    print_results(
+        f"Routing decisions (db rtt {args.db_rtt_ms}ms per query)", results
+    )
+    write_report(args.output, results)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--iterations", type=int, default=20000)
+    parser.add_argument("--uncached-iterations", type=int, default=200)
+    parser.add_argument("--db-rtt-ms", type=float, default=2.0)
+    parser.add_argument("--output", help="Write results as JSON to this path")
+    run(main(parser.parse_args()))
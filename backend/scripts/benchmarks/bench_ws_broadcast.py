@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Benchmark single-worker restaurant broadcast latency with a slow consumer.
+
+Connects --sockets fake devices to one restaurant, --slow of which take
+--slow-ms to accept each frame, then measures how long broadcast_to_restaurant
+blocks the caller and how long until every healthy device has the message.
+The "sequential" scenario replays the previous loop (encode per socket, await
+each send in turn) for comparison.
+
+Usage:
+    python scripts/benchmarks/bench_ws_broadcast.py --sockets 50 --slow 1
+"""
+
+import argparse
+import asyncio
+import json
+import time
+
+from common import print_results, run, summarize, write_report
+
+from app.core.websocket import EventType, WebSocketManager, WebSocketMessage
+
+RESTAURANT_ID = "bench-restaurant"
+
+
+class FakeSocket:
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.received = 0
+
+    async def accept(self):
+        pass
+
+    async def close(self, code: int = 1000):
+        pass
+
+    async def send_text(self, text):
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        self.received += 1
+
+
+def make_message(index):
+    return WebSocketMessage(
+        event_type=EventType.ORDER_CREATED,
+        data={
+            "order_id": f"order-{index}",
+            "items": [{"name": f"item-{i}", "qty": i} for i in range(10)],
+        },
+        restaurant_id=RESTAURANT_ID,
+    )
+
+
+async def connect_all(manager, args):
+    healthy, slow = [], []
+    for i in range(args.sockets):
+        is_slow = i < args.slow
+        socket = FakeSocket(args.slow_ms / 1000 if is_slow else 0.0)
+        await manager.connect(socket, RESTAURANT_ID, user_id=f"device-{i}")
+        (slow if is_slow else healthy).append(socket)
+    await manager.flush()
+    return healthy
+
+
+async def wait_for_delivery(sockets, expected):
+    while any(socket.received < expected for socket in sockets):
+        await asyncio.sleep(0)
+
+
+async def bench_queued(args):
+    manager = WebSocketManager()
+    manager.send_queue_size = args.messages + 10
+    manager.send_timeout = 60.0
+    healthy = await connect_all(manager, args)
+    baseline = healthy[0].received
+
+    call_samples, delivery_samples = [], []
+    for i in range(args.messages):
+        start = time.perf_counter()
+        await manager.broadcast_to_restaurant(RESTAURANT_ID, make_message(i))
+        call_samples.append(time.perf_counter() - start)
+        await wait_for_delivery(healthy, baseline + i + 1)
+        delivery_samples.append(time.perf_counter() - start)
+    return call_samples, delivery_samples
+
+
+async def bench_sequential(args):
+    """The pre-queue delivery loop, kept here only as a reference point"""
+    manager = WebSocketManager()
+    healthy = await connect_all(manager, args)
+    sockets = [c.websocket for c in manager.active_connections.values()]
+    iterations = max(1, args.messages // 10) if args.slow else args.messages
+
+    samples = []
+    for i in range(iterations):
+        message = make_message(i)
+        start = time.perf_counter()
+        for socket in sockets:
+            await socket.send_text(json.dumps(message.to_dict()))
+        samples.append(time.perf_counter() - start)
+    return samples, samples
+
+
+async def main(args):
+    results = {}
+    call, delivery = await bench_queued(args)
+    results["queued: broadcast call"] = summarize(call)
+    results["queued: all healthy delivered"] = summarize(delivery)
+    call, _ = await bench_sequential(args)
+    results["sequential: all delivered"] = summarize(call)
+
+    print_results(
+        f"Broadcast to {args.sockets} sockets ({args.slow} slow @ {args.slow_ms}ms)",
+        results,
+    )
+    write_report(args.output, results)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--sockets", type=int, default=50)
+    parser.add_argument("--slow", type=int, default=1)
+    parser.add_argument("--slow-ms", type=float, default=50.0)
+    parser.add_argument("--messages", type=int, default=500)
+    parser.add_argument("--output", help="Write results as JSON to this path")
+    run(main(parser.parse_args()))
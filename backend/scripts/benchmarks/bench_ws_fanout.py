@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+Benchmark cross-worker WebSocket broadcast latency and throughput.
+
+With --broker redis, each simulated uvicorn worker runs in its own process
+with a WebSocketManager attached to the Redis pub/sub broker and a set of fake
+sockets; the parent publishes order events and every worker reports the
+publish-to-socket latency it observed. --broker memory runs the same scenario
+in one process through the in-memory broker (no Redis needed).
+
+Usage:
+    python scripts/benchmarks/bench_ws_fanout.py --broker memory
+    python scripts/benchmarks/bench_ws_fanout.py --broker redis \\
+        --redis-url redis://localhost:6379/15 --workers 4 --messages 2000
+"""
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import time
+
+from common import print_results, run, summarize, write_report
+
+from app.core.websocket import (
+    ConnectionType,
+    EventType,
+    WebSocketManager,
+    WebSocketMessage,
+)
+from app.core.websocket_broker import (
+    InMemoryBroker,
+    InMemoryBrokerHub,
+    RedisPubSubBroker,
+)
+
+RESTAURANT_ID = "bench-restaurant"
+
+
+class LatencySocket:
+    """Fake WebSocket recording publish-to-delivery latency"""
+
+    def __init__(self, samples):
+        self.samples = samples
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, text):
+        payload = json.loads(text)
+        sent_at = payload["data"].get("sent_at")
+        if sent_at is not None:
+            self.samples.append(time.time() - sent_at)
+
+
+async def attach_sockets(manager, count, samples):
+    for i in range(count):
+        await manager.connect(
+            LatencySocket(samples),
+            RESTAURANT_ID,
+            user_id=f"device-{i}",
+            connection_type=ConnectionType.KITCHEN if i % 2 else ConnectionType.POS,
+        )
+
+
+def make_message(index):
+    return WebSocketMessage(
+        event_type=EventType.ORDER_CREATED,
+        data={"order_id": f"order-{index}", "sent_at": time.time()},
+        restaurant_id=RESTAURANT_ID,
+    )
+
+
+async def redis_worker_main(redis_url, sockets, expected, ready, results):
+    import redis.asyncio as aioredis
+
+    redis = aioredis.from_url(redis_url, decode_responses=True)
+    samples = []
+    manager = WebSocketManager()
+    await manager.attach_broker(
+        RedisPubSubBroker(redis, has_local_connections=manager.has_local_connections)
+    )
+    await attach_sockets(manager, sockets, samples)
+    await asyncio.sleep(0.5)  # let the pattern subscription settle
+    ready.set()
+
+    deadline = time.time() + 60
+    while len(samples) < expected and time.time() < deadline:
+        await asyncio.sleep(0.01)
+    await manager.detach_broker()
+    await redis.close()
+    results.put(samples)
+
+
+def redis_worker(redis_url, sockets, expected, ready, results):
+    asyncio.run(redis_worker_main(redis_url, sockets, expected, ready, results))
+
+
+async def run_redis(args):
+    import redis.asyncio as aioredis
+
+    ctx = multiprocessing.get_context("spawn")
+    results = ctx.Queue()
+    expected = args.messages * args.sockets
+    readies, processes = [], []
+    for _ in range(args.workers):
+        ready = ctx.Event()
+        process = ctx.Process(
+            target=redis_worker,
+            args=(args.redis_url, args.sockets, expected, ready, results),
+        )
+        process.start()
+        readies.append(ready)
+        processes.append(process)
+    for ready in readies:
+        ready.wait(30)
+
+    redis = aioredis.from_url(args.redis_url, decode_responses=True)
+    publisher = WebSocketManager()
+    await publisher.attach_broker(RedisPubSubBroker(redis))
+    start = time.perf_counter()
+    for i in range(args.messages):
+        await publisher.broadcast_to_restaurant(RESTAURANT_ID, make_message(i))
+    publish_elapsed = time.perf_counter() - start
+
+    samples = []
+    for _ in processes:
+        samples.extend(results.get(timeout=90))
+    elapsed = time.perf_counter() - start
+    for process in processes:
+        process.join()
+    await publisher.detach_broker()
+    await redis.close()
+    return samples, publish_elapsed, elapsed
+
+
+async def run_memory(args):
+    hub = InMemoryBrokerHub()
+    samples = []
+    managers = []
+    for _ in range(args.workers):
+        manager = WebSocketManager()
+        await manager.attach_broker(InMemoryBroker(hub))
+        await attach_sockets(manager, args.sockets, samples)
+        managers.append(manager)
+
+    start = time.perf_counter()
+    for i in range(args.messages):
+        await managers[i % len(managers)].broadcast_to_restaurant(
+            RESTAURANT_ID, make_message(i)
+        )
+    elapsed = time.perf_counter() - start
+    return samples, elapsed, elapsed
+
+
+async def main(args):
+    runner = run_redis if args.broker == "redis" else run_memory
+    samples, publish_elapsed, elapsed = await runner(args)
+
+    stats = summarize(samples) if samples else {"iterations": 0}
+    stats.update(
+        {
+            "workers": args.workers,
+            "sockets_per_worker": args.sockets,
+            "messages_published": args.messages,
+            "deliveries": len(samples),
+            "expected_deliveries": args.messages * args.sockets * args.workers,
+            "publish_per_sec": round(args.messages / publish_elapsed, 1),
+            "deliveries_per_sec": round(len(samples) / elapsed, 1),
+        }
+    )
+    # ops_per_sec from summarize() is per-sample latency based; report real rate
+    stats["ops_per_sec"] = stats["deliveries_per_sec"]
+    results = {f"{args.broker} fan-out": stats}
+    print_results(
+        f"Broadcast to {args.workers} workers x {args.sockets} sockets", results
+    )
+    print(
+        f"delivered {stats['deliveries']}/{stats['expected_deliveries']}, "
+        f"publish rate {stats['publish_per_sec']}/s"
+    )
+    write_report(args.output, results)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--broker", choices=["memory", "redis"], default="memory")
+    parser.add_argument("--redis-url", default="redis://localhost:6379/15")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--sockets", type=int, default=25)
+    parser.add_argument("--messages", type=int, default=1000)
+    parser.add_argument("--output", help="Write results as JSON to this path")
+    run(main(parser.parse_args()))
@@ -0,0 +1,138 @@
+"""
+Shared helpers for the offline benchmark scripts.
+
+Importing this module points the app settings at throwaway local values so the
+benchmarks never touch production services.
+"""
+
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+sys.path.insert(0, BACKEND_DIR)
+
+os.environ.setdefault("DATABASE_URL", "sqlite:///:memory:")
+os.environ.setdefault("REDIS_URL", "redis://localhost:6379/15")
+os.environ.setdefault("SECRET_KEY", "benchmark-secret-key-not-for-production-use")
+os.environ.setdefault("ENVIRONMENT", "test")
+
+
+def summarize(samples: List[float]) -> Dict[str, float]:
+    """Percentiles in microseconds plus throughput for a list of second timings"""
+    ordered = sorted(samples)
+    count = len(ordered)
+
+    def percentile(p: float) -> float:
+        index = min(count - 1, int(round(p / 100 * (count - 1))))
+        return ordered[index] * 1_000_000
+
+    total = sum(ordered)
+    return {
+        "iterations": count,
+        "p50_us": round(percentile(50), 2),
+        "p95_us": round(percentile(95), 2),
+        "p99_us": round(percentile(99), 2),
+        "mean_us": round(statistics.fmean(ordered) * 1_000_000, 2),
+        "ops_per_sec": round(count / total, 1) if total else 0.0,
+    }
+
+
+def measure(fn: Callable[[], Any], iterations: int, warmup: int = 10) -> Dict[str, float]:
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return summarize(samples)
+
+
+async def measure_async(
+    fn: Callable[[], Awaitable[Any]], iterations: int, warmup: int = 10
+) -> Dict[str, float]:
+    for _ in range(warmup):
+        await fn()
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        await fn()
+        samples.append(time.perf_counter() - start)
+    return summarize(samples)
+
+
+async def measure_allocations_async(
+    fn: Callable[[], Awaitable[Any]], iterations: int
+) -> Dict[str, float]:
+    """Mean traced memory per call: peak above the starting point, and retained"""
+    tracemalloc.start()
+    peaks, retained = [], []
+    try:
+        for _ in range(iterations):
+            before = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+            await fn()
+            current, peak = tracemalloc.get_traced_memory()
+            peaks.append(peak - before)
+            retained.append(current - before)
+    finally:
+        tracemalloc.stop()
+    return {
+        "alloc_peak_kib": round(statistics.fmean(peaks) / 1024, 1),
+        "alloc_retained_kib": round(statistics.fmean(retained) / 1024, 1),
+    }
+
+
+def print_results(title: str, results: Dict[str, Dict[str, float]]) -> None:
+    print(f"\n{title}")
+    print(f"{'scenario':<40}{'p50 µs':>12}{'p95 µs':>12}{'p99 µs':>12}{'ops/s':>12}")
+    for name, stats in results.items():
+        print(
+            f"{name:<40}{stats['p50_us']:>12}{stats['p95_us']:>12}"
+            f"{stats['p99_us']:>12}{stats['ops_per_sec']:>12}"
+        )
+
+
+def write_report(path: Optional[str], results: Dict[str, Any]) -> None:
+    if not path:
+        return
+    with open(path, "w") as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+    print(f"\nWrote {path}")
+
+
+def compare_reports(
+    baseline_path: str, results: Dict[str, Any], threshold_pct: float
+) -> List[str]:
+    """Print p50/p95/p99 changes against an earlier --output file
+
+    Returns the scenarios whose p95 grew by more than threshold_pct.
+    """
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+
+    print(f"\nChange vs {baseline_path}")
+    print(f"{'scenario':<40}{'p50':>12}{'p95':>12}{'p99':>12}")
+    regressions = []
+    for name, stats in results.items():
+        before = baseline.get(name)
+        if not isinstance(before, dict) or "p95_us" not in before:
+            continue
+        changes = [
+            (stats[key] - before[key]) / before[key] * 100 if before[key] else 0.0
+            for key in ("p50_us", "p95_us", "p99_us")
+        ]
+        print(f"{name:<40}" + "".join(f"{change:>+11.1f}%" for change in changes))
+        if changes[1] > threshold_pct:
+            regressions.append(name)
+    return regressions
+
+
+def run(coro: Awaitable[Any]) -> Any:
+    return asyncio.run(coro)
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Partition Orders and Payments Script
+Converts orders and/or payments into tables range-partitioned by month on
+created_at. Prints the plan by default; --execute runs it in one transaction,
+which holds an exclusive lock on the table while rows are copied, so run it
+in a maintenance window.
+"""
+
+import argparse
+import logging
+import sys
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from sqlalchemy import text
+
+from app.core.config import settings
+from app.core.database import engine
+from app.core.partitioning import (
+    PARTITIONED_TABLES,
+    conversion_statements,
+    is_partitioned,
+    read_table_definition,
+)
+
+logging.basicConfig(level=logging.INFO, format="%(message)s")
+logger = logging.getLogger(__name__)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Partition orders/payments by month")
+    parser.add_argument(
+        "--table",
+        action="append",
+        choices=PARTITIONED_TABLES,
+        help="Table to convert (repeatable, default: both)",
+    )
+    parser.add_argument(
+        "--months-ahead",
+        type=int,
+        default=settings.PARTITION_MONTHS_AHEAD,
+        help="Future monthly partitions to create up front",
+    )
+    parser.add_argument(
+        "--drop-inbound-fks",
+        action="store_true",
+        help="Allow dropping foreign keys that reference the table",
+    )
+    parser.add_argument("--execute", action="store_true", help="Run the plan")
+    args = parser.parse_args()
+
+    with engine.begin() as connection:
+        for table in args.table or PARTITIONED_TABLES:
+            if is_partitioned(connection, table):
+                logger.info(f"{table} is already partitioned")
+                continue
+
+            definition = read_table_definition(connection, table, args.months_ahead)
+            for referencing, constraint in definition.inbound_foreign_keys:
+                logger.info(
+                    f"{referencing}.{constraint} references {table}.id and "
+                    f"will be dropped (its key must now include created_at)"
+                )
+            for indexdef in definition.skipped_unique_indexes:
+                logger.info(f"Unique index not recreated: {indexdef}")
+            if definition.inbound_foreign_keys and not args.drop_inbound_fks:
+                logger.error(
+                    f"Refusing to convert {table}: pass --drop-inbound-fks "
+                    f"to drop the foreign keys listed above"
+                )
+                sys.exit(1)
+
+            statements = conversion_statements(definition)
+            for statement in statements:
+                logger.info(f"{statement};")
+            if args.execute:
+                for statement in statements:
+                    connection.execute(text(statement))
+                logger.info(f"Partitioned {table}")
+
+        if not args.execute:
+            logger.info("Dry run; pass --execute to apply")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Rebuild Order Lines Script
+Backfills or repairs the order_lines projection from orders.items, or checks
+stored lines against orders without changing them
+"""
+
+import argparse
+import logging
+import sys
+from datetime import date, timedelta
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from app.core.database import SessionLocal
+from app.services.order_line_service import get_order_line_service
+
+logging.basicConfig(level=logging.INFO, format="%(message)s")
+logger = logging.getLogger(__name__)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild or check order lines")
+    parser.add_argument(
+        "--start", type=date.fromisoformat, help="First day (YYYY-MM-DD)"
+    )
+    parser.add_argument(
+        "--end",
+        type=date.fromisoformat,
+        default=date.today(),
+        help="Last day, inclusive (default: today)",
+    )
+    parser.add_argument("--days", type=int, default=90, help="Days back if no --start")
+    parser.add_argument("--restaurant-id", help="Limit to one restaurant")
+    parser.add_argument(
+        "--check",
+        action="store_true",
+        help="Only report orders whose lines disagree with their items; exit 1 if any",
+    )
+    args = parser.parse_args()
+    start = args.start or args.end - timedelta(days=args.days)
+
+    db = SessionLocal()
+    try:
+        service = get_order_line_service(db)
+        if args.check:
+            mismatches = service.check_consistency(start, args.end, args.restaurant_id)
+            for m in mismatches:
+                logger.info(
+                    f"order {m['order_id']}: expected {m['expected']}, "
+                    f"stored {m['actual']}"
+                )
+            logger.info(f"{len(mismatches)} mismatched orders ({start}..{args.end})")
+            sys.exit(1 if mismatches else 0)
+
+        rebuilt = service.rebuild(start, args.end, args.restaurant_id)
+        logger.info(f"Rebuilt {rebuilt} order lines {start}..{args.end}")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
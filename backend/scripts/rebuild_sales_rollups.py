@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Rebuild Sales Rollups Script
+Backfills or repairs hourly/daily sales rollup buckets from orders, or checks
+stored buckets against orders without changing them
+"""
+
+import argparse
+import logging
+import sys
+from datetime import date, timedelta
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from app.core.database import SessionLocal
+from app.services.sales_rollup_service import get_sales_rollup_service
+
+logging.basicConfig(level=logging.INFO, format="%(message)s")
+logger = logging.getLogger(__name__)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild or check sales rollups")
+    parser.add_argument(
+        "--start", type=date.fromisoformat, help="First day (YYYY-MM-DD)"
+    )
+    parser.add_argument(
+        "--end",
+        type=date.fromisoformat,
+        default=date.today(),
+        help="Last day, inclusive (default: today)",
+    )
+    parser.add_argument("--days", type=int, default=90, help="Days back if no --start")
+    parser.add_argument("--restaurant-id", help="Limit to one restaurant")
+    parser.add_argument(
+        "--check",
+        action="store_true",
+        help="Only report buckets that disagree with orders; exit 1 if any",
+    )
+    args = parser.parse_args()
+    start = args.start or args.end - timedelta(days=args.days)
+
+    db = SessionLocal()
+    try:
+        service = get_sales_rollup_service(db)
+        if args.check:
+            mismatches = service.check_consistency(start, args.end, args.restaurant_id)
+            for m in mismatches:
+                logger.info(
+                    f"{m['granularity']} {m['restaurant_id']} {m['bucket_start']} "
+                    f"{m['metric']}: expected {m['expected']}, stored {m['actual']}"
+                )
+            logger.info(f"{len(mismatches)} mismatched metrics ({start}..{args.end})")
+            sys.exit(1 if mismatches else 0)
+
+        rebuilt = service.rebuild(start, args.end, args.restaurant_id)
+        logger.info(f"Rebuilt buckets {start}..{args.end}: {rebuilt}")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
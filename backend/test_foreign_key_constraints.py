@@ -105,14 +105,20 @@ async def test_foreign_key_constraints():
             'idx_customers_restaurant_id',
             'idx_products_restaurant_id',
             'idx_products_category_id',
-            'idx_orders_restaurant_id',
             'idx_orders_customer_id',
             'idx_orders_created_by',
-            'idx_payments_order_id',
             'idx_qr_payments_order_id',
             'idx_products_restaurant_active',
-            'idx_orders_restaurant_status',
-            'idx_categories_restaurant_sort'
+            'idx_categories_restaurant_sort',
+            # Order and payment hot paths (replace idx_orders_restaurant_id,
+            # idx_orders_restaurant_status and idx_payments_order_id)
+            'idx_orders_restaurant_created',
+            'idx_orders_restaurant_active',
+            'idx_orders_restaurant_changed',
+            'idx_payments_order_status',
+            'idx_payments_completed_created',
+            'idx_payments_completed_processed',
+            'idx_payments_changed'
         ]
         
         cursor.execute("""
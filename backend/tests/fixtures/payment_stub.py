@@ -0,0 +1,86 @@
+"""
+Offline payment provider stub server for testing
+
+A small ASGI app that answers the SumUp endpoints the provider uses, served
+in-process through httpx.ASGITransport so tests exercise the real transport
+(pooling, limits, retries) without network access.
+"""
+import asyncio
+import uuid
+from typing import List, Tuple
+
+import httpx
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+
+class PaymentStubServer:
+    """Scriptable provider stub; queue failures with fail_next()"""
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.requests: List[Tuple[str, str]] = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._failures: List[JSONResponse] = []
+        self.checkouts = {}
+        self.app = self._build_app()
+
+    def fail_next(self, status_code: int = 503, times: int = 1, headers=None):
+        for _ in range(times):
+            self._failures.append(
+                JSONResponse(
+                    {"error": "stubbed failure"},
+                    status_code=status_code,
+                    headers=headers,
+                )
+            )
+
+    def client(self) -> httpx.AsyncClient:
+        return httpx.AsyncClient(transport=httpx.ASGITransport(app=self.app))
+
+    def _build_app(self) -> FastAPI:
+        app = FastAPI()
+
+        @app.middleware("http")
+        async def track(request: Request, call_next):
+            self.requests.append((request.method, request.url.path))
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            try:
+                if self.latency:
+                    await asyncio.sleep(self.latency)
+                if self._failures:
+                    return self._failures.pop(0)
+                return await call_next(request)
+            finally:
+                self.in_flight -= 1
+
+        @app.get("/me")
+        async def me():
+            return {"merchant_profile": {"merchant_code": "STUB_MERCHANT"}}
+
+        @app.post("/checkouts")
+        async def create_checkout(request: Request):
+            body = await request.json()
+            checkout = {
+                "id": str(uuid.uuid4()),
+                "status": "PENDING",
+                "amount": body["amount"],
+                "currency": body["currency"],
+                "checkout_reference": body["checkout_reference"],
+            }
+            self.checkouts[checkout["id"]] = checkout
+            return JSONResponse(checkout, status_code=201)
+
+        @app.get("/checkouts/{checkout_id}")
+        async def get_checkout(checkout_id: str):
+            if checkout_id not in self.checkouts:
+                return JSONResponse({"error": "not found"}, status_code=404)
+            return self.checkouts[checkout_id]
+
+        @app.get("/me/transactions/{transaction_id}")
+        async def get_transaction(transaction_id: str):
+            return JSONResponse({"error": "not found"}, status_code=404)
+
+        return app
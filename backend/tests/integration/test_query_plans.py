@@ -0,0 +1,194 @@
+"""
+Query plan regression tests for the order, payment and customer hot paths
+
+Seeds a throwaway PostgreSQL database and checks that the hot queries are
+answered from the indexes declared on Order, Payment and Customer rather
+than by sequential scans. Set QUERY_PLAN_DATABASE_URL to an empty database
+whose name contains "test" to run them.
+"""
+
+import os
+
+import pytest
+from sqlalchemy import create_engine, text
+
+from app.core.database import Base
+import app.models  # noqa: F401 - register every table on Base
+
+DATABASE_URL = os.getenv("QUERY_PLAN_DATABASE_URL", "")
+
+RESTAURANTS = 20
+ORDERS_PER_RESTAURANT = 2000
+CUSTOMERS_PER_RESTAURANT = 2000
+
+pytestmark = [
+    pytest.mark.integration,
+    pytest.mark.performance,
+    pytest.mark.skipif(
+        "test" not in DATABASE_URL.rsplit("/", 1)[-1],
+        reason="QUERY_PLAN_DATABASE_URL not set to a test database",
+    ),
+]
+
+SEED_ORDERS = """
+INSERT INTO orders (
+    id, restaurant_id, order_number, status, items, subtotal, total_amount,
+    created_by, created_at, updated_at
+)
+SELECT
+    gen_random_uuid(),
+    r.id,
+    'ORD-' || n,
+    CASE WHEN n % 50 = 0 THEN 'preparing'
+         WHEN n % 50 = 1 THEN 'pending'
+         WHEN n % 50 = 2 THEN 'cancelled'
+         ELSE 'completed' END,
+    '[]'::jsonb,
+    20.00,
+    24.00,
+    r.id,
+    now() - (n * interval '263 minutes'),
+    now() - (n * interval '263 minutes') + interval '20 minutes'
+FROM (
+    SELECT gen_random_uuid() AS id FROM generate_series(1, :restaurants)
+) r
+CROSS JOIN generate_series(1, :orders) n
+"""
+
+SEED_PAYMENTS = """
+INSERT INTO payments (
+    id, order_id, payment_method, amount, fee_amount, net_amount, status,
+    processed_at, created_at
+)
+SELECT
+    gen_random_uuid(), o.id, 'card', o.total_amount, 0.36, o.total_amount - 0.36,
+    'completed', o.created_at + interval '1 minute', o.created_at
+FROM orders o
+WHERE o.status = 'completed'
+"""
+
+SEED_CUSTOMERS = """
+INSERT INTO customers (id, restaurant_id, first_name, last_name, email, phone)
+SELECT
+    gen_random_uuid(),
+    r.restaurant_id,
+    'Guest',
+    'Number ' || n,
+    'guest' || n || '.' || left(r.restaurant_id::text, 8) || '@example.com',
+    '+44 7700 ' || lpad(n::text, 6, '0')
+FROM (SELECT DISTINCT restaurant_id FROM orders) r
+CROSS JOIN generate_series(1, :customers) n
+"""
+
+# name -> (query, indexes the planner may use for it)
+HOT_QUERIES = {
+    "order list": (
+        "SELECT * FROM orders WHERE restaurant_id = :restaurant_id "
+        "ORDER BY created_at DESC LIMIT 50",
+        {"idx_orders_restaurant_created"},
+    ),
+    "active orders today": (
+        "SELECT * FROM orders WHERE restaurant_id = :restaurant_id "
+        "AND status IN ('pending', 'confirmed', 'preparing', 'ready') "
+        "AND created_at >= date_trunc('day', now())",
+        {"idx_orders_restaurant_active", "idx_orders_restaurant_status_created"},
+    ),
+    "completed sales window": (
+        "SELECT count(*), sum(total_amount) FROM orders "
+        "WHERE restaurant_id = :restaurant_id AND status = 'completed' "
+        "AND created_at >= now() - interval '7 days'",
+        {"idx_orders_restaurant_status_created"},
+    ),
+    "sync changes page": (
+        "SELECT * FROM orders WHERE restaurant_id = :restaurant_id "
+        "AND coalesce(updated_at, created_at) > now() - interval '3 days' "
+        "ORDER BY coalesce(updated_at, created_at), id LIMIT 100",
+        {"idx_orders_restaurant_changed"},
+    ),
+    "payments of an order": (
+        "SELECT * FROM payments WHERE order_id = :order_id "
+        "AND status = 'completed'",
+        {"idx_payments_order_status"},
+    ),
+    "completed payments range": (
+        "SELECT sum(amount), sum(fee_amount) FROM payments "
+        "WHERE status = 'completed' AND created_at >= now() - interval '1 day'",
+        {"idx_payments_completed_created"},
+    ),
+    "customer name lookup": (
+        "SELECT id FROM customers WHERE restaurant_id = :restaurant_id "
+        "AND (coalesce(first_name, '') || ' ' || coalesce(last_name, '')) "
+        "ILIKE '%number 1234%' LIMIT 10",
+        {"idx_customers_name_trgm"},
+    ),
+    "customer email prefix": (
+        "SELECT id FROM customers WHERE restaurant_id = :restaurant_id "
+        "AND lower(email) LIKE 'guest1234.%' LIMIT 10",
+        {"idx_customers_email_prefix", "idx_customers_email_trgm"},
+    ),
+    "customer phone prefix": (
+        "SELECT id FROM customers WHERE restaurant_id = :restaurant_id "
+        "AND regexp_replace(phone, '[^0-9]', '', 'g') LIKE '447700001%' LIMIT 10",
+        {"idx_customers_phone_prefix", "idx_customers_phone_trgm"},
+    ),
+}
+
+
+@pytest.fixture(scope="module")
+def connection():
+    engine = create_engine(DATABASE_URL)
+    Base.metadata.create_all(engine)
+    try:
+        with engine.connect() as connection:
+            connection.execute(
+                text(SEED_ORDERS),
+                {"restaurants": RESTAURANTS, "orders": ORDERS_PER_RESTAURANT},
+            )
+            connection.execute(text(SEED_PAYMENTS))
+            connection.execute(
+                text(SEED_CUSTOMERS), {"customers": CUSTOMERS_PER_RESTAURANT}
+            )
+            connection.commit()
+            for table in ("orders", "payments", "customers"):
+                connection.execute(text(f"ANALYZE {table}"))
+            connection.commit()
+            yield connection
+    finally:
+        Base.metadata.drop_all(engine)
+        engine.dispose()
+
+
+def plan_nodes(plan):
+    yield plan
+    for child in plan.get("Plans", []):
+        yield from plan_nodes(child)
+
+
+def explain(connection, query, params):
+    result = connection.execute(text(f"EXPLAIN (FORMAT JSON) {query}"), params)
+    return list(plan_nodes(result.scalar()[0]["Plan"]))
+
+
+@pytest.mark.parametrize("name", list(HOT_QUERIES))
+def test_hot_query_uses_index(connection, name):
+    query, expected_indexes = HOT_QUERIES[name]
+    restaurant_id, order_id = connection.execute(
+        text(
+            "SELECT restaurant_id, id FROM orders WHERE status = 'completed' "
+            "ORDER BY created_at DESC LIMIT 1"
+        )
+    ).one()
+
+    nodes = explain(
+        connection, query, {"restaurant_id": restaurant_id, "order_id": order_id}
+    )
+
+    seq_scans = [
+        node["Relation Name"]
+        for node in nodes
+        if node["Node Type"] == "Seq Scan"
+        and node.get("Relation Name") in ("orders", "payments", "customers")
+    ]
+    assert not seq_scans, f"{name} scans {seq_scans} sequentially"
+    used = {node["Index Name"] for node in nodes if "Index Name" in node}
+    assert used & expected_indexes, f"{name} used {used or 'no index'}"
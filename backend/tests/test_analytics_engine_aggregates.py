@@ -0,0 +1,202 @@
+"""
+Tests that AnalyticsEngine widgets are single grouped SQL aggregates
+"""
+
+from datetime import datetime, timedelta
+from decimal import Decimal
+from types import SimpleNamespace
+
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm import Query
+
+from app.core.analytics_engine import (
+    AnalyticsEngine,
+    AnalyticsFilter,
+    AnalyticsTimeframe,
+)
+
+
+class RecordingQuery(Query):
+    """Builds real SQLAlchemy queries; returns canned rows instead of executing"""
+
+    def one(self):
+        return self.session.record(self)[0]
+
+    def all(self):
+        return self.session.record(self)
+
+
+class RecordingSession:
+    def __init__(self, *results):
+        self.results = list(results)
+        self.statements = []
+
+    def query(self, *entities):
+        return RecordingQuery(entities, session=self)
+
+    def record(self, query):
+        """Compile the statement for inspection and return the next canned rows"""
+        self.statements.append(
+            str(query.statement.compile(dialect=postgresql.dialect()))
+        )
+        return self.results.pop(0)
+
+
+def row(**values):
+    return SimpleNamespace(**values)
+
+
+def window(days=7):
+    end = datetime(2025, 1, 8)
+    return AnalyticsFilter(
+        restaurant_id="restaurant-1",
+        start_date=end - timedelta(days=days),
+        end_date=end,
+    )
+
+
+class TestAggregateWidgets:
+    def test_revenue_metrics_compare_periods_in_one_query(self):
+        db = RecordingSession([row(current=Decimal("150"), previous=Decimal("100"))])
+
+        metrics = AnalyticsEngine(db)._get_revenue_metrics(window())
+
+        assert len(db.statements) == 1
+        assert "sum(CASE WHEN" in db.statements[0]
+        assert metrics["total_revenue"] == 150.0
+        assert metrics["previous_revenue"] == 100.0
+        assert metrics["change_percent"] == 50.0
+        assert metrics["change_direction"] == "up"
+
+    def test_sales_overview_revenue_per_day(self):
+        db = RecordingSession([row(total_revenue=Decimal("700"), total_orders=14)])
+
+        overview = AnalyticsEngine(db)._get_sales_overview(window(days=7))
+
+        assert overview["avg_order_value"] == 50.0
+        assert overview["revenue_per_day"] == 100.0
+
+    def test_order_analysis_on_empty_window(self):
+        db = RecordingSession(
+            [row(avg_value=None, max_value=None, min_value=None, total_orders=0)]
+        )
+
+        analysis = AnalyticsEngine(db)._get_order_analysis(window())
+
+        assert analysis == {
+            "avg_order_value": 0.0,
+            "max_order_value": 0.0,
+            "min_order_value": 0.0,
+            "total_orders": 0,
+        }
+        assert "avg(orders.total_amount)" in db.statements[0]
+
+    def test_trends_grouped_by_date_trunc(self):
+        bucket = datetime(2025, 1, 1)
+        db = RecordingSession([row(bucket=bucket, orders=3, revenue=Decimal("42"))])
+
+        revenue, orders = AnalyticsEngine(db)._get_trends(
+            window(), AnalyticsTimeframe.WEEK
+        )
+
+        assert revenue == [{"timestamp": bucket.isoformat(), "value": 42.0}]
+        assert orders == [{"timestamp": bucket.isoformat(), "value": 3}]
+        assert "date_trunc" in db.statements[0]
+        assert "GROUP BY" in db.statements[0]
+
+    def test_payment_breakdown_scoped_through_orders(self):
+        db = RecordingSession(
+            [row(payment_method="card", count=2, amount=Decimal("30.5"))]
+        )
+
+        breakdown = AnalyticsEngine(db)._get_payment_method_breakdown(window())
+
+        assert breakdown == {"card": {"count": 2, "amount": 30.5}}
+        assert "JOIN orders ON orders.id = payments.order_id" in db.statements[0]
+        assert "GROUP BY payments.payment_method" in db.statements[0]
+
+    def test_top_products_from_order_lines(self):
+        db = RecordingSession(
+            [
+                row(
+                    id="p1",
+                    name="Tacos",
+                    price=Decimal("4"),
+                    units_sold=5,
+                    revenue=Decimal("20"),
+                )
+            ]
+        )
+
+        products = AnalyticsEngine(db)._get_top_products(window())
+
+        assert products[0]["units_sold"] == 5
+        assert products[0]["revenue"] == 20.0
+        assert "FROM order_lines" in db.statements[0]
+        assert "GROUP BY order_lines.product_id" in db.statements[0]
+        assert "order_lines.completed_at IS NOT NULL" in db.statements[0]
+
+    def test_sales_by_category_from_order_lines(self):
+        db = RecordingSession(
+            [
+                row(
+                    category="Mains",
+                    units_sold=7,
+                    revenue=Decimal("63.50"),
+                    orders=4,
+                ),
+                row(category="General", units_sold=1, revenue=Decimal("2"), orders=1),
+            ]
+        )
+
+        breakdown = AnalyticsEngine(db)._get_sales_by_category(window())
+
+        assert breakdown["Mains"] == {"revenue": 63.5, "orders": 4, "units_sold": 7}
+        assert "GROUP BY order_lines.category_id" in db.statements[0]
+
+
+class TestSingleRoundTrip:
+    def test_employee_performance_is_one_grouped_query(self):
+        db = RecordingSession(
+            [
+                row(
+                    id="u1",
+                    username="ana",
+                    role="employee",
+                    total_orders=4,
+                    completed_orders=2,
+                    total_revenue=Decimal("50"),
+                )
+            ]
+        )
+
+        result = AnalyticsEngine(db).get_employee_performance(
+            "restaurant-1", AnalyticsTimeframe.DAY
+        )
+
+        assert len(db.statements) == 1
+        assert "LEFT OUTER JOIN orders" in db.statements[0]
+        employee = result["employee_performance"][0]
+        assert employee["avg_order_value"] == 25.0
+        assert employee["completion_rate"] == 50.0
+
+    def test_real_time_metrics_is_one_query(self):
+        db = RecordingSession(
+            [
+                row(
+                    total_orders=10,
+                    completed_orders=8,
+                    pending_orders=2,
+                    total_revenue=Decimal("80"),
+                    hour_orders=3,
+                    hour_revenue=Decimal("20"),
+                )
+            ]
+        )
+
+        metrics = AnalyticsEngine(db).get_real_time_metrics("restaurant-1")
+
+        assert len(db.statements) == 1
+        assert metrics["today_metrics"]["avg_order_value"] == 10.0
+        assert metrics["current_hour"]["orders_count"] == 3
+        assert metrics["operational_status"]["completion_rate"] == 80.0
@@ -0,0 +1,150 @@
+"""
+Tests for the pure ASGI middleware stack
+"""
+
+from types import SimpleNamespace
+
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+
+from app.core.mobile_middleware import MobileCompatibilityMiddleware
+from app.middleware.asgi import MiddlewareTimer, set_timing_hook
+from app.middleware.rls_middleware import RLSMiddleware
+from app.middleware.security_headers_middleware import SecurityHeadersMiddleware
+from app.middleware.sql_injection_waf import SQLInjectionWAFMiddleware
+from app.middleware.tenant_isolation_middleware import TenantIsolationMiddleware
+from app.middleware.version_middleware import APIVersionMiddleware
+
+
+def build_app():
+    app = FastAPI()
+
+    @app.get("/health")
+    async def health():
+        return {"status": "ok"}
+
+    @app.post("/api/v1/orders")
+    async def create_order(request: Request):
+        return {
+            "received": await request.json(),
+            "rls_context": request.state.rls_context,
+        }
+
+    @app.get("/api/v1/export")
+    async def export():
+        async def rows():
+            for i in range(3):
+                yield f"row-{i}\n".encode()
+
+        return StreamingResponse(rows(), media_type="text/csv")
+
+    # Same order as app.main
+    app.add_middleware(APIVersionMiddleware)
+    app.add_middleware(SecurityHeadersMiddleware)
+    app.add_middleware(RLSMiddleware)
+    app.add_middleware(SQLInjectionWAFMiddleware, enabled=True, log_attacks=False)
+    app.add_middleware(
+        MobileCompatibilityMiddleware, enable_cors=False, enable_port_redirect=True
+    )
+    return app
+
+
+@pytest.fixture
+def client():
+    return TestClient(build_app())
+
+
+@pytest.fixture
+def timer():
+    timer = MiddlewareTimer()
+    set_timing_hook(timer.record)
+    yield timer
+    set_timing_hook(None)
+
+
+class TestMiddlewareStack:
+    def test_body_replayed_to_endpoint(self, client):
+        response = client.post("/api/orders", json={"table": "12", "notes": "no ice"})
+
+        assert response.status_code == 200
+        assert response.json() == {
+            "received": {"table": "12", "notes": "no ice"},
+            "rls_context": None,
+        }
+
+    def test_response_headers(self, client):
+        response = client.post("/api/v1/orders", json={})
+
+        assert response.headers["x-frame-options"] == "DENY"
+        assert "content-security-policy" in response.headers
+        assert "x-process-time" in response.headers
+        assert "x-mobile-optimized" not in response.headers
+
+    def test_health_skips_security_headers(self, client):
+        response = client.get("/health")
+
+        assert response.status_code == 200
+        assert "content-security-policy" not in response.headers
+
+    def test_attack_blocked(self, client):
+        response = client.post("/api/v1/orders", json={"notes": "1' OR '1'='1"})
+
+        assert response.status_code == 400
+
+    def test_streaming_response_passes_through(self, client):
+        response = client.get("/api/v1/export")
+
+        assert response.text == "row-0\nrow-1\nrow-2\n"
+        assert "content-security-policy" in response.headers
+
+    def test_mobile_headers(self, client):
+        response = client.post(
+            "/api/v1/orders", json={}, headers={"user-agent": "Fynlo/2.0 iPhone"}
+        )
+
+        assert response.headers["x-mobile-optimized"] == "true"
+        assert response.headers["x-cache-control"] == "public, max-age=300"
+
+    def test_timing_hook_receives_each_middleware(self, client, timer):
+        client.post("/api/orders", json={})
+
+        assert set(timer.snapshot()) == {
+            "api_version",
+            "security_headers",
+            "rls",
+            "sql_injection_waf",
+            "mobile_compatibility",
+        }
+        assert all(s["requests"] == 1 for s in timer.snapshot().values())
+
+
+class TestTenantIsolationMiddleware:
+    @pytest.fixture
+    def client(self):
+        app = FastAPI()
+
+        @app.get("/api/v1/orders")
+        async def orders():
+            return []
+
+        app.add_middleware(TenantIsolationMiddleware)
+
+        async def set_user(scope, receive, send):
+            scope.setdefault("state", {})["user"] = SimpleNamespace(
+                email="owner@example.com",
+                role="restaurant_owner",
+                restaurant_id="r1",
+            )
+            await inner(scope, receive, send)
+
+        inner = app.build_middleware_stack()
+        app.middleware_stack = set_user
+        return TestClient(app)
+
+    def test_tenant_headers_for_authenticated_user(self, client):
+        response = client.get("/api/v1/orders")
+
+        assert response.headers["x-tenant-isolated"] == "true"
+        assert response.headers["x-platform-owner"] == "False"
@@ -2,10 +2,14 @@
 Test suite for CacheService and caching functionality
 """
 
+import asyncio
+import json
+
 import pytest
 from unittest.mock import AsyncMock, MagicMock, patch
 
 from app.core.cache_service import CacheService, CacheMetrics, cached, cache_service
+from app.api.v1.endpoints import products
 from app.core.redis_client import RedisClient
 
 
@@ -121,39 +125,277 @@ class TestCacheService:
     @pytest.mark.asyncio
     async def test_invalidate_restaurant_cache(self, cache_service_instance, mock_redis):
         """Test invalidating all cache for a restaurant"""
-        mock_redis.delete_pattern.return_value = 3
+        mock_redis.delete_tags.return_value = 3
         
         result = await cache_service_instance.invalidate_restaurant_cache("restaurant_123")
         
-        # Should call delete_pattern for each cache type
-        expected_patterns = [
-            "menu_items:*restaurant_id=restaurant_123*",
-            "menu_categories:*restaurant_id=restaurant_123*",
-            "products:*restaurant_id=restaurant_123*",
-            "categories:*restaurant_id=restaurant_123*",
-            "settings:*restaurant_id=restaurant_123*",
-            "analytics:*restaurant_id=restaurant_123*",
-            "*:restaurant_id=restaurant_123:hash:*"
-        ]
-        
-        assert mock_redis.delete_pattern.call_count == len(expected_patterns)
-        assert result == len(expected_patterns) * 3  # 3 keys per pattern
+        # One tag lookup instead of a keyspace scan per cache type
+        mock_redis.delete_tags.assert_called_once_with("restaurant:restaurant_123")
+        mock_redis.delete_pattern.assert_not_called()
+        assert result == 3
     
     @pytest.mark.asyncio
     async def test_invalidate_user_cache(self, cache_service_instance, mock_redis):
         """Test invalidating all cache for a user"""
-        mock_redis.delete_pattern.return_value = 2
+        mock_redis.delete_tags.return_value = 2
         
         result = await cache_service_instance.invalidate_user_cache("user_123")
         
-        expected_patterns = [
-            "user:user_id=user_123*",
-            "session:*user_123*",
-            "permissions:user_id=user_123*"
-        ]
-        
-        assert mock_redis.delete_pattern.call_count == len(expected_patterns)
-        assert result == len(expected_patterns) * 2  # 2 keys per pattern
+        mock_redis.delete_tags.assert_called_once_with("user:user_123")
+        assert result == 2
+
+
+class TestTwoTierCache:
+    """Test the in-process tier, request coalescing and invalidation"""
+
+    @pytest.fixture
+    def mock_redis(self):
+        mock = AsyncMock(spec=RedisClient)
+        mock.get.return_value = None
+        mock.set.return_value = True
+        mock.redis = AsyncMock()
+        return mock
+
+    @pytest.fixture
+    def service(self, mock_redis):
+        service = CacheService()
+        service.redis = mock_redis
+        return service
+
+    @pytest.mark.asyncio
+    async def test_l1_serves_repeat_reads(self, service, mock_redis):
+        mock_redis.get.return_value = {"menu": []}
+
+        for _ in range(5):
+            assert await service.get("menu_items:restaurant_id=1") == {"menu": []}
+
+        mock_redis.get.assert_called_once()
+        assert service.metrics.l2_hits == 1
+        assert service.metrics.l1_hits == 4
+
+    @pytest.mark.asyncio
+    async def test_expired_l1_entry_reads_redis(self, service, mock_redis):
+        await service.set("key", "value", ttl=300)
+        service._l1["key"].expires_at = 0
+        mock_redis.get.return_value = "value"
+
+        assert await service.get("key") == "value"
+        mock_redis.get.assert_called_once_with("key")
+
+    @pytest.mark.asyncio
+    async def test_l1_is_bounded(self, service):
+        service.l1_max_entries = 2
+        for key in ("a", "b", "c"):
+            await service.set(key, key)
+
+        assert list(service._l1) == ["b", "c"]
+        assert service.metrics.evictions == 1
+
+    @pytest.mark.asyncio
+    async def test_concurrent_misses_share_one_computation(self, service):
+        calls = 0
+
+        async def rebuild():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            return {"items": [1, 2]}
+
+        results = await asyncio.gather(
+            *[service.get_or_compute("menu", rebuild, ttl=300) for _ in range(10)]
+        )
+
+        assert calls == 1
+        assert all(result == {"items": [1, 2]} for result in results)
+        assert service.metrics.coalesced == 9
+
+    @pytest.mark.asyncio
+    async def test_invalidation_during_computation_not_cached(
+        self, service, mock_redis
+    ):
+        async def rebuild():
+            await service.delete_pattern("menu*")
+            return "stale"
+
+        assert await service.get_or_compute("menu", rebuild) == "stale"
+
+        mock_redis.set.assert_not_called()
+        assert "menu" not in service._l1
+
+    @pytest.mark.asyncio
+    async def test_value_refreshed_ahead_of_expiry(self, service):
+        await service.set("menu", "old", ttl=300, compute_time=1.0)
+        service._l1["menu"].deadline = 0  # expiry imminent
+
+        result = await service.get_or_compute("menu", AsyncMock(return_value="new"))
+
+        assert result == "new"
+        assert service.metrics.early_refreshes == 1
+
+    @pytest.mark.asyncio
+    async def test_failed_early_refresh_serves_cached_value(self, service):
+        await service.set("menu", "old", ttl=300, compute_time=1.0)
+        service._l1["menu"].deadline = 0
+
+        rebuild = AsyncMock(side_effect=RuntimeError("db down"))
+
+        assert await service.get_or_compute("menu", rebuild) == "old"
+
+    @pytest.mark.asyncio
+    async def test_no_early_refresh_without_compute_time(self, service):
+        await service.set("menu", "old", ttl=300)
+        service._l1["menu"].deadline = 0
+        rebuild = AsyncMock(return_value="new")
+
+        assert await service.get_or_compute("menu", rebuild) == "old"
+        rebuild.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_deletes_published_to_other_workers(self, service, mock_redis):
+        mock_redis.delete_pattern.return_value = 1
+        await service.set("menu_items:restaurant_id=1", "menu")
+
+        await service.delete_pattern("menu_items:*restaurant_id=1*")
+
+        assert "menu_items:restaurant_id=1" not in service._l1
+        channel, payload = mock_redis.redis.publish.call_args[0]
+        assert channel == "fynlo:cache:invalidate"
+        assert json.loads(payload)["patterns"] == ["menu_items:*restaurant_id=1*"]
+
+    @pytest.mark.asyncio
+    async def test_remote_invalidation_evicts_l1(self, service, mock_redis):
+        other_worker = CacheService()
+        other_worker.redis = mock_redis
+        await service.set("settings:restaurant_id=1", {"tax": 20})
+        await other_worker.delete("settings:restaurant_id=1")
+        payload = mock_redis.redis.publish.call_args[0][1]
+
+        service._handle_invalidation(payload)
+
+        assert "settings:restaurant_id=1" not in service._l1
+        assert service.metrics.remote_invalidations == 1
+
+    @pytest.mark.asyncio
+    async def test_own_invalidations_ignored(self, service, mock_redis):
+        await service.delete("key")
+        await service.set("key", "new value")
+
+        service._handle_invalidation(mock_redis.redis.publish.call_args[0][1])
+
+        assert "key" in service._l1
+        assert service.metrics.remote_invalidations == 0
+
+    def test_metrics_per_tier(self, service):
+        service.metrics.record_hit("l1")
+        service.metrics.record_hit("l2")
+        service.metrics.record_miss()
+
+        metrics = service.get_metrics()
+
+        assert metrics["l1"] == {
+            "hits": 1,
+            "misses": 2,
+            "hit_rate": "33.33%",
+            "evictions": 0,
+            "remote_invalidations": 0,
+            "entries": 0,
+        }
+        assert metrics["l2"]["hit_rate"] == "50.00%"
+
+
+class TestTaggedInvalidation:
+    """Test tag-based invalidation in CacheService and RedisClient"""
+
+    @pytest.fixture
+    def mock_redis(self):
+        mock = AsyncMock(spec=RedisClient)
+        mock.set.return_value = True
+        mock.delete_tags.return_value = 1
+        mock.redis = AsyncMock()
+        return mock
+
+    @pytest.fixture
+    def service(self, mock_redis):
+        service = CacheService()
+        service.redis = mock_redis
+        return service
+
+    @pytest.mark.asyncio
+    async def test_tags_passed_to_redis(self, service, mock_redis):
+        await service.set("menu_items:restaurant_id=1", [], ttl=300, tags=["restaurant:1"])
+
+        mock_redis.set.assert_called_once_with(
+            "menu_items:restaurant_id=1", [], expire=300, tags=("restaurant:1",)
+        )
+
+    @pytest.mark.asyncio
+    async def test_invalidate_tags_evicts_only_tagged_l1_entries(
+        self, service, mock_redis
+    ):
+        await service.set("a", 1, tags=["restaurant:1"])
+        await service.set("b", 2, tags=["restaurant:2"])
+        await service.set("c", 3)
+
+        await service.invalidate_tags("restaurant:1")
+
+        assert list(service._l1) == ["b", "c"]
+        payload = json.loads(mock_redis.redis.publish.call_args[0][1])
+        assert payload["tags"] == ["restaurant:1"]
+
+    @pytest.mark.asyncio
+    async def test_remote_tag_invalidation(self, service, mock_redis):
+        other_worker = CacheService()
+        other_worker.redis = mock_redis
+        await service.set("a", 1, tags=["user:7"])
+        await other_worker.invalidate_tags("user:7")
+
+        service._handle_invalidation(mock_redis.redis.publish.call_args[0][1])
+
+        assert "a" not in service._l1
+
+    @pytest.mark.asyncio
+    async def test_mock_storage_supports_tags(self):
+        client = RedisClient()
+        await client.set("menu:1", {"items": []}, tags=["restaurant:1", "menu:1"])
+        await client.set("settings:1", {"tax": 20}, tags=["restaurant:1"])
+        await client.set("menu:2", {"items": []}, tags=["restaurant:2"])
+
+        assert await client.invalidate_product_cache("1") == 1
+        assert await client.exists("settings:1")
+        assert await client.invalidate_restaurant_cache("1") == 1
+        assert not await client.exists("settings:1")
+        assert await client.exists("menu:2")
+
+    @pytest.mark.asyncio
+    async def test_product_endpoint_caches_invalidated_with_restaurant(self):
+        client = RedisClient()
+        db = MagicMock()
+        query = db.query.return_value
+        query.filter.return_value.order_by.return_value.all.return_value = []
+        user = MagicMock(restaurant_id="1")
+
+        await products.get_categories(None, db, user, client)
+        await products.get_products_mobile(None, db, user, client)
+
+        assert await client.exists("categories:1")
+        assert await client.exists("products:mobile:1")
+        assert await client.invalidate_restaurant_cache("1") == 2
+        assert not await client.exists("categories:1")
+        assert not await client.exists("products:mobile:1")
+
+    @pytest.mark.asyncio
+    async def test_delete_tags_runs_one_script(self):
+        client = RedisClient()
+        client.redis = MagicMock()
+        script = AsyncMock(return_value=5)
+        client.redis.register_script.return_value = script
+
+        assert await client.delete_tags("restaurant:1", "user:2") == 5
+        await client.delete_tags("restaurant:3")
+
+        client.redis.register_script.assert_called_once()
+        script.assert_any_call(keys=["cache:tag:restaurant:1", "cache:tag:user:2"])
+        client.redis.scan_iter.assert_not_called()
 
 
 class TestCacheMetrics:
@@ -262,14 +504,29 @@ class TestCachedDecorator:
         async def test_function(restaurant_id: str, force_refresh: bool = False):
             return {"data": "fresh"}
         
-        with patch.object(cache_service, 'delete_pattern') as mock_delete, \
+        with patch.object(cache_service, 'invalidate_tags') as mock_invalidate, \
              patch.object(cache_service, 'get', return_value=None), \
              patch.object(cache_service, 'set', return_value=True):
             
             # Call with invalidation
             await test_function("123", force_refresh=True)
             
-            mock_delete.assert_called_once_with("test*")
+            mock_invalidate.assert_called_once_with("prefix:test")
+    
+    @pytest.mark.asyncio
+    async def test_cached_decorator_tags_entries(self):
+        """Test entries are tagged with their prefix, restaurant and extra tags"""
+        @cached(ttl=60, prefix="orders", tags=["user:{user_id}"])
+        async def get_orders(restaurant_id: str, user_id: str):
+            return ["order"]
+        
+        with patch.object(cache_service, 'get', return_value=None), \
+             patch.object(cache_service, 'set', return_value=True) as mock_set:
+            await get_orders("123", "u1")
+            
+            assert mock_set.call_args[1]["tags"] == (
+                "prefix:orders", "restaurant:123", "user:u1"
+            )
     
     @pytest.mark.asyncio
     async def test_cached_decorator_complex_params(self):
@@ -2,11 +2,18 @@
 Test suite for CacheWarmer functionality
 """
 
+import asyncio
 import pytest
 from unittest.mock import AsyncMock, MagicMock, patch
 from datetime import datetime, timedelta
 
-from app.core.cache_warmer import CacheWarmer, warm_cache_task, warm_cache_on_startup
+from app.core import cache_warmer as cache_warmer_module
+from app.core.cache_warmer import (
+    VERSION_TTL,
+    CacheWarmer,
+    warm_cache_task,
+    warm_cache_on_startup,
+)
 from app.core.cache_service import cache_service
 
 
@@ -220,6 +227,19 @@ class TestCacheWarmer:
         assert stats["status"] == "error"
         assert stats["reason"] == "restaurant_not_found"
     
+    @pytest.mark.asyncio
+    async def test_warm_menu_cache_uses_preloaded_menu(
+        self, cache_warmer_instance, mock_db, mock_restaurants, mock_menu_items
+    ):
+        """Test menu warming from a preloaded batch skips per-restaurant queries"""
+        with patch.object(cache_service, "set", return_value=True):
+            result = await cache_warmer_instance._warm_menu_cache(
+                mock_db, mock_restaurants[0], products=mock_menu_items, categories=[]
+            )
+
+        assert result is True
+        mock_db.query.assert_not_called()
+
     def test_should_warm_first_time(self, cache_warmer_instance):
         """Test should_warm when never warmed before"""
         assert cache_warmer_instance.should_warm() is True
@@ -239,6 +259,124 @@ class TestCacheWarmer:
         assert cache_warmer_instance.should_warm() is False
 
 
+class TestIncrementalWarming:
+    """Test change detection, traffic ordering and bounded concurrency"""
+
+    @pytest.fixture
+    def warmer(self):
+        warmer = CacheWarmer()
+        warmer._warm_menu_cache = AsyncMock(return_value=True)
+        warmer._warm_categories_cache = AsyncMock(return_value=True)
+        return warmer
+
+    @pytest.fixture
+    def restaurants(self):
+        return [
+            MagicMock(id=f"rest_{i}", is_active=True, updated_at=None)
+            for i in range(5)
+        ]
+
+    @pytest.fixture
+    def mock_db(self, restaurants):
+        db = MagicMock()
+        db.query.return_value.filter.return_value.all.return_value = restaurants
+        return db
+
+    @pytest.fixture
+    def cache_store(self):
+        """Back cache_service.get/set with a dict"""
+        store = {}
+
+        async def fake_set(key, value, ttl=3600, **kwargs):
+            store[key] = value
+            return True
+
+        async def fake_get(key):
+            return store.get(key)
+
+        with patch.object(cache_service, "set", side_effect=fake_set) as mock_set, \
+             patch.object(cache_service, "get", side_effect=fake_get):
+            yield store, mock_set
+
+    @pytest.mark.asyncio
+    async def test_unchanged_restaurants_skipped(self, warmer, mock_db, cache_store):
+        """Test a second run skips restaurants whose menu version is unchanged"""
+        first = await warmer.warm_all_caches(mock_db)
+        second = await warmer.warm_all_caches(mock_db)
+
+        assert first["restaurants_warmed"] == 5
+        assert second["restaurants_warmed"] == 0
+        assert second["restaurants_skipped"] == 5
+        assert warmer._warm_menu_cache.call_count == 5
+
+        _, mock_set = cache_store
+        assert mock_set.call_args[1]["ttl"] == VERSION_TTL
+
+    @pytest.mark.asyncio
+    async def test_changed_restaurant_rewarmed(
+        self, warmer, mock_db, restaurants, cache_store
+    ):
+        """Test a restaurant is re-warmed once its menu version changes"""
+        await warmer.warm_all_caches(mock_db)
+        restaurants[2].updated_at = datetime.utcnow()
+
+        stats = await warmer.warm_all_caches(mock_db)
+
+        assert stats["restaurants_warmed"] == 1
+        assert stats["restaurants_skipped"] == 4
+        assert warmer._warm_menu_cache.call_args[0][1] is restaurants[2]
+
+    @pytest.mark.asyncio
+    async def test_version_not_recorded_on_failure(
+        self, warmer, mock_db, cache_store
+    ):
+        """Test a partially warmed restaurant is retried on the next run"""
+        warmer._warm_categories_cache.return_value = False
+
+        await warmer.warm_all_caches(mock_db)
+        stats = await warmer.warm_all_caches(mock_db)
+
+        assert stats["restaurants_skipped"] == 0
+
+    @pytest.mark.asyncio
+    async def test_busiest_restaurants_warmed_first(
+        self, warmer, mock_db, cache_store
+    ):
+        """Test restaurants are warmed in order of recent traffic"""
+        traffic = {"rest_3": 40, "rest_1": 12}
+
+        with patch.object(CacheWarmer, "_recent_traffic", return_value=traffic):
+            await warmer.warm_all_caches(mock_db)
+
+        order = [call[0][1].id for call in warmer._warm_menu_cache.call_args_list]
+        assert order[:2] == ["rest_3", "rest_1"]
+
+    @pytest.mark.asyncio
+    async def test_concurrency_is_bounded(self, warmer, mock_db, cache_store):
+        """Test no more than CACHE_WARM_CONCURRENCY restaurants warm at once"""
+        active = 0
+        peak = 0
+
+        async def slow_warm(*args, **kwargs):
+            nonlocal active, peak
+            active += 1
+            peak = max(peak, active)
+            await asyncio.sleep(0.01)
+            active -= 1
+            return True
+
+        warmer._warm_menu_cache.side_effect = slow_warm
+
+        with patch.object(cache_warmer_module, "settings") as mock_settings:
+            mock_settings.CACHE_WARM_CONCURRENCY = 2
+            mock_settings.CACHE_WARM_BATCH_SIZE = 200
+            mock_settings.CACHE_WARM_TRAFFIC_WINDOW_HOURS = 24
+            stats = await warmer.warm_all_caches(mock_db)
+
+        assert stats["restaurants_warmed"] == 5
+        assert peak == 2
+
+
 class TestCacheWarmingTasks:
     """Test background warming tasks"""
     
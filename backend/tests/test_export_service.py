@@ -0,0 +1,358 @@
+"""
+Tests for streamed exports and batched menu import
+"""
+
+import csv
+import io
+import json
+import uuid
+from datetime import date, datetime, timezone
+from decimal import Decimal
+from unittest.mock import AsyncMock, Mock, patch
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from app.api.v1.endpoints import exports
+from app.core.exceptions import FynloException
+from app.services import export_service
+from app.services.export_service import (
+    EXPORT_DATASETS,
+    import_menu,
+    stream_export,
+)
+
+RESTAURANT_ID = str(uuid.uuid4())
+
+
+class FakeExportSession:
+    """Serves pre-built partitions and records what was consumed"""
+
+    def __init__(self, partitions):
+        self.partitions = partitions
+        self.served = 0
+        self.statement = None
+        self.closed = False
+
+    def __call__(self):
+        return self
+
+    def execute(self, statement):
+        self.statement = statement
+        return Mock(partitions=self._partitions)
+
+    def _partitions(self):
+        for partition in self.partitions:
+            self.served += 1
+            yield partition
+
+    def close(self):
+        self.closed = True
+
+
+def order_rows(start, count):
+    created = datetime(2025, 3, 1, 12, 0, tzinfo=timezone.utc)
+    return [
+        (
+            f"A-{i}",
+            created,
+            "completed",
+            "dine_in",
+            None,
+            Decimal("10.00"),
+            Decimal("2.00"),
+            Decimal("0.00"),
+            Decimal("0.00"),
+            Decimal("12.00"),
+            "completed",
+        )
+        for i in range(start, start + count)
+    ]
+
+
+class TestStreamExport:
+    def test_csv_is_encoded_one_batch_at_a_time(self):
+        session = FakeExportSession([order_rows(0, 2), order_rows(2, 2)])
+        body = stream_export(
+            "orders", "csv", RESTAURANT_ID, session_factory=session, batch_size=2
+        )
+
+        first = next(body)
+        assert session.served == 1
+        rest = b"".join(body)
+
+        rows = list(csv.reader(io.StringIO((first + rest).decode())))
+        assert rows[0][:3] == ["order_number", "created_at", "status"]
+        assert [r[0] for r in rows[1:]] == ["A-0", "A-1", "A-2", "A-3"]
+        assert rows[1][1] == "2025-03-01T12:00:00+00:00"
+        assert rows[1][4] == ""
+        assert session.closed
+
+    def test_query_uses_server_side_cursor_and_date_window(self):
+        session = FakeExportSession([])
+        list(
+            stream_export(
+                "orders",
+                "csv",
+                RESTAURANT_ID,
+                date_from=date(2025, 1, 1),
+                date_to=date(2025, 12, 31),
+                session_factory=session,
+                batch_size=500,
+            )
+        )
+
+        compiled = session.statement.compile(dialect=postgresql.dialect())
+        assert session.statement.get_execution_options()["yield_per"] == 500
+        assert "orders.created_at >= " in str(compiled)
+        assert "orders.created_at < " in str(compiled)
+        assert datetime(2026, 1, 1) in compiled.params.values()
+        assert "ORDER BY orders.created_at, orders.id" in str(compiled)
+
+    def test_json_array_spans_batches(self):
+        session = FakeExportSession([order_rows(0, 1), [], order_rows(1, 1)])
+        body = b"".join(
+            stream_export("orders", "json", RESTAURANT_ID, session_factory=session)
+        )
+
+        data = json.loads(body)
+        assert [row["order_number"] for row in data] == ["A-0", "A-1"]
+        assert data[0]["total_amount"] == "12.00"
+
+    def test_empty_export_still_has_header(self):
+        body = b"".join(
+            stream_export(
+                "menu",
+                "csv",
+                RESTAURANT_ID,
+                session_factory=FakeExportSession([]),
+            )
+        )
+
+        assert body.decode().splitlines() == [
+            "category,name,description,price,sku,is_active,stock_quantity"
+        ]
+
+    def test_payments_scoped_through_orders(self):
+        query = EXPORT_DATASETS["payments"](RESTAURANT_ID, None, None)
+
+        sql = str(query.compile(dialect=postgresql.dialect()))
+        assert "JOIN orders ON orders.id = payments.order_id" in sql
+        assert "orders.restaurant_id" in sql
+
+    @pytest.mark.parametrize(
+        "format,attribute", [("xlsx", "Workbook"), ("parquet", "pyarrow")]
+    )
+    def test_missing_optional_library_rejected_up_front(self, format, attribute):
+        with patch.object(export_service, attribute, None):
+            with pytest.raises(FynloException) as exc:
+                stream_export("orders", format, RESTAURANT_ID)
+        assert exc.value.status_code == 501
+
+    def test_parquet_schema_from_column_types(self):
+        pyarrow = pytest.importorskip("pyarrow")
+        query = EXPORT_DATASETS["orders"](RESTAURANT_ID, None, None)
+
+        schema = export_service.arrow_schema(query)
+
+        assert schema.field("total_amount").type == pyarrow.decimal128(10, 2)
+        assert schema.field("created_at").type == pyarrow.timestamp("us", tz="UTC")
+        assert schema.field("status").type == pyarrow.string()
+
+    def test_xlsx_round_trip(self):
+        openpyxl = pytest.importorskip("openpyxl")
+        session = FakeExportSession([order_rows(0, 3)])
+
+        body = b"".join(
+            stream_export("orders", "xlsx", RESTAURANT_ID, session_factory=session)
+        )
+
+        sheet = openpyxl.load_workbook(io.BytesIO(body)).active
+        assert sheet.max_row == 4
+
+
+def make_import_db(categories=(), products=()):
+    db = Mock()
+    lookups = iter([list(categories)] + [list(batch) for batch in products])
+    writes = []
+
+    def execute(statement, params=None):
+        if params is None:
+            return Mock(all=Mock(return_value=next(lookups, [])))
+        writes.append((statement, params))
+        return Mock()
+
+    db.execute.side_effect = execute
+    db.writes = writes
+    return db
+
+
+class TestImportMenu:
+    def test_invalid_rows_reported_and_skipped(self):
+        db = make_import_db()
+
+        result = import_menu(
+            db,
+            RESTAURANT_ID,
+            {
+                "items": [
+                    {"name": "Taco", "category": "Mains", "price": 3.5},
+                    {"name": "", "category": "Mains", "price": 1},
+                    {"name": "Nachos", "category": "Mains", "price": -2},
+                    {"name": "Taco", "category": "Mains", "price": 4},
+                ]
+            },
+        )
+
+        assert result["created"] == 1
+        assert [e["row"] for e in result["errors"]] == [1, 2, 3]
+        db.commit.assert_called_once()
+
+    def test_upserts_in_batches_with_bulk_statements(self):
+        mains_id, taco_id = uuid.uuid4(), uuid.uuid4()
+        db = make_import_db(
+            categories=[("Mains", mains_id)],
+            products=[[("Taco", taco_id)], []],
+        )
+        items = [
+            {"name": name, "category": category, "price": 5}
+            for name, category in [
+                ("Taco", "Mains"),
+                ("Burrito", "Mains"),
+                ("Churros", "Desserts"),
+            ]
+        ]
+
+        result = import_menu(db, RESTAURANT_ID, {"items": items}, batch_size=2)
+
+        assert result == {
+            "imported": 3,
+            "created": 2,
+            "updated": 1,
+            "categories_created": 1,
+            "errors": [],
+        }
+        tables = [(stmt.table.name, stmt.is_insert) for stmt, _ in db.writes]
+        assert tables == [
+            ("categories", True),
+            ("products", True),
+            ("products", False),
+            ("products", True),
+        ]
+        update_rows = db.writes[2][1]
+        assert update_rows == [
+            {
+                "id": taco_id,
+                "name": "Taco",
+                "category_id": mains_id,
+                "price": Decimal("5"),
+                "description": None,
+                "sku": None,
+                "is_active": True,
+            }
+        ]
+        # 1 category lookup + 1 product lookup per batch
+        assert db.execute.call_count - len(db.writes) == 3
+
+    def test_failed_write_rolls_back_everything(self):
+        db = make_import_db()
+        db.execute.side_effect = [Mock(all=Mock(return_value=[])), Exception("boom")]
+
+        with pytest.raises(FynloException):
+            import_menu(
+                db,
+                RESTAURANT_ID,
+                {"items": [{"name": "Taco", "category": "Mains", "price": 3}]},
+            )
+
+        db.rollback.assert_called_once()
+        db.commit.assert_not_called()
+
+    def test_json_menu_export_reimports(self):
+        export = FakeExportSession(
+            [
+                [
+                    ("Mains", "Taco", "Corn tortilla", Decimal("3.50"), "T1", True, 10),
+                    ("Desserts", "Churros", None, Decimal("4.00"), None, False, 0),
+                ]
+            ]
+        )
+        body = b"".join(
+            stream_export("menu", "json", RESTAURANT_ID, session_factory=export)
+        )
+        db = make_import_db()
+
+        result = import_menu(db, RESTAURANT_ID, json.loads(body))
+
+        assert result["created"] == 2
+        assert result["categories_created"] == 2
+        assert result["errors"] == []
+        inserted = {row["name"]: row for row in db.writes[1][1]}
+        assert inserted["Taco"]["price"] == Decimal("3.50")
+        assert inserted["Churros"]["is_active"] is False
+
+    def test_category_objects_accepted(self):
+        db = make_import_db()
+
+        result = import_menu(
+            db,
+            RESTAURANT_ID,
+            {"items": [], "categories": [{"name": "Drinks"}, "Sides"]},
+        )
+
+        assert result["categories_created"] == 2
+
+    @pytest.mark.parametrize(
+        "payload",
+        [
+            {"items": [], "categories": [{"title": "Drinks"}]},
+            {"items": [], "categories": [["Drinks"]]},
+            {"items": [], "categories": "Drinks"},
+            {"items": {"name": "Taco"}},
+            "Taco",
+        ],
+    )
+    def test_malformed_payload_rejected(self, payload):
+        db = make_import_db()
+
+        with pytest.raises(FynloException) as exc:
+            import_menu(db, RESTAURANT_ID, payload)
+
+        assert exc.value.status_code == 422
+        db.execute.assert_not_called()
+
+
+class TestImportEndpoint:
+    @pytest.mark.asyncio
+    async def test_import_invalidates_restaurant_cache(self):
+        result = {"imported": 2, "created": 2, "updated": 0, "errors": []}
+        with patch.object(
+            exports.TenantSecurity, "validate_restaurant_access", AsyncMock()
+        ), patch.object(exports.ActivityLogger, "log_activity"), patch.object(
+            exports, "import_menu_items", return_value=result
+        ), patch.object(
+            exports.cache_service, "invalidate_restaurant_cache", AsyncMock()
+        ) as invalidate:
+            await exports.import_menu.__wrapped__(
+                Mock(), RESTAURANT_ID, [], Mock(), Mock(id=uuid.uuid4())
+            )
+
+        invalidate.assert_awaited_once_with(RESTAURANT_ID)
+
+    @pytest.mark.asyncio
+    async def test_failed_import_leaves_cache_alone(self):
+        with patch.object(
+            exports.TenantSecurity, "validate_restaurant_access", AsyncMock()
+        ), patch.object(
+            exports,
+            "import_menu_items",
+            side_effect=FynloException(message="Menu import failed"),
+        ), patch.object(
+            exports.cache_service, "invalidate_restaurant_cache", AsyncMock()
+        ) as invalidate:
+            with pytest.raises(FynloException):
+                await exports.import_menu.__wrapped__(
+                    Mock(), RESTAURANT_ID, [], Mock(), Mock(id=uuid.uuid4())
+                )
+
+        invalidate.assert_not_awaited()
@@ -0,0 +1,167 @@
+"""
+Tests for batched recipe deductions on order confirmation
+"""
+
+import uuid
+from unittest.mock import AsyncMock, Mock
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from app.core.websocket import EventType
+from app.models import InventoryItem, InventoryLedgerEntry, Order, Recipe
+from app.services.inventory_service import apply_recipe_deductions_for_order
+
+RESTAURANT_ID = uuid.uuid4()
+TACO = uuid.uuid4()
+BURRITO = uuid.uuid4()
+
+
+def make_order(items, status="confirmed"):
+    return Order(
+        id=uuid.uuid4(), restaurant_id=RESTAURANT_ID, status=status, items=items
+    )
+
+
+def make_item(sku, qty_g):
+    return InventoryItem(
+        sku=sku,
+        restaurant_id=RESTAURANT_ID,
+        name=sku.title(),
+        qty_g=qty_g,
+        par_level_g=100,
+        unit="grams",
+    )
+
+
+def make_db(order, recipe_lines, inventory_items):
+    db = Mock()
+    queries = {}
+
+    def query(*entities):
+        chain = Mock()
+        queries[entities[0]] = chain
+        if entities[0] is Order:
+            chain.filter.return_value.first.return_value = order
+        elif entities[0] is InventoryItem:
+            locked = chain.filter.return_value.order_by.return_value
+            locked.with_for_update.return_value.all.return_value = inventory_items
+        else:
+            chain.filter.return_value.all.return_value = recipe_lines
+        return chain
+
+    db.query.side_effect = query
+    db.queries = queries
+    db.scalars.side_effect = lambda stmt, rows: Mock(
+        all=Mock(return_value=[InventoryLedgerEntry(**row) for row in rows])
+    )
+    return db
+
+
+class TestBatchedDeductions:
+    @pytest.mark.asyncio
+    async def test_recipes_loaded_once_and_aggregated_per_sku(self):
+        order = make_order(
+            [
+                {"product_id": str(TACO), "quantity": 2},
+                {"product_id": str(BURRITO), "quantity": 1},
+                {"product_id": str(TACO), "quantity": 1},
+            ]
+        )
+        recipes = [
+            (TACO, "tortilla", 30),
+            (TACO, "beef", 50),
+            (BURRITO, "tortilla", 60),
+        ]
+        beef, tortilla = make_item("beef", 1000), make_item("tortilla", 1000)
+        db = make_db(order, recipes, [beef, tortilla])
+
+        result = await apply_recipe_deductions_for_order(db, order.id)
+
+        # Recipe lines for every product come from a single query
+        recipe_queries = [c for c in db.query.call_args_list if c.args[0] is not Order]
+        assert [c.args[0] for c in recipe_queries] == [Recipe.item_id, InventoryItem]
+        update_rows = db.execute.call_args.args[1]
+        assert {r["sku"]: r["qty_g"] for r in update_rows} == {
+            "beef": 850,  # 3 tacos x 50
+            "tortilla": 850,  # 3 tacos x 30 + 1 burrito x 60
+        }
+        assert [ledger.delta_g for _, ledger in result] == [-150, -150]
+        assert all(ledger.restaurant_id == RESTAURANT_ID for _, ledger in result)
+        assert beef.qty_g == 850
+        db.commit.assert_called_once()
+
+    @pytest.mark.asyncio
+    async def test_rows_locked_in_sku_order(self):
+        order = make_order([{"product_id": str(TACO), "quantity": 1}])
+        db = make_db(
+            order, [(TACO, "salsa", 10), (TACO, "beef", 50)], [make_item("beef", 100)]
+        )
+
+        await apply_recipe_deductions_for_order(db, order.id)
+
+        chain = db.queries[InventoryItem]
+        skus = chain.filter.call_args.args[0].right.value
+        assert skus == ["beef", "salsa"]
+        ordered = chain.filter.return_value.order_by
+        assert ordered.call_args.args[0] is InventoryItem.sku
+        ordered.return_value.with_for_update.assert_called_once()
+
+    @pytest.mark.asyncio
+    async def test_single_bulk_update_and_insert(self):
+        order = make_order([{"product_id": str(TACO), "quantity": 1}])
+        items = [make_item("beef", 100), make_item("tortilla", 100)]
+        db = make_db(order, [(TACO, "beef", 50), (TACO, "tortilla", 30)], items)
+
+        await apply_recipe_deductions_for_order(db, order.id)
+
+        db.execute.assert_called_once()
+        db.scalars.assert_called_once()
+        insert_sql = str(
+            db.scalars.call_args.args[0].compile(dialect=postgresql.dialect())
+        )
+        assert insert_sql.startswith("INSERT INTO inventory_ledger")
+
+    @pytest.mark.asyncio
+    async def test_overdraw_capped_at_zero(self):
+        order = make_order([{"product_id": str(TACO), "quantity": 4}])
+        beef = make_item("beef", 120)
+        db = make_db(order, [(TACO, "beef", 50)], [beef])
+
+        result = await apply_recipe_deductions_for_order(db, order.id)
+
+        assert beef.qty_g == 0
+        assert result[0][1].delta_g == -120
+
+    @pytest.mark.asyncio
+    async def test_one_inventory_event_for_all_skus(self):
+        order = make_order([{"product_id": str(TACO), "quantity": 1}])
+        items = [make_item("beef", 100), make_item("tortilla", 100)]
+        db = make_db(order, [(TACO, "beef", 50), (TACO, "tortilla", 30)], items)
+        manager = Mock(broadcast_to_restaurant=AsyncMock())
+
+        await apply_recipe_deductions_for_order(db, order.id, manager)
+
+        manager.broadcast_to_restaurant.assert_awaited_once()
+        restaurant_id, message = manager.broadcast_to_restaurant.call_args.args
+        assert restaurant_id == str(RESTAURANT_ID)
+        assert message.event_type == EventType.INVENTORY_UPDATED
+        assert [i["qty_g"] for i in message.data["items"]] == [50, 70]
+
+    @pytest.mark.asyncio
+    async def test_broadcast_failure_after_commit_is_not_raised(self):
+        order = make_order([{"product_id": str(TACO), "quantity": 1}])
+        db = make_db(order, [(TACO, "beef", 50)], [make_item("beef", 100)])
+        manager = Mock(broadcast_to_restaurant=AsyncMock(side_effect=RuntimeError))
+
+        result = await apply_recipe_deductions_for_order(db, order.id, manager)
+
+        assert len(result) == 1
+
+    @pytest.mark.asyncio
+    async def test_unconfirmed_order_skipped(self):
+        order = make_order([{"product_id": str(TACO), "quantity": 1}], "pending")
+        db = make_db(order, [], [])
+
+        assert await apply_recipe_deductions_for_order(db, order.id) == []
+        db.execute.assert_not_called()
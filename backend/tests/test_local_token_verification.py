@@ -0,0 +1,371 @@
+"""
+Tests for local Supabase JWT verification and the authenticated-user cache
+"""
+
+import time
+import uuid
+
+import pytest
+from unittest.mock import AsyncMock, patch
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec
+from jose import jwk, jwt
+from sqlalchemy import inspect
+from sqlalchemy.orm import Session
+from starlette.requests import Request
+
+from app.api.v1.endpoints import auth as auth_endpoints
+from app.core import auth
+from app.core.auth_cache import AuthUserCache
+from app.core.database import User
+from app.core.exceptions import AuthenticationException
+from app.models.audit_log import AuditEventType
+from app.core.token_verifier import (
+    JWKSCache,
+    SupabaseTokenVerifier,
+    TokenIdentity,
+)
+
+ISSUER = "https://example.supabase.co/auth/v1"
+SECRET = "test-jwt-secret-for-local-verification-only"
+
+
+def make_claims(**overrides):
+    claims = {
+        "sub": str(uuid.uuid4()),
+        "email": "staff@example.com",
+        "aud": "authenticated",
+        "iss": ISSUER,
+        "exp": int(time.time()) + 3600,
+        "session_id": "session-1",
+    }
+    claims.update(overrides)
+    return claims
+
+
+@pytest.fixture
+def ec_key_pair():
+    private_key = ec.generate_private_key(ec.SECP256R1())
+    private_pem = private_key.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.PKCS8,
+        serialization.NoEncryption(),
+    )
+    public_pem = private_key.public_key().public_bytes(
+        serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo
+    )
+    public_jwk = jwk.construct(public_pem, "ES256").to_dict()
+    public_jwk["kid"] = "key-1"
+    return private_pem, public_jwk
+
+
+@pytest.fixture
+def verifier():
+    return SupabaseTokenVerifier(
+        jwks_cache=JWKSCache(jwks_url=None), hmac_secret=SECRET, issuer=ISSUER
+    )
+
+
+class TestSupabaseTokenVerifier:
+    """Local signature and claim validation"""
+
+    @pytest.mark.asyncio
+    async def test_valid_hs256_token(self, verifier):
+        claims = make_claims()
+        token = jwt.encode(claims, SECRET, algorithm="HS256")
+
+        identity = await verifier.verify(token)
+
+        assert identity.supabase_id == claims["sub"]
+        assert identity.token_id == "session-1"
+        assert identity.email == "staff@example.com"
+
+    @pytest.mark.asyncio
+    async def test_jti_preferred_over_session_id(self, verifier):
+        token = jwt.encode(make_claims(jti="token-42"), SECRET, algorithm="HS256")
+
+        identity = await verifier.verify(token)
+
+        assert identity.token_id == "token-42"
+
+    @pytest.mark.asyncio
+    async def test_expired_token_rejected(self, verifier):
+        token = jwt.encode(
+            make_claims(exp=int(time.time()) - 120), SECRET, algorithm="HS256"
+        )
+
+        with pytest.raises(AuthenticationException) as exc_info:
+            await verifier.verify(token)
+        assert exc_info.value.details["error_code"] == "TOKEN_EXPIRED"
+
+    @pytest.mark.asyncio
+    async def test_repeat_token_served_until_expiry(self, verifier):
+        token = jwt.encode(
+            make_claims(exp=int(time.time()) + 60), SECRET, algorithm="HS256"
+        )
+        first = await verifier.verify(token)
+
+        with patch("app.core.token_verifier.jwt.decode") as decode:
+            assert await verifier.verify(token) is first
+            decode.assert_not_called()
+
+        # Once the cached expiry has passed the token is fully re-verified
+        first.expires_at = time.time() - 600
+        assert await verifier.verify(token) is not first
+
+    @pytest.mark.asyncio
+    async def test_wrong_audience_rejected(self, verifier):
+        token = jwt.encode(make_claims(aud="anon"), SECRET, algorithm="HS256")
+
+        with pytest.raises(AuthenticationException) as exc_info:
+            await verifier.verify(token)
+        assert exc_info.value.details["error_code"] == "INVALID_TOKEN"
+
+    @pytest.mark.asyncio
+    async def test_bad_signature_rejected(self, verifier):
+        token = jwt.encode(make_claims(), "some-other-secret", algorithm="HS256")
+
+        with pytest.raises(AuthenticationException):
+            await verifier.verify(token)
+
+    @pytest.mark.asyncio
+    async def test_es256_token_verified_against_jwks(self, ec_key_pair):
+        private_pem, public_jwk = ec_key_pair
+        cache = JWKSCache(jwks_url=None)
+        cache.load({"keys": [public_jwk]})
+        verifier = SupabaseTokenVerifier(jwks_cache=cache, issuer=ISSUER)
+        claims = make_claims()
+        token = jwt.encode(
+            claims, private_pem, algorithm="ES256", headers={"kid": "key-1"}
+        )
+
+        identity = await verifier.verify(token)
+
+        assert identity.supabase_id == claims["sub"]
+
+    @pytest.mark.asyncio
+    async def test_unknown_kid_forces_refresh(self, ec_key_pair):
+        private_pem, public_jwk = ec_key_pair
+        cache = JWKSCache(jwks_url="https://example.supabase.co/jwks")
+        cache.load({"keys": []})
+
+        async def fake_refresh(force=False):
+            cache.load({"keys": [public_jwk]})
+
+        verifier = SupabaseTokenVerifier(jwks_cache=cache, issuer=ISSUER)
+        token = jwt.encode(
+            make_claims(), private_pem, algorithm="ES256", headers={"kid": "key-1"}
+        )
+
+        with patch.object(cache, "refresh", side_effect=fake_refresh) as refresh:
+            await verifier.verify(token)
+
+        refresh.assert_called_once_with(force=True)
+
+
+class TestAuthUserCache:
+    """In-process and Redis tiers with revocation"""
+
+    @pytest.fixture
+    def mock_redis(self):
+        redis = AsyncMock()
+        redis.get.return_value = None
+        redis.exists.return_value = False
+        return redis
+
+    @pytest.fixture
+    def user(self):
+        return User(
+            id=uuid.uuid4(),
+            email="staff@example.com",
+            supabase_id=uuid.uuid4(),
+            first_name="Sam",
+            last_name="Staff",
+            role="employee",
+            restaurant_id=uuid.uuid4(),
+            is_active=True,
+            password_hash="hashed",
+        )
+
+    @pytest.mark.asyncio
+    async def test_hit_attaches_user_without_query(self, mock_redis, user):
+        cache = AuthUserCache(ttl=30, redis=mock_redis)
+        supabase_id = str(user.supabase_id)
+        await cache.set(supabase_id, "session-1", user)
+        db = Session()
+
+        cached = await cache.get(supabase_id, "session-1", db)
+
+        assert cached.id == user.id
+        assert cached.role == "employee"
+        assert cached in db
+        assert "password_hash" not in cached.__dict__
+        assert cache.hits == 1
+        mock_redis.get.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_redis_tier_used_on_local_miss(self, mock_redis, user):
+        writer = AuthUserCache(ttl=30, redis=mock_redis)
+        await writer.set(str(user.supabase_id), "session-1", user)
+        mock_redis.get.return_value = mock_redis.set.call_args.args[1]
+
+        reader = AuthUserCache(ttl=30, redis=mock_redis)
+        cached = await reader.get(str(user.supabase_id), "session-1", Session())
+
+        assert cached.id == user.id
+        assert cached.restaurant_id == user.restaurant_id
+        assert reader.redis_hits == 1
+
+    @pytest.mark.asyncio
+    async def test_miss_returns_none(self, mock_redis):
+        cache = AuthUserCache(ttl=30, redis=mock_redis)
+
+        assert await cache.get("unknown", "session-1", Session()) is None
+        assert cache.misses == 1
+
+    @pytest.mark.asyncio
+    async def test_revoked_token_rejected(self, mock_redis, user):
+        cache = AuthUserCache(ttl=30, redis=mock_redis)
+        supabase_id = str(user.supabase_id)
+        await cache.set(supabase_id, "session-1", user)
+
+        await cache.revoke_token("session-1", time.time() + 600)
+
+        with pytest.raises(AuthenticationException):
+            await cache.get(supabase_id, "session-1", Session())
+
+    @pytest.mark.asyncio
+    async def test_expired_entry_not_served(self, mock_redis, user):
+        cache = AuthUserCache(ttl=0, redis=mock_redis)
+        await cache.set(str(user.supabase_id), "session-1", user)
+
+        assert await cache.get(str(user.supabase_id), "session-1", Session()) is None
+
+    @pytest.mark.asyncio
+    async def test_invalidate_user_drops_all_tokens(self, mock_redis, user):
+        cache = AuthUserCache(ttl=30, redis=mock_redis)
+        supabase_id = str(user.supabase_id)
+        await cache.set(supabase_id, "session-1", user)
+        await cache.set(supabase_id, "session-2", user)
+
+        await cache.invalidate_user(supabase_id)
+
+        assert cache.get_stats()["entries"] == 0
+        mock_redis.delete.assert_called_once_with(f"auth:user:{supabase_id}")
+
+    @pytest.mark.asyncio
+    async def test_bounded_entries(self, mock_redis, user):
+        cache = AuthUserCache(ttl=30, max_entries=2, redis=mock_redis)
+        for i in range(3):
+            await cache.set(str(user.supabase_id), f"session-{i}", user)
+
+        assert cache.get_stats()["entries"] == 2
+
+    @pytest.mark.asyncio
+    async def test_redis_errors_do_not_fail_lookup(self, user):
+        redis = AsyncMock()
+        redis.get.side_effect = Exception("connection reset")
+        redis.exists.side_effect = Exception("connection reset")
+        cache = AuthUserCache(ttl=30, redis=redis)
+
+        assert await cache.get(str(user.supabase_id), "session-1", Session()) is None
+
+
+def make_request(path="/api/v1/orders"):
+    return Request(
+        {
+            "type": "http",
+            "method": "POST",
+            "path": path,
+            "headers": [],
+            "query_string": b"",
+            "client": ("10.0.0.1", 1234),
+            "server": ("testserver", 80),
+            "scheme": "http",
+        }
+    )
+
+
+class TestGetCurrentUser:
+    """The full dependency in local mode"""
+
+    @pytest.fixture
+    def user(self):
+        return User(
+            id=uuid.uuid4(),
+            email="staff@example.com",
+            supabase_id=uuid.uuid4(),
+            role="employee",
+            restaurant_id=uuid.uuid4(),
+            is_active=True,
+        )
+
+    @pytest.fixture
+    def local_mode(self, user, monkeypatch):
+        identity = TokenIdentity(
+            supabase_id=str(user.supabase_id),
+            token_id="session-1",
+            email=user.email,
+            expires_at=time.time() + 600,
+        )
+        redis = AsyncMock()
+        redis.get.return_value = None
+        redis.exists.return_value = False
+        cache = AuthUserCache(ttl=30, redis=redis)
+        audit_logs = []
+
+        class CommittingAuditLogger:
+            """Commits the request session like the real audit logger"""
+
+            def __init__(self, db):
+                self.db = db
+
+            async def create_audit_log(self, **kwargs):
+                audit_logs.append(kwargs)
+                if kwargs.get("commit"):
+                    self.db.commit()
+
+        monkeypatch.setattr(auth.settings, "AUTH_VERIFICATION_MODE", "local")
+        monkeypatch.setattr(
+            auth, "verify_supabase_token", AsyncMock(return_value=identity)
+        )
+        monkeypatch.setattr(auth, "auth_user_cache", cache)
+        monkeypatch.setattr(auth, "AuditLoggerService", CommittingAuditLogger)
+        monkeypatch.setattr(
+            auth_endpoints, "AuditLoggerService", CommittingAuditLogger
+        )
+        return cache, audit_logs
+
+    @pytest.mark.asyncio
+    async def test_cached_user_not_expired_by_audit_commit(self, user, local_mode):
+        cache, audit_logs = local_mode
+        await cache.set(str(user.supabase_id), "session-1", user)
+        db = Session()
+
+        current = await auth.get_current_user(make_request(), "Bearer token", db)
+
+        assert current in db
+        # Credentials are never cached, so only they are left to lazy-load
+        assert inspect(current).expired_attributes == {"password_hash", "pin_code"}
+        assert current.role == "employee"
+        assert audit_logs[-1]["event_type"] == AuditEventType.ACCESS_GRANTED
+
+    @pytest.mark.asyncio
+    async def test_revoked_token_rejected_after_logout(self, user, local_mode):
+        cache, _ = local_mode
+        await cache.set(str(user.supabase_id), "session-1", user)
+        request = make_request("/api/v1/auth/logout")
+        db = Session()
+        current = await auth.get_current_user(request, "Bearer token", db)
+
+        with patch.object(auth, "get_token_verifier") as verifier, patch.object(
+            auth_endpoints, "supabase_admin"
+        ) as supabase:
+            verifier.return_value.verify = auth.verify_supabase_token
+            await auth_endpoints.logout.__wrapped__(
+                request, "Bearer token", current, db
+            )
+
+        supabase.auth.admin.sign_out.assert_called_once_with("token")
+        with pytest.raises(AuthenticationException):
+            await auth.get_current_user(make_request(), "Bearer token", Session())
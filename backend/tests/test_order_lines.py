@@ -0,0 +1,143 @@
+"""
+Tests for the order_lines projection of orders.items
+"""
+
+import uuid
+from datetime import date, datetime, timezone
+from decimal import Decimal
+from unittest.mock import MagicMock
+
+from sqlalchemy.dialects import postgresql
+
+from app.core.database import Order
+from app.services.order_line_service import (
+    OrderLineService,
+    _on_order_flushed,
+    build_order_lines,
+    completed_at_change,
+    modifiers_total,
+)
+
+NOW = datetime(2025, 1, 10, 14, 35, tzinfo=timezone.utc)
+PRODUCT_ID = uuid.uuid4()
+
+
+def item(**overrides):
+    values = {
+        "product_id": str(PRODUCT_ID),
+        "quantity": 2,
+        "unit_price": 4.5,
+        "total_price": 9.0,
+        "modifiers": [],
+        "special_instructions": None,
+    }
+    values.update(overrides)
+    return values
+
+
+class TestBuildOrderLines:
+    def test_line_values(self):
+        lines = build_order_lines([item(), item(quantity=1, total_price=4.5)])
+
+        assert [line["line_number"] for line in lines] == [1, 2]
+        assert lines[0]["product_id"] == PRODUCT_ID
+        assert lines[0]["quantity"] == 2
+        assert lines[0]["unit_price"] == Decimal("4.5")
+        assert lines[0]["line_total"] == Decimal("9.0")
+        assert lines[1]["quantity"] == 1
+
+    def test_line_total_defaults_to_unit_price_times_quantity(self):
+        (line,) = build_order_lines([item(total_price=None, quantity=3)])
+
+        assert line["line_total"] == Decimal("13.5")
+
+    def test_non_uuid_product_id_kept_as_null(self):
+        (line,) = build_order_lines([item(product_id="legacy-42")])
+
+        assert line["product_id"] is None
+
+    def test_malformed_items_skipped(self):
+        lines = build_order_lines([item(), "not a line", item()])
+
+        # Line numbers stay aligned with positions in orders.items
+        assert [line["line_number"] for line in lines] == [1, 3]
+        assert build_order_lines(None) == []
+
+    def test_modifiers_total(self):
+        modifiers = [
+            {"name": "Extra cheese", "price": 1.25},
+            {"name": "No onions", "price": 0},
+            {"name": "Large"},
+            "bad",
+        ]
+
+        assert modifiers_total(modifiers) == Decimal("1.25")
+        assert modifiers_total(None) == Decimal("0")
+
+
+class TestCompletedAt:
+    def test_completing_sets_completed_at(self):
+        assert completed_at_change("ready", "completed", NOW) == {"completed_at": NOW}
+
+    def test_refund_clears_completed_at(self):
+        assert completed_at_change("completed", "refunded", NOW) == {
+            "completed_at": None
+        }
+
+    def test_unrelated_status_change_ignored(self):
+        assert completed_at_change("pending", "confirmed", NOW) is None
+
+
+class TestListener:
+    def test_new_order_writes_its_lines(self):
+        order = Order(
+            id=uuid.uuid4(),
+            restaurant_id=uuid.uuid4(),
+            status="pending",
+            items=[item(), item(product_id=str(uuid.uuid4()))],
+        )
+        connection = MagicMock()
+        connection.execute.return_value = []
+
+        _on_order_flushed(connection, order, inserted=True)
+
+        calls = connection.execute.call_args_list
+        statements = [str(c.args[0]) for c in calls]
+        assert statements[0].startswith("DELETE FROM order_lines")
+        assert "FROM products" in statements[1]
+        assert statements[2].startswith("INSERT INTO order_lines")
+        rows = calls[2].args[1]
+        assert [row["line_number"] for row in rows] == [1, 2]
+        assert all(row["completed_at"] is None for row in rows)
+
+    def test_listener_failure_does_not_raise(self):
+        order = Order(id=uuid.uuid4(), restaurant_id=uuid.uuid4(), items=[item()])
+        connection = MagicMock()
+        connection.execute.side_effect = RuntimeError("relation does not exist")
+
+        _on_order_flushed(connection, order, inserted=True)
+
+
+class TestBackfill:
+    def test_lines_unnested_in_sql(self):
+        stmt = OrderLineService(MagicMock())._lines_select(
+            NOW, NOW, restaurant_id=str(uuid.uuid4())
+        )
+
+        sql = str(stmt.compile(dialect=postgresql.dialect()))
+        assert "WITH ORDINALITY AS item" in sql
+        assert "LEFT OUTER JOIN products" in sql
+        assert "orders.restaurant_id = " in sql
+
+    def test_rebuild_replaces_lines_in_one_transaction(self):
+        db = MagicMock()
+
+        OrderLineService(db).rebuild(date(2025, 1, 1), date(2025, 3, 31))
+
+        statements = [
+            str(c.args[0].compile(dialect=postgresql.dialect()))
+            for c in db.execute.call_args_list
+        ]
+        assert statements[0].startswith("DELETE FROM order_lines")
+        assert statements[1].startswith("INSERT INTO order_lines")
+        db.commit.assert_called_once()
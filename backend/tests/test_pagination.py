@@ -0,0 +1,146 @@
+"""
+Tests for keyset (cursor) pagination of list endpoints
+"""
+
+import base64
+import json
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import DECIMAL, Column, DateTime, Integer, String, create_engine
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm import Session, declarative_base
+
+from app.api.v1.endpoints.customers import customer_search_keyset
+from app.api.v1.endpoints.orders import ORDERS_NEWEST
+from app.core.exceptions import FynloException
+from app.core.pagination import Keyset
+
+Base = declarative_base()
+NOW = datetime(2025, 10, 16, 12, 0, tzinfo=timezone.utc)
+
+
+class Row(Base):
+    __tablename__ = "rows"
+
+    id = Column(Integer, primary_key=True)
+    name = Column(String(50))
+    total = Column(DECIMAL(10, 2))
+    created_at = Column(DateTime(timezone=True))
+
+
+BY_TOTAL = Keyset("rows.total", [(Row.total, 0), Row.id], descending=True)
+BY_NAME = Keyset("rows.name", [(Row.name, ""), Row.id])
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    with Session(engine) as session:
+        # Many equal totals and names so the id tiebreaker matters; some NULLs
+        session.add_all(
+            Row(
+                id=i,
+                name=None if i % 7 == 0 else f"row {i % 3}",
+                total=None if i % 5 == 0 else Decimal(i % 4),
+                created_at=NOW - timedelta(minutes=i),
+            )
+            for i in range(1, 41)
+        )
+        session.commit()
+        yield session
+
+
+def all_pages(keyset, query, limit):
+    ids, cursor = [], None
+    while True:
+        rows, cursor = keyset.paginate(query, cursor, limit)
+        ids += [row.id for row in rows]
+        if cursor is None:
+            return ids
+
+
+class TestKeysetPaging:
+    @pytest.mark.parametrize("keyset", [BY_TOTAL, BY_NAME])
+    def test_pages_match_single_sorted_read(self, db, keyset):
+        query = db.query(Row)
+        expected = [row.id for row in query.order_by(*keyset.order_by()).all()]
+
+        assert all_pages(keyset, query, 6) == expected
+        assert len(expected) == 40
+
+    def test_offset_page_hands_out_cursor(self, db):
+        query = db.query(Row)
+        rows, cursor = BY_TOTAL.paginate(query, None, 10, offset=10)
+        following, _ = BY_TOTAL.paginate(query, cursor, 10)
+        by_offset, _ = BY_TOTAL.paginate(query, None, 10, offset=20)
+
+        assert [r.id for r in following] == [r.id for r in by_offset]
+
+    def test_last_page_has_no_cursor(self, db):
+        rows, cursor = BY_TOTAL.paginate(db.query(Row), None, 40)
+
+        assert len(rows) == 40
+        assert cursor is None
+
+    def test_rows_inserted_before_cursor_do_not_shift_pages(self, db):
+        query = db.query(Row)
+        first, cursor = BY_NAME.paginate(query, None, 10)
+        db.add(Row(id=100, name="", total=Decimal(9)))
+        db.commit()
+        second, _ = BY_NAME.paginate(query, cursor, 10)
+
+        assert not {r.id for r in first} & {r.id for r in second}
+        assert 100 not in {r.id for r in second}
+
+
+class TestCursors:
+    def test_values_round_trip(self, db):
+        row = db.get(Row, 6)
+        keyset = Keyset("rows.created", [Row.created_at, Row.total, Row.id])
+
+        assert keyset.decode(keyset.encode(row)) == [
+            row.created_at,
+            row.total,
+            row.id,
+        ]
+
+    def test_cursor_from_other_ordering_rejected(self, db):
+        cursor = BY_NAME.encode(db.get(Row, 1))
+
+        with pytest.raises(FynloException) as exc:
+            BY_TOTAL.decode(cursor)
+        assert exc.value.status_code == 400
+
+    @pytest.mark.parametrize(
+        "token",
+        [
+            "not a cursor",
+            base64.urlsafe_b64encode(b'{"v": 1, "k": "rows.total"}').decode(),
+            base64.urlsafe_b64encode(
+                json.dumps({"v": 1, "k": "rows.total", "p": ["x", 1]}).encode()
+            ).decode(),
+        ],
+    )
+    def test_malformed_cursor_rejected(self, token):
+        with pytest.raises(FynloException):
+            BY_TOTAL.decode(token)
+
+
+class TestEndpointKeysets:
+    def test_orders_page_after_cursor_in_postgres(self):
+        sql = str(
+            ORDERS_NEWEST.after([NOW, "ab"]).compile(dialect=postgresql.dialect())
+        )
+
+        assert sql.startswith("(orders.created_at, orders.id) < (")
+
+    def test_customer_search_sorts_nullable_fields(self):
+        keyset = customer_search_keyset("last_name", "desc")
+        sql = str(keyset.order_by()[0].compile(dialect=postgresql.dialect()))
+
+        assert keyset.descending
+        assert sql.startswith("coalesce(customers.last_name,")
+        assert customer_search_keyset(None, "asc").name == "customers.total_spent"
@@ -0,0 +1,116 @@
+"""
+Tests for monthly partitioning of orders and payments
+"""
+
+from datetime import date
+from unittest.mock import MagicMock, patch
+
+from app.core import partitioning
+from app.core.partitioning import (
+    TableDefinition,
+    add_months,
+    conversion_statements,
+    ensure_monthly_partitions,
+    missing_partitions,
+    monthly_ranges,
+)
+
+
+class TestMonthlyRanges:
+    def test_add_months_crosses_years(self):
+        assert add_months(date(2025, 11, 1), 3) == date(2026, 2, 1)
+        assert add_months(date(2025, 1, 1), -1) == date(2024, 12, 1)
+
+    def test_ranges_cover_whole_months(self):
+        ranges = monthly_ranges("orders", date(2025, 11, 17), date(2026, 1, 3))
+
+        assert ranges == [
+            ("orders_p202511", date(2025, 11, 1), date(2025, 12, 1)),
+            ("orders_p202512", date(2025, 12, 1), date(2026, 1, 1)),
+            ("orders_p202601", date(2026, 1, 1), date(2026, 2, 1)),
+        ]
+
+    def test_only_missing_partitions_created(self):
+        missing = missing_partitions(
+            "payments", {"payments_p202510", "payments_default"}, date(2025, 10, 16), 2
+        )
+
+        assert [name for name, _, _ in missing] == [
+            "payments_p202511",
+            "payments_p202512",
+        ]
+
+
+class TestEnsurePartitions:
+    def test_unpartitioned_table_left_alone(self):
+        connection = MagicMock()
+        connection.dialect.name = "postgresql"
+
+        with patch.object(partitioning, "is_partitioned", return_value=False):
+            assert ensure_monthly_partitions(connection, "orders", 3) == []
+
+        connection.execute.assert_not_called()
+
+    def test_creates_upcoming_months(self):
+        connection = MagicMock()
+        connection.dialect.name = "postgresql"
+
+        existing = {"orders_p202510"}
+        with patch.object(
+            partitioning, "is_partitioned", return_value=True
+        ), patch.object(partitioning, "existing_partitions", return_value=existing):
+            created = ensure_monthly_partitions(
+                connection, "orders", 1, today=date(2025, 10, 16)
+            )
+
+        assert created == ["orders_p202511"]
+        sql = str(connection.execute.call_args.args[0])
+        assert "FROM ('2025-11-01') TO ('2025-12-01')" in sql
+
+    def test_sqlite_ignored(self):
+        connection = MagicMock()
+        connection.dialect.name = "sqlite"
+
+        assert ensure_monthly_partitions(connection, "orders", 3) == []
+
+
+class TestConversion:
+    def test_statement_order(self):
+        definition = TableDefinition(
+            table="payments",
+            first_month=date(2025, 9, 1),
+            last_month=date(2025, 10, 1),
+            index_definitions=[
+                "CREATE INDEX idx_payments_order_status ON payments "
+                "USING btree (order_id, status)"
+            ],
+            outbound_foreign_keys={
+                "fk_payments_order_id": "FOREIGN KEY (order_id) REFERENCES orders(id)"
+            },
+            inbound_foreign_keys=[("refunds", "refunds_payment_id_fkey")],
+            policies=["CREATE POLICY payments_tenant_isolation ON payments"],
+            row_level_security=True,
+        )
+
+        statements = conversion_statements(definition)
+
+        def position(prefix):
+            return next(i for i, s in enumerate(statements) if s.startswith(prefix))
+
+        assert statements[0] == "LOCK TABLE payments IN ACCESS EXCLUSIVE MODE"
+        assert position("ALTER TABLE refunds DROP CONSTRAINT") < position(
+            "ALTER TABLE payments RENAME TO payments_unpartitioned"
+        )
+        primary_key = statements[position("ALTER TABLE payments ADD CONSTRAINT")]
+        assert primary_key.endswith("PRIMARY KEY (id, created_at)")
+        assert position("CREATE TABLE IF NOT EXISTS payments_p202510") < position(
+            "INSERT INTO payments SELECT"
+        )
+        assert position("CREATE TABLE payments_default") < position("INSERT INTO")
+        assert position("DROP TABLE payments_unpartitioned") < position(
+            "CREATE INDEX idx_payments_order_status"
+        )
+        assert position("ALTER TABLE payments ENABLE ROW LEVEL SECURITY") < position(
+            "CREATE POLICY"
+        )
+        assert statements[-1] == "ANALYZE payments"
@@ -0,0 +1,352 @@
+"""
+Tests for payment provider circuit breakers, health-aware routing and failover
+"""
+
+import asyncio
+from decimal import Decimal
+from unittest.mock import AsyncMock, Mock, patch
+
+import pytest
+
+from app.services.payment_providers import health
+from app.services.payment_providers import payment_factory as factory_module
+from app.services.payment_providers import transport as transport_module
+from app.services.payment_providers.base import PaymentStatus
+from app.services.payment_providers.health import (
+    CircuitBreaker,
+    CircuitOpenError,
+    CircuitState,
+    get_breaker,
+    reset_breakers,
+)
+from app.services.payment_providers.transport import ProviderTransport
+from app.services import secure_payment_processor
+from app.services.secure_payment_processor import SecurePaymentProcessor
+from app.services.smart_routing import SmartRoutingService
+from tests.fixtures.payment_stub import PaymentStubServer
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def breaker_settings():
+    reset_breakers()
+    transport_module._provider_limits.clear()
+    with patch.object(health, "settings") as settings:
+        settings.PAYMENT_BREAKER_WINDOW_SECONDS = 60
+        settings.PAYMENT_BREAKER_MIN_CALLS = 4
+        settings.PAYMENT_BREAKER_FAILURE_RATE = 0.5
+        settings.PAYMENT_BREAKER_SLOW_CALL_SECONDS = 5.0
+        settings.PAYMENT_BREAKER_SLOW_CALL_RATE = 0.8
+        settings.PAYMENT_BREAKER_OPEN_SECONDS = 30.0
+        settings.PAYMENT_BREAKER_HALF_OPEN_PROBES = 2
+        yield settings
+    reset_breakers()
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+def trip(breaker, calls=4):
+    for _ in range(calls):
+        assert breaker.allow_request()
+        breaker.record(False, 0.1)
+
+
+class TestCircuitBreaker:
+    def test_opens_once_failure_rate_reached(self, breaker_settings, clock):
+        breaker = CircuitBreaker("stripe", clock=clock)
+        breaker.record(True, 0.1)
+        breaker.record(False, 0.1)
+        breaker.record(False, 0.1)
+        assert breaker.state == CircuitState.CLOSED  # below MIN_CALLS
+
+        breaker.record(True, 0.1)
+
+        assert breaker.state == CircuitState.OPEN
+        assert not breaker.allow_request()
+        with pytest.raises(CircuitOpenError):
+            breaker.before_call()
+
+    def test_slow_calls_open_the_breaker(self, breaker_settings, clock):
+        breaker = CircuitBreaker("stripe", clock=clock)
+        for _ in range(4):
+            breaker.record(True, 6.0)
+
+        assert breaker.state == CircuitState.OPEN
+
+    def test_failures_age_out_of_the_window(self, breaker_settings, clock):
+        breaker = CircuitBreaker("stripe", clock=clock)
+        for _ in range(3):
+            breaker.record(False, 0.1)
+
+        clock.now += 70
+        breaker.record(False, 0.1)
+
+        assert breaker.call_count() == 1
+        assert breaker.state == CircuitState.CLOSED
+
+    def test_half_open_probes_close_the_breaker(self, breaker_settings, clock):
+        breaker = CircuitBreaker("stripe", clock=clock)
+        trip(breaker)
+
+        clock.now += 30
+        assert breaker.state == CircuitState.HALF_OPEN
+        assert breaker.allow_request()
+        assert breaker.allow_request()
+        assert not breaker.allow_request()  # only two probes at a time
+
+        breaker.record(True, 0.1)
+        breaker.record(True, 0.1)
+
+        assert breaker.state == CircuitState.CLOSED
+        assert breaker.call_count() == 0
+
+    def test_failed_probe_reopens(self, breaker_settings, clock):
+        breaker = CircuitBreaker("stripe", clock=clock)
+        trip(breaker)
+        clock.now += 30
+        assert breaker.allow_request()
+
+        breaker.record(False, 0.1)
+
+        assert breaker.state == CircuitState.OPEN
+        assert breaker.retry_after() == 30.0
+
+    def test_cancelled_probe_gives_back_its_slot(self, breaker_settings, clock):
+        breaker = CircuitBreaker("stripe", clock=clock)
+        trip(breaker)
+        clock.now += 30
+        assert breaker.allow_request() and breaker.allow_request()
+
+        breaker.release()
+
+        assert breaker.allow_request()
+
+    def test_latency_quantiles_from_histogram(self, breaker_settings, clock):
+        breaker = CircuitBreaker("stripe", clock=clock)
+        assert breaker.latency_quantile(0.95) is None
+
+        for _ in range(19):
+            breaker.record(True, 0.2)
+        breaker.record(True, 3.0)
+
+        assert breaker.latency_quantile(0.5) == 0.25
+        assert breaker.latency_quantile(0.95) == 0.25
+        assert breaker.latency_quantile(1.0) == 5.0
+
+
+class TestTransportBreaker:
+    @pytest.mark.asyncio
+    async def test_open_breaker_fails_fast_without_calling_provider(
+        self, breaker_settings
+    ):
+        stub = PaymentStubServer()
+        trip(get_breaker("sumup"))
+        transport = ProviderTransport(
+            "sumup", base_url="http://stub", client=stub.client()
+        )
+
+        with pytest.raises(CircuitOpenError):
+            await transport.request("GET", "/me")
+
+        assert stub.requests == []
+
+    @pytest.mark.asyncio
+    async def test_gateway_errors_recorded_as_failures(self, breaker_settings):
+        stub = PaymentStubServer()
+        stub.fail_next(503, times=4)
+        transport = ProviderTransport(
+            "sumup", base_url="http://stub", client=stub.client()
+        )
+
+        for _ in range(4):
+            await transport.request("POST", "/checkouts", json={})
+
+        assert get_breaker("sumup").state == CircuitState.OPEN
+
+    @pytest.mark.asyncio
+    async def test_declines_do_not_count_against_provider(self, breaker_settings):
+        transport = ProviderTransport("stripe")
+
+        for _ in range(4):
+            with pytest.raises(ValueError):
+                await transport.run(Mock(side_effect=ValueError("card declined")))
+
+        assert get_breaker("stripe").failure_rate() == 0.0
+
+
+def provider(name, fee="0.10"):
+    mock = Mock()
+    mock.provider_name = name
+    mock.is_available.return_value = True
+    mock.get_supported_payment_methods.return_value = ["card"]
+    mock.get_supported_currencies.return_value = ["GBP"]
+    mock.calculate_fee.return_value = Decimal(fee)
+    return mock
+
+
+@pytest.fixture
+def factory(breaker_settings):
+    factory = factory_module.PaymentProviderFactory()
+    factory._get_provider_metrics = AsyncMock(return_value={})
+    with patch.object(factory_module, "settings") as settings:
+        settings.PAYMENT_HEDGE_MIN_DELAY_SECONDS = 0.05
+        settings.PAYMENT_BREAKER_SLOW_CALL_SECONDS = 0.05
+        yield factory
+
+
+class TestFallback:
+    @pytest.mark.asyncio
+    async def test_open_providers_dropped_and_half_open_last(self, factory):
+        factory.providers = {
+            "stripe": provider("stripe", "0.10"),
+            "square": provider("square", "0.20"),
+            "sumup": provider("sumup", "0.30"),
+        }
+        trip(get_breaker("stripe"))
+        sumup = get_breaker("sumup")
+        trip(sumup)
+        sumup._opened_at -= 30  # cool-down elapsed: half-open
+
+        ranked = await factory.get_providers_for_fallback(Decimal("10"), "card")
+
+        assert [p.provider_name for p in ranked] == ["square", "sumup"]
+
+    @pytest.mark.asyncio
+    async def test_fails_over_to_next_provider(self, factory):
+        first, second = provider("stripe"), provider("square")
+
+        async def operation(p):
+            if p is first:
+                return {"success": False, "status": PaymentStatus.FAILED}
+            return {"success": True, "transaction_id": "sq_1"}
+
+        result = await factory.execute_with_fallback([first, second], operation)
+
+        assert result["transaction_id"] == "sq_1"
+
+    @pytest.mark.asyncio
+    async def test_slow_idempotent_call_hedged_to_next_provider(self, factory):
+        slow, fast = provider("stripe"), provider("square")
+        cancelled = asyncio.Event()
+
+        async def operation(p):
+            if p is slow:
+                try:
+                    await asyncio.sleep(1)
+                except asyncio.CancelledError:
+                    cancelled.set()
+                    raise
+            return {"success": True, "provider": p.provider_name}
+
+        result = await factory.execute_with_fallback(
+            [slow, fast], operation, idempotent=True, hedge=True
+        )
+        await asyncio.sleep(0)
+
+        assert result["provider"] == "square"
+        assert cancelled.is_set()
+
+    @pytest.mark.asyncio
+    async def test_non_idempotent_call_never_hedged(self, factory):
+        slow, fast = provider("stripe"), provider("square")
+        calls = []
+
+        async def operation(p):
+            calls.append(p.provider_name)
+            await asyncio.sleep(0.1)
+            return {"success": True}
+
+        await factory.execute_with_fallback([slow, fast], operation, hedge=True)
+
+        assert calls == ["stripe"]
+
+
+class TestProcessorFallback:
+    @pytest.fixture
+    def processor(self, factory):
+        # The records are stubbed so the charge path runs without configuring
+        # the ORM mappers
+        with patch.object(
+            secure_payment_processor, "SecurePaymentConfigService"
+        ), patch.object(secure_payment_processor, "Payment"), patch.object(
+            secure_payment_processor, "PaymentAuditLog"
+        ):
+            processor = SecurePaymentProcessor(Mock())
+            processor.provider_factory = factory
+            processor._initialized = True
+            yield processor
+
+    def charging_provider(self, name, outcome):
+        mock = provider(name)
+        mock.create_payment = AsyncMock(side_effect=outcome)
+        return mock
+
+    @pytest.mark.asyncio
+    async def test_charge_fails_over_through_factory(self, processor, factory):
+        stripe = self.charging_provider("stripe", ConnectionError("reset"))
+        square = self.charging_provider(
+            "square",
+            [{"status": PaymentStatus.COMPLETED, "transaction_id": "sq_1"}],
+        )
+        factory.providers = {"stripe": stripe, "square": square}
+
+        with patch.object(
+            factory, "execute_with_fallback", wraps=factory.execute_with_fallback
+        ) as fallback:
+            result = await processor.process_payment(
+                order_id="order-1",
+                amount=Decimal("12.50"),
+                payment_method="card",
+                payment_details={},
+                user_id="user-1",
+                restaurant_id="restaurant-1",
+            )
+
+        assert result["provider"] == "square"
+        assert result["transaction_id"] == "sq_1"
+        assert fallback.call_args.kwargs["idempotent"] is False
+        stripe.create_payment.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_slow_charge_never_hedged(self, processor, factory):
+        async def slow_charge(**kwargs):
+            await asyncio.sleep(0.2)
+            return {"status": PaymentStatus.COMPLETED, "transaction_id": "st_1"}
+
+        stripe = self.charging_provider("stripe", slow_charge)
+        square = self.charging_provider("square", AssertionError("hedged"))
+        factory.providers = {"stripe": stripe, "square": square}
+
+        result = await processor.process_payment(
+            order_id="order-1",
+            amount=Decimal("12.50"),
+            payment_method="card",
+            payment_details={},
+            user_id="user-1",
+            restaurant_id="restaurant-1",
+        )
+
+        assert result["provider"] == "stripe"
+        square.create_payment.assert_not_awaited()
+
+
+class TestRoutingHealth:
+    @pytest.mark.asyncio
+    async def test_availability_score_follows_breaker(self, breaker_settings):
+        router = SmartRoutingService(Mock())
+        config = router.provider_configs["stripe"]
+        assert await router._calculate_availability_score("stripe", config) == 100
+
+        trip(get_breaker("stripe"))
+
+        assert await router._calculate_availability_score("stripe", config) == 0
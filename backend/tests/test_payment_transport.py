@@ -0,0 +1,238 @@
+"""
+Tests for the pooled, non-blocking payment provider transport
+"""
+
+import asyncio
+import threading
+import time
+from decimal import Decimal
+from unittest.mock import AsyncMock, Mock, patch
+
+import httpx
+import pytest
+import stripe
+
+from app.services.payment_providers import StripeProvider, SumUpProvider
+from app.services.payment_providers import transport
+from app.services.payment_providers.base import PaymentStatus
+from app.services.payment_providers.health import reset_breakers
+from app.services.payment_providers.transport import ProviderTransport
+from tests.fixtures.payment_stub import PaymentStubServer
+
+
+@pytest.fixture
+def stub():
+    return PaymentStubServer()
+
+
+@pytest.fixture
+def limits():
+    """Fresh semaphores, breakers and settings for each test"""
+    transport._provider_limits.clear()
+    reset_breakers()
+    with patch.object(transport, "settings") as settings:
+        settings.PAYMENT_PROVIDER_CONCURRENCY = 20
+        settings.PAYMENT_MAX_RETRIES = 2
+        settings.PAYMENT_RETRY_BACKOFF_SECONDS = 0.2
+        settings.PAYMENT_HTTP_TIMEOUT_SECONDS = 5.0
+        settings.PAYMENT_SDK_THREADS = 4
+        yield settings
+    transport._provider_limits.clear()
+    reset_breakers()
+
+
+@pytest.fixture
+def sleeps():
+    with patch.object(transport.asyncio, "sleep", new=AsyncMock()) as sleep:
+        yield sleep
+
+
+def stub_transport(stub, provider="sumup"):
+    return ProviderTransport(provider, base_url="http://stub", client=stub.client())
+
+
+def sumup_on(stub):
+    provider = SumUpProvider({"access_token": "tok", "merchant_code": "M1"})
+    provider.transport = stub_transport(stub)
+    return provider
+
+
+class TestRequest:
+    @pytest.mark.asyncio
+    async def test_sumup_checkout_round_trip(self, stub, limits):
+        provider = sumup_on(stub)
+
+        created = await provider.create_payment(
+            Decimal("12.50"), "gbp", "order-1", {}, {}
+        )
+        status = await provider.get_transaction_status(created["transaction_id"])
+
+        assert created["status"] == PaymentStatus.PENDING
+        assert status["status"] == PaymentStatus.PENDING
+        assert status["amount"] == Decimal("12.5")
+
+    @pytest.mark.asyncio
+    async def test_idempotent_request_retried_after_gateway_error(
+        self, stub, limits, sleeps
+    ):
+        stub.fail_next(503, times=2)
+
+        response = await stub_transport(stub).request("GET", "/me")
+
+        assert response.status_code == 200
+        assert stub.requests == [("GET", "/me")] * 3
+        assert sleeps.await_count == 2
+
+    @pytest.mark.asyncio
+    async def test_post_without_idempotency_key_not_retried(
+        self, stub, limits, sleeps
+    ):
+        stub.fail_next(503)
+
+        response = await stub_transport(stub).request(
+            "POST", "/checkouts", json={}
+        )
+
+        assert response.status_code == 503
+        assert len(stub.requests) == 1
+        sleeps.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_idempotency_key_makes_post_retryable(self, stub, limits, sleeps):
+        stub.fail_next(429, headers={"Retry-After": "1.5"})
+
+        response = await stub_transport(stub).request(
+            "POST",
+            "/checkouts",
+            idempotency_key="key-1",
+            json={"amount": 1, "currency": "GBP", "checkout_reference": "o"},
+        )
+
+        assert response.status_code == 201
+        assert len(stub.requests) == 2
+        sleeps.assert_awaited_once_with(1.5)
+
+    @pytest.mark.asyncio
+    async def test_gives_up_after_max_retries(self, stub, limits, sleeps):
+        limits.PAYMENT_MAX_RETRIES = 1
+        stub.fail_next(503, times=5)
+
+        response = await stub_transport(stub).request("GET", "/me")
+
+        assert response.status_code == 503
+        assert len(stub.requests) == 2
+
+    @pytest.mark.asyncio
+    async def test_unsent_post_retried_on_connect_error(self, limits, sleeps):
+        calls = []
+
+        def handler(request):
+            calls.append(request)
+            if len(calls) == 1:
+                raise httpx.ConnectError("refused", request=request)
+            return httpx.Response(201, json={"id": "c1"})
+
+        client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        provider = ProviderTransport("sumup", base_url="http://stub", client=client)
+
+        response = await provider.request("POST", "/checkouts", json={})
+
+        assert response.status_code == 201
+        assert len(calls) == 2
+
+    @pytest.mark.asyncio
+    async def test_in_flight_requests_capped_per_provider(self, limits):
+        limits.PAYMENT_PROVIDER_CONCURRENCY = 3
+        stub = PaymentStubServer(latency=0.02)
+        first, second = stub_transport(stub), stub_transport(stub)
+
+        await asyncio.gather(
+            *[t.request("GET", "/me") for t in [first, second] * 5]
+        )
+
+        assert len(stub.requests) == 10
+        assert stub.max_in_flight == 3
+
+
+class TestRun:
+    @pytest.mark.asyncio
+    async def test_blocking_call_runs_off_the_event_loop(self, limits):
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0.005)
+
+        def blocking_sdk_call():
+            time.sleep(0.1)
+            return threading.current_thread().name
+
+        task = asyncio.create_task(ticker())
+        thread_name = await ProviderTransport("stripe").run(blocking_sdk_call)
+        task.cancel()
+
+        assert thread_name.startswith("payment-sdk")
+        assert ticks > 5
+
+    @pytest.mark.asyncio
+    async def test_timed_out_call_keeps_its_slot_until_the_thread_ends(
+        self, limits
+    ):
+        limits.PAYMENT_PROVIDER_CONCURRENCY = 1
+        limits.PAYMENT_HTTP_TIMEOUT_SECONDS = 0.05
+        unblock = threading.Event()
+        started = []
+
+        def stuck_sdk_call():
+            started.append("stuck")
+            unblock.wait(5)
+
+        def next_sdk_call():
+            started.append("next")
+            return "ok"
+
+        with pytest.raises(asyncio.TimeoutError):
+            await ProviderTransport("stripe").run(stuck_sdk_call)
+        waiting = asyncio.create_task(ProviderTransport("stripe").run(next_sdk_call))
+        await asyncio.sleep(0.1)
+
+        assert started == ["stuck"]
+        unblock.set()
+        assert await waiting == "ok"
+        assert started == ["stuck", "next"]
+
+    @pytest.mark.asyncio
+    async def test_only_listed_errors_retried(self, limits, sleeps):
+        sdk_call = Mock(side_effect=[ConnectionError("reset"), "ok"])
+        assert await ProviderTransport("stripe").run(
+            sdk_call, retry_on=(ConnectionError,)
+        ) == "ok"
+
+        sdk_call = Mock(side_effect=ValueError("declined"))
+        with pytest.raises(ValueError):
+            await ProviderTransport("stripe").run(
+                sdk_call, retry_on=(ConnectionError,)
+            )
+        assert sdk_call.call_count == 1
+
+    @pytest.mark.asyncio
+    async def test_stripe_payment_retried_with_same_idempotency_key(
+        self, limits, sleeps
+    ):
+        provider = StripeProvider({"secret_key": "sk_test_123"})
+        intent = Mock(id="pi_1", status="succeeded", client_secret="cs")
+        create = Mock(
+            side_effect=[stripe.error.APIConnectionError("reset"), intent]
+        )
+
+        with patch("stripe.PaymentIntent.create", create):
+            result = await provider.create_payment(
+                Decimal("10.00"), "gbp", "order-1", {}, {"token": "pm_card"}
+            )
+
+        assert result["transaction_id"] == "pi_1"
+        first, second = create.call_args_list
+        assert first.kwargs["idempotency_key"] == second.kwargs["idempotency_key"]
+        assert first.kwargs["amount"] == 1000
@@ -0,0 +1,165 @@
+"""
+Tests for the per-restaurant smart routing table
+"""
+
+import asyncio
+import sys
+from decimal import Decimal
+from unittest.mock import AsyncMock, Mock, patch
+
+import pytest
+
+from app.services import smart_routing
+from app.services.payment_analytics import PaymentAnalyticsService
+from app.services.payment_providers.health import reset_breakers
+from app.services.smart_routing import (
+    RoutingTable,
+    SmartRoutingService,
+    invalidate_routing,
+    record_routing_volume,
+)
+
+
+def performance(total_volume):
+    return {
+        "overall_metrics": {"total_volume": total_volume, "total_fees": 0.0},
+        "provider_performance": {},
+    }
+
+
+@pytest.fixture
+def analytics():
+    reset_breakers()
+    analytics = Mock(spec=PaymentAnalyticsService)
+    analytics.get_provider_performance_summary = AsyncMock(
+        return_value=performance(700.0)
+    )
+    analytics.get_provider_health_scores = AsyncMock(return_value={})
+    return analytics
+
+
+@pytest.fixture
+def router(analytics):
+    return SmartRoutingService(analytics, routing_table=RoutingTable(ttl_seconds=300))
+
+
+async def route(router, restaurant_id="r1"):
+    return await router.route_payment(
+        amount=Decimal("25.00"), restaurant_id=restaurant_id
+    )
+
+
+class TestRoutingTable:
+    @pytest.mark.asyncio
+    async def test_analytics_queried_once_per_restaurant(self, router, analytics):
+        for _ in range(50):
+            await route(router)
+        await route(router, "r2")
+
+        assert analytics.get_provider_performance_summary.await_count == 2
+        assert analytics.get_provider_health_scores.await_count == 2
+
+    @pytest.mark.asyncio
+    async def test_matches_uncached_scoring(self, router):
+        decision = await route(router)
+
+        context = await router._get_routing_context("r1", Decimal("25.00"))
+        uncached = await router._score_providers(
+            Decimal("25.00"), "r1", context, smart_routing.RoutingStrategy.BALANCED
+        )
+
+        assert decision.selected_provider == uncached[0].provider
+
+    @pytest.mark.asyncio
+    async def test_concurrent_misses_share_one_build(self, router, analytics):
+        async def slow_summary(*args):
+            await asyncio.sleep(0.01)
+            return performance(700.0)
+
+        analytics.get_provider_performance_summary.side_effect = slow_summary
+
+        await asyncio.gather(*[route(router) for _ in range(10)])
+
+        assert analytics.get_provider_performance_summary.await_count == 1
+
+    @pytest.mark.asyncio
+    async def test_stale_entry_served_while_refreshing(self, router, analytics):
+        await route(router)
+        router.routing_table.get("r1").built_at -= 301
+        analytics.get_provider_performance_summary.return_value = performance(7000.0)
+
+        await route(router)
+        volume = router.routing_table.get("r1").analytics_data["monthly_volume"]
+        assert volume == pytest.approx(3000)
+        for _ in range(5):
+            await asyncio.sleep(0)
+
+        volume = router.routing_table.get("r1").analytics_data["monthly_volume"]
+        assert volume == pytest.approx(30000)
+
+    @pytest.mark.asyncio
+    async def test_failed_refresh_keeps_previous_entry(self, router, analytics):
+        await route(router)
+        entry = router.routing_table.get("r1")
+        entry.built_at -= 301
+        analytics.get_provider_performance_summary.side_effect = RuntimeError("db")
+
+        await route(router)
+        for _ in range(5):
+            await asyncio.sleep(0)
+
+        assert router.routing_table.get("r1") is entry
+
+    @pytest.mark.asyncio
+    async def test_config_change_invalidates(self, router, analytics):
+        await route(router)
+        await route(router, "r2")
+
+        invalidate_routing("r1")
+        await route(router)
+        await route(router, "r2")
+
+        assert analytics.get_provider_performance_summary.await_count == 3
+
+    @pytest.mark.asyncio
+    async def test_invalidation_during_build_not_overwritten(self, router, analytics):
+        async def summary_then_invalidate(*args):
+            invalidate_routing("r1")
+            return performance(700.0)
+
+        analytics.get_provider_performance_summary.side_effect = (
+            summary_then_invalidate
+        )
+
+        await route(router)
+
+        assert router.routing_table.get("r1") is None
+
+    @pytest.mark.asyncio
+    async def test_completed_payments_update_volume_projection(self, router):
+        await route(router)
+
+        record_routing_volume("r1", Decimal("70"))
+
+        volume = router.routing_table.get("r1").analytics_data["monthly_volume"]
+        assert volume == pytest.approx(3300)
+
+    @pytest.mark.asyncio
+    async def test_disabling_provider_config_invalidates(self, router, analytics):
+        from app.services import secure_payment_config
+
+        await route(router)
+        service = secure_payment_config.SecurePaymentConfigService.__new__(
+            secure_payment_config.SecurePaymentConfigService
+        )
+        service.db = Mock()
+        service.db.query.return_value.filter_by.return_value.first.return_value = (
+            Mock()
+        )
+
+        # Resolve the lazy import to the module this file's tables live in,
+        # even if another test has cleared app.* from sys.modules
+        with patch.dict(sys.modules, {"app.services.smart_routing": smart_routing}):
+            assert service.disable_provider_config("stripe", "r1")
+
+        assert router.routing_table.get("r1") is None
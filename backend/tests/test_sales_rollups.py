@@ -0,0 +1,223 @@
+"""
+Tests for incrementally maintained sales rollup buckets
+"""
+
+import json
+import uuid
+from datetime import date, datetime, timedelta, timezone
+from decimal import Decimal
+from types import SimpleNamespace
+from unittest.mock import MagicMock, Mock, patch
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from app.api.v1.endpoints import analytics
+from app.core.database import Order
+from app.services.sales_rollup_service import (
+    SalesRollupService,
+    _on_order_flushed,
+    apply_rollup_deltas,
+    bucket_start,
+    order_contribution,
+    rollup_deltas,
+)
+
+CREATED = datetime(2025, 1, 10, 14, 35, tzinfo=timezone.utc)
+HOUR = datetime(2025, 1, 10, 14)
+DAY = datetime(2025, 1, 10)
+
+
+def order_values(status="completed", **overrides):
+    values = {
+        "status": status,
+        "order_type": "dine_in",
+        "created_at": CREATED,
+        "total_amount": Decimal("24.00"),
+        "subtotal": Decimal("20.00"),
+        "tax_amount": Decimal("4.00"),
+        "service_charge": Decimal("0.00"),
+        "discount_amount": None,
+    }
+    values.update(overrides)
+    return values
+
+
+class TestContributions:
+    def test_completed_order_contribution(self):
+        contribution = order_contribution(
+            order_values(), {"card": Decimal("20"), "apple_pay": Decimal("4")}
+        )
+
+        assert contribution["order_count"] == 1
+        assert contribution["revenue"] == Decimal("24.00")
+        assert contribution["total_discounts"] == 0
+        assert contribution["dine_in_orders"] == 1
+        assert contribution["card_sales"] == Decimal("20")
+        assert contribution["other_sales"] == Decimal("4")
+
+    def test_non_counted_status_contributes_nothing(self):
+        assert order_contribution(order_values(status="preparing"), {}) == {}
+
+    def test_bucket_start_uses_utc(self):
+        bst = datetime.fromisoformat("2025-06-01T00:30:00+01:00")
+
+        assert bucket_start(bst, "day") == datetime(2025, 5, 31)
+        assert bucket_start(bst, "hour") == datetime(2025, 5, 31, 23)
+
+
+class TestDeltas:
+    def test_completion_adds_to_hour_and_day(self):
+        deltas = rollup_deltas(order_values(status="ready"), order_values(), {})
+
+        assert set(deltas) == {("hour", HOUR), ("day", DAY)}
+        assert deltas[("day", DAY)]["order_count"] == 1
+        assert deltas[("day", DAY)]["revenue"] == Decimal("24.00")
+
+    def test_refund_moves_revenue_to_refunds(self):
+        deltas = rollup_deltas(
+            order_values(), order_values(status="refunded"), {"cash": Decimal("24")}
+        )
+
+        day = deltas[("day", DAY)]
+        assert day["order_count"] == -1
+        assert day["revenue"] == Decimal("-24.00")
+        assert day["cash_sales"] == Decimal("-24")
+        assert day["refunded_orders"] == 1
+        assert day["refunded_amount"] == Decimal("24.00")
+
+    def test_amount_edit_on_completed_order_applies_difference(self):
+        deltas = rollup_deltas(
+            order_values(), order_values(total_amount=Decimal("30.00")), {}
+        )
+
+        assert deltas[("day", DAY)] == {
+            **{metric: 0 for metric in deltas[("day", DAY)]},
+            "revenue": Decimal("6.00"),
+        }
+
+    def test_unchanged_order_produces_no_deltas(self):
+        assert rollup_deltas(order_values(), order_values(), {}) == {}
+
+
+class TestUpsert:
+    def test_deltas_added_on_conflict(self):
+        connection = Mock()
+        deltas = {("day", DAY): {"order_count": 1}}
+
+        apply_rollup_deltas(connection, uuid.uuid4(), deltas)
+
+        stmt = connection.execute.call_args.args[0]
+        sql = str(stmt.compile(dialect=postgresql.dialect()))
+        assert "INSERT INTO daily_sales_rollups" in sql
+        assert "ON CONFLICT (restaurant_id, bucket_start) DO UPDATE" in sql
+        assert "order_count = (daily_sales_rollups.order_count + excluded" in sql
+
+    def test_listener_upserts_new_completed_order(self):
+        order = Order(
+            id=uuid.uuid4(),
+            restaurant_id=uuid.uuid4(),
+            **order_values(),
+        )
+        connection = MagicMock()
+        connection.execute.return_value = []
+
+        _on_order_flushed(connection, order, inserted=True)
+
+        statements = [str(c.args[0]) for c in connection.execute.call_args_list]
+        assert any("FROM payments" in s for s in statements)
+        assert sum("INSERT INTO" in s for s in statements) == 2
+
+    def test_listener_ignores_non_counted_orders(self):
+        order = Order(id=uuid.uuid4(), restaurant_id=uuid.uuid4(), status="pending")
+        connection = MagicMock()
+
+        _on_order_flushed(connection, order, inserted=True)
+
+        connection.execute.assert_not_called()
+
+    def test_listener_failure_does_not_raise(self):
+        order = Order(id=uuid.uuid4(), restaurant_id=uuid.uuid4(), **order_values())
+        connection = MagicMock()
+        connection.execute.side_effect = RuntimeError("relation does not exist")
+
+        _on_order_flushed(connection, order, inserted=True)
+
+
+class TestConsistency:
+    def test_reports_drifted_metrics(self):
+        restaurant_id = uuid.uuid4()
+        expected = SimpleNamespace(
+            restaurant_id=restaurant_id,
+            bucket_start=DAY,
+            order_count=3,
+            revenue=Decimal("60"),
+        )
+        stored = SimpleNamespace(
+            restaurant_id=restaurant_id,
+            bucket_start=DAY,
+            order_count=2,
+            revenue=Decimal("60"),
+        )
+        db = Mock()
+        db.execute.return_value = [expected]
+        db.query.return_value.filter.return_value = [stored]
+
+        mismatches = SalesRollupService(db).check_consistency(
+            date(2025, 1, 10), date(2025, 1, 10)
+        )
+
+        # Once per granularity, each with the same drifted count
+        assert [m["metric"] for m in mismatches] == ["order_count", "order_count"]
+        assert mismatches[0]["expected"] == 3
+        assert mismatches[0]["actual"] == 2
+
+    def test_missing_bucket_reported(self):
+        db = Mock()
+        db.execute.return_value = []
+        db.query.return_value.filter.return_value = [
+            SimpleNamespace(restaurant_id=uuid.uuid4(), bucket_start=DAY, order_count=1)
+        ]
+
+        mismatches = SalesRollupService(db).check_consistency(
+            date(2025, 1, 10), date(2025, 1, 10)
+        )
+
+        assert {m["expected"] for m in mismatches} == {0}
+
+
+class TestDashboard:
+    @pytest.mark.asyncio
+    async def test_today_is_the_utc_rollup_day(self):
+        """At 23:30 UTC a server two hours ahead is already on the next day"""
+        utc_now = datetime(2025, 6, 1, 23, 30, tzinfo=timezone.utc)
+
+        class ServerClock(datetime):
+            @classmethod
+            def now(cls, tz=None):
+                if tz is None:
+                    return (utc_now + timedelta(hours=2)).replace(tzinfo=None)
+                return utc_now.astimezone(tz)
+
+        rollups = Mock()
+        rollups.buckets.return_value = [
+            SimpleNamespace(
+                bucket_start=datetime(2025, 6, 1), revenue=Decimal("50"), order_count=2
+            )
+        ]
+        with patch.object(analytics, "datetime", ServerClock), patch.object(
+            analytics, "get_sales_rollup_service", return_value=rollups
+        ), patch.object(analytics, "get_order_line_service"):
+            response = await analytics.get_mobile_reports_dashboard(
+                restaurant_id=None,
+                db=MagicMock(),
+                current_user=SimpleNamespace(role="manager", restaurant_id="r1"),
+            )
+
+        summary = json.loads(response.body)["data"]["todaySummary"]
+        assert summary["totalSales"] == 50.0
+        assert summary["transactions"] == 2
+        assert rollups.buckets.call_args.args[1:] == (
+            datetime(2025, 5, 26, tzinfo=timezone.utc),
+            datetime(2025, 6, 2, tzinfo=timezone.utc),
+        )
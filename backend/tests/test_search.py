@@ -0,0 +1,121 @@
+"""
+Tests for customer lookup and product search
+"""
+
+import uuid
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from app.services.search_service import (
+    PREFIX_SCORE,
+    SearchService,
+    TrigramIndex,
+    trigrams,
+    word_similarity,
+)
+
+
+def entity(**fields):
+    return SimpleNamespace(id=uuid.uuid4(), **fields)
+
+
+def postgres_session(rows=None):
+    db = MagicMock()
+    db.get_bind.return_value.dialect.name = "postgresql"
+    db.execute.return_value.all.return_value = rows or []
+    return db
+
+
+def compiled(statement):
+    return str(statement.compile(dialect=postgresql.dialect()))
+
+
+class TestTrigrams:
+    def test_matches_pg_trgm(self):
+        # Values documented for pg_trgm's show_trgm() and word_similarity()
+        assert trigrams("cat") == {"  c", " ca", "cat", "at "}
+        assert word_similarity("word", "two words") == pytest.approx(0.8)
+
+    def test_case_and_punctuation_ignored(self):
+        assert word_similarity("o brien", "O'Brien") == 1.0
+        assert word_similarity("MARIA", "Maria Lopez") == 1.0
+
+
+class TestTrigramIndex:
+    def index(self):
+        index = TrigramIndex()
+        self.maria = entity(name="Maria Lopez")
+        self.mario = entity(name="Mario Rossi")
+        self.sam = entity(name="Sam Hill")
+        index.add(self.maria, "Maria Lopez", "maria@example.com", "+44 7700 900123")
+        index.add(self.mario, "Mario Rossi", "mrossi@example.com", "07700 900456")
+        index.add(self.sam, "Sam Hill", "sam@example.com", None)
+        return index
+
+    def test_closest_name_ranks_first(self):
+        hits = self.index().search("maria", 10)
+
+        assert [hit.entity for hit in hits][:2] == [self.maria, self.mario]
+
+    def test_typo_still_matches(self):
+        assert self.index().search("Lopes", 10)[0].entity is self.maria
+
+    def test_email_and_phone_prefixes(self):
+        index = self.index()
+
+        assert index.search("mross", 10)[0].entity is self.mario
+        assert index.search("mross", 10)[0].score == PREFIX_SCORE
+        assert [hit.entity for hit in index.search("447700", 10)] == [self.maria]
+
+    def test_unrelated_term_matches_nothing(self):
+        assert self.index().search("zzz", 10) == []
+
+    def test_description_words(self):
+        index = TrigramIndex()
+        taco = entity(name="Al Pastor")
+        index.add(taco, "Al Pastor", description="Pork taco with pineapple")
+        index.add(entity(name="Horchata"), "Horchata", description="Rice drink")
+
+        hits = index.search("pineapple taco", 10)
+
+        assert [hit.entity for hit in hits] == [taco]
+
+
+class TestIndexedQueries:
+    def test_customer_lookup_uses_index_expressions(self):
+        db = postgres_session()
+
+        SearchService(db).search_customers(str(uuid.uuid4()), " 07700 90 ", 5)
+
+        sql = compiled(db.execute.call_args.args[0])
+        assert "coalesce(customers.first_name, %(coalesce_1)s) || " in sql
+        assert "lower(customers.email) LIKE" in sql
+        assert "regexp_replace(customers.phone" in sql
+        assert "%%> " in sql and "word_similarity(" in sql
+
+    def test_short_digit_runs_skip_phone_lookup(self):
+        db = postgres_session()
+
+        SearchService(db).search_customers(str(uuid.uuid4()), "jo", 5)
+
+        assert "regexp_replace" not in compiled(db.execute.call_args.args[0])
+
+    def test_like_wildcards_escaped(self):
+        clause = SearchService(postgres_session()).customer_filter("50%_off")
+        params = clause.compile(dialect=postgresql.dialect()).params
+
+        assert "%50\\%\\_off%" in params.values()
+
+    def test_other_databases_use_memory_index(self):
+        maria = entity(first_name="Maria", last_name="Lopez", email=None, phone=None)
+        db = MagicMock()
+        db.get_bind.return_value.dialect.name = "sqlite"
+        db.query.return_value.filter.return_value = [maria]
+
+        hits = SearchService(db).search_customers("r1", "maria", 5)
+
+        assert [hit.entity for hit in hits] == [maria]
+        db.execute.assert_not_called()
@@ -0,0 +1,279 @@
+"""
+Tests for the SQL injection WAF scanning engine
+"""
+
+import json
+import random
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.middleware.sql_injection_waf import SQLInjectionWAFMiddleware
+
+ATTACKS = [
+    "1' OR '1'='1",
+    "admin'--",
+    "'; DROP TABLE users--",
+    "1; delete from orders",
+    "UNION SELECT password FROM users",
+    "select name from information_schema.tables",
+    "1 AND 1=1",
+    "pg_sleep(5)",
+    "exec xp_cmdshell",
+    "0x4f52",
+    "abc%00",
+    "%27%20OR%20%271%27%3D%271",
+    "CONCAT(a, b)",
+    "load_file('/etc/passwd')",
+]
+
+ORDER = {
+    "restaurant_id": "6f1c2d3e-1111-2222-3333-444455556666",
+    "order_type": "dine_in",
+    "table_number": "12",
+    "notes": "No onions please, allergy to nuts",
+    "items": [
+        {
+            "product_id": f"6f1c2d3e-1111-2222-3333-4444555566{i:02d}",
+            "name": "Carnitas Taco",
+            "quantity": 2,
+            "unit_price": 3.5,
+            "modifiers": ["extra salsa", "no cilantro"],
+            "special_instructions": "well done",
+        }
+        for i in range(20)
+    ],
+    "payment_method": "card",
+}
+
+
+def make_waf(**kwargs):
+    return SQLInjectionWAFMiddleware(None, **kwargs)
+
+
+def pattern_matches(waf, text):
+    """The uncached verdict of the full pattern set, without the prefilter"""
+    if any(pattern.search(text) for pattern in waf.COMPILED_PATTERNS):
+        return True
+    lowered = text.lower()
+    if any(sequence in lowered for sequence in waf.SUSPICIOUS_SEQUENCES):
+        return True
+    return "\x00" in text or "%00" in text
+
+
+class TestScanner:
+    @pytest.mark.parametrize("attack", ATTACKS)
+    def test_attacks_detected(self, attack):
+        waf = make_waf()
+
+        assert waf._check_string(attack, "Query param 'q'")
+
+    def test_prefilter_never_hides_a_pattern_match(self):
+        """Any text a pattern matches must contain a trigger"""
+        waf = make_waf()
+        fragments = [
+            "select", "union", "update", "from", "where", "into", "exec",
+            "sleep", "sys", "users", "or", "and", "1", "=", "'", '"', ";",
+            "-", "/", "*", "#", "(", "0", "x", "_", "%", " ", "a", "ſ",
+        ]
+        rng = random.Random(0)
+
+        for _ in range(5000):
+            text = "".join(rng.choice(fragments) for _ in range(rng.randint(1, 8)))
+            if pattern_matches(waf, text):
+                assert waf._may_match(text), text
+
+    def test_clean_order_passes(self):
+        waf = make_waf()
+        body = json.dumps(ORDER).encode()
+
+        assert waf._check_body(body, "application/json") == []
+
+    def test_json_leaf_reported_with_path(self):
+        waf = make_waf()
+        order = json.loads(json.dumps(ORDER))
+        order["items"][1]["special_instructions"] = "'; DROP TABLE orders--"
+
+        findings = waf._check_body(json.dumps(order).encode(), "application/json")
+
+        assert findings == [
+            "JSON body.items[1].special_instructions matches SQL injection pattern"
+        ]
+
+    def test_invalid_json_scanned_as_text(self):
+        waf = make_waf()
+
+        findings = waf._check_body(b"{'a': 1 OR 1=1", "application/json")
+
+        assert findings == ["Request body matches SQL injection pattern"]
+
+    def test_jwt_tokens_skipped(self):
+        waf = make_waf()
+
+        assert waf._check_string("eyJhbGci.eyJzdWIi.c2lnbmF0dXJl", "Header") is None
+
+    def test_repeated_body_served_from_cache(self):
+        waf = make_waf()
+        body = json.dumps({"notes": "1' OR '1'='1"}).encode()
+
+        first = waf._check_body(body, "application/json")
+        first.clear()
+        second = waf._check_body(body, "application/json")
+
+        assert second == ["JSON body.notes matches SQL injection pattern"]
+        assert waf.get_stats()["verdict_cache_hits"] == 1
+
+    def test_cache_is_bounded(self):
+        waf = make_waf(verdict_cache_size=2)
+
+        for value in ("a", "b", "c", "d"):
+            waf._check_string(value, "Header")
+
+        assert waf.get_stats()["verdict_cache_size"] == 2
+
+    def test_oversized_json_leaf_rejected(self):
+        waf = make_waf(max_scan_bytes=100)
+        body = json.dumps({"padding": "x" * 200, "notes": "no onions"}).encode()
+
+        assert waf._check_body(body, "application/json") == [
+            "JSON body.padding exceeds the 100 character scan limit"
+        ]
+
+    def test_attack_beside_padding_detected(self):
+        """An oversized leaf is rejected and the rest is still scanned"""
+        waf = make_waf()
+        body = json.dumps({"padding": "x" * 70000, "notes": "1' OR '1'='1"})
+
+        findings = waf._check_body(body.encode(), "application/json")
+
+        assert findings == [
+            "JSON body.padding exceeds the 65536 character scan limit",
+            "JSON body.notes matches SQL injection pattern",
+        ]
+
+    def test_large_json_document_scanned_in_full(self):
+        """The per-string limit doesn't cap the size of the whole document"""
+        waf = make_waf(max_scan_bytes=100)
+        document = {"items": [{"name": "Taco"}] * 50 + [{"name": "1 AND 1=1"}]}
+
+        findings = waf._check_body(json.dumps(document).encode(), "application/json")
+
+        assert findings == ["JSON body.items[50].name matches SQL injection pattern"]
+
+    def test_oversized_body_rejected(self):
+        waf = make_waf(max_body_bytes=100)
+        body = json.dumps({"items": ["Taco"] * 50}).encode()
+
+        assert waf._check_body(body, "application/json") == [
+            "Request body exceeds the 100 character scan limit"
+        ]
+
+    def test_leaves_checked_in_document_order(self):
+        waf = make_waf()
+        document = {"a": ["1 AND 1=1", {"b": "0x41"}], "c": "pg_sleep(1)"}
+
+        findings = waf._check_json(document, "JSON body")
+
+        assert findings == [
+            "JSON body.a[0] matches SQL injection pattern",
+            "JSON body.a[1].b matches SQL injection pattern",
+            "JSON body.c matches SQL injection pattern",
+        ]
+
+    def test_oversized_text_body_rejected(self):
+        waf = make_waf(max_body_bytes=100)
+
+        findings = waf._check_body(b"x" * 200 + b"' OR 1=1--", "text/plain")
+
+        assert findings == ["Request body exceeds the 100 character scan limit"]
+
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+    app.add_middleware(SQLInjectionWAFMiddleware)
+
+    @app.post("/api/v1/upload")
+    async def upload():
+        return {"ok": True}
+
+    return TestClient(app)
+
+
+def menu_import(products):
+    return [
+        {
+            "name": f"Carnitas Taco {i}",
+            "category": f"Category {i % 12}",
+            "price": "3.50",
+            "description": "Slow-cooked pork shoulder with salsa verde and onion",
+            "sku": f"TACO-{i:04d}",
+            "is_active": True,
+            "image_url": f"https://cdn.example.com/menu/taco-{i:04d}.jpg",
+        }
+        for i in range(products)
+    ]
+
+
+def sync_upload(actions):
+    return {
+        "device_id": "pos-terminal-01",
+        "sync_actions": [
+            {
+                "id": f"6f1c2d3e-1111-2222-3333-4444{i:08d}",
+                "entity_type": "orders",
+                "entity_id": f"7a2b3c4d-1111-2222-3333-4444{i:08d}",
+                "action": "update",
+                "data": {"status": "completed", "notes": "No onions please"},
+                "client_timestamp": "2026-10-16T12:00:00+00:00",
+                "version": 2,
+            }
+            for i in range(actions)
+        ],
+        "force_overwrite": False,
+    }
+
+
+class TestMiddleware:
+    def test_json_with_charset_scanned(self, client):
+        response = client.post(
+            "/api/v1/upload",
+            content=json.dumps({"name": "1' OR '1'='1"}),
+            headers={"content-type": "application/json; charset=utf-8"},
+        )
+
+        assert response.status_code == 400
+
+    def test_binary_upload_not_scanned(self, client):
+        response = client.post(
+            "/api/v1/upload",
+            content=b"--\x00' OR 1=1",
+            headers={"content-type": "image/png"},
+        )
+
+        assert response.status_code == 200
+
+    def test_text_body_scanned(self, client):
+        response = client.post(
+            "/api/v1/upload",
+            content=b"' OR 1=1--",
+            headers={"content-type": "text/plain"},
+        )
+
+        assert response.status_code == 400
+
+    @pytest.mark.parametrize(
+        "payload", [menu_import(400), sync_upload(400)], ids=["menu", "sync"]
+    )
+    def test_large_clean_payload_passes(self, client, payload):
+        content = json.dumps(payload)
+        assert len(content) > 65536
+
+        response = client.post(
+            "/api/v1/upload",
+            content=content,
+            headers={"content-type": "application/json"},
+        )
+
+        assert response.status_code == 200
@@ -0,0 +1,364 @@
+"""
+Tests for cursor-paged offline sync downloads
+"""
+
+import asyncio
+import json
+import uuid
+from datetime import datetime, timedelta, timezone
+from unittest.mock import Mock, patch
+
+import pytest
+from sqlalchemy import (
+    Column,
+    DateTime,
+    MetaData,
+    String,
+    Table,
+    create_engine,
+    insert,
+    select,
+    update,
+)
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm import sessionmaker
+
+from app.core.exceptions import FynloException
+from app.core import sync_manager
+from app.core.sync_manager import (
+    OfflineSyncManager,
+    SyncCursor,
+    tombstone_key,
+)
+from app.models import Customer, Order, Payment, Product, SyncTombstone
+
+RESTAURANT_ID = str(uuid.uuid4())
+NOW = datetime(2025, 10, 16, 12, 0, tzinfo=timezone.utc)
+
+
+def ago(minutes):
+    return NOW - timedelta(minutes=minutes)
+
+
+class FakeSyncSession:
+    """
+    Evaluates the keyset page queries against in-memory rows, reading the
+    cursor position, settle bound and limit from the compiled parameters.
+    """
+
+    def __init__(self, rows=None, tombstones=None):
+        self.rows = rows or {}
+        self.tombstones = tombstones or []
+        self.statements = []
+        self.now = NOW
+
+    def scalar(self, stmt):
+        return self.now
+
+    def _page(self, stmt, keyed):
+        self.statements.append(stmt)
+        params = stmt.compile(dialect=postgresql.dialect()).params
+        after = (params["param_1"], params["param_2"])
+        upper = next(
+            v
+            for k, v in params.items()
+            if isinstance(v, datetime) and k != "param_1"
+        )
+        page = sorted(
+            (key, row) for key, row in keyed if key > after and key[0] <= upper
+        )
+        return [row for _, row in page][: stmt._limit]
+
+    def execute(self, stmt):
+        model = stmt.column_descriptions[0]["entity"]
+        keyed = [
+            ((changed_at, entity.id), (entity, changed_at))
+            for entity, changed_at in self.rows.get(model, [])
+        ]
+        return Mock(all=Mock(return_value=self._page(stmt, keyed)))
+
+    def scalars(self, stmt):
+        params = stmt.compile(dialect=postgresql.dialect()).params
+        keyed = [
+            ((t.deleted_at, t.id), t)
+            for t in self.tombstones
+            if t.entity_type == params["entity_type_1"]
+        ]
+        return Mock(all=Mock(return_value=self._page(stmt, keyed)))
+
+
+def make_product(changed_at, name="Taco", is_active=True):
+    product = Product(
+        id=uuid.uuid4(),
+        restaurant_id=RESTAURANT_ID,
+        name=name,
+        price=3.5,
+        stock_quantity=10,
+        is_active=is_active,
+    )
+    return product, changed_at
+
+
+def make_order(changed_at):
+    order = Order(
+        id=uuid.uuid4(),
+        restaurant_id=RESTAURANT_ID,
+        order_number="A-1",
+        status="completed",
+        payment_status="completed",
+        total_amount=12.0,
+    )
+    return order, changed_at
+
+
+def make_tombstone(entity_type, deleted_at):
+    return SyncTombstone(
+        id=uuid.uuid4(),
+        restaurant_id=RESTAURANT_ID,
+        entity_type=entity_type,
+        entity_id=uuid.uuid4(),
+        deleted_at=deleted_at,
+    )
+
+
+def drain(manager, **kwargs):
+    """Follow next_cursor until has_more is false; returns (records, pages)"""
+    records, pages, cursor = [], 0, None
+    while True:
+        page = manager.download_page(RESTAURANT_ID, cursor=cursor, **kwargs)
+        records.extend(page.records)
+        pages += 1
+        cursor = page.cursor.encode()
+        if not page.has_more:
+            return records, pages, cursor
+
+
+class TestSyncCursor:
+    def test_round_trip(self):
+        cursor = SyncCursor.start(RESTAURANT_ID, ago(60), NOW)
+        cursor.positions["orders"] = (ago(5), uuid.uuid4())
+
+        decoded = SyncCursor.decode(cursor.encode())
+
+        assert decoded.restaurant_id == RESTAURANT_ID
+        assert decoded.positions == cursor.positions
+
+    def test_first_sync_ignores_earlier_deletes(self):
+        cursor = SyncCursor.start(RESTAURANT_ID, None, NOW)
+
+        assert cursor.positions["products"][0].year == 1970
+        assert cursor.positions[tombstone_key("products")][0] == NOW
+
+    @pytest.mark.parametrize("token", ["not-a-cursor", "e30", ""])
+    def test_malformed_cursor_rejected(self, token):
+        with pytest.raises(FynloException) as exc:
+            SyncCursor.decode(token)
+        assert exc.value.status_code == 400
+
+
+class TestDownloadPage:
+    def test_pages_follow_keyset_order_without_gaps(self):
+        products = [make_product(ago(30 - i), name=f"P{i}") for i in range(7)]
+        # Two rows sharing a timestamp are split across pages by id
+        products.append(make_product(ago(27), name="tie"))
+        manager = OfflineSyncManager(FakeSyncSession({Product: products}))
+
+        records, pages, _ = drain(manager, entity_types=["products"], page_size=3)
+
+        assert pages == 3
+        expected = sorted(products, key=lambda p: (p[1], p[0].id))
+        assert [r["id"] for r in records] == [str(p.id) for p, _ in expected]
+
+    def test_page_size_capped_and_query_bounded(self):
+        db = FakeSyncSession({Product: [make_product(ago(1))]})
+        manager = OfflineSyncManager(db)
+
+        with patch.object(sync_manager, "settings") as settings:
+            settings.SYNC_PAGE_SIZE = 500
+            settings.SYNC_MAX_PAGE_SIZE = 50
+            settings.SYNC_SETTLE_SECONDS = 0
+            settings.SYNC_TOMBSTONE_RETENTION_DAYS = 30
+            page = manager.download_page(
+                RESTAURANT_ID, entity_types=["products"], page_size=10_000
+            )
+
+        sql = str(db.statements[0].compile(dialect=postgresql.dialect()))
+        assert page.page_size == 50
+        assert db.statements[0]._limit == 51
+        changed_at = "coalesce(products.updated_at, products.created_at)"
+        assert f"({changed_at}, products.id) >" in sql
+        assert f"ORDER BY {changed_at}, products.id" in sql
+
+    def test_rows_inside_settle_window_wait_for_next_sync(self):
+        settled, recent = make_product(ago(10)), make_product(NOW)
+        manager = OfflineSyncManager(FakeSyncSession({Product: [settled, recent]}))
+
+        records, _, _ = drain(manager, entity_types=["products"])
+
+        assert [r["id"] for r in records] == [str(settled[0].id)]
+
+    def test_incremental_sync_returns_only_new_changes_and_tombstones(self):
+        db = FakeSyncSession({Product: [make_product(ago(60))]})
+        manager = OfflineSyncManager(db)
+        _, _, cursor = drain(manager, entity_types=["products"])
+
+        db.now = NOW + timedelta(hours=1)
+        changed = make_product(NOW + timedelta(minutes=20), name="Burrito")
+        removed = make_tombstone("products", NOW + timedelta(minutes=30))
+        db.rows[Product].append(changed)
+        db.tombstones.append(removed)
+        page = manager.download_page(
+            RESTAURANT_ID, cursor=cursor, entity_types=["products"]
+        )
+
+        assert [(r["id"], r["action"]) for r in page.records] == [
+            (str(changed[0].id), "update"),
+            (str(removed.entity_id), "delete"),
+        ]
+        assert "data" not in page.records[1]
+
+    def test_requested_types_do_not_advance_other_positions(self):
+        db = FakeSyncSession(
+            {Product: [make_product(ago(5))], Order: [make_order(ago(5))]}
+        )
+        manager = OfflineSyncManager(db)
+        _, _, cursor = drain(manager, entity_types=["products"])
+
+        page = manager.download_page(
+            RESTAURANT_ID, cursor=cursor, entity_types=["orders"]
+        )
+
+        assert [r["entity_type"] for r in page.records] == ["orders"]
+
+    def test_deactivated_product_sent_as_delete(self):
+        inactive = make_product(ago(5), is_active=False)
+        manager = OfflineSyncManager(FakeSyncSession({Product: [inactive]}))
+
+        page = manager.download_page(RESTAURANT_ID, entity_types=["products"])
+
+        assert page.records[0]["action"] == "delete"
+
+    def test_cursor_from_other_restaurant_rejected(self):
+        cursor = SyncCursor.start(str(uuid.uuid4()), None, NOW).encode()
+        manager = OfflineSyncManager(FakeSyncSession())
+
+        with pytest.raises(FynloException) as exc:
+            manager.download_page(RESTAURANT_ID, cursor=cursor)
+        assert exc.value.status_code == 400
+
+    def test_cursor_older_than_tombstone_retention_requires_resync(self):
+        cursor = SyncCursor.start(RESTAURANT_ID, NOW - timedelta(days=90), NOW)
+        manager = OfflineSyncManager(FakeSyncSession())
+
+        with pytest.raises(FynloException) as exc:
+            manager.download_page(RESTAURANT_ID, cursor=cursor.encode())
+        assert exc.value.status_code == 410
+        assert exc.value.details == {"resync_required": True}
+
+    def test_payments_scoped_through_order(self):
+        db = FakeSyncSession()
+        manager = OfflineSyncManager(db)
+
+        manager.download_page(RESTAURANT_ID, entity_types=["payments"])
+
+        sql = str(db.statements[0].compile(dialect=postgresql.dialect()))
+        assert "JOIN orders ON orders.id = payments.order_id" in sql
+        assert "orders.restaurant_id" in sql
+        assert "coalesce(payments.updated_at, payments.created_at)" in sql
+
+    def test_refund_moves_payment_sync_position(self):
+        statement = update(Payment).values(status="refunded")
+
+        sql = str(statement.compile(dialect=postgresql.dialect()))
+
+        assert "updated_at=now()" in sql
+
+
+class TestPageEncoding:
+    def test_ndjson_ends_with_checkpoint(self):
+        products = [make_product(ago(i + 1)) for i in range(3)]
+        manager = OfflineSyncManager(FakeSyncSession({Product: products}))
+        page = manager.download_page(
+            RESTAURANT_ID, entity_types=["products"], page_size=2
+        )
+
+        lines = [json.loads(line) for line in page.ndjson_lines()]
+
+        assert [line["entity_type"] for line in lines[:-1]] == ["products"] * 2
+        assert lines[-1]["type"] == "checkpoint"
+        assert lines[-1]["has_more"] is True
+        assert lines[-1]["next_cursor"] == page.cursor.encode()
+
+    def test_legacy_json_groups_by_entity_type(self):
+        customer = Customer(
+            id=uuid.uuid4(),
+            restaurant_id=RESTAURANT_ID,
+            first_name="Ada",
+            last_name="Lovelace",
+            email=None,
+        )
+        manager = OfflineSyncManager(FakeSyncSession({Customer: [(customer, ago(3))]}))
+
+        changes = manager.download_changes(RESTAURANT_ID, entity_types=["customers"])
+
+        (entry,) = changes["changes"]["customers"]
+        assert entry["name"] == "Ada Lovelace"
+        assert "email" not in entry
+        assert entry["action"] == "update"
+        assert changes["has_more"] is False
+        assert changes["next_cursor"]
+
+
+class TestTombstonePurge:
+    @pytest.fixture
+    def session_factory(self):
+        # The tombstone table with SQLite column types; the purge only
+        # compares deleted_at
+        engine = create_engine("sqlite://")
+        metadata = MetaData()
+        self.table = Table(
+            "sync_tombstones",
+            metadata,
+            Column("id", String, primary_key=True),
+            Column("deleted_at", DateTime(timezone=True)),
+        )
+        metadata.create_all(engine)
+        yield sessionmaker(bind=engine)
+        engine.dispose()
+
+    def test_expired_tombstones_removed(self, session_factory):
+        now = datetime.now(timezone.utc)
+        db = session_factory()
+        db.execute(
+            insert(self.table),
+            [
+                {"id": str(days), "deleted_at": now - timedelta(days=days)}
+                for days in (45, 31, 29, 1)
+            ],
+        )
+        db.commit()
+
+        with patch.object(sync_manager, "SessionLocal", session_factory), patch.object(
+            sync_manager.settings, "SYNC_TOMBSTONE_RETENTION_DAYS", 30
+        ):
+            purged = sync_manager.purge_expired_tombstones()
+
+        kept = session_factory().scalars(select(self.table.c.id)).all()
+        assert purged == 2
+        assert sorted(kept) == ["1", "29"]
+
+    @pytest.mark.asyncio
+    async def test_purge_task_runs_daily(self):
+        sleep = Mock(side_effect=[None, asyncio.CancelledError])
+
+        async def fake_sleep(seconds):
+            sleep(seconds)
+
+        with patch.object(
+            sync_manager, "purge_expired_tombstones", return_value=3
+        ) as purge, patch.object(sync_manager.asyncio, "sleep", fake_sleep):
+            with pytest.raises(asyncio.CancelledError):
+                await sync_manager.tombstone_purge_task()
+
+        assert purge.call_count == 2
+        assert [c.args[0] for c in sleep.call_args_list] == [86400, 86400]
@@ -0,0 +1,251 @@
+"""
+Tests for set-based offline batch upload
+"""
+
+import uuid
+from datetime import datetime, timedelta
+from unittest.mock import MagicMock, Mock, patch
+
+from app.core import sync_manager
+from app.core.sync_manager import (
+    OfflineSyncManager,
+    server_snapshot,
+    snapshot_hash,
+)
+from app.models import Order, Product
+
+RESTAURANT_ID = str(uuid.uuid4())
+USER_ID = str(uuid.uuid4())
+
+
+def make_order(status="pending"):
+    return Order(
+        id=uuid.uuid4(),
+        restaurant_id=RESTAURANT_ID,
+        status=status,
+        total_amount=20.0,
+        updated_at=datetime(2025, 10, 16, 12, 0),
+    )
+
+
+def make_product(price=4.0):
+    return Product(
+        id=uuid.uuid4(),
+        restaurant_id=RESTAURANT_ID,
+        name="Taco",
+        price=price,
+        stock_quantity=10,
+        updated_at=datetime(2025, 10, 16, 12, 0),
+    )
+
+
+def make_db(*entities, write_errors=()):
+    db = Mock()
+    db.statements = []
+
+    def scalars(stmt):
+        db.statements.append(stmt)
+        model = stmt.column_descriptions[0]["entity"]
+        return Mock(
+            all=Mock(return_value=[e for e in entities if isinstance(e, model)])
+        )
+
+    db.scalars.side_effect = scalars
+    db.begin_nested.return_value = MagicMock()
+    db.execute.side_effect = list(write_errors) or None
+    return db
+
+
+def action(entity_type, entity, action="update", **data):
+    return {
+        "entity_type": entity_type,
+        "entity_id": str(entity.id),
+        "action": action,
+        "data": {"id": str(entity.id), **data},
+        "client_timestamp": "2025-10-16T12:30:00Z",
+    }
+
+
+class TestBatchUpload:
+    def test_entities_prefetched_once_per_type(self):
+        orders = [make_order() for _ in range(50)]
+        products = [make_product() for _ in range(50)]
+        db = make_db(*orders, *products)
+        manager = OfflineSyncManager(db)
+
+        result = manager.batch_upload(
+            [action("orders", o, status="completed") for o in orders]
+            + [action("products", p, stock_quantity=3) for p in products],
+            RESTAURANT_ID,
+            USER_ID,
+        )
+
+        assert result["successful"] == 100
+        assert db.scalars.call_count == 2
+        db.query.assert_not_called()
+        assert all(o.status == "completed" for o in orders)
+        assert all(p.stock_quantity == 3 for p in products)
+        # One executemany UPDATE per table, no per-row flush
+        assert [len(c.args[1]) for c in db.execute.call_args_list] == [50, 50]
+        db.flush.assert_not_called()
+        db.commit.assert_called_once()
+
+    def test_bulk_rows_keyed_by_primary_key(self):
+        order = make_order()
+        db = make_db(order)
+        manager = OfflineSyncManager(db)
+
+        manager.batch_upload(
+            [action("orders", order, status="preparing")], RESTAURANT_ID, USER_ID
+        )
+
+        statement, rows = db.execute.call_args.args
+        assert statement.table.name == "orders"
+        assert rows == [
+            {"id": order.id, "status": "preparing", "updated_at": order.updated_at}
+        ]
+
+    def test_bulk_order_writes_update_projections(self):
+        order = make_order(status="ready")
+        db = make_db(order)
+        manager = OfflineSyncManager(db)
+
+        with patch.object(sync_manager, "order_changed_in_bulk") as changed:
+            manager.batch_upload(
+                [action("orders", order, status="completed")], RESTAURANT_ID, USER_ID
+            )
+
+        changed.assert_called_once()
+        connection, entity, previous = changed.call_args.args
+        assert entity is order
+        assert previous["status"] == "ready"
+
+    def test_prefetch_scoped_to_restaurant_and_skips_bad_ids(self):
+        order = make_order()
+        db = make_db(order)
+        manager = OfflineSyncManager(db)
+        bad = action("orders", order, status="completed")
+        bad["entity_id"] = "not-a-uuid"
+
+        manager.batch_upload(
+            [action("orders", order, status="completed"), bad],
+            RESTAURANT_ID,
+            USER_ID,
+        )
+
+        sql = str(db.statements[0])
+        assert "orders.id IN" in sql
+        assert "orders.restaurant_id" in sql
+        db.query.assert_not_called()
+
+    def test_stale_base_hash_is_a_conflict(self):
+        product = make_product(price=4.0)
+        seen = snapshot_hash(server_snapshot("products", product))
+        product.price = 5.0  # changed on the server after the device synced
+        manager = OfflineSyncManager(make_db(product))
+
+        result = manager.batch_upload(
+            [action("products", product, price=4.5, base_hash=seen)],
+            RESTAURANT_ID,
+            USER_ID,
+        )
+
+        assert result["conflicts"] == 1
+        conflict = result["conflicts_detected"][0]
+        assert conflict["conflict_type"] == "version_conflict"
+        assert conflict["conflict_fields"] == ["price"]
+        assert product.price == 5.0
+
+    def test_current_base_hash_applies_and_returns_new_hash(self):
+        product = make_product(price=4.0)
+        seen = snapshot_hash(server_snapshot("products", product))
+        manager = OfflineSyncManager(make_db(product))
+
+        result = manager.batch_upload(
+            [action("products", product, price=4.5, base_hash=seen)],
+            RESTAURANT_ID,
+            USER_ID,
+        )
+
+        (processed,) = result["processed_actions"]
+        assert processed["status"] == "completed"
+        assert processed["entity_hash"] != seen
+        assert processed["entity_hash"] == snapshot_hash(
+            server_snapshot("products", product)
+        )
+
+    def test_later_actions_see_earlier_ones_in_the_batch(self):
+        order = make_order()
+        manager = OfflineSyncManager(make_db(order))
+
+        result = manager.batch_upload(
+            [
+                action("orders", order, status="preparing"),
+                action("orders", order, action="create"),
+            ],
+            RESTAURANT_ID,
+            USER_ID,
+        )
+
+        assert order.status == "preparing"
+        assert [p["status"] for p in result["processed_actions"]] == [
+            "completed",
+            "conflict",
+        ]
+
+    def test_failed_chunk_retried_per_action(self):
+        orders = [make_order() for _ in range(3)]
+        # The chunk flush fails, then the retry of the second action fails
+        db = make_db(
+            *orders,
+            write_errors=[Exception("deadlock"), None, Exception("bad row"), None],
+        )
+        manager = OfflineSyncManager(db)
+
+        result = manager.batch_upload(
+            [action("orders", o, status="completed") for o in orders],
+            RESTAURANT_ID,
+            USER_ID,
+        )
+
+        assert result["successful"] == 2
+        assert result["failed"] == 1
+        assert result["errors"] == [
+            {
+                "sync_record_id": result["processed_actions"][1]["sync_record_id"],
+                "error": "bad row",
+            }
+        ]
+        assert db.begin_nested.call_count == 4
+        # The failed action's row is back to its loaded state
+        assert [o.status for o in orders] == ["completed", "pending", "completed"]
+
+    def test_actions_flushed_in_chunks(self):
+        orders = [make_order() for _ in range(5)]
+        db = make_db(*orders)
+        manager = OfflineSyncManager(db)
+
+        with patch.object(sync_manager, "settings") as settings:
+            settings.SYNC_UPLOAD_CHUNK_SIZE = 2
+            manager.batch_upload(
+                [action("orders", o, status="completed") for o in orders],
+                RESTAURANT_ID,
+                USER_ID,
+            )
+
+        assert db.begin_nested.call_count == 3
+        assert [len(c.args[1]) for c in db.execute.call_args_list] == [2, 2, 1]
+
+    def test_timestamp_conflict_still_detected(self):
+        order = make_order(status="ready")
+        stale = (order.updated_at - timedelta(hours=1)).isoformat()
+        manager = OfflineSyncManager(make_db(order))
+
+        result = manager.batch_upload(
+            [action("orders", order, status="cancelled", updated_at=stale)],
+            RESTAURANT_ID,
+            USER_ID,
+        )
+
+        assert result["conflicts"] == 1
+        assert order.status == "ready"
@@ -0,0 +1,299 @@
+"""
+Tests for cross-worker WebSocket fan-out through the broker backends
+"""
+
+import json
+
+import pytest
+from unittest.mock import AsyncMock, Mock, patch
+
+from app.core.websocket import (
+    ConnectionType,
+    EventType,
+    WebSocketManager,
+    WebSocketMessage,
+)
+import app.core.websocket_broker as websocket_broker
+from app.core.websocket_broker import (
+    InMemoryBroker,
+    InMemoryBrokerHub,
+    RedisPubSubBroker,
+    create_broker,
+)
+
+
+def make_socket():
+    ws = AsyncMock()
+    ws.accept = AsyncMock()
+    ws.send_text = AsyncMock()
+    return ws
+
+
+def sent_messages(ws):
+    """Decode everything sent to a socket, skipping the connection greeting"""
+    messages = [json.loads(c.args[0]) for c in ws.send_text.call_args_list]
+    return [m for m in messages if m["data"].get("type") != "connection_established"]
+
+
+async def flush(*managers):
+    for manager in managers:
+        await manager.flush()
+
+
+def order_message(restaurant_id="restaurant-1"):
+    return WebSocketMessage(
+        event_type=EventType.ORDER_CREATED,
+        data={"order_id": "order-1"},
+        restaurant_id=restaurant_id,
+    )
+
+
+class TestBrokerFanOut:
+    """Two managers sharing a hub behave like two uvicorn workers"""
+
+    @pytest.fixture
+    async def workers(self):
+        hub = InMemoryBrokerHub()
+        worker_a, worker_b = WebSocketManager(), WebSocketManager()
+        await worker_a.attach_broker(InMemoryBroker(hub))
+        await worker_b.attach_broker(InMemoryBroker(hub))
+        return worker_a, worker_b
+
+    @pytest.mark.asyncio
+    async def test_broadcast_reaches_other_workers(self, workers):
+        worker_a, worker_b = workers
+        pos, kitchen = make_socket(), make_socket()
+        await worker_a.connect(pos, "restaurant-1", connection_type=ConnectionType.POS)
+        await worker_b.connect(
+            kitchen, "restaurant-1", connection_type=ConnectionType.KITCHEN
+        )
+
+        await worker_a.broadcast_to_restaurant("restaurant-1", order_message())
+        await flush(worker_a, worker_b)
+
+        assert len(sent_messages(pos)) == 1
+        assert len(sent_messages(kitchen)) == 1
+        assert sent_messages(kitchen)[0]["data"] == {"order_id": "order-1"}
+
+    @pytest.mark.asyncio
+    async def test_sequence_numbers_per_restaurant_channel(self, workers):
+        worker_a, worker_b = workers
+        ws_1, ws_2 = make_socket(), make_socket()
+        await worker_b.connect(ws_1, "restaurant-1")
+        await worker_b.connect(ws_2, "restaurant-2")
+
+        await worker_a.broadcast_to_restaurant("restaurant-1", order_message())
+        await worker_a.broadcast_to_restaurant(
+            "restaurant-2", order_message("restaurant-2")
+        )
+        await worker_b.broadcast_to_restaurant("restaurant-1", order_message())
+        await flush(worker_b)
+
+        assert [m["sequence"] for m in sent_messages(ws_1)] == [1, 2]
+        assert [m["sequence"] for m in sent_messages(ws_2)] == [1]
+
+    @pytest.mark.asyncio
+    async def test_filtered_broadcasts_leave_no_gaps(self, workers):
+        worker_a, worker_b = workers
+        pos, kitchen, manager, own = (make_socket() for _ in range(4))
+        await worker_b.connect(pos, "restaurant-1", connection_type=ConnectionType.POS)
+        await worker_b.connect(
+            kitchen, "restaurant-1", connection_type=ConnectionType.KITCHEN
+        )
+        await worker_a.connect(
+            manager, "restaurant-1", connection_type=ConnectionType.MANAGEMENT
+        )
+        await worker_b.connect(
+            own,
+            "restaurant-1",
+            user_id="user-1",
+            connection_type=ConnectionType.MANAGEMENT,
+        )
+
+        audiences = [
+            [ConnectionType.KITCHEN, ConnectionType.POS],
+            [ConnectionType.MANAGEMENT],
+            [ConnectionType.POS, ConnectionType.MANAGEMENT],
+            [ConnectionType.KITCHEN, ConnectionType.MANAGEMENT],
+            None,
+        ]
+        for connection_types in audiences:
+            await worker_a.broadcast_to_restaurant(
+                "restaurant-1", order_message(), connection_types=connection_types
+            )
+        await worker_b.broadcast_to_restaurant(
+            "restaurant-1",
+            order_message(),
+            connection_types=[ConnectionType.MANAGEMENT],
+            exclude_user_id="user-1",
+        )
+        await flush(worker_a, worker_b)
+
+        assert [m["sequence"] for m in sent_messages(pos)] == [1, 2, 3]
+        assert [m["sequence"] for m in sent_messages(kitchen)] == [1, 2, 3]
+        assert [m["sequence"] for m in sent_messages(manager)] == [1, 2, 3, 4, 5]
+        assert [m["sequence"] for m in sent_messages(own)] == [1, 2, 3, 4]
+
+    @pytest.mark.asyncio
+    async def test_missed_broadcast_shows_as_gap(self, workers):
+        worker_a, worker_b = workers
+        ws = make_socket()
+        await worker_b.connect(ws, "restaurant-1")
+        hub = worker_b.broker.hub
+
+        await worker_a.broadcast_to_restaurant("restaurant-1", order_message())
+        hub.brokers.remove(worker_b.broker)
+        await worker_a.broadcast_to_restaurant("restaurant-1", order_message())
+        hub.brokers.append(worker_b.broker)
+        await worker_a.broadcast_to_restaurant("restaurant-1", order_message())
+        await flush(worker_b)
+
+        assert [m["sequence"] for m in sent_messages(ws)] == [1, 3]
+
+    @pytest.mark.asyncio
+    async def test_sequence_restarts_without_gap_for_new_sockets(self, workers):
+        worker_a, worker_b = workers
+        first = make_socket()
+        connection_id = await worker_b.connect(first, "restaurant-1")
+        await worker_a.broadcast_to_restaurant("restaurant-1", order_message())
+        await worker_b.disconnect(connection_id)
+        await worker_a.broadcast_to_restaurant("restaurant-1", order_message())
+
+        second = make_socket()
+        await worker_b.connect(second, "restaurant-1")
+        await worker_a.broadcast_to_restaurant("restaurant-1", order_message())
+        await flush(worker_b)
+
+        assert [m["sequence"] for m in sent_messages(second)] == [1]
+
+    @pytest.mark.asyncio
+    async def test_filters_applied_on_receiving_worker(self, workers):
+        worker_a, worker_b = workers
+        kitchen, manager, own = make_socket(), make_socket(), make_socket()
+        await worker_b.connect(
+            kitchen, "restaurant-1", connection_type=ConnectionType.KITCHEN
+        )
+        await worker_b.connect(
+            manager, "restaurant-1", connection_type=ConnectionType.MANAGEMENT
+        )
+        await worker_b.connect(
+            own,
+            "restaurant-1",
+            user_id="user-1",
+            connection_type=ConnectionType.MANAGEMENT,
+        )
+
+        await worker_a.broadcast_to_restaurant(
+            "restaurant-1",
+            order_message(),
+            connection_types=[ConnectionType.MANAGEMENT],
+            exclude_user_id="user-1",
+        )
+        await flush(worker_b)
+
+        assert sent_messages(kitchen) == []
+        assert len(sent_messages(manager)) == 1
+        assert sent_messages(own) == []
+
+    @pytest.mark.asyncio
+    async def test_message_identity_preserved(self, workers):
+        worker_a, worker_b = workers
+        ws = make_socket()
+        await worker_b.connect(ws, "restaurant-1")
+        message = order_message()
+
+        await worker_a.broadcast_to_restaurant("restaurant-1", message)
+        await flush(worker_b)
+
+        delivered = sent_messages(ws)[0]
+        assert delivered["id"] == message.id
+        assert delivered["timestamp"] == message.timestamp
+        assert delivered["event_type"] == "order_created"
+
+    @pytest.mark.asyncio
+    async def test_publish_failure_falls_back_to_local_delivery(self):
+        manager = WebSocketManager()
+        broker = InMemoryBroker()
+        await manager.attach_broker(broker)
+        ws = make_socket()
+        await manager.connect(ws, "restaurant-1")
+
+        with patch.object(broker, "publish", side_effect=ConnectionError("down")):
+            await manager.broadcast_to_restaurant("restaurant-1", order_message())
+        await flush(manager)
+
+        delivered = sent_messages(ws)
+        assert len(delivered) == 1
+        assert "sequence" not in delivered[0]
+
+    @pytest.mark.asyncio
+    async def test_without_broker_delivery_is_local(self):
+        manager = WebSocketManager()
+        ws = make_socket()
+        await manager.connect(ws, "restaurant-1")
+
+        await manager.send_to_restaurant("restaurant-1", order_message())
+        await flush(manager)
+
+        assert len(sent_messages(ws)) == 1
+        assert manager.get_connection_stats()["broker"] is None
+
+
+class TestRedisPubSubBroker:
+    """Payload handling for the Redis transport"""
+
+    @pytest.mark.asyncio
+    async def test_payload_decoded_and_dispatched(self):
+        broker = RedisPubSubBroker(Mock())
+        handler = AsyncMock()
+        broker.handler = handler
+        envelope = {"message": {"event_type": "order_created"}}
+
+        await broker._handle_raw(
+            "fynlo:ws:restaurant:restaurant-1", f"7|{json.dumps(envelope)}"
+        )
+
+        handler.assert_awaited_once_with("restaurant-1", 7, envelope)
+
+    @pytest.mark.asyncio
+    async def test_restaurants_without_local_sockets_skipped(self):
+        broker = RedisPubSubBroker(Mock(), has_local_connections=lambda rid: False)
+        handler = AsyncMock()
+        broker.handler = handler
+
+        await broker._handle_raw("fynlo:ws:restaurant:restaurant-1", "1|{}")
+
+        handler.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_publish_uses_sequence_script(self):
+        script = AsyncMock(return_value=12)
+        broker = RedisPubSubBroker(Mock())
+        broker._script = script
+
+        sequence = await broker.publish("restaurant-1", {"message": {}})
+
+        assert sequence == 12
+        assert script.call_args.kwargs["keys"] == [
+            "fynlo:ws:seq:restaurant-1",
+            "fynlo:ws:restaurant:restaurant-1",
+        ]
+
+
+class TestCreateBroker:
+    def test_redis_unavailable_uses_in_memory(self):
+        redis_client = Mock(redis=None)
+        with patch.object(websocket_broker, "settings") as settings:
+            settings.WEBSOCKET_BROKER = "redis"
+            assert isinstance(create_broker(redis_client), InMemoryBroker)
+
+    def test_redis_connected_uses_pubsub(self):
+        redis_client = Mock(redis=Mock())
+        with patch.object(websocket_broker, "settings") as settings:
+            settings.WEBSOCKET_BROKER = "redis"
+            assert isinstance(create_broker(redis_client), RedisPubSubBroker)
+
+    def test_disabled(self):
+        with patch.object(websocket_broker, "settings") as settings:
+            settings.WEBSOCKET_BROKER = "none"
+            assert create_broker(Mock()) is None
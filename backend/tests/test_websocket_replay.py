@@ -0,0 +1,270 @@
+"""
+Tests for the offline replay log and resume-from-offset on reconnect
+"""
+
+import json
+import time
+
+import pytest
+from unittest.mock import AsyncMock, MagicMock, Mock, patch
+
+from app.core.websocket import EventType, WebSocketManager, WebSocketMessage
+from app.core.websocket_replay import (
+    InMemoryReplayLog,
+    RedisStreamReplayLog,
+    create_replay_log,
+    with_offset,
+)
+
+
+def make_socket():
+    ws = AsyncMock()
+    ws.accept = AsyncMock()
+    ws.send_text = AsyncMock()
+    return ws
+
+
+def received(ws):
+    messages = [json.loads(c.args[0]) for c in ws.send_text.call_args_list]
+    return [m for m in messages if m["data"].get("type") != "connection_established"]
+
+
+def user_message(order_id, restaurant_id="restaurant-1"):
+    return WebSocketMessage(
+        event_type=EventType.ORDER_STATUS_CHANGED,
+        data={"order_id": order_id},
+        restaurant_id=restaurant_id,
+        user_id="user-1",
+    )
+
+
+class TestInMemoryReplayLog:
+    """Bounds and offsets of the process-local fallback"""
+
+    @pytest.mark.asyncio
+    async def test_offsets_increase_and_read_since_is_exclusive(self):
+        log = InMemoryReplayLog(ttl_seconds=60, max_entries=10, max_bytes=10_000)
+        offsets = [await log.append("r1", "u1", f'{{"n":{i}}}') for i in range(3)]
+
+        assert offsets == sorted(offsets, key=lambda o: tuple(map(int, o.split("-"))))
+        assert len(set(offsets)) == 3
+        entries = await log.read_since("r1", "u1", offsets[0])
+        assert [offset for offset, _ in entries] == offsets[1:]
+
+    @pytest.mark.asyncio
+    async def test_per_user_entry_cap(self):
+        log = InMemoryReplayLog(ttl_seconds=60, max_entries=2, max_bytes=10_000)
+        for i in range(5):
+            await log.append("r1", "u1", f'{{"n":{i}}}')
+
+        entries = await log.read_since("r1", "u1")
+        assert [frame for _, frame in entries] == ['{"n":3}', '{"n":4}']
+        assert log.get_stats()["entries"] == 2
+
+    @pytest.mark.asyncio
+    async def test_expired_entries_dropped(self):
+        log = InMemoryReplayLog(ttl_seconds=60, max_entries=10, max_bytes=10_000)
+        await log.append("r1", "u1", '{"n":1}')
+
+        later = time.time() + 120
+        with patch("app.core.websocket_replay.time.time", return_value=later):
+            assert await log.read_since("r1", "u1") == []
+        assert log.get_stats()["bytes"] == 0
+
+    @pytest.mark.asyncio
+    async def test_byte_budget_evicts_least_recent_user(self):
+        log = InMemoryReplayLog(ttl_seconds=60, max_entries=10, max_bytes=30)
+        await log.append("r1", "idle", '{"payload":"xxxxxxxx"}')
+        await log.append("r1", "busy", '{"payload":"yyyyyyyy"}')
+
+        assert await log.read_since("r1", "idle") == []
+        assert len(await log.read_since("r1", "busy")) == 1
+        assert log.get_stats()["bytes"] <= 30
+
+    def test_with_offset_prefixes_field(self):
+        frame = with_offset('{"id":"m1"}', "17-0")
+
+        assert json.loads(frame) == {"offset": "17-0", "id": "m1"}
+
+
+class TestRedisStreamReplayLog:
+    @pytest.mark.asyncio
+    async def test_append_caps_stream_and_sets_ttl(self):
+        pipe = MagicMock()
+        pipe.execute = AsyncMock(return_value=["1700000000000-0", True, 1, True])
+        redis = Mock()
+        redis.pipeline.return_value.__aenter__ = AsyncMock(return_value=pipe)
+        redis.pipeline.return_value.__aexit__ = AsyncMock(return_value=False)
+        log = RedisStreamReplayLog(redis, ttl_seconds=600, max_entries=50)
+
+        offset = await log.append("r1", "u1", '{"n":1}')
+
+        assert offset == "1700000000000-0"
+        pipe.xadd.assert_called_once_with(
+            "fynlo:ws:replay:r1:u1", {"f": '{"n":1}'}, maxlen=50, approximate=False
+        )
+        assert pipe.expire.call_args_list[0].args == ("fynlo:ws:replay:r1:u1", 600)
+        (streams,) = pipe.zadd.call_args.args[1]
+        assert pipe.zadd.call_args.args[0] == "fynlo:ws:replay-streams"
+        assert streams == "fynlo:ws:replay:r1:u1"
+
+    @pytest.mark.asyncio
+    async def test_read_since_is_exclusive_of_resume_offset(self):
+        redis = Mock()
+        redis.xrange = AsyncMock(return_value=[("9999999999999-1", {"f": "{}"})])
+        log = RedisStreamReplayLog(redis, ttl_seconds=600, max_entries=50)
+
+        entries = await log.read_since("r1", "u1", "9999999999999-0")
+
+        assert entries == [("9999999999999-1", "{}")]
+        assert redis.xrange.call_args.kwargs["min"] == "(9999999999999-0"
+
+    @pytest.mark.asyncio
+    async def test_stale_resume_offset_bounded_by_ttl(self):
+        redis = Mock()
+        redis.xrange = AsyncMock(return_value=[])
+        log = RedisStreamReplayLog(redis, ttl_seconds=600, max_entries=50)
+
+        await log.read_since("r1", "u1", "1-0")
+
+        assert not redis.xrange.call_args.kwargs["min"].startswith("(")
+
+    @pytest.mark.asyncio
+    async def test_refresh_stats_reads_registered_streams(self):
+        pipe = MagicMock()
+        pipe.execute = AsyncMock(
+            side_effect=[
+                [
+                    1,
+                    [
+                        b"fynlo:ws:replay:r1:u1",
+                        b"fynlo:ws:replay:r1:u2",
+                        b"fynlo:ws:replay:r1:u3",
+                    ],
+                ],
+                # u3's stream expired before its registration
+                [3, 512, 2, 256, 0, None],
+            ]
+        )
+        redis = Mock()
+        redis.pipeline.return_value.__aenter__ = AsyncMock(return_value=pipe)
+        redis.pipeline.return_value.__aexit__ = AsyncMock(return_value=False)
+        log = RedisStreamReplayLog(redis, ttl_seconds=600, max_entries=50)
+
+        await log.refresh_stats()
+
+        assert not redis.scan_iter.called
+        assert pipe.zremrangebyscore.call_args.args[:2] == (
+            "fynlo:ws:replay-streams",
+            "-inf",
+        )
+        assert len(pipe.xlen.call_args_list) == 3
+        stats = log.get_stats()
+        assert (stats["users"], stats["entries"], stats["bytes"]) == (2, 5, 768)
+
+        manager = WebSocketManager()
+        manager.replay_log = log
+        assert manager.get_connection_stats()["queued_messages"] == 5
+
+    def test_factory_falls_back_to_memory(self):
+        assert isinstance(create_replay_log(Mock(redis=None)), InMemoryReplayLog)
+        assert isinstance(
+            create_replay_log(Mock(redis=Mock())), RedisStreamReplayLog
+        )
+
+
+class TestReconnectReplay:
+    """WebSocketManager replay on connect"""
+
+    @pytest.mark.asyncio
+    async def test_offline_messages_replayed_in_order_with_offsets(self):
+        manager = WebSocketManager()
+        for i in range(3):
+            await manager.send_to_user("user-1", user_message(f"order-{i}"))
+
+        ws = make_socket()
+        await manager.connect(ws, "restaurant-1", user_id="user-1")
+        await manager.flush()
+
+        messages = received(ws)
+        assert [m["data"]["order_id"] for m in messages] == [
+            "order-0",
+            "order-1",
+            "order-2",
+        ]
+        assert all("offset" in m for m in messages)
+
+    @pytest.mark.asyncio
+    async def test_resume_from_skips_acknowledged_messages(self):
+        manager = WebSocketManager()
+        for i in range(3):
+            await manager.send_to_user("user-1", user_message(f"order-{i}"))
+        first = make_socket()
+        connection_id = await manager.connect(first, "restaurant-1", user_id="user-1")
+        await manager.flush()
+        seen = received(first)[0]["offset"]
+        await manager.disconnect(connection_id)
+
+        # Client only processed the first frame before the Wi-Fi dropped
+        second = make_socket()
+        await manager.connect(
+            second, "restaurant-1", user_id="user-1", resume_from=seen
+        )
+        await manager.flush()
+
+        assert [m["data"]["order_id"] for m in received(second)] == [
+            "order-1",
+            "order-2",
+        ]
+
+    @pytest.mark.asyncio
+    async def test_reconnect_without_offset_does_not_redeliver(self):
+        manager = WebSocketManager()
+        await manager.send_to_user("user-1", user_message("order-0"))
+        first = make_socket()
+        connection_id = await manager.connect(first, "restaurant-1", user_id="user-1")
+        await manager.disconnect(connection_id)
+        await manager.send_to_user("user-1", user_message("order-1"))
+
+        second = make_socket()
+        await manager.connect(second, "restaurant-1", user_id="user-1")
+        await manager.flush()
+
+        assert [m["data"]["order_id"] for m in received(second)] == ["order-1"]
+
+    @pytest.mark.asyncio
+    async def test_malformed_resume_offset_ignored(self):
+        manager = WebSocketManager()
+        await manager.send_to_user("user-1", user_message("order-0"))
+
+        ws = make_socket()
+        await manager.connect(
+            ws, "restaurant-1", user_id="user-1", resume_from="not-an-offset"
+        )
+        await manager.flush()
+
+        assert len(received(ws)) == 1
+
+    @pytest.mark.asyncio
+    async def test_other_restaurant_messages_not_replayed(self):
+        manager = WebSocketManager()
+        await manager.send_to_user(
+            "user-1", user_message("order-0", restaurant_id="restaurant-2")
+        )
+
+        ws = make_socket()
+        await manager.connect(ws, "restaurant-1", user_id="user-1")
+        await manager.flush()
+
+        assert received(ws) == []
+
+    @pytest.mark.asyncio
+    async def test_replay_memory_reported_in_stats(self):
+        manager = WebSocketManager()
+        await manager.send_to_user("user-1", user_message("order-0"))
+
+        stats = manager.get_connection_stats()
+
+        assert stats["queued_messages"] == 1
+        assert stats["replay"]["backend"] == "InMemoryReplayLog"
+        assert stats["replay"]["bytes"] > 0
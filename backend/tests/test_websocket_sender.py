@@ -0,0 +1,176 @@
+"""
+Tests for queued, serialize-once WebSocket delivery and slow-consumer handling
+"""
+
+import asyncio
+import json
+
+import pytest
+from unittest.mock import AsyncMock, patch
+
+from app.core import websocket
+from app.core.websocket import (
+    ConnectionType,
+    EventType,
+    WebSocketManager,
+    WebSocketMessage,
+)
+from app.core.websocket_sender import SLOW_CONSUMER_CLOSE_CODE, encode_message
+
+
+def make_socket(send_delay=0.0):
+    ws = AsyncMock()
+    ws.accept = AsyncMock()
+    ws.close = AsyncMock()
+
+    async def send_text(text):
+        if send_delay:
+            await asyncio.sleep(send_delay)
+
+    ws.send_text = AsyncMock(side_effect=send_text)
+    return ws
+
+
+def order_message(restaurant_id="restaurant-1"):
+    return WebSocketMessage(
+        event_type=EventType.ORDER_CREATED,
+        data={"order_id": "order-1"},
+        restaurant_id=restaurant_id,
+    )
+
+
+def broadcast_frames(ws):
+    return [
+        c.args[0]
+        for c in ws.send_text.call_args_list
+        if json.loads(c.args[0])["event_type"] == "order_created"
+    ]
+
+
+class TestBroadcastDelivery:
+    """Fan-out through per-connection send queues"""
+
+    @pytest.mark.asyncio
+    async def test_message_encoded_once_for_all_connections(self):
+        manager = WebSocketManager()
+        sockets = [make_socket() for _ in range(5)]
+        for ws in sockets:
+            await manager.connect(ws, "restaurant-1")
+
+        with patch.object(
+            websocket, "encode_message", side_effect=encode_message
+        ) as encode:
+            await manager.broadcast_to_restaurant("restaurant-1", order_message())
+        await manager.flush()
+
+        encode.assert_called_once()
+        frames = {broadcast_frames(ws)[0] for ws in sockets}
+        assert len(frames) == 1
+
+    @pytest.mark.asyncio
+    async def test_slow_socket_does_not_delay_others(self):
+        manager = WebSocketManager()
+        manager.send_timeout = 5.0
+        fast = make_socket()
+        slow = make_socket()
+        await manager.connect(fast, "restaurant-1")
+        await manager.connect(slow, "restaurant-1")
+        await manager.flush()
+        slow.send_text.side_effect = lambda text: asyncio.sleep(1.0)
+
+        await asyncio.wait_for(
+            manager.broadcast_to_restaurant("restaurant-1", order_message()),
+            timeout=0.05,
+        )
+        await asyncio.sleep(0.01)
+
+        assert len(broadcast_frames(fast)) == 1
+
+    @pytest.mark.asyncio
+    async def test_filters_still_applied(self):
+        manager = WebSocketManager()
+        kitchen, pos = make_socket(), make_socket()
+        await manager.connect(
+            kitchen, "restaurant-1", connection_type=ConnectionType.KITCHEN
+        )
+        await manager.connect(pos, "restaurant-1", connection_type=ConnectionType.POS)
+
+        await manager.broadcast_to_restaurant(
+            "restaurant-1", order_message(), connection_types=[ConnectionType.KITCHEN]
+        )
+        await manager.flush()
+
+        assert len(broadcast_frames(kitchen)) == 1
+        assert broadcast_frames(pos) == []
+
+    @pytest.mark.asyncio
+    async def test_frames_delivered_in_order(self):
+        manager = WebSocketManager()
+        ws = make_socket()
+        await manager.connect(ws, "restaurant-1")
+
+        for i in range(10):
+            message = order_message()
+            message.data = {"order_id": f"order-{i}"}
+            await manager.broadcast_to_restaurant("restaurant-1", message)
+        await manager.flush()
+
+        order_ids = [json.loads(f)["data"]["order_id"] for f in broadcast_frames(ws)]
+        assert order_ids == [f"order-{i}" for i in range(10)]
+
+
+class TestSlowConsumers:
+    """Consumers that fall behind are dropped instead of blocking"""
+
+    @pytest.mark.asyncio
+    async def test_full_queue_disconnects_consumer(self):
+        manager = WebSocketManager()
+        manager.send_queue_size = 2
+        ws = make_socket(send_delay=0.5)
+        connection_id = await manager.connect(ws, "restaurant-1")
+
+        for _ in range(5):
+            await manager.broadcast_to_restaurant("restaurant-1", order_message())
+        await asyncio.sleep(0.01)
+
+        assert connection_id not in manager.active_connections
+        assert manager.stats["slow_consumers_dropped"] == 1
+        ws.close.assert_awaited_once_with(code=SLOW_CONSUMER_CLOSE_CODE)
+
+    @pytest.mark.asyncio
+    async def test_send_timeout_disconnects_consumer(self):
+        manager = WebSocketManager()
+        manager.send_timeout = 0.05
+        ws = make_socket(send_delay=1.0)
+        connection_id = await manager.connect(ws, "restaurant-1")
+
+        await manager.flush()
+        await asyncio.sleep(0.01)
+
+        assert connection_id not in manager.active_connections
+        assert manager.stats["messages_failed"] >= 1
+
+    @pytest.mark.asyncio
+    async def test_send_error_disconnects_consumer(self):
+        manager = WebSocketManager()
+        ws = make_socket()
+        connection_id = await manager.connect(ws, "restaurant-1")
+        await manager.flush()
+        ws.send_text.side_effect = RuntimeError("socket closed")
+
+        await manager.broadcast_to_restaurant("restaurant-1", order_message())
+        await manager.flush()
+        await asyncio.sleep(0.01)
+
+        assert connection_id not in manager.active_connections
+
+    @pytest.mark.asyncio
+    async def test_disconnected_connection_rejects_frames(self):
+        manager = WebSocketManager()
+        ws = make_socket()
+        connection_id = await manager.connect(ws, "restaurant-1")
+        await manager.disconnect(connection_id)
+
+        sent = await manager.send_to_connection(connection_id, order_message())
+
+        assert sent is False
@@ -9,6 +9,7 @@ from . import test_basecase
 from . import test_cache
 from . import test_date_utils
 from . import test_deprecation
+from . import test_connection_pool
 from . import test_db_cursor
 from . import test_display_name
 from . import test_expression
@@ -56,6 +56,9 @@ class TestConfigManager(TransactionCase):
             'http_enable': True,
             'proxy_mode': False,
             'x_sendfile': False,
+            'session_store': 'filesystem',
+            'session_redis_url': 'redis://localhost:6379/0',
+            'session_redis_prefix': 'session:',
 
             # web
             'dbfilter': '',
@@ -96,6 +99,8 @@ class TestConfigManager(TransactionCase):
             'db_sslmode': 'prefer',
             'db_maxconn': 64,
             'db_maxconn_gevent': False,
+            'db_pool_mode': 'legacy',
+            'db_pool_timeout': 10.0,
             'db_template': 'template0',
             'db_replica_host': False,
             'db_replica_port': False,
@@ -177,6 +182,9 @@ class TestConfigManager(TransactionCase):
             'http_enable': False,
             'proxy_mode': True,
             'x_sendfile': True,
+            'session_store': 'filesystem',
+            'session_redis_url': 'redis://localhost:6379/0',
+            'session_redis_prefix': 'session:',
 
             # web
             'dbfilter': '.*',
@@ -217,6 +225,8 @@ class TestConfigManager(TransactionCase):
             'db_sslmode': 'verify-full',
             'db_maxconn': 42,
             'db_maxconn_gevent': 100,
+            'db_pool_mode': 'legacy',
+            'db_pool_timeout': 10.0,
             'db_template': 'backup1706',
             'db_replica_host': 'db2.localhost',
             'db_replica_port': 2038,
@@ -362,6 +372,8 @@ class TestConfigManager(TransactionCase):
 
             # new options since 14.0
             'db_maxconn_gevent': False,
+            'db_pool_mode': 'legacy',
+            'db_pool_timeout': 10.0,
             'db_replica_host': False,
             'db_replica_port': False,
             'geoip_country_db': '/usr/share/GeoIP/GeoLite2-Country.mmdb',
@@ -373,6 +385,9 @@ class TestConfigManager(TransactionCase):
             'websocket_rate_limit_burst': '10',
             'websocket_rate_limit_delay': '0.2',
             'x_sendfile': False,
+            'session_store': 'filesystem',
+            'session_redis_url': 'redis://localhost:6379/0',
+            'session_redis_prefix': 'session:',
             'limit_time_worker_cron': 0,
         }
         if IS_POSIX:
@@ -442,6 +457,9 @@ class TestConfigManager(TransactionCase):
             'http_enable': False,
             'proxy_mode': True,
             'x_sendfile': True,
+            'session_store': 'filesystem',
+            'session_redis_url': 'redis://localhost:6379/0',
+            'session_redis_prefix': 'session:',
 
             # web
             'dbfilter': '.*',
@@ -488,6 +506,8 @@ class TestConfigManager(TransactionCase):
             'db_sslmode': 'verify-full',
             'db_maxconn': 42,
             'db_maxconn_gevent': 100,
+            'db_pool_mode': 'legacy',
+            'db_pool_timeout': 10.0,
             'db_template': 'backup1706',
             'db_replica_host': 'db2.localhost',
             'db_replica_port': 2038,
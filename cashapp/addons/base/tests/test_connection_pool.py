@@ -0,0 +1,143 @@
+# -*- coding: utf-8 -*-
+# Part of CashApp. See LICENSE file for full copyright and licensing details.
+import os
+import threading
+import time
+from unittest.mock import patch
+
+from cashapp.sql_db import BucketedConnectionPool, PoolError
+from cashapp.tests.common import BaseCase
+
+
+class FakeConnection:
+    def __init__(self, connection_factory=None, **dsn):
+        self.dsn = dsn
+        self.closed = False
+        self.resets = 0
+
+    def reset(self):
+        self.resets += 1
+
+    def close(self):
+        self.closed = True
+
+    def get_backend_pid(self):
+        return id(self)
+
+
+DB1 = {'dbname': 'db1', 'user': 'cashapp', 'password': 'secret'}
+DB2 = {'dbname': 'db2', 'user': 'cashapp', 'password': 'secret'}
+
+
+class TestBucketedConnectionPool(BaseCase):
+
+    def setUp(self):
+        super().setUp()
+        patcher = patch('cashapp.sql_db.psycopg2.connect', side_effect=FakeConnection)
+        self.connect = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def pool(self, **kwargs):
+        pool = BucketedConnectionPool(**kwargs)
+        pool._reaper_pid = os.getpid()  # reaping is driven by the tests
+        return pool
+
+    def test_reuse_per_dsn(self):
+        pool = self.pool(maxconn=4)
+        cnx1 = pool.borrow(DB1)
+        cnx2 = pool.borrow(DB2)
+        pool.give_back(cnx1)
+        pool.give_back(cnx2)
+
+        self.assertIs(pool.borrow(dict(DB1, password='other')), cnx1)
+        self.assertIs(pool.borrow(DB2), cnx2)
+        self.assertEqual(self.connect.call_count, 2)
+        self.assertEqual(cnx1.resets, 1)
+
+    def test_wait_for_given_back_connection(self):
+        pool = self.pool(maxconn=1, timeout=5)
+        cnx = pool.borrow(DB1)
+        threading.Timer(0.05, pool.give_back, [cnx]).start()
+
+        self.assertIs(pool.borrow(DB1), cnx)
+        stats = pool.stats()
+        self.assertEqual(stats['waits'], 1)
+        self.assertGreater(stats['max_wait'], 0)
+
+    def test_wait_times_out(self):
+        pool = self.pool(maxconn=1, timeout=0.05)
+        pool.borrow(DB1)
+
+        with self.assertRaises(PoolError):
+            pool.borrow(DB1)
+        self.assertEqual(pool.stats()['timeouts'], 1)
+
+    def test_too_many_waiters_rejected(self):
+        pool = self.pool(maxconn=1, timeout=5, max_waiters=0)
+        pool.borrow(DB1)
+
+        with self.assertRaises(PoolError):
+            pool.borrow(DB1)
+        self.assertEqual(pool.stats()['rejected'], 1)
+
+    def test_full_pool_evicts_idle_connection_to_other_dsn(self):
+        pool = self.pool(maxconn=1)
+        cnx1 = pool.borrow(DB1)
+        pool.give_back(cnx1)
+
+        cnx2 = pool.borrow(DB2)
+
+        self.assertIsNot(cnx2, cnx1)
+        self.assertTrue(cnx1.closed)
+        self.assertEqual(pool.stats()['connections'], 1)
+
+    def test_leaked_connection_reclaimed(self):
+        pool = self.pool(maxconn=1, timeout=0.05)
+        cnx = pool.borrow(DB1)
+        cnx.leaked = True
+
+        self.assertIs(pool.borrow(DB1), cnx)
+
+    def test_reap_idle_and_dead_connections(self):
+        pool = self.pool(maxconn=4)
+        old, dead, fresh = pool.borrow(DB1), pool.borrow(DB1), pool.borrow(DB2)
+        for cnx in (old, dead, fresh):
+            pool.give_back(cnx)
+        dead.close()
+        pool._free[pool._dsn_key(DB1)][0][1] = time.monotonic() - 3600
+
+        self.assertEqual(pool.reap(), 2)
+        self.assertTrue(old.closed)
+        self.assertFalse(fresh.closed)
+        self.assertEqual(pool.stats()['connections'], 1)
+        self.assertEqual(pool.stats()['idle'], 1)
+
+    def test_close_all(self):
+        pool = self.pool(maxconn=4)
+        cnx1, cnx2 = pool.borrow(DB1), pool.borrow(DB2)
+        pool.give_back(cnx1)
+
+        pool.close_all(DB1)
+        self.assertTrue(cnx1.closed)
+        self.assertFalse(cnx2.closed)
+
+        pool.close_all()
+        self.assertTrue(cnx2.closed)
+        self.assertEqual(pool.stats()['connections'], 0)
+        with self.assertRaises(PoolError):
+            pool.give_back(cnx2)
+
+    def test_stats(self):
+        pool = self.pool(maxconn=4)
+        cnx = pool.borrow(DB1)
+        pool.borrow(DB1)
+        pool.give_back(cnx)
+
+        stats = pool.stats(reset=True)
+        self.assertEqual(stats['borrows'], 2)
+        self.assertEqual(stats['created'], 2)
+        self.assertEqual(stats['used'], 1)
+        self.assertEqual(stats['idle'], 1)
+        self.assertEqual(stats['utilization'], 0.25)
+        self.assertEqual(stats['peak_utilization'], 0.5)
+        self.assertEqual(pool.stats()['borrows'], 0)
@@ -6,14 +6,17 @@ import json
 import pytz
 from freezegun import freeze_time
 from urllib.parse import urlencode
+from types import SimpleNamespace
 from unittest.mock import patch
 from tempfile import TemporaryDirectory
 
 import cashapp
 from cashapp.addons.base.tests.common import HttpCaseWithUserDemo
-from cashapp.http import SESSION_LIFETIME
+from cashapp.http import SESSION_LIFETIME, RedisSessionStore, Session
 from cashapp.tools import config, lazy_property, mute_logger
 from cashapp.tests import get_db_name, tagged
+from cashapp.tests.common import BaseCase, TransactionCase
+from cashapp.addons.test_http.utils import MemoryRedis
 from .test_common import TestHttpBase
 
 
@@ -315,3 +318,112 @@ class TestSessionStore(HttpCaseWithUserDemo):
             self.env['ir.http']._gc_sessions()
             session_from_store = cashapp.http.root.session_store.get(session)
             self.assertNotEqual(session, session_from_store.sid, "the old session as been removed")
+
+
+class TestRedisSessionStore(BaseCase):
+    def setUp(self):
+        super().setUp()
+        self.client = MemoryRedis()
+        self.store = RedisSessionStore(self.client, max_lifetime=60, session_class=Session)
+
+    def test_save_and_get(self):
+        session = self.store.new()
+        session['login'] = 'demo'
+        self.store.save(session)
+
+        session_from_store = self.store.get(session.sid)
+        self.assertEqual(session_from_store.sid, session.sid)
+        self.assertEqual(session_from_store['login'], 'demo')
+        self.assertFalse(session_from_store.is_new)
+
+    def test_unknown_or_invalid_sid_gives_new_session(self):
+        self.assertTrue(self.store.get(self.store.generate_key()).is_new)
+        self.assertTrue(self.store.get('../../etc/passwd').is_new)
+
+    def test_sessions_expire(self):
+        with freeze_time() as freeze:
+            session = self.store.new()
+            session['login'] = 'demo'
+            self.store.save(session)
+
+            freeze.tick(delta=datetime.timedelta(seconds=59))
+            self.assertFalse(self.store.get(session.sid).is_new)
+            freeze.tick(delta=datetime.timedelta(seconds=2))
+            self.assertTrue(self.store.get(session.sid).is_new)
+
+    def test_vacuum_updates_lifetime(self):
+        self.store.vacuum(max_lifetime=3600)
+        with freeze_time() as freeze:
+            session = self.store.new()
+            session['login'] = 'demo'
+            self.store.save(session)
+
+            freeze.tick(delta=datetime.timedelta(seconds=61))
+            self.assertFalse(self.store.get(session.sid).is_new)
+
+    def test_empty_session_not_stored(self):
+        session = self.store.new()
+        session['login'] = 'demo'
+        self.store.save(session)
+
+        session.clear()
+        self.store.save(session)
+
+        self.assertEqual(self.client.data, {})
+
+    def test_rotate(self):
+        session = self.store.new()
+        session['login'] = 'demo'
+        self.store.save(session)
+        old_sid = session.sid
+
+        self.store.rotate(session, None)
+
+        self.assertNotEqual(session.sid, old_sid)
+        self.assertTrue(self.store.get(old_sid).is_new)
+        self.assertEqual(self.store.get(session.sid)['login'], 'demo')
+
+    def test_delete_from_identifiers(self):
+        sessions = [self.store.new() for _ in range(3)]
+        for session in sessions:
+            session['login'] = 'demo'
+            self.store.save(session)
+
+        self.store.delete_from_identifiers([sessions[0].sid[:42], sessions[1].sid[:42], '../*'])
+
+        self.assertTrue(self.store.get(sessions[0].sid).is_new)
+        self.assertTrue(self.store.get(sessions[1].sid).is_new)
+        self.assertFalse(self.store.get(sessions[2].sid).is_new)
+
+    def test_selected_from_config(self):
+        lazy_property.reset_all(cashapp.http.root)
+        self.addCleanup(lazy_property.reset_all, cashapp.http.root)
+        self.startPatcher(patch.dict(config.options, {'session_store': 'redis'}))
+        redis = self.startPatcher(patch('cashapp.http.redis'))
+        redis.Redis.from_url.return_value = self.client
+
+        store = cashapp.http.root.session_store
+
+        self.assertIsInstance(store, RedisSessionStore)
+        redis.Redis.from_url.assert_called_once_with(config['session_redis_url'])
+        self.assertEqual(store.prefix, config['session_redis_prefix'])
+
+
+class TestRedisSessionLifetime(TransactionCase):
+    def test_web_worker_save_uses_configured_inactivity(self):
+        client = MemoryRedis()
+        store = RedisSessionStore(client, session_class=Session)
+        self.env['ir.config_parameter'].sudo().set_param('sessions.max_inactivity_seconds', 120)
+        cashapp.http._request_stack.push(SimpleNamespace(env=self.env))
+        self.addCleanup(cashapp.http._request_stack.pop)
+
+        with freeze_time() as freeze:
+            session = store.new()
+            session['login'] = 'demo'
+            store.save(session)
+
+            freeze.tick(delta=datetime.timedelta(seconds=119))
+            self.assertFalse(store.get(session.sid).is_new)
+            freeze.tick(delta=datetime.timedelta(seconds=2))
+            self.assertTrue(store.get(session.sid).is_new)
+        self.assertEqual(store.max_lifetime, SESSION_LIFETIME, "no vacuum ran in this worker")
@@ -2,6 +2,7 @@
 
 import geoip2.errors
 import geoip2.models
+import time
 from html.parser import HTMLParser
 from cashapp.http import FilesystemSessionStore
 from cashapp.tools._vendor.sessions import SessionStore
@@ -116,3 +117,68 @@ class HtmlTokenizer(HTMLParser):
         tokenizer = cls()
         tokenizer.feed(source_str)
         return tokenizer.tokens
+
+
+class MemoryRedis:
+    """ In-memory stand-in for the subset of ``redis.Redis`` used by
+    :class:`~cashapp.http.RedisSessionStore`, expiring keys on access. """
+    def __init__(self):
+        self.data = {}
+        self.expiry = {}
+
+    def _alive(self, key):
+        if key in self.expiry and self.expiry[key] <= time.time():
+            self.data.pop(key, None)
+            self.expiry.pop(key)
+        return key in self.data
+
+    def get(self, key):
+        return self.data[key] if self._alive(key) else None
+
+    def set(self, key, value, ex=None):
+        self.data[key] = value.encode() if isinstance(value, str) else value
+        self.expiry.pop(key, None)
+        if ex is not None:
+            self.expire(key, ex)
+
+    def delete(self, *keys):
+        deleted = sum(1 for key in keys if self._alive(key))
+        for key in keys:
+            self.data.pop(key, None)
+            self.expiry.pop(key, None)
+        return deleted
+
+    def expire(self, key, seconds):
+        if self._alive(key):
+            self.expiry[key] = time.time() + seconds
+
+    def sadd(self, key, *members):
+        if not self._alive(key):
+            self.data[key] = set()
+        self.data[key].update(member.encode() for member in members)
+
+    def srem(self, key, *members):
+        if self._alive(key):
+            self.data[key].difference_update(member.encode() for member in members)
+            if not self.data[key]:
+                self.delete(key)
+
+    def smembers(self, key):
+        return set(self.data[key]) if self._alive(key) else set()
+
+    def pipeline(self):
+        return MemoryRedisPipeline(self)
+
+
+class MemoryRedisPipeline:
+    def __init__(self, client):
+        self.client = client
+        self.commands = []
+
+    def __getattr__(self, name):
+        method = getattr(self.client, name)
+        return lambda *args, **kwargs: self.commands.append((method, args, kwargs))
+
+    def execute(self):
+        commands, self.commands = self.commands, []
+        return [method(*args, **kwargs) for method, args, kwargs in commands]
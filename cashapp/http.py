@@ -169,6 +169,11 @@ try:
 except ImportError:
     maxminddb = None
 
+try:
+    import redis
+except ImportError:
+    redis = None
+
 import psycopg2
 import werkzeug.datastructures
 import werkzeug.exceptions
@@ -980,6 +985,88 @@ class FilesystemSessionStore(sessions.FilesystemSessionStore):
                 os.unlink(fn)
 
 
+class RedisSessionStore(sessions.SessionStore):
+    """ Session store keeping sessions in Redis, shared by every worker of
+    every node. Sessions expire through Redis TTLs instead of a vacuum of the
+    session tree, and each session identifier is indexed in a set so that
+    :meth:`delete_from_identifiers` does not have to scan the keys.
+
+    Sessions are only written when modified (see ``Request._save_session``),
+    and emptied sessions are deleted rather than stored.
+    """
+    def __init__(self, client, prefix='session:', max_lifetime=SESSION_LIFETIME, session_class=None):
+        super().__init__(session_class=session_class)
+        self.client = client
+        self.prefix = prefix
+        self.max_lifetime = max_lifetime
+
+    generate_key = FilesystemSessionStore.generate_key
+    is_valid_key = FilesystemSessionStore.is_valid_key
+    rotate = FilesystemSessionStore.rotate
+
+    def _session_key(self, sid):
+        return f'{self.prefix}{sid}'
+
+    def _identifier_key(self, identifier):
+        return f'{self.prefix}identifier:{identifier}'
+
+    def get(self, sid):
+        if not self.is_valid_key(sid):
+            return self.new()
+        payload = self.client.get(self._session_key(sid))
+        if payload is None:
+            return self.new()
+        try:
+            data = json.loads(payload)
+        except ValueError:
+            _logger.debug('Could not load session data. Use empty session.', exc_info=True)
+            data = {}
+        return self.session_class(data, sid, False)
+
+    def _lifetime(self):
+        # sessions.max_inactivity_seconds is a per-database parameter: read it
+        # from the request being served, fall back to the vacuum's value
+        if request and request.env:
+            return get_session_max_inactivity(request.env)
+        return self.max_lifetime
+
+    def save(self, session):
+        if not session:
+            self.delete(session)
+            return
+        lifetime = self._lifetime()
+        identifier_key = self._identifier_key(session.sid[:42])
+        pipe = self.client.pipeline()
+        pipe.set(self._session_key(session.sid), json.dumps(dict(session)), ex=lifetime)
+        pipe.sadd(identifier_key, session.sid)
+        pipe.expire(identifier_key, lifetime)
+        pipe.execute()
+
+    def delete(self, session):
+        pipe = self.client.pipeline()
+        pipe.delete(self._session_key(session.sid))
+        pipe.srem(self._identifier_key(session.sid[:42]), session.sid)
+        pipe.execute()
+
+    def vacuum(self, max_lifetime=SESSION_LIFETIME):
+        # Redis expires the sessions itself, only keep their TTL up to date
+        self.max_lifetime = max_lifetime
+
+    def delete_from_identifiers(self, identifiers):
+        keys = []
+        for identifier in identifiers:
+            if not _session_identifier_re.match(identifier):
+                continue
+            identifier_key = self._identifier_key(identifier)
+            keys.append(identifier_key)
+            keys.extend(
+                self._session_key(sid.decode() if isinstance(sid, bytes) else sid)
+                for sid in self.client.smembers(identifier_key)
+            )
+        if keys:
+            self.client.delete(*keys)
+
+
 class Session(collections.abc.MutableMapping):
     """ Structure containing data persisted across requests. """
     __slots__ = ('can_save', '_Session__data', 'is_dirty', 'is_new',
@@ -2300,6 +2387,12 @@ class Application:
 
     @lazy_property
     def session_store(self):
+        if config['session_store'] == 'redis':
+            if redis is None:
+                raise ImportError("The 'redis' session store requires the redis python library")
+            _logger.debug('HTTP sessions stored in Redis under %r', config['session_redis_prefix'])
+            client = redis.Redis.from_url(config['session_redis_url'])
+            return RedisSessionStore(client, prefix=config['session_redis_prefix'], session_class=Session)
         path = cashapp.tools.config.session_dir
         _logger.debug('HTTP sessions stored in: %s', path)
         return FilesystemSessionStore(path, session_class=Session, renew_missing=True)
@@ -8,6 +8,7 @@ the ORM does, in fact.
 """
 from __future__ import annotations
 
+import collections
 import logging
 import os
 import re
@@ -17,6 +18,7 @@ import typing
 import uuid
 from contextlib import contextmanager
 from datetime import datetime, timedelta
+from functools import partial
 from inspect import currentframe
 
 import psycopg2
@@ -773,6 +775,325 @@ class ConnectionPool(object):
         return dsn1 == dsn2
 
 
+class BucketedConnectionPool(object):
+    """ A pool of connections to database(s), bucketed by DSN
+
+        Idle connections sit in one LIFO free list per DSN, so borrowing and
+        giving back are O(1) instead of a scan of every connection. When the
+        pool is full, borrowers wait (up to ``timeout`` seconds, at most
+        ``max_waiters`` of them) for a connection to be given back instead of
+        failing at once. Idle, dead and leaked connections are collected by a
+        background reaper thread rather than on every borrow.
+
+        Same interface as :class:`ConnectionPool`, plus :meth:`stats`.
+    """
+    REAP_INTERVAL = 30
+
+    def __init__(self, maxconn=64, readonly=False, timeout=10.0, max_waiters=None):
+        self._maxconn = max(maxconn, 1)
+        self._readonly = readonly
+        self._timeout = timeout
+        self._max_waiters = max_waiters if max_waiters is not None else 4 * self._maxconn
+        self._lock = threading.Lock()
+        self._available = threading.Condition(self._lock)
+        self._free = {}             # dsn key -> deque of [cnx, last_used]
+        self._used = {}             # cnx -> dsn key
+        self._count = 0             # open connections, including ones being opened
+        self._idle = 0              # connections in the free lists
+        self._waiting = 0
+        self._reaper_pid = None
+        self._reset_stats()
+
+    def __repr__(self):
+        mode = 'read-only' if self._readonly else 'read/write'
+        return f"BucketedConnectionPool({mode};used={self._count - self._idle}/count={self._count}/max={self._maxconn})"
+
+    @property
+    def readonly(self):
+        return self._readonly
+
+    def _debug(self, msg, *args):
+        _logger_conn.debug(('%r ' + msg), self, *args)
+
+    def _dsn_key(self, dsn):
+        alias_keys = {'dbname': 'database'}
+        items = psycopg2.extensions.parse_dsn(dsn) if isinstance(dsn, str) else dsn
+        return frozenset(
+            (alias_keys.get(key, key), str(value))
+            for key, value in items.items()
+            if key != 'password'
+        )
+
+    def borrow(self, connection_info):
+        """
+        Borrow a PsycoConnection from the pool. Reuse an idle connection to the
+        same DSN, else open a new one if a slot is free, else close the oldest
+        idle connection to another DSN and open one in its place. When every
+        connection is in use, wait for one to be given back.
+
+        :param dict connection_info: dict of psql connection keywords
+        :rtype: PsycoConnection
+        :raise PoolError: when no connection frees up within the timeout, or
+            too many borrowers are already waiting
+        """
+        self._ensure_reaper()
+        key = self._dsn_key(connection_info)
+        while True:
+            with self._lock:
+                cnx, evicted = self._reserve(key)
+
+            if evicted is not None:
+                self._debug('Removing old connection to %r', evicted.dsn)
+                if not evicted.closed:
+                    evicted.close()
+
+            if cnx is None:
+                return self._connect(key, connection_info)
+
+            try:
+                cnx.reset()
+            except psycopg2.OperationalError:
+                self._debug('Cannot reset connection to %r', cnx.dsn)
+                if not cnx.closed:
+                    cnx.close()
+                with self._lock:
+                    del self._used[cnx]
+                    self._count -= 1
+                    self._available.notify()
+                continue
+            self._debug('Borrow existing connection to %r', cnx.dsn)
+            return cnx
+
+    def _reserve(self, key):
+        """ Under the lock: claim an idle connection to ``key``, or a slot to
+            open a new one, evicting an idle connection to another DSN or
+            waiting as needed.
+
+            :return: ``(cnx, evicted)`` where ``cnx`` is the claimed idle
+                connection or ``None`` if a slot was claimed instead, and
+                ``evicted`` is a connection the caller must close
+        """
+        self._stats['borrows'] += 1
+        started = None
+        while True:
+            bucket = self._free.get(key)
+            if bucket:
+                cnx, _ = bucket.pop()
+                if not bucket:
+                    del self._free[key]
+                self._idle -= 1
+                self._used[cnx] = key
+                return self._claimed(started, cnx, None)
+
+            if self._count < self._maxconn:
+                self._count += 1
+                return self._claimed(started, None, None)
+
+            evicted = self._pop_oldest_idle()
+            if evicted is not None:
+                # the evicted connection's slot goes to the new one
+                return self._claimed(started, None, evicted)
+
+            if self._reclaim_leaked():
+                continue
+
+            if started is None:
+                if self._waiting >= self._max_waiters:
+                    self._stats['rejected'] += 1
+                    raise PoolError('The Connection Pool Is Full')
+                started = time.monotonic()
+            remaining = started + self._timeout - time.monotonic()
+            if remaining <= 0:
+                self._record_wait(started)
+                self._stats['timeouts'] += 1
+                raise PoolError(
+                    f'The Connection Pool Is Full (no connection freed up in {self._timeout}s)'
+                )
+            self._waiting += 1
+            try:
+                self._available.wait(remaining)
+            finally:
+                self._waiting -= 1
+
+    def _claimed(self, started, cnx, evicted):
+        if started is not None:
+            self._record_wait(started)
+        self._stats['peak_used'] = max(self._stats['peak_used'], self._count - self._idle)
+        return cnx, evicted
+
+    def _connect(self, key, connection_info):
+        try:
+            result = psycopg2.connect(
+                connection_factory=PsycoConnection,
+                **connection_info)
+        except psycopg2.Error:
+            _logger.info('Connection to the database failed')
+            with self._lock:
+                self._count -= 1
+                self._available.notify()
+            raise
+        with self._lock:
+            self._used[result] = key
+            self._stats['created'] += 1
+        self._debug('Create new connection backend PID %d', result.get_backend_pid())
+        return result
+
+    def _pop_oldest_idle(self):
+        oldest_key = None
+        for key, bucket in self._free.items():
+            if oldest_key is None or bucket[0][1] < self._free[oldest_key][0][1]:
+                oldest_key = key
+        if oldest_key is None:
+            return None
+        bucket = self._free[oldest_key]
+        cnx, _ = bucket.popleft()
+        if not bucket:
+            del self._free[oldest_key]
+        self._idle -= 1
+        self._stats['closed'] += 1
+        return cnx
+
+    def _reclaim_leaked(self):
+        """ Under the lock: put connections of garbage-collected cursors back
+            in their free list. Returns how many were reclaimed.
+        """
+        leaked = [cnx for cnx in self._used if getattr(cnx, 'leaked', False)]
+        for cnx in leaked:
+            delattr(cnx, 'leaked')
+            self._release(cnx, self._used.pop(cnx))
+            _logger.info('%r: Free leaked connection to %r', self, cnx.dsn)
+        return len(leaked)
+
+    def _release(self, cnx, key):
+        self._free.setdefault(key, collections.deque()).append([cnx, time.monotonic()])
+        self._idle += 1
+        self._available.notify()
+
+    def _record_wait(self, started):
+        waited = time.monotonic() - started
+        self._stats['waits'] += 1
+        self._stats['wait_time'] += waited
+        self._stats['max_wait'] = max(self._stats['max_wait'], waited)
+
+    def give_back(self, connection, keep_in_pool=True):
+        self._debug('Give back connection to %r', connection.dsn)
+        with self._lock:
+            if connection not in self._used:
+                raise PoolError('This connection does not belong to the pool')
+            key = self._used.pop(connection)
+            if keep_in_pool and not connection.closed:
+                self._release(connection, key)
+                self._debug('Put connection to %r in pool', connection.dsn)
+                return
+            self._count -= 1
+            self._stats['closed'] += 1
+            self._available.notify()
+        self._debug('Forgot connection to %r', connection.dsn)
+        connection.close()
+
+    def close_all(self, dsn=None):
+        key = None if dsn is None else self._dsn_key(dsn)
+        with self._lock:
+            to_close = [cnx for cnx, cnx_key in self._used.items() if key in (None, cnx_key)]
+            for cnx in to_close:
+                del self._used[cnx]
+            for bucket_key in list(self._free):
+                if key in (None, bucket_key):
+                    bucket = self._free.pop(bucket_key)
+                    self._idle -= len(bucket)
+                    to_close.extend(cnx for cnx, _ in bucket)
+            self._count -= len(to_close)
+            self._stats['closed'] += len(to_close)
+            self._available.notify_all()
+        for cnx in to_close:
+            cnx.close()
+        if to_close:
+            _logger.info('%r: Closed %d connections %s', self, len(to_close),
+                        (dsn and 'to %r' % to_close[-1].dsn) or '')
+
+    def reap(self):
+        """ Close idle connections unused for MAX_IDLE_TIMEOUT, forget dead
+            ones and reclaim leaked ones. Run periodically by the reaper thread.
+        """
+        cutoff = time.monotonic() - MAX_IDLE_TIMEOUT
+        to_close = []
+        with self._lock:
+            self._reclaim_leaked()
+            for key in list(self._free):
+                bucket = self._free[key]
+                # buckets are LIFO, so the idlest connections are on the left
+                while bucket and (bucket[0][1] < cutoff or bucket[0][0].closed):
+                    to_close.append(bucket.popleft()[0])
+                for entry in [entry for entry in bucket if entry[0].closed]:
+                    bucket.remove(entry)
+                    to_close.append(entry[0])
+                if not bucket:
+                    del self._free[key]
+            self._idle -= len(to_close)
+            self._count -= len(to_close)
+            self._stats['closed'] += len(to_close)
+            if to_close:
+                self._available.notify_all()
+        for cnx in to_close:
+            self._debug('Close idle connection to %r', cnx.dsn)
+            if not cnx.closed:
+                cnx.close()
+        return len(to_close)
+
+    def _ensure_reaper(self):
+        # the reaper does not survive a fork: start one per process
+        if self._reaper_pid == os.getpid():
+            return
+        with self._lock:
+            if self._reaper_pid == os.getpid():
+                return
+            self._reaper_pid = os.getpid()
+        thread = threading.Thread(
+            target=self._reap_forever, name=f'{type(self).__name__}.reaper', daemon=True)
+        thread.start()
+
+    def _reap_forever(self):
+        pid = os.getpid()
+        while self._reaper_pid == pid:
+            time.sleep(self.REAP_INTERVAL)
+            try:
+                self.reap()
+                _logger_conn.debug('%r stats: %s', self, self.stats())
+            except Exception:
+                _logger.exception('%r: connection reaper failed', self)
+
+    def _reset_stats(self):
+        self._stats = {
+            'borrows': 0, 'created': 0, 'closed': 0, 'waits': 0,
+            'wait_time': 0.0, 'max_wait': 0.0, 'timeouts': 0, 'rejected': 0,
+            'peak_used': 0,
+        }
+        self._stats_since = time.monotonic()
+
+    def stats(self, reset=False):
+        """ Pool metrics since the last reset: borrow rate, wait times and
+            utilization, plus the current connection counts.
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            elapsed = max(time.monotonic() - self._stats_since, 1e-9)
+            used = self._count - self._idle
+            stats.update(
+                maxconn=self._maxconn,
+                connections=self._count,
+                used=used,
+                idle=self._idle,
+                waiting=self._waiting,
+                utilization=used / self._maxconn,
+                peak_utilization=stats['peak_used'] / self._maxconn,
+                borrow_rate=stats['borrows'] / elapsed,
+                avg_wait=stats['wait_time'] / stats['waits'] if stats['waits'] else 0.0,
+            )
+            if reset:
+                self._reset_stats()
+        return stats
+
+
 class Connection(object):
     """ A lightweight instance of a connection to postgres
     """
@@ -844,10 +1165,14 @@ def db_connect(to, allow_uri=False, readonly=False):
     global _Pool, _Pool_readonly  # noqa: PLW0603 (global-statement)
 
     maxconn = cashapp.evented and tools.config['db_maxconn_gevent'] or tools.config['db_maxconn']
+    if tools.config.get('db_pool_mode') == 'bucketed':
+        pool_class = partial(BucketedConnectionPool, timeout=tools.config['db_pool_timeout'])
+    else:
+        pool_class = ConnectionPool
     if _Pool is None and not readonly:
-        _Pool = ConnectionPool(int(maxconn), readonly=False)
+        _Pool = pool_class(int(maxconn), readonly=False)
     if _Pool_readonly is None and readonly:
-        _Pool_readonly = ConnectionPool(int(maxconn), readonly=True)
+        _Pool_readonly = pool_class(int(maxconn), readonly=True)
 
     db, info = connection_info_for(to, readonly)
     if not allow_uri and db != to:
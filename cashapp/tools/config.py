@@ -150,6 +150,15 @@ class configmanager(object):
                          help="Activate X-Sendfile (apache) and X-Accel-Redirect (nginx) "
                               "HTTP response header to delegate the delivery of large "
                               "files (assets/attachments) to the web server.")
+        group.add_option("--session-store", dest="session_store", type="choice", my_default='filesystem',
+                         choices=['filesystem', 'redis'],
+                         help="specify where HTTP sessions are stored: 'filesystem' keeps one file per "
+                              "session in the data directory, 'redis' keeps them in the Redis server "
+                              "given by --session-redis-url and lets Redis expire them")
+        group.add_option("--session-redis-url", dest="session_redis_url", my_default='redis://localhost:6379/0',
+                         help="specify the URL of the Redis server used by the 'redis' session store")
+        group.add_option("--session-redis-prefix", dest="session_redis_prefix", my_default='session:',
+                         help="specify the prefix of the Redis keys used by the 'redis' session store")
         # HTTP: hidden backwards-compatibility for "*xmlrpc*" options
         hidden = optparse.SUPPRESS_HELP
         group.add_option("--xmlrpc-interface", dest="http_interface", help=hidden)
@@ -269,6 +278,14 @@ class configmanager(object):
                          help="specify the maximum number of physical connections to PostgreSQL")
         group.add_option("--db_maxconn_gevent", dest="db_maxconn_gevent", type='int', my_default=False,
                          help="specify the maximum number of physical connections to PostgreSQL specifically for the gevent worker")
+        group.add_option("--db_pool_mode", dest="db_pool_mode", type="choice", my_default='legacy',
+                         choices=['legacy', 'bucketed'],
+                         help="specify the connection pool implementation: 'legacy' scans every connection on "
+                              "borrow and fails when full, 'bucketed' keeps per-database free lists and waits "
+                              "for a connection when full")
+        group.add_option("--db_pool_timeout", dest="db_pool_timeout", type="float", my_default=10.0,
+                         help="specify how many seconds a 'bucketed' pool waits for a free connection "
+                              "before raising an error")
         group.add_option("--db-template", dest="db_template", my_default="template0",
                          help="specify a custom database template to create a new database")
         parser.add_option_group(group)
@@ -477,11 +494,12 @@ class configmanager(object):
 
         # if defined do not take the configfile value even if the defined value is None
         keys = ['gevent_port', 'http_interface', 'http_port', 'http_enable', 'x_sendfile',
+                'session_store', 'session_redis_url', 'session_redis_prefix',
                 'db_name', 'db_user', 'db_password', 'db_host', 'db_replica_host', 'db_sslmode',
                 'db_port', 'db_replica_port', 'db_template', 'logfile', 'pidfile', 'smtp_port',
                 'email_from', 'smtp_server', 'smtp_user', 'smtp_password', 'from_filter',
                 'smtp_ssl_certificate_filename', 'smtp_ssl_private_key_filename',
-                'db_maxconn', 'db_maxconn_gevent', 'import_partial', 'addons_path', 'upgrade_path', 'pre_upgrade_scripts',
+                'db_maxconn', 'db_maxconn_gevent', 'db_pool_mode', 'db_pool_timeout', 'import_partial', 'addons_path', 'upgrade_path', 'pre_upgrade_scripts',
                 'syslog', 'without_demo', 'screencasts', 'screenshots',
                 'dbfilter', 'log_level', 'log_db',
                 'log_db_level', 'geoip_city_db', 'geoip_country_db', 'dev_mode',